@@ -1,50 +1,145 @@
 from micropython import const
+import struct
 import time
 
 BMP280_I2C_ADDR = const(0x76)
 
+_REG_CALIB = const(0x88)
+_REG_STATUS = const(0xF3)
+_REG_CTRL_MEAS = const(0xF4)
+_REG_CONFIG = const(0xF5)
+_REG_DATA = const(0xF7)  # press_msb .. temp_xlsb, 6 bytes
+
+# Oversampling (osrs_t / osrs_p)
+OSAMPLE_SKIP = const(0)
+OSAMPLE_1 = const(1)
+OSAMPLE_2 = const(2)
+OSAMPLE_4 = const(3)
+OSAMPLE_8 = const(4)
+OSAMPLE_16 = const(5)
+
+# Power modes
+MODE_SLEEP = const(0)
+MODE_FORCED = const(1)
+MODE_NORMAL = const(3)
+
+# IIR filter coefficient
+IIR_OFF = const(0)
+IIR_2 = const(1)
+IIR_4 = const(2)
+IIR_8 = const(3)
+IIR_16 = const(4)
+
+# Standby time between conversions in normal mode
+STANDBY_0_5 = const(0)
+STANDBY_62_5 = const(1)
+STANDBY_125 = const(2)
+STANDBY_250 = const(3)
+STANDBY_500 = const(4)
+STANDBY_1000 = const(5)
+STANDBY_2000 = const(6)
+STANDBY_4000 = const(7)
+
+_STANDBY_US = (500, 62500, 125000, 250000, 500000, 1000000, 2000000, 4000000)
+
+
 class BMP280:
-    def __init__(self, i2c, addr=BMP280_I2C_ADDR):
+    def __init__(self, i2c, addr=BMP280_I2C_ADDR, osrs_t=OSAMPLE_1, osrs_p=OSAMPLE_1,
+                 mode=MODE_NORMAL, iir=IIR_OFF, standby=STANDBY_1000):
         self.i2c = i2c
         self.addr = addr
+        self.buf = bytearray(6)
+        self._one = bytearray(1)
+        self.t_fine = 0
         self._load_calibration()
-        self._write(0xF4, 0x27)
-        self._write(0xF5, 0xA0)
+        self.configure(osrs_t, osrs_p, mode, iir, standby)
 
     def _read(self, reg, nbytes=1):
         return self.i2c.readfrom_mem(self.addr, reg, nbytes)
 
     def _write(self, reg, value):
-        self.i2c.writeto_mem(self.addr, reg, bytes([value]))
+        self._one[0] = value
+        self.i2c.writeto_mem(self.addr, reg, self._one)
 
     def _load_calibration(self):
-        calib = self._read(0x88, 24)
-        self.dig_T1 = calib[1] << 8 | calib[0]
-        self.dig_T2 = calib[3] << 8 | calib[2]
-        self.dig_T3 = calib[5] << 8 | calib[4]
-        self.dig_P1 = calib[7] << 8 | calib[6]
-        self.dig_P2 = calib[9] << 8 | calib[8]
-        self.dig_P3 = calib[11] << 8 | calib[10]
-        self.dig_P4 = calib[13] << 8 | calib[12]
-        self.dig_P5 = calib[15] << 8 | calib[14]
-        self.dig_P6 = calib[17] << 8 | calib[16]
-        self.dig_P7 = calib[19] << 8 | calib[18]
-        self.dig_P8 = calib[21] << 8 | calib[20]
-        self.dig_P9 = calib[23] << 8 | calib[22]
+        # Raw registers are kept so logs can be compensated on the ground
+        self.calibration = self._read(_REG_CALIB, 24)
+        # dig_T1 and dig_P1 are unsigned, all other words are signed
+        (self.dig_T1, self.dig_T2, self.dig_T3,
+         self.dig_P1, self.dig_P2, self.dig_P3, self.dig_P4, self.dig_P5,
+         self.dig_P6, self.dig_P7, self.dig_P8, self.dig_P9) = struct.unpack(
+            "<HhhHhhhhhhhh", self.calibration)
 
-    @property
-    def temperature(self):
-        raw = self._read(0xFA, 3)
-        adc_T = (raw[0] << 12) | (raw[1] << 4) | (raw[2] >> 4)
+    def configure(self, osrs_t=OSAMPLE_1, osrs_p=OSAMPLE_1, mode=MODE_NORMAL,
+                  iir=IIR_OFF, standby=STANDBY_1000):
+        """Set oversampling, power mode, IIR filter and normal-mode standby time.
+
+        The config register is only guaranteed to take effect in sleep mode, so
+        the sensor is put to sleep first.
+        """
+        self.osrs_t = osrs_t
+        self.osrs_p = osrs_p
+        self.mode = mode
+        self.iir = iir
+        self.standby = standby
+        self._write(_REG_CTRL_MEAS, (osrs_t << 5) | (osrs_p << 2) | MODE_SLEEP)
+        self._write(_REG_CONFIG, (standby << 5) | (iir << 2))
+        self._ctrl_meas = (osrs_t << 5) | (osrs_p << 2)
+        if mode != MODE_SLEEP:
+            self._write(_REG_CTRL_MEAS, self._ctrl_meas | mode)
+
+    def measure_time_us(self):
+        """Maximum conversion time for the current oversampling (datasheet 9.1)."""
+        t = 1250
+        if self.osrs_t:
+            t += 2300 * (1 << (min(self.osrs_t, OSAMPLE_16) - 1))
+        if self.osrs_p:
+            t += 2300 * (1 << (min(self.osrs_p, OSAMPLE_16) - 1)) + 575
+        return t
+
+    def sample_period_us(self):
+        """How often a new result appears in normal mode."""
+        return self.measure_time_us() + _STANDBY_US[self.standby]
+
+    def force(self):
+        """Start one conversion in forced mode; returns the time to wait in us."""
+        self._write(_REG_CTRL_MEAS, self._ctrl_meas | MODE_FORCED)
+        return self.measure_time_us()
+
+    def measuring(self):
+        self.i2c.readfrom_mem_into(self.addr, _REG_STATUS, self._one)
+        return bool(self._one[0] & 0x08)
+
+    def read_raw(self):
+        """Pressure and temperature ADC registers (0xF7-0xFC) in one burst."""
+        self.i2c.readfrom_mem_into(self.addr, _REG_DATA, self.buf)
+        return self.buf
+
+    def read(self):
+        """Return (temperature in °C, pressure in Pa) from one I2C transaction.
+
+        In forced mode this triggers a conversion and waits for it first.
+        """
+        if self.mode == MODE_FORCED:
+            time.sleep_us(self.force())
+            while self.measuring():
+                pass
+        return self.convert(self.read_raw())
+
+    def convert(self, b, o=0):
+        """(temperature, pressure) from a read_raw() block found at ``b[o:o + 6]``."""
+        return self.compensate((b[o + 3] << 12) | (b[o + 4] << 4) | (b[o + 5] >> 4),
+                               (b[o] << 12) | (b[o + 1] << 4) | (b[o + 2] >> 4))
+
+    def compensate(self, adc_T, adc_P):
+        """Datasheet integer compensation; temperature is always done first."""
         var1 = (((adc_T >> 3) - (self.dig_T1 << 1)) * self.dig_T2) >> 11
         var2 = (((((adc_T >> 4) - self.dig_T1) * ((adc_T >> 4) - self.dig_T1)) >> 12) * self.dig_T3) >> 14
         self.t_fine = var1 + var2
-        return ((self.t_fine * 5 + 128) >> 8) / 100
+        temperature = ((self.t_fine * 5 + 128) >> 8) / 100
+        return temperature, self._compensate_pressure(adc_P)
 
-    @property
-    def pressure(self):
-        raw = self._read(0xF7, 3)
-        adc_P = (raw[0] << 12) | (raw[1] << 4) | (raw[2] >> 4)
+    def _compensate_pressure(self, adc_P):
         var1 = self.t_fine - 128000
         var2 = var1 * var1 * self.dig_P6
         var2 = var2 + ((var1 * self.dig_P5) << 17)
@@ -58,4 +153,12 @@ class BMP280:
         var1 = (self.dig_P9 * (p >> 13) * (p >> 13)) >> 25
         var2 = (self.dig_P8 * p) >> 19
         p = ((p + var1 + var2) >> 8) + (self.dig_P7 << 4)
-        return p / 256
\ No newline at end of file
+        return p / 256
+
+    @property
+    def temperature(self):
+        return self.read()[0]
+
+    @property
+    def pressure(self):
+        return self.read()[1]
@@ -1,30 +1,279 @@
 # Save this file to your Pico as: micropython_tinygpsplus.py
+#
+# Incremental NMEA parser in the spirit of TinyGPS++.  Bytes are fed in as
+# they arrive (feed() takes a whole UART chunk, update() a single character);
+# each sentence is collected into a preallocated buffer, its *hh checksum is
+# verified and GGA, RMC, VTG and GSA fields are decoded straight from the
+# bytes into integers.  Nothing is allocated per byte or per sentence; the
+# float accessors (location.lat, altitude.meters(), ...) only allocate when
+# they are called.
+#
+# u-blox UBX frames in the same stream are collected as well; NAV-PVT (see
+# ublox.py) fills the same fields as GGA + RMC.
+import struct
 import time
 
+MAX_SENTENCE = 96  # NMEA allows 82 characters; some receivers go a little over
+MAX_FIELDS = 24
+
+_DOLLAR = 36
+_STAR = 42
+_COMMA = 44
+_DOT = 46
+_MINUS = 45
+_CR = 13
+_LF = 10
+_SYNC1 = 0xB5
+_SYNC2 = 0x62
+
+UBX_MAX = 98  # class, id, length, 92-byte NAV-PVT payload, checksum
+# iTOW, year, month, day, hour, min, sec, valid, tAcc, nano, fixType, flags,
+# flags2, numSV, lon, lat, height, hMSL, hAcc, vAcc, velN, velE, velD,
+# gSpeed, headMot, sAcc, headAcc, pDOP
+NAV_PVT_FORMAT = "<IHBBBBBBIiBBBBiiiiIIiiiiiIIH"
+
+
+def _hex(c):
+    if 48 <= c <= 57:
+        return c - 48
+    if 65 <= c <= 70:
+        return c - 55
+    if 97 <= c <= 102:
+        return c - 87
+    return -1
+
+
+class _Fix:
+    # Common bookkeeping: validity, update flag and the tick of the last update
+    def __init__(self):
+        self.is_valid = False
+        self.updated = False
+        self._ticks = 0
+
+    def _commit(self):
+        self.is_valid = True
+        self.updated = True
+        self._ticks = time.ticks_ms()
+
+    def age(self):
+        """Milliseconds since the last update, or -1 if there never was one."""
+        if not self.is_valid:
+            return -1
+        return time.ticks_diff(time.ticks_ms(), self._ticks)
+
+
+class Location(_Fix):
+    # Degrees plus billionths of a degree, like TinyGPS++ RawDegrees; both fit
+    # a MicroPython small int
+    def __init__(self):
+        super().__init__()
+        self.lat_deg = 0
+        self.lat_billionths = 0
+        self.lat_negative = False
+        self.lng_deg = 0
+        self.lng_billionths = 0
+        self.lng_negative = False
+
+    @property
+    def lat(self):
+        v = self.lat_deg + self.lat_billionths / 1000000000
+        return -v if self.lat_negative else v
+
+    @property
+    def lng(self):
+        v = self.lng_deg + self.lng_billionths / 1000000000
+        return -v if self.lng_negative else v
+
+    def lat_e7(self):
+        v = self.lat_deg * 10000000 + self.lat_billionths // 100
+        return -v if self.lat_negative else v
+
+    def lng_e7(self):
+        v = self.lng_deg * 10000000 + self.lng_billionths // 100
+        return -v if self.lng_negative else v
+
+
+class Value(_Fix):
+    # Fixed-point field: ``value`` is in units of 1/``scale``
+    def __init__(self, scale=100):
+        super().__init__()
+        self.value = 0
+        self.scale = scale
+
+
+class Altitude(Value):
+    def meters(self):
+        return self.value / 100
+
+
+class Speed(Value):
+    # value: knots * 100
+    def knots(self):
+        return self.value / 100
+
+    def mps(self):
+        return self.value * 0.00514444
+
+    def kmph(self):
+        return self.value * 0.01852
+
+    def cms(self):
+        return self.value * 5144 // 10000
+
+
+class Course(Value):
+    # value: degrees * 100
+    def deg(self):
+        return self.value / 100
+
+
+class Hdop(Value):
+    # value: HDOP * 100
+    def hdop(self):
+        return self.value / 100
+
+
+class Date(_Fix):
+    def __init__(self):
+        super().__init__()
+        self.year = 0
+        self.month = 0
+        self.day = 0
+
+
+class Time(_Fix):
+    def __init__(self):
+        super().__init__()
+        self.hour = 0
+        self.minute = 0
+        self.second = 0
+        self.centisecond = 0
+
+
 class TinyGPSPlus:
     def __init__(self):
-        self.location = type('obj', (object,), {'lat': 0.0, 'lng': 0.0, 'is_valid': False})
-        self.date = type('obj', (object,), {'year': 0, 'month': 0, 'day': 0})
-        self.time = type('obj', (object,), {'hour': 0, 'minute': 0, 'second': 0})
-        self.satellites = type('obj', (object,), {'value': 0})
+        self.location = Location()
+        self.date = Date()
+        self.time = Time()
+        self.satellites = Value(1)
+        self.altitude = Altitude()
+        self.speed = Speed()
+        self.course = Course()
+        self.hdop = Hdop()
+        self.fix_quality = 0  # GGA: 0 none, 1 GPS, 2 DGPS, ...
+        self.fix_type = 1  # GSA: 1 none, 2 2D, 3 3D
+
+        self.chars_processed = 0
+        self.sentences_passed = 0
+        self.failed_checksum = 0
+        self.sentences_dropped = 0  # too long or no checksum
+        self.sentences_ignored = 0  # valid, but a type we do not decode
 
+        self._line = bytearray(MAX_SENTENCE)
+        self._commas = bytearray(MAX_FIELDS)
+        self._pos = 0  # 0 = waiting for '$'
+        self._star = 0
+        self._xor = 0
+        self._fields = 0
+        self._end = 0
+        self._nfields = 0
+        self._one = bytearray(1)
+        self._ubx = bytearray(UBX_MAX)
+        self._ubx_pos = 0  # 0 = not in a UBX frame, 1 = seen 0xB5, then 2 + index
+        self._ubx_len = 0
+
+    # ============= INPUT =============
     def update(self, char):
-        # Very simplified parser logic for demonstration 
-        # (In a real scenario, this would parse the NMEA string)
-        return True
+        """Feed one character (str or int); True when it completed a good sentence."""
+        if isinstance(char, str):
+            char = ord(char)
+        passed = self.sentences_passed
+        self._feed_byte(char)
+        return self.sentences_passed != passed
+
+    def feed(self, data, n=-1):
+        """Feed the first ``n`` bytes of ``data``; returns how many sentences passed."""
+        if n < 0:
+            n = len(data)
+        line = self._line
+        commas = self._commas
+        size = MAX_SENTENCE
+        pos = self._pos
+        star = self._star
+        xor = self._xor
+        fields = self._fields
+        ubx = self._ubx_pos
+        frame = self._ubx
+        passed = self.sentences_passed
+        i = 0
+        while i < n:
+            c = data[i]
+            i += 1
+            if ubx:
+                # Binary frame: sync 0xB5 0x62, then class, id, length, payload, checksum
+                if ubx == 1:
+                    ubx = 2 if c == _SYNC2 else 0
+                    continue
+                k = ubx - 2
+                if k < UBX_MAX:
+                    frame[k] = c
+                ubx += 1
+                if k == 3:
+                    self._ubx_len = 6 + (frame[2] | c << 8)
+                    if self._ubx_len > UBX_MAX:
+                        # Too long for us (or a false sync): back to scanning
+                        self.sentences_dropped += 1
+                        ubx = 0
+                elif k > 3 and k + 1 == self._ubx_len:
+                    self._frame(k + 1)
+                    ubx = 0
+                continue
+            if c == _DOLLAR:
+                pos = 1
+                star = xor = fields = 0
+                continue
+            if not pos:
+                if c == _SYNC1:
+                    ubx = 1
+                continue
+            if c == _CR or c == _LF:
+                self._sentence(pos, star, xor, fields)
+                pos = 0
+                continue
+            if pos >= size:
+                self.sentences_dropped += 1
+                pos = 0
+                continue
+            line[pos] = c
+            if not star:
+                if c == _STAR:
+                    star = pos
+                else:
+                    xor ^= c
+                    if c == _COMMA and fields < MAX_FIELDS:
+                        commas[fields] = pos
+                        fields += 1
+            pos += 1
+        self._pos = pos
+        self._star = star
+        self._xor = xor
+        self._fields = fields
+        self._ubx_pos = ubx
+        self.chars_processed += n
+        return self.sentences_passed - passed
+
+    def _feed_byte(self, c):
+        self._one[0] = c
+        self.feed(self._one, 1)
 
     def parse_nmea(self, sentence):
-        try:
-            parts = sentence.split(',')
-            if parts[0] in ['$GPGGA', '$GNRMC']:
-                if parts[2] and parts[4]:
-                    self.location.lat = self.convert_coords(parts[2], parts[3])
-                    self.location.lng = self.convert_coords(parts[4], parts[5])
-                    self.location.is_valid = True
-                    return True
-        except:
-            pass
-        return False
+        """Parse one complete sentence (str or bytes); True if it updated the location."""
+        if isinstance(sentence, str):
+            sentence = sentence.encode()
+        self.location.updated = False
+        self.feed(sentence)
+        self.feed(b"\n")
+        return self.location.updated
 
     def convert_coords(self, value, direction):
         dot = value.find('.')
@@ -33,4 +282,244 @@ class TinyGPSPlus:
         decimal = degrees + (minutes / 60)
         if direction in ['S', 'W']:
             decimal *= -1
-        return decimal
\ No newline at end of file
+        return decimal
+
+    # ============= SENTENCES =============
+    def _sentence(self, end, star, xor, fields):
+        line = self._line
+        if not star or star + 3 > end:
+            self.sentences_dropped += 1
+            return
+        hi = _hex(line[star + 1])
+        lo = _hex(line[star + 2])
+        if hi < 0 or lo < 0 or (hi << 4 | lo) != xor:
+            self.failed_checksum += 1
+            return
+        self.sentences_passed += 1
+        self._end = star
+        self._nfields = fields
+        # $ttSSS: talker (GP, GN, GL, ...) is ignored, SSS picks the decoder
+        if fields == 0 or self._commas[0] != 6:
+            self.sentences_ignored += 1
+            return
+        a, b, c = line[3], line[4], line[5]
+        if a == 71 and b == 71 and c == 65:  # GGA
+            self._gga()
+        elif a == 82 and b == 77 and c == 67:  # RMC
+            self._rmc()
+        elif a == 86 and b == 84 and c == 71:  # VTG
+            self._vtg()
+        elif a == 71 and b == 83 and c == 65:  # GSA
+            self._gsa()
+        else:
+            self.sentences_ignored += 1
+
+    def _gga(self):
+        # time, lat, N/S, lon, E/W, quality, satellites, HDOP, altitude, M, ...
+        self._time(1)
+        quality = self._int(6)
+        self.fix_quality = quality
+        if not self._empty(7):
+            self.satellites.value = self._int(7)
+            self.satellites._commit()
+        if not self._empty(8):
+            self.hdop.value = self._fixed(8, 2)
+            self.hdop._commit()
+        if quality > 0:
+            self._location(2)
+            if not self._empty(9):
+                self.altitude.value = self._fixed(9, 2)
+                self.altitude._commit()
+
+    def _rmc(self):
+        # time, status, lat, N/S, lon, E/W, speed (knots), course, date, ...
+        self._time(1)
+        if self._char(2) != 65:  # 'A'
+            return
+        self._location(3)
+        if not self._empty(7):
+            self.speed.value = self._fixed(7, 2)
+            self.speed._commit()
+        if not self._empty(8):
+            self.course.value = self._fixed(8, 2)
+            self.course._commit()
+        if not self._empty(9):
+            d = self._int(9)
+            self.date.day = d // 10000
+            self.date.month = d // 100 % 100
+            self.date.year = 2000 + d % 100
+            self.date._commit()
+
+    def _vtg(self):
+        # course true, T, course magnetic, M, speed knots, N, speed km/h, K, mode
+        if self._char(9) == 78:  # mode 'N': no fix
+            return
+        if not self._empty(1):
+            self.course.value = self._fixed(1, 2)
+            self.course._commit()
+        if not self._empty(5):
+            self.speed.value = self._fixed(5, 2)
+            self.speed._commit()
+
+    def _gsa(self):
+        # mode, fix type, 12 satellite PRNs, PDOP, HDOP, VDOP
+        if not self._empty(2):
+            self.fix_type = self._int(2)
+        if self.fix_type > 1 and not self._empty(16):
+            self.hdop.value = self._fixed(16, 2)
+            self.hdop._commit()
+
+    # ============= UBX =============
+    def _frame(self, size):
+        frame = self._ubx
+        a = b = 0
+        for i in range(size - 2):
+            a = (a + frame[i]) & 0xFF
+            b = (b + a) & 0xFF
+        if a != frame[size - 2] or b != frame[size - 1]:
+            self.failed_checksum += 1
+            return
+        self.sentences_passed += 1
+        if frame[0] == 0x01 and frame[1] == 0x07 and size == UBX_MAX:
+            self._nav_pvt()
+        else:
+            self.sentences_ignored += 1
+
+    def _nav_pvt(self):
+        (_, year, month, day, hour, minute, second, valid, _, nano, fix, flags, _, sats,
+         lon, lat, _, h_msl, _, _, _, _, _, g_speed, head, _, _, p_dop) = \
+            struct.unpack_from(NAV_PVT_FORMAT, self._ubx, 4)
+        if valid & 0x01:
+            self.date.year = year
+            self.date.month = month
+            self.date.day = day
+            self.date._commit()
+        if valid & 0x02:
+            self.time.hour = hour
+            self.time.minute = minute
+            self.time.second = second
+            self.time.centisecond = max(0, nano) // 10000000
+            self.time._commit()
+        ok = flags & 0x01 and 2 <= fix <= 4
+        self.fix_quality = 1 if ok else 0
+        self.fix_type = 3 if ok and fix != 2 else 2 if ok else 1
+        self.satellites.value = sats
+        self.satellites._commit()
+        # Only PDOP is in NAV-PVT; it bounds HDOP from above
+        self.hdop.value = p_dop
+        self.hdop._commit()
+        if not ok:
+            return
+        loc = self.location
+        loc.lat_negative = lat < 0
+        loc.lat_deg, r = divmod(abs(lat), 10000000)
+        loc.lat_billionths = r * 100
+        loc.lng_negative = lon < 0
+        loc.lng_deg, r = divmod(abs(lon), 10000000)
+        loc.lng_billionths = r * 100
+        loc._commit()
+        self.altitude.value = h_msl // 10
+        self.altitude._commit()
+        self.speed.value = g_speed * 1944 // 10000  # mm/s -> knots * 100
+        self.speed._commit()
+        self.course.value = head // 1000  # 1e-5 deg -> 0.01 deg
+        self.course._commit()
+
+    # ============= FIELDS =============
+    # Field k (as in sentence.split(',')[k]) runs from after comma k-1 up to
+    # comma k, or up to the '*' for the last field
+    def _start(self, k):
+        return self._commas[k - 1] + 1
+
+    def _stop(self, k):
+        return self._commas[k] if k < self._nfields else self._end
+
+    def _empty(self, k):
+        return k > self._nfields or self._start(k) >= self._stop(k)
+
+    def _char(self, k):
+        if self._empty(k):
+            return 0
+        return self._line[self._start(k)]
+
+    def _int(self, k):
+        if k > self._nfields:
+            return 0
+        line = self._line
+        v = 0
+        for i in range(self._start(k), self._stop(k)):
+            c = line[i] - 48
+            if not 0 <= c <= 9:
+                break
+            v = v * 10 + c
+        return v
+
+    def _fixed(self, k, decimals):
+        # "-12.345" -> -1234 for decimals=2 (extra digits are truncated)
+        line = self._line
+        v = 0
+        frac = -1
+        negative = False
+        for i in range(self._start(k), self._stop(k)):
+            c = line[i]
+            if c == _MINUS:
+                negative = True
+            elif c == _DOT:
+                frac = 0
+            elif 48 <= c <= 57:
+                if frac < 0:
+                    v = v * 10 + c - 48
+                elif frac < decimals:
+                    v = v * 10 + c - 48
+                    frac += 1
+        if frac < 0:
+            frac = 0
+        while frac < decimals:
+            v *= 10
+            frac += 1
+        return -v if negative else v
+
+    def _degrees(self, k):
+        # "ddmm.mmmmm" / "dddmm.mmmmm" -> (degrees, billionths of a degree)
+        line = self._line
+        start = self._start(k)
+        stop = self._stop(k)
+        dot = start
+        while dot < stop and line[dot] != _DOT:
+            dot += 1
+        deg = 0
+        for i in range(start, dot - 2):
+            deg = deg * 10 + line[i] - 48
+        # minutes * 1e7 (at most 6e8, still a small int)
+        minutes = (line[dot - 2] - 48) * 10 + line[dot - 1] - 48
+        digits = 0
+        for i in range(dot + 1, min(stop, dot + 8)):
+            minutes = minutes * 10 + line[i] - 48
+            digits += 1
+        while digits < 7:
+            minutes *= 10
+            digits += 1
+        # billionths = minutes_e7 / 60 * 100, split to stay below 2**30
+        q, r = divmod(minutes, 6)
+        return deg, q * 10 + r * 10 // 6
+
+    def _location(self, k):
+        if self._empty(k) or self._empty(k + 2):
+            return
+        loc = self.location
+        loc.lat_deg, loc.lat_billionths = self._degrees(k)
+        loc.lat_negative = self._char(k + 1) == 83  # 'S'
+        loc.lng_deg, loc.lng_billionths = self._degrees(k + 2)
+        loc.lng_negative = self._char(k + 3) == 87  # 'W'
+        loc._commit()
+
+    def _time(self, k):
+        if self._empty(k):
+            return
+        t = self._fixed(k, 2)
+        self.time.centisecond = t % 100
+        t //= 100
+        self.time.second = t % 100
+        self.time.minute = t // 100 % 100
+        self.time.hour = t // 10000
+        self.time._commit()
@@ -0,0 +1,206 @@
+from micropython import const
+from array import array
+import time
+
+MPU6050_I2C_ADDR = const(0x68)
+
+_SMPLRT_DIV = const(0x19)
+_CONFIG = const(0x1A)
+_GYRO_CONFIG = const(0x1B)
+_ACCEL_CONFIG = const(0x1C)
+_FIFO_EN = const(0x23)
+_INT_PIN_CFG = const(0x37)
+_INT_ENABLE = const(0x38)
+_INT_STATUS = const(0x3A)
+_ACCEL_XOUT_H = const(0x3B)
+_USER_CTRL = const(0x6A)
+_PWR_MGMT_1 = const(0x6B)
+_FIFO_COUNT_H = const(0x72)
+_FIFO_R_W = const(0x74)
+_WHO_AM_I = const(0x75)
+
+_FIFO_SIZE = const(1024)
+_FIFO_SAMPLE = const(12)  # accel XYZ + gyro XYZ, 2 bytes each
+_FIFO_OFLOW = const(0x10)
+
+# Full-scale ranges: index 0..3 -> ±2/4/8/16 g and ±250/500/1000/2000 °/s
+ACCEL_LSB = (16384.0, 8192.0, 4096.0, 2048.0)
+GYRO_LSB = (131.0, 65.5, 32.8, 16.4)
+
+
+class MPU6050:
+    def __init__(self, i2c, addr=MPU6050_I2C_ADDR, accel_range=0, gyro_range=0):
+        self.i2c = i2c
+        self.addr = addr
+        self.buf = bytearray(14)
+        self._one = bytearray(1)
+        self._count = bytearray(2)
+        self.fifo_rate = 0
+        self.sample_period_us = 0
+        self.fifo_overflows = 0
+        self.fifo_buf = None
+
+        self._write(_PWR_MGMT_1, 0x01)  # wake up, clock from gyro X PLL
+        time.sleep_ms(100)
+        self._write(_ACCEL_CONFIG, accel_range << 3)
+        self._write(_GYRO_CONFIG, gyro_range << 3)
+        self.accel_scale = 1 / ACCEL_LSB[accel_range]
+        self.gyro_scale = 1 / GYRO_LSB[gyro_range]
+
+    def _write(self, reg, value):
+        self._one[0] = value
+        self.i2c.writeto_mem(self.addr, reg, self._one)
+
+    def _read_byte(self, reg):
+        self.i2c.readfrom_mem_into(self.addr, reg, self._one)
+        return self._one[0]
+
+    def whoami(self):
+        return self._read_byte(_WHO_AM_I)
+
+    # ============= DIRECT (POLLED) READS =============
+    def read_raw(self):
+        """Accel, temperature and gyro registers (0x3B-0x48) in one burst."""
+        self.i2c.readfrom_mem_into(self.addr, _ACCEL_XOUT_H, self.buf)
+        return self.buf
+
+    def read(self, out):
+        """Burst-read and store ax, ay, az (g), gx, gy, gz (°/s) into ``out``."""
+        self.i2c.readfrom_mem_into(self.addr, _ACCEL_XOUT_H, self.buf)
+        return self.convert(self.buf, out)
+
+    def convert(self, b, out, o=0):
+        """Scale a read_raw() block found at ``b[o:o + 14]`` into ``out`` like read()."""
+        a = self.accel_scale
+        g = self.gyro_scale
+        v = b[o] << 8 | b[o + 1]
+        out[0] = (v - 65536 if v > 32767 else v) * a
+        v = b[o + 2] << 8 | b[o + 3]
+        out[1] = (v - 65536 if v > 32767 else v) * a
+        v = b[o + 4] << 8 | b[o + 5]
+        out[2] = (v - 65536 if v > 32767 else v) * a
+        v = b[o + 8] << 8 | b[o + 9]
+        out[3] = (v - 65536 if v > 32767 else v) * g
+        v = b[o + 10] << 8 | b[o + 11]
+        out[4] = (v - 65536 if v > 32767 else v) * g
+        v = b[o + 12] << 8 | b[o + 13]
+        out[5] = (v - 65536 if v > 32767 else v) * g
+        return out
+
+    @property
+    def temperature(self):
+        """Die temperature (°C) from the last burst read."""
+        v = self.buf[6] << 8 | self.buf[7]
+        return (v - 65536 if v > 32767 else v) / 340 + 36.53
+
+    # ============= DATA-READY INTERRUPT =============
+    def enable_data_ready(self, rate_hz=1000):
+        """Sample at ``rate_hz`` (<= 1 kHz) and pulse INT (active high, 50 us) on every
+        new sample; returns the rate actually set."""
+        div = 1000 // max(4, min(1000, rate_hz))
+        self._write(_CONFIG, 0x01)  # DLPF 188 Hz -> 1 kHz internal rate
+        self._write(_SMPLRT_DIV, div - 1)
+        self._write(_INT_PIN_CFG, 0x00)
+        self._write(_INT_ENABLE, 0x01)  # DATA_RDY_EN
+        self.sample_period_us = div * 1000
+        return 1000 // div
+
+    def disable_data_ready(self):
+        self._write(_INT_ENABLE, 0x00)
+
+    # ============= FIFO MODE =============
+    def start_fifo(self, rate_hz=1000, batch=32):
+        """Let the chip sample accel+gyro at ``rate_hz`` (<= 1 kHz) into its FIFO.
+
+        ``batch`` is the most samples one drain() moves over the bus.  The
+        1024-byte FIFO holds 85 samples, so drain() has to run at least every
+        85 / rate_hz seconds.
+        """
+        rate_hz = max(4, min(1000, rate_hz))
+        batch = max(1, min(batch, _FIFO_SIZE // _FIFO_SAMPLE))
+        self._write(_CONFIG, 0x01)  # DLPF 188 Hz -> 1 kHz internal rate
+        self._write(_SMPLRT_DIV, 1000 // rate_hz - 1)
+        self.fifo_rate = 1000 // (1000 // rate_hz)
+        self.sample_period_us = 1000000 // self.fifo_rate
+        self.fifo_buf = bytearray(batch * _FIFO_SAMPLE)
+        mv = memoryview(self.fifo_buf)
+        # One view per possible batch length so drain() never slices.
+        self._views = [mv[:n * _FIFO_SAMPLE] for n in range(batch + 1)]
+        self.batch = batch
+        self._write(_FIFO_EN, 0x78)  # XG, YG, ZG, ACCEL
+        self.reset_fifo()
+
+    def stop_fifo(self):
+        self._write(_FIFO_EN, 0x00)
+        self._write(_USER_CTRL, 0x00)
+        self.fifo_rate = 0
+
+    def reset_fifo(self):
+        self._write(_USER_CTRL, 0x04)  # FIFO_RESET
+        self._write(_USER_CTRL, 0x40)  # FIFO_EN
+        self._read_byte(_INT_STATUS)
+
+    def fifo_span_ms(self):
+        """How long the FIFO takes to fill at the configured rate."""
+        return (_FIFO_SIZE // _FIFO_SAMPLE) * 1000 // self.fifo_rate
+
+    def fifo_count(self):
+        self.i2c.readfrom_mem_into(self.addr, _FIFO_COUNT_H, self._count)
+        return self._count[0] << 8 | self._count[1]
+
+    def drain(self):
+        """Move up to ``batch`` whole samples from the chip into ``fifo_buf``.
+
+        Returns the number of samples read; the oldest is index 0.  On FIFO
+        overflow the chip's data is no longer sample-aligned, so the FIFO is
+        reset and 0 is returned.
+        """
+        if self._read_byte(_INT_STATUS) & _FIFO_OFLOW:
+            self.fifo_overflows += 1
+            self.reset_fifo()
+            return 0
+        n = self.fifo_count() // _FIFO_SAMPLE
+        if n > self.batch:
+            n = self.batch
+        if n:
+            self.i2c.readfrom_mem_into(self.addr, _FIFO_R_W, self._views[n])
+        return n
+
+    def fifo_raw(self, i, out):
+        """Copy sample ``i`` into a 14-byte ``out`` laid out like read_raw().
+
+        The FIFO carries no temperature, so bytes 6-7 keep the last burst read.
+        """
+        b = self.fifo_buf
+        o = i * _FIFO_SAMPLE
+        for j in range(6):
+            out[j] = b[o + j]
+            out[j + 8] = b[o + j + 6]
+        out[6] = self.buf[6]
+        out[7] = self.buf[7]
+        return out
+
+    def fifo_sample(self, i, out):
+        """Scale sample ``i`` of the last drain() into ``out`` like read()."""
+        b = self.fifo_buf
+        o = i * _FIFO_SAMPLE
+        a = self.accel_scale
+        g = self.gyro_scale
+        v = b[o] << 8 | b[o + 1]
+        out[0] = (v - 65536 if v > 32767 else v) * a
+        v = b[o + 2] << 8 | b[o + 3]
+        out[1] = (v - 65536 if v > 32767 else v) * a
+        v = b[o + 4] << 8 | b[o + 5]
+        out[2] = (v - 65536 if v > 32767 else v) * a
+        v = b[o + 6] << 8 | b[o + 7]
+        out[3] = (v - 65536 if v > 32767 else v) * g
+        v = b[o + 8] << 8 | b[o + 9]
+        out[4] = (v - 65536 if v > 32767 else v) * g
+        v = b[o + 10] << 8 | b[o + 11]
+        out[5] = (v - 65536 if v > 32767 else v) * g
+        return out
+
+
+def values():
+    """Preallocated output buffer for read()/fifo_sample()."""
+    return array('f', (0.0, 0.0, 0.0, 0.0, 0.0, 0.0))
@@ -0,0 +1,150 @@
+# Save this file to your Pico as: ublox.py
+#
+# Boot-time configuration of a u-blox GPS (NEO-6M, NEO-M8N, ...) over UBX.
+# The receiver powers up at 9600 baud sending six NMEA sentences once a
+# second.  configure() moves it to a faster baud rate, switches off the
+# sentences nobody parses, optionally turns on the binary NAV-PVT message and
+# raises the navigation rate.  Every CFG message is answered with ACK or NAK,
+# so each step is checked; a receiver that never answers (a clone without UBX)
+# is left at 9600 baud with its defaults.
+from micropython import const
+import struct
+import time
+
+DEFAULT_BAUD = const(9600)
+
+CLS_NAV = const(0x01)
+CLS_ACK = const(0x05)
+CLS_CFG = const(0x06)
+CLS_NMEA = const(0xF0)
+ID_NAV_PVT = const(0x07)
+ID_ACK_NAK = const(0x00)
+ID_ACK_ACK = const(0x01)
+ID_CFG_PRT = const(0x00)
+ID_CFG_MSG = const(0x01)
+ID_CFG_RATE = const(0x08)
+
+PROTO_UBX = const(0x01)
+PROTO_NMEA = const(0x02)
+
+# Standard NMEA messages (class 0xF0)
+NMEA_IDS = (("GGA", 0x00), ("GLL", 0x01), ("GSA", 0x02), ("GSV", 0x03), ("RMC", 0x04), ("VTG", 0x05))
+
+NAV_PVT_LEN = const(92)
+NMEA_EPOCH_BYTES = const(80)  # per enabled sentence, for the bandwidth check
+
+ACK_TIMEOUT_MS = const(1000)  # u-blox answers CFG messages within a second
+PROBE_TIMEOUT_MS = const(300)
+PRT_SETTLE_MS = const(100)
+
+
+def checksum(data):
+    # 8-bit Fletcher over class, id, length and payload
+    a = b = 0
+    for c in data:
+        a = (a + c) & 0xFF
+        b = (b + a) & 0xFF
+    return a, b
+
+
+def frame(cls, msg_id, payload=b""):
+    body = struct.pack("<BBH", cls, msg_id, len(payload)) + payload
+    return b"\xb5\x62" + body + bytes(checksum(body))
+
+
+def cfg_prt(baudrate, out_proto=PROTO_UBX | PROTO_NMEA):
+    # UART1, 8N1, UBX and NMEA in
+    return frame(CLS_CFG, ID_CFG_PRT, struct.pack(
+        "<BBHIIHHHH", 1, 0, 0, 0x08D0, baudrate, PROTO_UBX | PROTO_NMEA, out_proto, 0, 0))
+
+
+def cfg_rate(rate_hz):
+    return frame(CLS_CFG, ID_CFG_RATE, struct.pack("<HHH", 1000 // rate_hz, 1, 1))
+
+
+def cfg_msg(cls, msg_id, rate):
+    # Rate is per navigation epoch on the port the message arrives on
+    return frame(CLS_CFG, ID_CFG_MSG, bytes((cls, msg_id, rate)))
+
+
+def wait_ack(uart, cls, msg_id, timeout_ms=ACK_TIMEOUT_MS):
+    """True on ACK, False on NAK, None if nothing came back in time."""
+    ack = frame(CLS_ACK, ID_ACK_ACK, bytes((cls, msg_id)))
+    nak = frame(CLS_ACK, ID_ACK_NAK, bytes((cls, msg_id)))
+    buf = bytearray()
+    start = time.ticks_ms()
+    while time.ticks_diff(time.ticks_ms(), start) < timeout_ms:
+        n = uart.any()
+        if n:
+            buf += uart.read(n)
+            if ack in buf:
+                return True
+            if nak in buf:
+                return False
+            if len(buf) > 256:
+                # Keep enough of the tail for a frame split across reads
+                buf = buf[-16:]
+        else:
+            time.sleep_ms(5)
+    return None
+
+
+def send(uart, msg, timeout_ms=ACK_TIMEOUT_MS):
+    uart.write(msg)
+    return wait_ack(uart, msg[2], msg[3], timeout_ms)
+
+
+# Harmless message every u-blox acknowledges: GSV off
+_PROBE = cfg_msg(CLS_NMEA, 0x03, 0)
+
+
+def link(uart, baudrate):
+    """Bring the receiver to ``baudrate``; return the baud rate it answers at, or 0."""
+    # A receiver that kept its settings over a Pico reset is already there
+    for baud in (baudrate, DEFAULT_BAUD):
+        uart.init(baudrate=baud)
+        if send(uart, _PROBE, PROBE_TIMEOUT_MS) is not None:
+            break
+    else:
+        return 0
+    if baud == baudrate:
+        return baud
+    # The ACK to CFG-PRT goes out at the new rate, so it cannot be waited for
+    uart.write(cfg_prt(baudrate))
+    time.sleep_ms(PRT_SETTLE_MS)
+    uart.init(baudrate=baudrate)
+    if send(uart, _PROBE, PROBE_TIMEOUT_MS) is not None:
+        return baudrate
+    uart.init(baudrate=DEFAULT_BAUD)
+    return DEFAULT_BAUD
+
+
+def set_rate(uart, rate_hz):
+    # Receivers NAK rates they cannot do (a NEO-6M stops at 5 Hz): step down
+    while True:
+        ok = send(uart, cfg_rate(rate_hz))
+        if ok is None:
+            return 0
+        if ok or rate_hz == 1:
+            return rate_hz
+        rate_hz = max(1, rate_hz // 2)
+
+
+def configure(uart, baudrate=115200, rate_hz=10, nav_pvt=False, sentences=("GGA", "RMC")):
+    """Configure the receiver on ``uart`` (opened at any baud rate).
+
+    Returns (baudrate, rate_hz, nav_pvt) as actually set; baudrate is 0 when
+    the receiver never answered and was left at 9600 baud, 1 Hz, NMEA.
+    """
+    baud = link(uart, baudrate)
+    if not baud:
+        uart.init(baudrate=DEFAULT_BAUD)
+        return 0, 1, False
+    # NAV-PVT needs protocol 15+ (M8 and later); older receivers NAK it
+    nav_pvt = nav_pvt and send(uart, cfg_msg(CLS_NAV, ID_NAV_PVT, 1)) is True
+    for name, msg_id in NMEA_IDS:
+        send(uart, cfg_msg(CLS_NMEA, msg_id, 0 if nav_pvt or name not in sentences else 1))
+    # Leave half the line free so a late epoch never piles up behind the next one
+    epoch = NAV_PVT_LEN + 8 if nav_pvt else NMEA_EPOCH_BYTES * len(sentences)
+    rate_hz = min(rate_hz, max(1, baud // 20 // epoch))
+    return baud, set_rate(uart, rate_hz) or 1, nav_pvt
@@ -0,0 +1,136 @@
+"""
+Altitude and vertical speed from the barometer and the accelerometer.
+
+A three-state Kalman filter: height above the launch site, vertical speed
+and the accelerometer's vertical bias.  Every IMU sample predicts with the
+gravity-free vertical acceleration (``Attitude.vertical``), every barometer
+sample corrects with its pressure altitude.  The accelerometer carries the
+fast motion the barometer smooths over, the barometer keeps the integrated
+acceleration from drifting away, and the bias state soaks up the sensor's
+offset so vertical speed settles to zero on the pad.  While the
+accelerometer is clipping (a boost beyond its range) its reading is only a
+lower bound, so the prediction is given ``clip_noise`` instead and the
+barometer takes over.
+
+The covariance is kept as six floats and every step is unrolled, so predict
+and correct run in constant time without allocating.
+
+The launch site is the ground pressure given to the constructor, or else the
+average of the first ``ground_samples`` barometer readings; until then the
+filter only collects them.  ``apogee`` is the highest filtered altitude so
+far, or the ballistic prediction ``h + v**2 / 2g`` while climbing if that is
+higher.  Pressures become heights through ``height``, ``standard_height``
+unless a faster equivalent such as ``fastmath.HeightTable`` is given.
+
+    alt = AltitudeFilter()
+    alt.predict(accel, dt)     # m/s^2 up, gravity removed; dt in seconds
+    alt.baro(pressure)         # Pa
+    alt.x[0], alt.x[1], alt.apogee
+"""
+
+from array import array
+
+G = 9.80665
+SEA_LEVEL_PA = 101325.0
+
+
+def standard_height(pressure):
+    """Height in metres where the standard atmosphere's pressure is ``pressure`` (Pa)."""
+    return 44330 * (1 - (pressure / SEA_LEVEL_PA) ** 0.1903)
+
+
+def pressure_altitude(pressure, ground):
+    """Height in metres above the level where the pressure is ``ground``.
+
+    Both pressures go through the standard atmosphere from sea level, whose
+    temperature falls with height, so this stays right above a high site.
+    """
+    return standard_height(pressure) - standard_height(ground)
+
+
+class AltitudeFilter:
+    def __init__(self, ground=0, ground_samples=50, accel_noise=0.5, bias_noise=0.02, baro_noise=0.1,
+                 clip_noise=100.0, height=standard_height):
+        self.height = height
+        self.ground = ground  # Pa, 0 until calibrated
+        self._ground = 0
+        self._ground_term = 0.0
+        self.ground_samples = ground_samples
+        self.qa = accel_noise * accel_noise  # (m/s^2)^2
+        self.qc = clip_noise * clip_noise
+        self.qb = bias_noise * bias_noise  # (m/s^2)^2 per second
+        self.r = baro_noise * baro_noise  # m^2
+        self.x = array('f', (0.0, 0.0, 0.0))  # height (m), vertical speed (m/s), accel bias (m/s^2)
+        self.p = array('f', (0.0, 0.0, 0.0, 0.0, 0.0, 0.0))  # covariance 00 01 02 11 12 22
+        self.reset()
+
+    def reset(self):
+        x, p = self.x, self.p
+        x[0] = x[1] = x[2] = 0.0
+        p[1] = p[2] = p[4] = 0.0
+        p[0] = self.r
+        p[3] = 1.0
+        p[5] = 1.0
+        self.apogee = 0.0
+        self.altitude = 0.0  # last barometric altitude above the ground (m)
+        self._sum = 0.0
+        self._count = 0
+
+    def predict(self, accel, dt, clipped=False):
+        x, p = self.x, self.p
+        a = accel - x[2]
+        x[0] += (x[1] + 0.5 * a * dt) * dt
+        x[1] += a * dt
+
+        # P = F P F' + Q with F = [[1, dt, -dt^2/2], [0, 1, -dt], [0, 0, 1]]
+        e = -0.5 * dt * dt
+        p00, p01, p02, p11, p12, p22 = p[0], p[1], p[2], p[3], p[4], p[5]
+        a01 = p01 + dt * p11 + e * p12
+        a02 = p02 + dt * p12 + e * p22
+        a12 = p12 - dt * p22
+        q = (self.qc if clipped else self.qa) * dt * dt
+        p[0] = p00 + dt * p01 + e * p02 + dt * a01 + e * a02 + 0.25 * q * dt * dt
+        p[1] = a01 - dt * a02 + 0.5 * q * dt
+        p[2] = a02
+        p[3] = p11 - dt * p12 - dt * a12 + q
+        p[4] = a12
+        p[5] = p22 + self.qb * dt
+        self._peak()
+
+    def baro(self, pressure):
+        """Correct with one pressure reading; False while still calibrating the ground."""
+        if not self.ground:
+            self._sum += pressure
+            self._count += 1
+            if self._count < self.ground_samples:
+                return False
+            self.ground = self._sum / self._count
+        if self.ground != self._ground:
+            self._ground = self.ground
+            self._ground_term = self.height(self.ground)
+        z = self.height(pressure) - self._ground_term
+        self.altitude = z
+
+        x, p = self.x, self.p
+        p00, p01, p02 = p[0], p[1], p[2]
+        s = p00 + self.r
+        k0, k1, k2 = p00 / s, p01 / s, p02 / s
+        y = z - x[0]
+        x[0] += k0 * y
+        x[1] += k1 * y
+        x[2] += k2 * y
+        p[0] = p00 - k0 * p00
+        p[1] = p01 - k0 * p01
+        p[2] = p02 - k0 * p02
+        p[3] -= k1 * p01
+        p[4] -= k1 * p02
+        p[5] -= k2 * p02
+        self._peak()
+        return True
+
+    def _peak(self):
+        h, v = self.x[0], self.x[1]
+        if v > 0:
+            h += v * v / (2 * G)
+        if h > self.apogee:
+            self.apogee = h
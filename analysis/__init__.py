@@ -0,0 +1 @@
+"""Post-flight analysis of the CSV log on a PC (needs NumPy)."""
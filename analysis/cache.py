@@ -0,0 +1,291 @@
+"""
+Columnar cache of many flights' CSV logs, opened as NumPy memmaps.
+
+    python -m analysis.cache ingest flights/*/cansat_log.csv --cache flights.cache
+    python -m analysis.cache list --cache flights.cache
+    python -m analysis.cache remove 2025-06 --cache flights.cache
+    python -m analysis.cache query altitude_agl --min 500 --cache flights.cache
+
+Ingesting converts a log once, in one streaming pass over blocks of its
+lines (``analysis.csvlog``), so memory stays at a few blocks whatever the
+size of the log.  Every column becomes a flat file of its typed values
+(``<cache>/<flight>/<column>.bin``, little-endian as ``csvlog.DTYPES``) that
+``Cache.open`` maps without copying.  ``index.json`` holds per flight the
+source file (a log whose size and modification time are unchanged is not
+converted again), the time range and highest altitude, and per chunk (one
+block of the log) its rows, its byte range in the log and the smallest and
+largest value of every column.  A query reads only the chunks whose range
+can match:
+
+    cache = Cache("flights.cache")
+    for name, rows in cache.where("altitude_agl", low=500, columns=("time", "gps_lat", "gps_lon")):
+        ...
+
+and a cached flight is a dict of arrays like ``csvlog.read`` returns, so
+``analysis.flight.flights(cache.open(name))`` analyses it straight from the
+cache.  A log called ``cansat_log.csv`` is named after its directory, any
+other after its file name; the index keeps every flight's source, so a
+second log that would get the same name (``2025-06/cansat_log.csv`` under
+another parent) is cached as ``2025-06_2`` instead of replacing the first.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from analysis import csvlog
+
+BLOCK_BYTES = 4 << 20  # one chunk; about 27000 rows of the current log
+INDEX = "index.json"
+ALTITUDES = ("altitude_agl", "altitude_bmp")  # the flight's altitude: the can's estimate above ground if logged
+
+
+def flight_name(path):
+    base, _ = os.path.splitext(os.path.basename(path))
+    if base == "cansat_log":
+        return os.path.basename(os.path.dirname(os.path.abspath(path))) or base
+    return base
+
+
+def zone(values):
+    """[smallest, largest] of the non-NaN ``values``, or None when there are none."""
+    if values.dtype.kind == "f":
+        values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    return [values.min().item(), values.max().item()]
+
+
+class Cache:
+    def __init__(self, root):
+        self.root = root
+        self.index = {}
+        path = os.path.join(root, INDEX)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.index = json.load(f)
+
+    @property
+    def flights(self):
+        return sorted(self.index)
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, INDEX)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def name_for(self, source, name=None):
+        """The flight ``source`` is (to be) cached as.
+
+        Its own entry if it has one, else the first free of ``flight_name``,
+        ``_2``, ``_3``...  A ``name`` given that holds another log is refused
+        with ValueError.
+        """
+        source = os.path.abspath(source)
+        if name:
+            entry = self.index.get(name)
+            if entry and entry["source"] != source:
+                raise ValueError("%s already holds %s; remove it first" % (name, entry["source"]))
+            return name
+        for name, entry in self.index.items():
+            if entry["source"] == source:
+                return name
+        base = name = flight_name(source)
+        n = 1
+        while name in self.index:
+            n += 1
+            name = "%s_%d" % (base, n)
+        return name
+
+    def ingest(self, source, name=None, block_bytes=BLOCK_BYTES, force=False):
+        """Convert the log at ``source``; its entry in the index (None if it was cached already)."""
+        name = self.name_for(source, name)
+        st = os.stat(source)
+        entry = self.index.get(name)
+        if not force and entry and (entry["source"], entry["source_size"], entry["source_mtime"]) == (
+                os.path.abspath(source), st.st_size, st.st_mtime):
+            return None
+        final = os.path.join(self.root, name)
+        work = final + ".tmp"
+        shutil.rmtree(work, ignore_errors=True)
+        os.makedirs(work)
+        files = {}
+        chunks = []
+        rows = skipped = 0
+        try:
+            for offset, length, channels, n in csvlog.blocks(source, block_bytes):
+                skipped += n
+                if not files:
+                    files = {c: open(os.path.join(work, c + ".bin"), "wb") for c in channels}
+                count = len(channels["time"])
+                if not count:
+                    continue
+                for c, values in channels.items():
+                    files[c].write(values.astype(values.dtype.newbyteorder("<"), copy=False).tobytes())
+                chunks.append({"row": rows, "rows": count, "offset": offset, "length": length,
+                               "zones": {c: zone(values) for c, values in channels.items()}})
+                rows += count
+        finally:
+            for f in files.values():
+                f.close()
+        if not files:
+            with open(source, "rb") as f:
+                columns = csvlog.read_header(f)[0]
+            for c in columns:
+                open(os.path.join(work, c + ".bin"), "wb").close()
+        else:
+            columns = list(files)
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(work, final)
+        altitude = next((c for c in ALTITUDES if c in columns), None)
+        maxima = [ch["zones"][altitude][1] for ch in chunks if altitude and ch["zones"][altitude]]
+        times = [ch["zones"]["time"] for ch in chunks if ch["zones"]["time"]]
+        self.index[name] = entry = {
+            "source": os.path.abspath(source), "source_size": st.st_size, "source_mtime": st.st_mtime,
+            "rows": rows, "skipped": skipped,
+            "columns": {c: np.dtype(csvlog.dtype(c)).newbyteorder("<").str for c in columns},
+            "time": [min(t[0] for t in times), max(t[1] for t in times)] if times else None,
+            "altitude": altitude, "max_altitude": max(maxima) if maxima else None,
+            "chunks": chunks}
+        self.save()
+        return entry
+
+    def remove(self, name):
+        shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        del self.index[name]
+        self.save()
+
+    def column(self, name, column):
+        """One column of a cached flight, memory-mapped read-only."""
+        entry = self.index[name]
+        dtype = np.dtype(entry["columns"][column])
+        if not entry["rows"]:
+            return np.empty(0, dtype)
+        return np.memmap(os.path.join(self.root, name, column + ".bin"), dtype, "r", shape=(entry["rows"],))
+
+    def open(self, name, columns=None):
+        """{column: memmap} of a cached flight, all columns or the ``columns`` given."""
+        return {c: self.column(name, c) for c in columns or self.index[name]["columns"]}
+
+    def chunks(self, column, low=None, high=None, flights=None):
+        """Yield (flight, chunk) for the chunks whose ``column`` may lie within [low, high]."""
+        for name in flights or self.flights:
+            entry = self.index[name]
+            if column not in entry["columns"]:
+                continue
+            for chunk in entry["chunks"]:
+                z = chunk["zones"][column]
+                if z is None or (low is not None and z[1] < low) or (high is not None and z[0] > high):
+                    continue
+                yield name, chunk
+
+    def where(self, column, low=None, high=None, columns=None, flights=None):
+        """Yield (flight, {column: values}) of the rows where ``column`` is within [low, high].
+
+        Only the chunks that can hold such rows are read; ``columns`` picks
+        what is returned (the flight's columns by default).
+        """
+        name = None
+        parts = []
+        for flight, chunk in self.chunks(column, low, high, flights):
+            if flight != name:
+                if parts:
+                    yield name, concatenate(parts)
+                name, parts = flight, []
+                maps = self.open(flight)
+                wanted = [c for c in columns or maps if c in maps]
+            rows = slice(chunk["row"], chunk["row"] + chunk["rows"])
+            v = maps[column][rows]
+            keep = np.ones(len(v), bool)
+            if low is not None:
+                keep &= v >= low
+            if high is not None:
+                keep &= v <= high
+            if keep.any():
+                parts.append({c: maps[c][rows][keep] for c in wanted})
+        if parts:
+            yield name, concatenate(parts)
+
+
+def concatenate(parts):
+    return {c: np.concatenate([p[c] for p in parts]) for c in parts[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--cache", default="flights.cache", help="cache directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("ingest", parents=[common], help="convert CSV logs into the cache")
+    p.add_argument("logs", nargs="+")
+    p.add_argument("--name", help="flight name (one log only)")
+    p.add_argument("--force", action="store_true", help="convert even if the log is unchanged")
+    sub.add_parser("list", parents=[common], help="the cached flights")
+    p = sub.add_parser("remove", parents=[common], help="drop flights from the cache")
+    p.add_argument("flights", nargs="+")
+    p = sub.add_parser("query", parents=[common], help="rows of every flight where a column is within a range")
+    p.add_argument("column")
+    p.add_argument("--min", type=float)
+    p.add_argument("--max", type=float)
+    p.add_argument("--columns", default="time", help="comma-separated columns to return")
+    p.add_argument("--save", help="write the matching rows to this .npz, one array per flight and column")
+    args = parser.parse_args()
+    cache = Cache(args.cache)
+
+    if args.command == "ingest":
+        if args.name and len(args.logs) > 1:
+            parser.error("--name needs a single log")
+        for path in args.logs:
+            t0 = time.perf_counter()
+            try:
+                name = cache.name_for(path, args.name)
+            except ValueError as e:
+                print("%s: %s" % (path, e), file=sys.stderr)
+                continue
+            entry = cache.ingest(path, name, force=args.force)
+            if entry is None:
+                print("%s: %s, unchanged" % (path, name))
+            else:
+                print("%s: %s, %d rows in %d chunks (%d lines skipped) in %.2f s" % (
+                    path, name, entry["rows"], len(entry["chunks"]), entry["skipped"], time.perf_counter() - t0))
+    elif args.command == "remove":
+        for name in args.flights:
+            if name not in cache.index:
+                print("%s: not cached" % name, file=sys.stderr)
+                continue
+            cache.remove(name)
+    elif args.command == "list":
+        for name in cache.flights:
+            e = cache.index[name]
+            print("%-24s %9d rows  %s  max %s %s" % (
+                name, e["rows"], "%.1f-%.1f s" % tuple(e["time"]) if e["time"] else "-",
+                e["altitude"], "-" if e["max_altitude"] is None else "%.1f m" % e["max_altitude"]))
+    else:
+        columns = [c for c in args.columns.split(",") if c]
+        if args.column not in columns:
+            columns.append(args.column)
+        t0 = time.perf_counter()
+        total = sum(len(cache.index[n]["chunks"]) for n in cache.flights)
+        read = sum(1 for _ in cache.chunks(args.column, args.min, args.max))
+        saved = {}
+        for name, rows in cache.where(args.column, args.min, args.max, columns):
+            v = rows[args.column]
+            t = rows.get("time")
+            print("%-24s %9d rows  %s %.1f-%.1f%s" % (
+                name, len(v), args.column, v.min(), v.max(),
+                "  %.1f-%.1f s" % (t.min(), t.max()) if t is not None else ""))
+            saved.update({"%s/%s" % (name, c): a for c, a in rows.items()})
+        print("%d of %d chunks read in %.3f s" % (read, total, time.perf_counter() - t0), file=sys.stderr)
+        if args.save:
+            np.savez(args.save, **saved)
+
+
+if __name__ == "__main__":
+    main()
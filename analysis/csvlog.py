@@ -0,0 +1,217 @@
+"""
+Read ``cansat_log.csv`` into NumPy arrays, one per column.
+
+    channels, skipped = csvlog.read("cansat_log.csv")
+    channels["altitude_bmp"], channels["gps_lat"], channels["phase"]
+
+Both headers ``main.py`` has written are understood, the current one and
+the original 14 columns.  A column is named after its header without the
+unit, in lower case (``Vertical_Speed(m/s)`` is ``vertical_speed``).  GPS
+fields logged as ``N/A`` (or left empty) before a fix are NaN, coordinates
+come out in signed decimal degrees whether they were logged that way or as
+NMEA ``ddmm.mmmmN`` / ``dddmm.mmmmE``, and the phase is its index in
+``flightphase.NAMES``.  Integer columns use -1 for a missing value.
+``# stats`` comment lines, a line torn by a power cut and anything else
+without the header's number of fields are skipped and counted.
+
+The file is read in blocks of whole lines, and each block is parsed with
+array operations over its bytes: text fields are rewritten in place into
+numbers, then NumPy's C parser (``loadtxt``) reads the whole block as
+floats in one call.  Memory stays at a few times ``block_bytes`` (per
+worker, with ``workers``) on top of the result.
+"""
+
+import collections
+import concurrent.futures
+import io
+import re
+
+import numpy as np
+
+from flightphase import NAMES as PHASE_NAMES
+
+BLOCK_BYTES = 16 << 20
+
+NEWLINE = ord("\n")
+COMMA = ord(",")
+SPACE = ord(" ")
+HASH = ord("#")
+DOT = ord(".")
+
+# Integer digits of an NMEA coordinate: ddmm.mmmm and dddmm.mmmm
+COORDINATES = {"gps_lat": 4, "gps_lon": 5}
+HEMISPHERE = np.zeros(256, np.int8)
+HEMISPHERE[[ord("N"), ord("E")]] = 1
+HEMISPHERE[[ord("S"), ord("W")]] = -1
+
+# Phase names by their first two letters
+PHASE_CODES = np.full(1 << 16, -1, np.int16)
+PHASE_CODES[[ord(name[0]) << 8 | ord(name[1]) for name in PHASE_NAMES]] = np.arange(len(PHASE_NAMES))
+
+DTYPES = {"time": np.float64, "gps_lat": np.float64, "gps_lon": np.float64, "satellites": np.int16,
+          "phase": np.int8, "seq": np.int64, "sample_ticks": np.int64}  # the rest float32
+
+EMPTY = re.compile(rb",(?=[,\n])")
+UNIT = re.compile(r"\(.*\)$")
+
+
+def channel_name(field):
+    return UNIT.sub("", field.strip()).lower()
+
+
+def dtype(name):
+    return DTYPES.get(name, np.float32)
+
+
+def parse(data, columns):
+    """Parse ``data``, whole lines of the log, into a (rows, columns) float array; also the lines skipped."""
+    if b"\r" in data:
+        data = data.replace(b"\r", b"")
+    data = data.replace(b"N/A", b"nan")
+    if data and not data.endswith(b"\n"):
+        data += b"\n"
+    ncols = len(columns)
+    a = np.frombuffer(bytearray(data), np.uint8)
+    newlines = np.flatnonzero(a == NEWLINE)
+    commas = np.flatnonzero(a == COMMA)
+    after = a[commas + 1]
+    if np.any((after == COMMA) | (after == NEWLINE)):
+        return parse(EMPTY.sub(b",nan", data), columns)
+    # Comment lines, torn lines and the like do not have the header's number of fields.
+    # Comments are left to the parser; anything else is cut out here.
+    good = np.diff(np.searchsorted(commas, newlines), prepend=0) == ncols - 1
+    comment = a[np.concatenate(([0], newlines[:-1] + 1))] == HASH
+    skipped = int(len(good) - np.count_nonzero(good))
+    if skipped > np.count_nonzero(comment):
+        keep = good | comment
+        a = a[np.repeat(keep, np.diff(newlines, prepend=-1))]
+        newlines = np.flatnonzero(a == NEWLINE)
+        commas = np.flatnonzero(a == COMMA)
+        comment = comment[keep]
+    rows = len(newlines) - np.count_nonzero(comment)
+    if not rows:
+        return np.empty((0, ncols)), skipped
+    if "phase" in columns:
+        # The phase name becomes its index, told apart by its first two letters
+        c = columns.index("phase")
+        start = commas[c - 1::ncols - 1] + 1
+        end = commas[c::ncols - 1] if c < ncols - 1 else newlines
+        code = PHASE_CODES[a[start].astype(np.intp) << 8 | a[start + 1]]
+        named = code >= 0
+        start, end = start[named], end[named]
+        a[start] = code[named] + ord("0")
+        for i in range(1, max(map(len, PHASE_NAMES))):
+            a[(start + i)[start + i < end]] = SPACE
+    if any(letter in data for letter in (b"N", b"S", b"E", b"W")):
+        marks = np.flatnonzero(HEMISPHERE[a])
+    else:
+        marks = np.empty(0, np.intp)
+    letters = a[marks]
+    a[marks] = SPACE
+    try:
+        values = np.loadtxt(io.BytesIO(a), delimiter=",", comments="#" if comment.any() else None, ndmin=2)
+    except ValueError:
+        # Something in the block is not a number: find the lines that fail and parse the rest again
+        a[marks] = letters
+        ok = np.array([numeric(line, ncols) for line in bytes(a).split(b"\n")[:-1]], bool) | comment
+        values, more = parse(bytes(a[np.repeat(ok, np.diff(newlines, prepend=-1))]), columns)
+        return values, more + int(len(ok) - np.count_nonzero(ok))
+    if len(marks):
+        # The field each hemisphere letter ends, and whether it is NMEA (a dot after degrees and minutes)
+        before = np.searchsorted(commas, marks)
+        row, col = np.divmod(before, ncols - 1)
+        start = np.where(col > 0, commas[np.maximum(before - 1, 0)] + 1, 0)
+        v = values[row, col] * HEMISPHERE[letters]
+        for name, digits in COORDINATES.items():
+            if name in columns:
+                nmea = (col == columns.index(name)) & (a[np.minimum(start + digits, len(a) - 1)] == DOT)
+                degrees = np.trunc(v / 100)
+                v = np.where(nmea, degrees + (v - degrees * 100) / 60, v)
+        values[row, col] = v
+    return values, skipped
+
+
+def numeric(line, ncols):
+    try:
+        return len(np.fromstring(line.translate(None, b"NSEW"), sep=",")) == ncols
+    except ValueError:
+        return False
+
+
+def channels(columns, values):
+    """Split parsed rows into one typed array per column."""
+    result = {}
+    for i, name in enumerate(columns):
+        t = dtype(name)
+        v = values[:, i]
+        if np.issubdtype(t, np.integer):
+            v = np.where(np.isnan(v), -1, v)
+        result[name] = v.astype(t)
+    return result
+
+
+def read_header(f):
+    """Column names from the header line of the open log ``f`` (binary); the header's length in bytes."""
+    line = f.readline()
+    if not line.startswith(b"Time"):
+        raise ValueError("not a CanSat CSV log (header %r)" % line[:40])
+    return [channel_name(field) for field in line.decode().split(",")], len(line)
+
+
+def whole_lines(f, offset, block_bytes):
+    """Yield (file offset, data) for blocks of whole lines read from ``f``; the last may be torn."""
+    rest = b""
+    while True:
+        chunk = f.read(block_bytes)
+        data = rest + chunk
+        if not chunk:
+            if data:
+                yield offset, data
+            return
+        end = data.rfind(b"\n") + 1
+        if not end:
+            rest = data
+            continue
+        data, rest = data[:end], data[end:]
+        yield offset, data
+        offset += len(data)
+
+
+def blocks(path, block_bytes=BLOCK_BYTES, workers=1):
+    """Yield (file offset, length, channels, lines skipped) for successive blocks of whole lines.
+
+    With ``workers`` above 1 the blocks are parsed in that many processes, a
+    few blocks ahead of the one being yielded.
+    """
+    with open(path, "rb") as f:
+        columns, offset = read_header(f)
+        if workers <= 1:
+            for offset, data in whole_lines(f, offset, block_bytes):
+                values, skipped = parse(data, columns)
+                yield offset, len(data), channels(columns, values), skipped
+            return
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            pending = collections.deque()
+            for offset, data in whole_lines(f, offset, block_bytes):
+                pending.append((offset, len(data), pool.submit(parse, data, columns)))
+                if len(pending) > 2 * workers:
+                    offset, length, future = pending.popleft()
+                    values, skipped = future.result()
+                    yield offset, length, channels(columns, values), skipped
+            for offset, length, future in pending:
+                values, skipped = future.result()
+                yield offset, length, channels(columns, values), skipped
+
+
+def read(path, block_bytes=BLOCK_BYTES, workers=1):
+    """All channels of the log at ``path``, and the number of lines skipped."""
+    parts = []
+    skipped = 0
+    for _, _, part, n in blocks(path, block_bytes, workers):
+        parts.append(part)
+        skipped += n
+    if not parts:
+        with open(path, "rb") as f:
+            columns = read_header(f)[0]
+        return {name: np.empty(0, dtype(name)) for name in columns}, 0
+    return {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}, skipped
@@ -0,0 +1,186 @@
+"""
+Derived flight products from the channels of a CSV log (``analysis.csvlog``).
+
+    channels, skipped = csvlog.read("cansat_log.csv")
+    for flight in flight.flights(channels):
+        print(flight.summary())
+
+The log is split into sessions where its time goes backwards (the can was
+powered up again and appended to the same file); each becomes a
+``Flight``.  Its channels are resampled onto one uniform timebase of
+``rate_hz`` by linear interpolation, GPS channels only between fixes at
+most ``max_gap_s`` apart, so rows logged at the pad's slower rate,
+repeated timestamps and GPS outages all line up.  From there, with array
+operations only:
+
+    altitude        above the pad (the can's own estimate when it was logged),
+                    smoothed over ``smooth_s``
+    vertical speed  its derivative
+    acceleration    magnitude of the accelerometer vector, in g
+    apogee          highest smoothed altitude, and when
+    phases          launch, apogee and landing found from the altitude with
+                    the flight software's thresholds, and the transitions the
+                    can logged itself when the log has a Phase column
+    descent rate    mean from apogee to landing, and over the last third of it
+    ground track    decimal degrees; east and north metres from the first fix,
+                    drift and path length
+"""
+
+import numpy as np
+
+from flightphase import NAMES as PHASE_NAMES
+
+EARTH_RADIUS_M = 6371000.0
+
+# flightphase.FlightPhase's defaults
+LAUNCH_ALT_M = 10.0
+LANDED_SPEED = 1.0
+LANDED_S = 5.0
+
+PAD_S = 10.0  # ground level is the median altitude over this long at the start
+
+
+def sessions(time):
+    """Slices of the rows between the points where ``time`` goes backwards."""
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(time) < 0) + 1, [len(time)]))
+    return [slice(a, b) for a, b in zip(starts[:-1], starts[1:]) if b > a]
+
+
+def resample(t, y, grid, max_gap_s=None):
+    """``y`` sampled at ``t`` interpolated onto ``grid``; NaN outside the finite samples or across gaps."""
+    valid = np.isfinite(y)
+    if not valid.all():
+        t, y = t[valid], y[valid]
+    if not len(t):
+        return np.full(len(grid), np.nan)
+    out = np.interp(grid, t, y, left=np.nan, right=np.nan)
+    if max_gap_s is not None:
+        after = np.clip(np.searchsorted(t, grid), 1, len(t) - 1)
+        out[t[after] - t[after - 1] > max_gap_s] = np.nan
+    return out
+
+
+def smooth(y, n):
+    """Centred moving average over ``n`` samples, shorter at the ends."""
+    if n <= 1 or len(y) < 2:
+        return y
+    c = np.concatenate(([0.0], np.cumsum(y)))
+    i = np.arange(len(y))
+    lo = np.maximum(i - n // 2, 0)
+    hi = np.minimum(i + n - n // 2, len(y))
+    return (c[hi] - c[lo]) / (hi - lo)
+
+
+def held(cond, n):
+    """Index of the first run of ``n`` True values in ``cond``, or None."""
+    if n <= 1:
+        hits = np.flatnonzero(cond)
+    else:
+        c = np.concatenate(([0], np.cumsum(cond)))
+        hits = np.flatnonzero(c[n:] - c[:-n] == n)
+    return int(hits[0]) if len(hits) else None
+
+
+class Flight:
+    """One session of the log, resampled, with its derived products."""
+
+    def __init__(self, channels, rate_hz=10.0, smooth_s=1.0, max_gap_s=5.0):
+        raw_t = channels["time"]
+        self.rows = len(raw_t)
+        self.rate_hz = rate_hz
+        dt = 1 / rate_hz
+        n = int((raw_t[-1] - raw_t[0]) * rate_hz + 1e-6) + 1
+        self.t = t = np.minimum(raw_t[0] + np.arange(n) * dt, raw_t[-1])
+
+        def channel(name, max_gap=None):
+            if name not in channels:
+                return None
+            return resample(raw_t, channels[name].astype(np.float64), t, max_gap)
+
+        if "altitude_agl" in channels:
+            alt = channel("altitude_agl")
+        else:
+            alt = channel("altitude_bmp")
+            alt -= np.median(alt[:max(1, int(PAD_S * rate_hz))])
+        self.altitude = smooth(alt, int(smooth_s * rate_hz))
+        self.vspeed = np.gradient(self.altitude, dt) if len(t) > 1 else np.zeros(len(t))
+        self.accel = np.sqrt(channel("accel_x") ** 2 + channel("accel_y") ** 2 + channel("accel_z") ** 2)
+        self.lat = channel("gps_lat", max_gap_s)
+        self.lon = channel("gps_lon", max_gap_s)
+        self.gps_alt = channel("gps_alt", max_gap_s)
+        self.logged_phases = []
+        if "phase" in channels:
+            p = channels["phase"]
+            change = np.concatenate(([0], np.flatnonzero(np.diff(p)) + 1))
+            self.logged_phases = [(float(raw_t[i]), PHASE_NAMES[p[i]] if 0 <= p[i] < len(PHASE_NAMES) else "?")
+                                  for i in change]
+        self._phases()
+        self._track()
+
+    def _phases(self):
+        alt, vs = self.altitude, self.vspeed
+        n = len(alt)
+        self.launch = self.apogee = self.landing = None
+        up = np.flatnonzero(alt > LAUNCH_ALT_M)
+        if not len(up):
+            return
+        # Launch is the last time on the pad before the first climb past LAUNCH_ALT_M
+        pad = np.flatnonzero(alt[:up[0]] <= 1.0)
+        self.launch = int(pad[-1]) if len(pad) else 0
+        self.apogee = self.launch + int(np.argmax(alt[self.launch:]))
+        landed = held(np.abs(vs[self.apogee:]) < LANDED_SPEED, int(LANDED_S * self.rate_hz))
+        if landed is not None and self.apogee + landed < n - 1:
+            self.landing = self.apogee + landed
+
+    def _track(self):
+        self.east = self.north = None
+        self.fixes = np.flatnonzero(np.isfinite(self.lat) & np.isfinite(self.lon)) if self.lat is not None else []
+        if not len(self.fixes):
+            return
+        first = self.fixes[0]
+        lat0, lon0 = np.radians(self.lat[first]), np.radians(self.lon[first])
+        self.north = EARTH_RADIUS_M * (np.radians(self.lat) - lat0)
+        self.east = EARTH_RADIUS_M * (np.radians(self.lon) - lon0) * np.cos(lat0)
+
+    def summary(self):
+        """Everything worth reporting, as plain numbers (None where the flight did not get that far)."""
+        t, alt, vs = self.t, self.altitude, self.vspeed
+        at = lambda i: None if i is None else float(t[i])
+        s = {"rows": self.rows, "start_s": at(0), "end_s": at(len(t) - 1), "rate_hz": self.rate_hz,
+             "launch_s": at(self.launch), "apogee_s": at(self.apogee), "landing_s": at(self.landing),
+             "apogee_m": None, "max_climb_mps": None, "ascent_rate_mps": None, "descent_rate_mps": None,
+             "final_descent_rate_mps": None, "max_descent_mps": None, "logged_phases": self.logged_phases,
+             "fixes": len(self.fixes), "first_fix": None, "last_fix": None,
+             "drift_m": None, "drift_bearing_deg": None, "track_m": None, "max_gps_alt_m": None}
+        s["max_accel_g"] = s["max_accel_s"] = None
+        if not np.isnan(self.accel).all():  # all N/A when the MPU6050 failed at boot
+            i = int(np.nanargmax(self.accel))
+            s["max_accel_g"], s["max_accel_s"] = float(self.accel[i]), float(t[i])
+        if self.apogee is not None:
+            s["apogee_m"] = float(alt[self.apogee])
+            s["max_climb_mps"] = float(vs[self.launch:self.apogee + 1].max())
+            if self.apogee > self.launch:
+                s["ascent_rate_mps"] = float((alt[self.apogee] - alt[self.launch]) / (t[self.apogee] - t[self.launch]))
+            end = self.landing if self.landing is not None else len(t) - 1
+            if end > self.apogee:
+                descent = -vs[self.apogee:end + 1]
+                s["max_descent_mps"] = float(descent.max())
+                s["descent_rate_mps"] = float((alt[self.apogee] - alt[end]) / (t[end] - t[self.apogee]))
+                s["final_descent_rate_mps"] = float(np.median(descent[len(descent) * 2 // 3:]))
+        if len(self.fixes):
+            first, last = self.fixes[0], self.fixes[-1]
+            s["first_fix"] = (float(self.lat[first]), float(self.lon[first]), float(t[first]))
+            s["last_fix"] = (float(self.lat[last]), float(self.lon[last]), float(t[last]))
+            e, n = self.east[last], self.north[last]
+            s["drift_m"] = float(np.hypot(e, n))
+            s["drift_bearing_deg"] = float(np.degrees(np.arctan2(e, n)) % 360)
+            s["track_m"] = float(np.nansum(np.hypot(np.diff(self.east), np.diff(self.north))))
+            if self.gps_alt is not None and np.isfinite(self.gps_alt).any():
+                s["max_gps_alt_m"] = float(np.nanmax(self.gps_alt))
+        return s
+
+
+def flights(channels, rate_hz=10.0, smooth_s=1.0, max_gap_s=5.0):
+    """One ``Flight`` per session of the log."""
+    return [Flight({name: v[s] for name, v in channels.items()}, rate_hz, smooth_s, max_gap_s)
+            for s in sessions(channels["time"])]
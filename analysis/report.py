@@ -0,0 +1,85 @@
+"""
+Post-flight report from a CSV log.
+
+    python -m analysis.report /media/$USER/SDCARD/cansat_log.csv
+    python -m analysis.report flight.csv --rate 20 --smooth-s 2 --json
+
+Reads the log (``analysis.csvlog``), splits it into the sessions appended
+to it boot after boot and prints for every one with a flight in it (or
+``--all``) its phases, apogee, climb and descent rates, peak acceleration
+and GPS ground track (``analysis.flight``).  ``tools.decode_log`` output
+reads the same, so binary and raw logs are reported on after decoding.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from analysis import csvlog
+from analysis.flight import flights
+
+
+def value(v, fmt):
+    return "-" if v is None else fmt % v
+
+
+def format_flight(index, s):
+    lines = ["Session %d: %.1f-%.1f s, %d rows" % (index, s["start_s"], s["end_s"], s["rows"])]
+    add = lambda label, text: lines.append("  %-22s %s" % (label, text))
+    add("launch", value(s["launch_s"], "%.1f s"))
+    add("apogee", "%s at %s" % (value(s["apogee_m"], "%.1f m"), value(s["apogee_s"], "%.1f s")))
+    add("landing", value(s["landing_s"], "%.1f s"))
+    for t, name in s["logged_phases"]:
+        add("logged %s" % name, "%.1f s" % t)
+    add("ascent rate", "%s mean, %s peak" % (value(s["ascent_rate_mps"], "%.1f m/s"),
+                                             value(s["max_climb_mps"], "%.1f m/s")))
+    add("descent rate", "%s mean, %s over the last third, %s peak" % (
+        value(s["descent_rate_mps"], "%.1f m/s"), value(s["final_descent_rate_mps"], "%.1f m/s"),
+        value(s["max_descent_mps"], "%.1f m/s")))
+    add("peak acceleration", "-" if s["max_accel_g"] is None else "%.2f g at %.1f s" % (s["max_accel_g"], s["max_accel_s"]))
+    if s["fixes"]:
+        add("first fix", "%.6f, %.6f at %.1f s" % s["first_fix"])
+        add("last fix", "%.6f, %.6f at %.1f s" % s["last_fix"])
+        add("drift", "%.0f m towards %.0f deg, %.0f m of track" % (
+            s["drift_m"], s["drift_bearing_deg"], s["track_m"]))
+        add("max GPS altitude", value(s["max_gps_alt_m"], "%.1f m"))
+    else:
+        add("GPS", "no fix")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("log", help="cansat_log.csv, or tools.decode_log output")
+    parser.add_argument("--rate", type=float, default=10.0, help="common timebase in Hz")
+    parser.add_argument("--smooth-s", type=float, default=1.0, help="altitude moving average")
+    parser.add_argument("--max-gap-s", type=float, default=5.0, help="longest GPS outage interpolated over")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes parsing the log")
+    parser.add_argument("--all", action="store_true", help="also report sessions without a launch")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    channels, skipped = csvlog.read(args.log, workers=args.workers)
+    t1 = time.perf_counter()
+    summaries = [f.summary() for f in flights(channels, args.rate, args.smooth_s, args.max_gap_s)]
+    t2 = time.perf_counter()
+    shown = [(i, s) for i, s in enumerate(summaries) if args.all or s["launch_s"] is not None]
+    if args.json:
+        json.dump({"rows": len(channels["time"]), "skipped": skipped, "sessions": len(summaries),
+                   "flights": [s for _, s in shown]}, sys.stdout, indent=2)
+        print()
+        return
+    print("%s: %d rows (%d lines skipped), %d session%s; read in %.2f s, analysed in %.2f s" % (
+        args.log, len(channels["time"]), skipped, len(summaries), "" if len(summaries) == 1 else "s",
+        t1 - t0, t2 - t1))
+    if not shown:
+        print("No flight found (--all reports every session)")
+    for i, s in shown:
+        print()
+        print(format_flight(i, s))
+
+
+if __name__ == "__main__":
+    main()
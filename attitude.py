@@ -0,0 +1,142 @@
+"""
+Attitude estimation from the MPU6050.
+
+Madgwick's filter in its IMU form (no magnetometer): the gyro rates are
+integrated into a unit quaternion, and one normalised gradient-descent step
+per sample pulls it towards the attitude in which the measured acceleration
+points straight up.  ``beta`` (rad/s) sets how hard: larger follows the
+accelerometer sooner but lets more vibration through.  Yaw has no absolute
+reference, so it is relative to the heading at boot and drifts with the gyro
+bias.
+
+While the can is under thrust or falling freely the accelerometer does not
+measure gravity, so the correction is skipped whenever the magnitude is more
+than ``accel_gate`` g away from 1 g and the gyros carry the attitude alone.
+
+Every update runs the same straight-line sequence of float operations on
+locals and keeps its state in an ``array('f')``; nothing else is created per
+sample.
+
+    att = Attitude()
+    att.align(imu)             # first sample: roll and pitch from gravity
+    att.update(imu, dt)        # imu as filled by MPU6050.read(), dt in seconds
+    att.euler(angles)          # roll, pitch, yaw in degrees
+    att.vertical(imu)          # vertical acceleration for altitude.AltitudeFilter
+"""
+
+from array import array
+import math
+
+try:
+    import micropython
+except ImportError:
+    # Ground tools under plain CPython: the decorator is a no-op
+    class micropython:
+        @staticmethod
+        def native(func):
+            return func
+
+DEG = math.pi / 180
+RAD = 180 / math.pi
+G = 9.80665
+
+
+def angles():
+    """Preallocated output buffer for euler()."""
+    return array('f', (0.0, 0.0, 0.0))
+
+
+class Attitude:
+    def __init__(self, beta=0.1, accel_gate=0.3):
+        self.beta = beta
+        self.accel_gate = accel_gate
+        self.q = array('f', (1.0, 0.0, 0.0, 0.0))  # w, x, y, z
+        self.updates = 0
+        self.corrected = 0  # updates that used the accelerometer
+
+    def reset(self):
+        q = self.q
+        q[0] = 1.0
+        q[1] = q[2] = q[3] = 0.0
+        self.updates = self.corrected = 0
+
+    def align(self, imu):
+        """Start from roll and pitch of the measured gravity vector, yaw 0."""
+        self.reset()
+        ax, ay, az = imu[0], imu[1], imu[2]
+        if ax == 0.0 and ay == 0.0 and az == 0.0:
+            return
+        roll = math.atan2(ay, az) * 0.5
+        pitch = math.atan2(-ax, math.sqrt(ay * ay + az * az)) * 0.5
+        cr, sr = math.cos(roll), math.sin(roll)
+        cp, sp = math.cos(pitch), math.sin(pitch)
+        q = self.q
+        q[0] = cr * cp
+        q[1] = sr * cp
+        q[2] = cr * sp
+        q[3] = -sr * sp
+
+    @micropython.native
+    def update(self, imu, dt):
+        """Advance by one sample taken ``dt`` seconds after the previous one."""
+        q = self.q
+        q0, q1, q2, q3 = q[0], q[1], q[2], q[3]
+        ax, ay, az = imu[0], imu[1], imu[2]
+        gx, gy, gz = imu[3] * DEG, imu[4] * DEG, imu[5] * DEG
+
+        # Rate of change of the quaternion from the gyros
+        d0 = 0.5 * (-q1 * gx - q2 * gy - q3 * gz)
+        d1 = 0.5 * (q0 * gx + q2 * gz - q3 * gy)
+        d2 = 0.5 * (q0 * gy - q1 * gz + q3 * gx)
+        d3 = 0.5 * (q0 * gz + q1 * gy - q2 * gx)
+
+        norm = ax * ax + ay * ay + az * az
+        gate = self.accel_gate
+        if (1.0 - gate) * (1.0 - gate) < norm < (1.0 + gate) * (1.0 + gate):
+            r = 1.0 / math.sqrt(norm)
+            ax *= r
+            ay *= r
+            az *= r
+            # Gradient of the error between predicted and measured gravity
+            # (Madgwick's expressions halved; only its direction is used)
+            p = q1 * q1 + q2 * q2
+            m = q0 * q0 + q3 * q3 + 2.0 * p - 1.0 + az
+            s0 = 2.0 * q0 * p + q2 * ax - q1 * ay
+            s1 = 2.0 * q1 * m - q3 * ax - q0 * ay
+            s2 = 2.0 * q2 * m + q0 * ax - q3 * ay
+            s3 = 2.0 * q3 * p - q1 * ax - q2 * ay
+            norm = s0 * s0 + s1 * s1 + s2 * s2 + s3 * s3
+            if norm > 0.0:
+                r = self.beta / math.sqrt(norm)
+                d0 -= r * s0
+                d1 -= r * s1
+                d2 -= r * s2
+                d3 -= r * s3
+                self.corrected += 1
+
+        q0 += d0 * dt
+        q1 += d1 * dt
+        q2 += d2 * dt
+        q3 += d3 * dt
+        r = 1.0 / math.sqrt(q0 * q0 + q1 * q1 + q2 * q2 + q3 * q3)
+        q[0] = q0 * r
+        q[1] = q1 * r
+        q[2] = q2 * r
+        q[3] = q3 * r
+        self.updates += 1
+
+    def vertical(self, imu):
+        """Acceleration along the local vertical in m/s^2, positive up, gravity removed."""
+        q0, q1, q2, q3 = self.q[0], self.q[1], self.q[2], self.q[3]
+        up = (2.0 * (q1 * q3 - q0 * q2) * imu[0] + 2.0 * (q0 * q1 + q2 * q3) * imu[1]
+              + (q0 * q0 - q1 * q1 - q2 * q2 + q3 * q3) * imu[2])
+        return (up - 1.0) * G
+
+    def euler(self, out):
+        """Roll, pitch and yaw in degrees (aerospace order, z up the can) into ``out``."""
+        q0, q1, q2, q3 = self.q[0], self.q[1], self.q[2], self.q[3]
+        out[0] = math.atan2(q0 * q1 + q2 * q3, 0.5 - q1 * q1 - q2 * q2) * RAD
+        s = 2.0 * (q0 * q2 - q1 * q3)
+        out[1] = math.asin(1.0 if s > 1.0 else -1.0 if s < -1.0 else s) * RAD
+        out[2] = math.atan2(q1 * q2 + q0 * q3, 0.5 - q2 * q2 - q3 * q3) * RAD
+        return out
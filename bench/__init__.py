@@ -0,0 +1,6 @@
+"""
+Host-side benchmarks for the flight software.
+
+Run from the repository root, e.g. ``python -m bench.loop``.  Every benchmark
+drives the real firmware modules against the simulator in ``sim/``.
+"""
@@ -0,0 +1,140 @@
+"""
+Sampling-mode benchmark.
+
+Flies the simulated board once per ``ACQ_MODE`` with the binary log on,
+busy dashboard clients and core 0 stalling for ``--stall-ms`` once a second
+(standing in for an SD card sync, a garbage collection or a page render):
+sensors polled by core 0 tasks, sampled on the second core, from a timer
+IRQ and from the MPU6050 data-ready pin.  For each run it reports the sample
+rate that reached core 0, the ring's overflow/gap/torn counters and, from
+the log file itself, how many samples were written, whether their sequence
+numbers are contiguous, how evenly the sample timestamps are spaced and the
+longest hole between two consecutive samples:
+
+    python -m bench.acquire
+    python -m bench.acquire --seconds 5 --stall-ms 250 --modes tasks timer --json
+"""
+
+import argparse
+import statistics
+import time
+
+from hal import asyncio
+from sim import board
+
+import binlog
+from bench.harness import emit_json, quiet, table
+from bench.loop import Clients
+
+
+def scan_log(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    hdr = binlog.read_header(data)
+    period = hdr["ticks_period"]
+    samples = 0
+    seq_gaps = 0
+    intervals = []
+    last_seq = last_ticks = None
+    for rec in binlog.iter_records(data, hdr):
+        seq = rec[2]
+        if last_seq is not None and seq != (last_seq + 1) & 0xFFFF:
+            seq_gaps += (seq - last_seq - 1) & 0xFFFF
+        last_seq = seq
+        if rec[0] != binlog.REC_SENSOR:
+            continue
+        samples += 1
+        if last_ticks is not None:
+            intervals.append((rec[3] - last_ticks) % period)
+        last_ticks = rec[3]
+    intervals = intervals or [0]
+    return {"log_samples": samples, "log_seq_gaps": seq_gaps,
+            "log_interval_ms": statistics.median(intervals) / 1000,
+            "log_interval_sd_us": statistics.pstdev(intervals),
+            "log_worst_gap_ms": max(intervals) / 1000}
+
+
+def fly(mode, seconds, stall_ms, clients_per_s, streams):
+    board.reset()
+    import main
+    main.LOG_FORMAT = "binary"
+    main.ACQ_MODE = mode
+    main.PHASE_RATES = False  # measure at the flight rates, not the pad's
+
+    async def stall():
+        while True:
+            await asyncio.sleep(1)
+            time.sleep(stall_ms / 1000)  # blocks the event loop, like a long SD write
+
+    async def go():
+        samples = main.imu_samples
+        tasks = await main.start()
+        extra = [asyncio.create_task(Clients(main.HTTP_PORT, clients_per_s, 2, streams, 1).run()),
+                 asyncio.create_task(stall())]
+        await asyncio.sleep(seconds)
+        stats = main.sched.stats()
+        for t in extra + tasks:
+            t.cancel()
+        main.server.close()
+        return stats, main.imu_samples - samples
+
+    with quiet():
+        main.setup()
+        stats, samples = asyncio.run(go())
+        ring = mode != "tasks"
+        if ring:
+            main.stop_acquisition()
+            main.drain_samples()
+        main.sd_log.close()
+    result = {"mode": mode,
+              "target_hz": main.ACQ_HZ if ring else 1000 / main.IMU_PERIOD_MS,
+              "samples_hz": samples / seconds,
+              "missed": main.acq_overruns if ring else stats["imu"]["overruns"],
+              "ring_overflows": main.acq_ring.overflows if ring else None,
+              "ring_gaps": main.acq_gaps if ring else None,
+              "ring_torn": main.acq_torn if ring else None,
+              "sd_dropped": main.sd_log.dropped}
+    result.update(scan_log(main.log_filename))
+    return result
+
+
+MODES = ("tasks", "core1", "timer", "drdy")
+
+
+def run(modes, seconds, stall_ms, clients_per_s, streams):
+    return [fly(mode, seconds, stall_ms, clients_per_s, streams) for mode in modes]
+
+
+def opt(v):
+    return "-" if v is None else v
+
+
+def report(results, stall_ms):
+    print("core 0 stalls %d ms once a second, dashboard clients connected" % stall_ms)
+    print()
+    table([(r["mode"], "%.0f" % r["target_hz"], "%.1f" % r["samples_hz"], r["missed"],
+            opt(r["ring_overflows"]), opt(r["ring_gaps"]), opt(r["ring_torn"]), r["sd_dropped"],
+            r["log_samples"], r["log_seq_gaps"], "%.2f" % r["log_interval_ms"],
+            "%.0f" % r["log_interval_sd_us"], "%.1f" % r["log_worst_gap_ms"]) for r in results],
+          ("sampling", "Hz target", "Hz", "missed", "ring full", "gaps", "torn", "sd dropped",
+           "logged", "seq gaps", "interval ms", "sd us", "worst hole ms"))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=4.0, help="length of each run")
+    parser.add_argument("--stall-ms", type=float, default=150, help="how long core 0 blocks once a second")
+    parser.add_argument("--clients-per-s", type=float, default=5.0)
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+    results = run(args.modes, args.seconds, args.stall_ms, args.clients_per_s, args.streams)
+    if args.json:
+        emit_json(results)
+    else:
+        report(results, args.stall_ms)
+
+
+if __name__ == "__main__":
+    main_cli()
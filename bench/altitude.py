@@ -0,0 +1,192 @@
+"""
+Altitude filter benchmark.
+
+Replays the simulated flight through the drivers (MPU6050 raw counts at the
+IMU rate, BMP280 ADC values compensated by the driver) and the flight
+software's attitude and altitude filters, in the order main.py runs them.
+Compares against the scripted truth:
+
+  * the old ``altitude_bmp`` (standard sea-level pressure),
+  * raw barometric altitude above the launch site, with vertical speed from
+    the difference of consecutive readings,
+  * the Kalman filter.
+
+The filter is tuned as main.py tunes it (``ALT_*_NOISE``).  It must track
+the altitude at least as well as the raw barometer it smooths: the
+benchmark fails when its RMS or worst altitude error is the larger.
+
+An accelerometer bias can be added to show the filter estimating it; the
+MPU6050 range can be raised so the boost does not clip at 2 g:
+
+    python -m bench.altitude
+    python -m bench.altitude --accel-bias 0.05 --accel-range 3 --json
+"""
+
+import argparse
+import math
+import time
+
+from sim import board
+
+from bench.harness import emit_json, peak_alloc, quiet, table
+import hal
+from altitude import AltitudeFilter, pressure_altitude
+from attitude import Attitude
+from bmp280 import BMP280
+from mpu6050 import MPU6050, values
+
+
+def record(imu_hz, baro_hz, accel_range, accel_bias):
+    """Time-ordered ("imu", t, ax..gz) and ("baro", t, pressure) events over the flight."""
+    b = board.reset()
+    i2c = hal.I2C(0, sda=hal.Pin(0), scl=hal.Pin(1), freq=400000)
+    mpu = MPU6050(i2c, accel_range=accel_range)
+    bmp = BMP280(i2c)
+    mpu_model = b.i2c[0].devices[0x68]
+    bmp_model = b.i2c[0].devices[0x76]
+    profile = b.profile
+    end = profile.landing_t + 5
+    events = []
+    out = values()
+    for i in range(int(end * imu_hz)):
+        t = i / imu_hz
+        mpu.convert(mpu_model.sample(t), out)
+        out[2] += accel_bias
+        events.append(("imu", t, tuple(out)))
+    raw = bytearray(6)
+    for i in range(int(end * baro_hz)):
+        t = (i + 0.5) / baro_hz
+        adc_t, adc_p = bmp_model.raw_for(profile.temperature(t), profile.pressure(t))
+        raw[0:3] = bytes((adc_p >> 12, (adc_p >> 4) & 0xFF, (adc_p & 0x0F) << 4))
+        raw[3:6] = bytes((adc_t >> 12, (adc_t >> 4) & 0xFF, (adc_t & 0x0F) << 4))
+        events.append(("baro", t, bmp.convert(raw)[1]))
+    events.sort(key=lambda e: e[1])
+    return events, profile, 32000 * mpu.accel_scale
+
+
+def replay(events, ground_samples, clip, main):
+    """Run the filters over the events; one (t, estimates...) row per barometer reading."""
+    att = Attitude()
+    alt = AltitudeFilter(0, ground_samples, main.ALT_ACCEL_NOISE, baro_noise=main.ALT_BARO_NOISE,
+                         clip_noise=main.ALT_CLIP_NOISE)
+    imu = values()
+    rows = []
+    predict_ns = correct_ns = predicts = corrects = 0
+    last_imu = None
+    last_baro = None
+    for kind, t, data in events:
+        if kind == "imu":
+            for k in range(6):
+                imu[k] = data[k]
+            if last_imu is None:
+                att.align(imu)
+            else:
+                dt = t - last_imu
+                att.update(imu, dt)
+                t0 = time.perf_counter_ns()
+                alt.predict(att.vertical(imu), dt, max(abs(imu[0]), abs(imu[1]), abs(imu[2])) > clip)
+                predict_ns += time.perf_counter_ns() - t0
+                predicts += 1
+            last_imu = t
+            continue
+        t0 = time.perf_counter_ns()
+        calibrated = alt.baro(data)
+        correct_ns += time.perf_counter_ns() - t0
+        corrects += 1
+        if calibrated:
+            sea = 44330 * (1 - (data / 101325) ** 0.1903)
+            agl = pressure_altitude(data, alt.ground)
+            speed = 0.0 if last_baro is None else (agl - last_baro[1]) / (t - last_baro[0])
+            last_baro = (t, agl)
+            rows.append((t, sea, agl, speed, alt.x[0], alt.x[1], alt.apogee, alt.x[2]))
+    return rows, predict_ns / 1000 / max(1, predicts), correct_ns / 1000 / max(1, corrects)
+
+
+def errors(rows, profile, start):
+    """RMS and worst altitude error, RMS speed error for each estimator after ``start`` s."""
+    est = {"altitude_bmp (1013.25 hPa)": (1, None), "baro above ground": (2, 3), "kalman": (4, 5)}
+    result = {}
+    for name, (h_col, v_col) in est.items():
+        sq_h = sq_v = worst = 0.0
+        n = 0
+        for row in rows:
+            if row[0] < start:
+                continue
+            h, v, _ = profile.kinematics(row[0])
+            err = row[h_col] - h
+            sq_h += err * err
+            worst = max(worst, abs(err))
+            if v_col is not None:
+                sq_v += (row[v_col] - v) ** 2
+            n += 1
+        result[name] = {"alt_rms_m": math.sqrt(sq_h / n), "alt_max_m": worst,
+                        "speed_rms_ms": math.sqrt(sq_v / n) if v_col is not None else None}
+    return result
+
+
+def run(imu_hz, baro_hz, accel_range, accel_bias):
+    board.reset()
+    with quiet():
+        import main
+    events, profile, clip = record(imu_hz, baro_hz, accel_range, accel_bias)
+    rows, predict_us, correct_us = replay(events, baro_hz, clip, main)
+    # From after the ground calibration to touchdown (the simulated landing
+    # stops the can dead, with nothing on the accelerometer)
+    rows = [row for row in rows if row[0] < profile.landing_t]
+    result = {"errors": errors(rows, profile, 5.0),
+              "predict_us": predict_us, "correct_us": correct_us,
+              "true_apogee_m": profile.apogee_h, "true_apogee_s": profile.apogee_t}
+
+    # When the apogee estimate settles: within 2 % of the truth from then on
+    settled = None
+    for row in rows:
+        if abs(row[6] - profile.apogee_h) > 0.02 * profile.apogee_h:
+            settled = None
+        elif settled is None:
+            settled = row[0]
+    result["apogee_m"] = rows[-1][6]
+    result["apogee_settled_s"] = settled
+    result["accel_bias_ms2"] = rows[-1][7]
+
+    alt = AltitudeFilter(101325.0)
+    result["predict_alloc_bytes"] = peak_alloc(lambda: alt.predict(0.1, 0.01), 200)
+    result["correct_alloc_bytes"] = peak_alloc(lambda: alt.baro(101300.0), 200)
+    kalman, raw = result["errors"]["kalman"], result["errors"]["baro above ground"]
+    result["filter_ok"] = kalman["alt_rms_m"] <= raw["alt_rms_m"] and kalman["alt_max_m"] <= raw["alt_max_m"]
+    return result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--imu-hz", type=int, default=100)
+    parser.add_argument("--baro-hz", type=int, default=50)
+    parser.add_argument("--accel-range", type=int, default=0, choices=range(4),
+                        help="MPU6050 range index: 0..3 = 2/4/8/16 g (main.py uses 0)")
+    parser.add_argument("--accel-bias", type=float, default=0.0, help="added to the z accelerometer (g)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    r = run(args.imu_hz, args.baro_hz, args.accel_range, args.accel_bias)
+    if args.json:
+        emit_json(r)
+    else:
+        report(r)
+    if not r["filter_ok"]:
+        raise SystemExit("altitude filter is less accurate than the raw barometer: retune ALT_*_NOISE in main.py")
+
+
+def report(r):
+    table([(name, "%.2f" % e["alt_rms_m"], "%.2f" % e["alt_max_m"],
+            "-" if e["speed_rms_ms"] is None else "%.2f" % e["speed_rms_ms"])
+           for name, e in r["errors"].items()],
+          ("estimate", "alt rms m", "alt max m", "speed rms m/s"))
+    settled = r["apogee_settled_s"]
+    print("\napogee %.1f m (true %.1f m at %.1f s), within 2%% from %s" % (
+        r["apogee_m"], r["true_apogee_m"], r["true_apogee_s"],
+        "%.1f s" % settled if settled is not None else "never"))
+    print("accelerometer bias estimate %.3f m/s^2 (%.3f g)" % (r["accel_bias_ms2"], r["accel_bias_ms2"] / 9.80665))
+    print("predict %.2f us, correct %.2f us per call on this machine; %.0f / %.0f B allocated" % (
+        r["predict_us"], r["correct_us"], r["predict_alloc_bytes"], r["correct_alloc_bytes"]))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,178 @@
+"""
+Post-flight analysis benchmark.
+
+Writes a synthetic balloon flight of ``--rows`` log lines in the CSV layout
+of ``main.py`` (its own ``CSV_LINE``; ``--legacy`` for the original
+14 columns with NMEA coordinates), with a GPS that has no fix for the first
+90 s and drops out now and then, ``# stats`` lines and a line torn at the
+end, then times ``analysis.csvlog`` reading it (``--workers`` processes, one
+per core by default) and ``analysis.flight`` deriving the flight from it,
+and checks the results against the flight that was written:
+
+    python -m bench.analysis
+    python -m bench.analysis --rows 5000000 --legacy
+    python -m bench.analysis --rows 500000 --json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from bench.harness import emit_json, quiet, table
+from sim import board
+from sim.profile import SITE_LAT, SITE_LON, pressure_at
+from tools.decode_log import CSV_HEADER, STATS_LINE
+
+DT = 0.1  # LOG_INTERVAL in flight
+PAD_S = 600.0
+ASCENT_MPS = 5.0
+BURST_M = 30000.0
+SITE_ALT = 920.0
+SCALE_HEIGHT_M = 7000.0  # descent speed grows as sqrt(1 / density)
+SEA_LEVEL_DESCENT_MPS = 5.0
+WIND_MPS = (8.0, 3.0)  # east, north
+FIRST_FIX_S = 90.0
+STATS_ROWS = 300  # a "# stats" line every 30 s
+
+LEGACY_HEADER = "Time(s),Temp(C),Pressure(hPa),Altitude_BMP(m),Accel_X(g),Accel_Y(g),Accel_Z(g),Gyro_X(deg/s),Gyro_Y(deg/s),Gyro_Z(deg/s),GPS_Lat,GPS_Lon,GPS_Alt(m),Satellites"
+LEGACY_LINE = "%.1f,%.2f,%.2f,%.2f,%.3f,%.3f,%.3f,%.2f,%.2f,%.2f,%s,%s,%s,%s\n"
+
+
+def balloon(rows, seed=1, burst_m=BURST_M):
+    """The flight as arrays, and the truth the analysis should find."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(rows) * DT
+    apogee_s = PAD_S + burst_m / ASCENT_MPS
+    k = 2 * SCALE_HEIGHT_M
+    fall_s = k * (1 - np.exp(-burst_m / k)) / SEA_LEVEL_DESCENT_MPS
+    landing_s = apogee_s + fall_s
+    d = np.clip(t - apogee_s, 0, fall_s)
+    h = np.where(t < PAD_S, 0.0, np.where(t < apogee_s, (t - PAD_S) * ASCENT_MPS,
+                 np.maximum(0.0, -k * np.log(np.exp(-burst_m / k) + SEA_LEVEL_DESCENT_MPS * d / k))))
+    v = np.gradient(h, DT)
+    airborne = np.clip(t, PAD_S, landing_s) - PAD_S
+    east, north = WIND_MPS[0] * airborne, WIND_MPS[1] * airborne
+    lat = SITE_LAT + np.degrees(north / 6371000.0)
+    lon = SITE_LON + np.degrees(east / (6371000.0 * np.cos(np.radians(SITE_LAT))))
+    fix = (t >= FIRST_FIX_S) & (t % 1000 >= 3) & ~((t >= 8000) & (t < 8030))
+    pressure = pressure_at(SITE_ALT + h + rng.normal(0, 0.5, rows)) / 100
+    burst = np.abs(t - apogee_s) < 0.5
+    f = {
+        "time": t, "temp": 28 - 0.0065 * h + rng.normal(0, 0.05, rows), "pressure": pressure,
+        "altitude_bmp": 44330 * (1 - (pressure / 1013.25) ** 0.1903),
+        "altitude_agl": h + rng.normal(0, 0.2, rows), "vertical_speed": v + rng.normal(0, 0.1, rows),
+        "apogee_agl": np.maximum.accumulate(h),
+        "accel_x": rng.normal(0, 0.02, rows), "accel_y": rng.normal(0, 0.02, rows),
+        "accel_z": 1 + rng.normal(0, 0.02, rows) + 2.5 * burst,
+        "gyro_x": rng.normal(0, 0.5, rows), "gyro_y": rng.normal(0, 0.5, rows), "gyro_z": rng.normal(0, 0.5, rows),
+        "roll": rng.normal(0, 2, rows), "pitch": rng.normal(0, 2, rows), "yaw": (t * 3) % 360,
+        "lat": lat, "lon": lon, "gps_alt": SITE_ALT + h, "fix": fix,
+        "phase": np.select([(h <= 10) & (t < apogee_s), t < apogee_s, t < apogee_s + 1, t < landing_s + 5],
+                           ["pad", "ascent", "apogee", "descent"], "landed"),
+    }
+    truth = {"launch_s": PAD_S, "apogee_s": apogee_s, "apogee_m": burst_m,
+             "landing_s": landing_s if landing_s < t[-1] else None,
+             "descent_rate_mps": burst_m / fall_s, "drift_m": float(np.hypot(east[fix][-1], north[fix][-1]))}
+    return f, truth
+
+
+def nmea(deg, width, hemispheres):
+    a = abs(deg)
+    return "%0*d%07.4f%s" % (width, int(a), (a - int(a)) * 60, hemispheres[deg < 0])
+
+
+def write(path, f, legacy, csv_line):
+    rows = len(f["time"])
+    with open(path, "w") as out:
+        out.write((LEGACY_HEADER if legacy else CSV_HEADER) + "\n")
+        for start in range(0, rows, STATS_ROWS):
+            s = slice(start, start + STATS_ROWS)
+            fix = f["fix"][s].tolist()
+            if legacy:
+                lat = [nmea(x, 2, "NS") if ok else "N/A" for x, ok in zip(f["lat"][s].tolist(), fix)]
+                lon = [nmea(x, 3, "EW") if ok else "N/A" for x, ok in zip(f["lon"][s].tolist(), fix)]
+            else:
+                lat = ["%.6f" % x if ok else "N/A" for x, ok in zip(f["lat"][s].tolist(), fix)]
+                lon = ["%.6f" % x if ok else "N/A" for x, ok in zip(f["lon"][s].tolist(), fix)]
+            alt = ["%.1f" % x if ok else "N/A" for x, ok in zip(f["gps_alt"][s].tolist(), fix)]
+            if legacy:
+                sats = ["09" if ok else "0" for ok in fix]
+                cols = [f[k][s].tolist() for k in ("time", "temp", "pressure", "altitude_bmp", "accel_x", "accel_y",
+                                                   "accel_z", "gyro_x", "gyro_y", "gyro_z")]
+                out.write("".join(LEGACY_LINE % r for r in zip(*cols, lat, lon, alt, sats)))
+            else:
+                sats = [9 if ok else 0 for ok in fix]
+                seq = range(start * 10, (start + len(fix)) * 10, 10)
+                ticks = [int(x * 1e6) & ((1 << 30) - 1) for x in f["time"][s].tolist()]
+                cols = [f[k][s].tolist() for k in ("time", "temp", "pressure", "altitude_bmp", "altitude_agl",
+                                                   "vertical_speed", "apogee_agl", "accel_x", "accel_y", "accel_z",
+                                                   "gyro_x", "gyro_y", "gyro_z", "roll", "pitch", "yaw")]
+                out.write("".join(csv_line % r for r in zip(*cols, lat, lon, alt, sats, f["phase"][s].tolist(),
+                                                              seq, ticks)))
+                out.write(STATS_LINE % (f["time"][s][-1], "baro", 300, 120, 180, 950, 0))
+        out.write("%.1f,28.1,10" % (rows * DT))  # power cut mid-line
+
+
+def run(rows, legacy, block_bytes, workers, rate_hz):
+    from analysis import csvlog
+    from analysis.flight import flights
+
+    board.reset()
+    with quiet():
+        import main
+    path = os.path.join(tempfile.mkdtemp(prefix="cansat_analysis_"), "cansat_log.csv")
+    t0 = time.perf_counter()
+    f, truth = balloon(rows)
+    write(path, f, legacy, main.CSV_LINE)
+    written = time.perf_counter() - t0
+    size = os.path.getsize(path)
+    try:
+        t0 = time.perf_counter()
+        channels, skipped = csvlog.read(path, block_bytes, workers)
+        t1 = time.perf_counter()
+        found = flights(channels, rate_hz)
+        summary = found[0].summary()
+        t2 = time.perf_counter()
+    finally:
+        os.remove(path)
+    return {"rows": rows, "legacy": legacy, "bytes": size, "write_s": written, "workers": workers,
+            "rows_read": len(channels["time"]), "skipped": skipped, "sessions": len(found),
+            "read_s": t1 - t0, "analyse_s": t2 - t1, "rows_per_s": rows / (t2 - t0),
+            "mb_per_s": size / 1e6 / (t1 - t0), "summary": summary, "truth": truth}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000000, help="log lines (10 per second of flight)")
+    parser.add_argument("--legacy", action="store_true", help="original 14-column log with NMEA coordinates")
+    parser.add_argument("--block-mb", type=float, default=16, help="bytes parsed at a time")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes parsing the log")
+    parser.add_argument("--rate", type=float, default=10.0, help="common timebase in Hz")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    r = run(args.rows, args.legacy, int(args.block_mb * (1 << 20)), args.workers, args.rate)
+    if args.json:
+        emit_json(r)
+        return
+    s, truth = r["summary"], r["truth"]
+    err = lambda key, fmt: "-" if s[key] is None or truth[key] is None else fmt % (s[key] - truth[key])
+    table([("log", "%d rows, %.0f MB%s (written in %.1f s)" % (
+               r["rows"], r["bytes"] / 1e6, ", legacy" if r["legacy"] else "", r["write_s"])),
+           ("read", "%.2f s, %.0f MB/s with %d worker%s; %d rows, %d lines skipped" % (
+               r["read_s"], r["mb_per_s"], r["workers"], "" if r["workers"] == 1 else "s",
+               r["rows_read"], r["skipped"])),
+           ("analyse", "%.2f s (%d session)" % (r["analyse_s"], r["sessions"])),
+           ("total", "%.0f rows/s" % r["rows_per_s"]),
+           ("launch error", err("launch_s", "%+.1f s")),
+           ("apogee error", "%s, %s" % (err("apogee_m", "%+.1f m"), err("apogee_s", "%+.1f s"))),
+           ("landing error", err("landing_s", "%+.1f s")),
+           ("descent rate error", err("descent_rate_mps", "%+.2f m/s")),
+           ("drift error", err("drift_m", "%+.0f m"))],
+          ("post-flight analysis", ""))
+
+
+if __name__ == "__main__":
+    main_cli()
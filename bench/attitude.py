@@ -0,0 +1,193 @@
+"""
+Attitude filter benchmark.
+
+Records a whole simulated flight from the MPU6050 model (raw counts at the
+IMU rate, converted by the driver exactly as on the Pico), or takes the IMU
+samples of a binary flight log, and runs the flight software's filter over
+them.  Reports the cost of one update against the IMU period, its
+allocations, how well roll follows the swing under the parachute, and the
+largest difference from a straightforward NumPy implementation of the same
+filter (Madgwick's Jacobian form in double precision):
+
+    python -m bench.attitude
+    python -m bench.attitude --log cansat_log_000.bin --json
+"""
+
+import argparse
+import math
+import struct
+import time
+from array import array
+
+from sim import board
+
+from bench.harness import emit_json, peak_alloc, table
+import binlog
+import hal
+from attitude import Attitude, angles
+from mpu6050 import MPU6050, values
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def record(rate_hz):
+    """(dt in s, ax..gz) per sample over the simulated flight, plus the true swing roll."""
+    b = board.reset()
+    mpu = MPU6050(hal.I2C(0, sda=hal.Pin(0), scl=hal.Pin(1), freq=400000))
+    model = b.i2c[0].devices[0x68]
+    profile = b.profile
+    out = values()
+    samples, truth = [], []
+    n = int((profile.landing_t + 5) * rate_hz)
+    for i in range(n):
+        t = i / rate_hz
+        mpu.convert(model.sample(t), out)
+        samples.append((1 / rate_hz, *out))
+        truth.append(profile.swing(t)[0])
+    return samples, truth
+
+
+def load_log(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    hdr = binlog.read_header(data)
+    accel = 1 / hdr["accel_lsb"]
+    gyro = 1 / hdr["gyro_lsb"]
+    period, half = hdr["ticks_period"], hdr["ticks_period"] // 2
+    samples = []
+    last = None
+    for rec in binlog.iter_records(data, hdr):
+        if rec[0] != binlog.REC_SENSOR or not rec[1] & binlog.FLAG_IMU:
+            continue
+        ax, ay, az, _, gx, gy, gz = struct.unpack(">7h", rec[5])
+        dt = 0 if last is None else ((rec[3] - last + half) % period - half) / 1e6
+        last = rec[3]
+        samples.append((dt, ax * accel, ay * accel, az * accel, gx * gyro, gy * gyro, gz * gyro))
+    return samples, None
+
+
+def firmware(samples, beta):
+    """Run attitude.Attitude as main.py does; return (roll, pitch, yaw) per sample and us/update."""
+    att = Attitude(beta)
+    imu = values()
+    euler = angles()
+    out = []
+    busy = 0
+    for i, s in enumerate(samples):
+        for k in range(6):
+            imu[k] = s[k + 1]
+        t0 = time.perf_counter_ns()
+        if i:
+            att.update(imu, s[0])
+        else:
+            att.align(imu)
+        busy += time.perf_counter_ns() - t0
+        out.append(tuple(att.euler(euler)))
+    return out, busy / 1000 / max(1, len(samples) - 1)
+
+
+def reference(samples, beta, accel_gate=0.3):
+    """The same filter written from the paper's J^T f gradient, in float64 NumPy."""
+    data = np.array(samples, dtype=np.float64)
+    dt, acc, gyr = data[:, 0], data[:, 1:4], np.radians(data[:, 4:7])
+    norm = np.linalg.norm(acc, axis=1)
+    use = (norm > 1 - accel_gate) & (norm < 1 + accel_gate)
+    acc = acc / np.where(norm > 0, norm, 1)[:, None]
+
+    a = acc[0] * norm[0]
+    roll = math.atan2(a[1], a[2]) / 2
+    pitch = math.atan2(-a[0], math.hypot(a[1], a[2])) / 2
+    q = np.array([math.cos(roll) * math.cos(pitch), math.sin(roll) * math.cos(pitch),
+                  math.cos(roll) * math.sin(pitch), -math.sin(roll) * math.sin(pitch)])
+    qs = np.empty((len(data), 4))
+    qs[0] = q
+    for i in range(1, len(data)):
+        w, x, y, z = q
+        gx, gy, gz = gyr[i]
+        # Quaternion product q * (0, omega) / 2
+        dq = 0.5 * np.array([-x * gx - y * gy - z * gz,
+                             w * gx + y * gz - z * gy,
+                             w * gy - x * gz + z * gx,
+                             w * gz + x * gy - y * gx])
+        if use[i]:
+            f = np.array([2 * (x * z - w * y) - acc[i, 0],
+                          2 * (w * x + y * z) - acc[i, 1],
+                          2 * (0.5 - x * x - y * y) - acc[i, 2]])
+            j = np.array([[-2 * y, 2 * z, -2 * w, 2 * x],
+                          [2 * x, 2 * w, 2 * z, 2 * y],
+                          [0, -4 * x, -4 * y, 0]])
+            step = j.T @ f
+            n = np.linalg.norm(step)
+            if n > 0:
+                dq -= beta * step / n
+        q = q + dq * dt[i]
+        q /= np.linalg.norm(q)
+        qs[i] = q
+
+    w, x, y, z = qs.T
+    return np.degrees(np.stack([
+        np.arctan2(w * x + y * z, 0.5 - x * x - y * y),
+        np.arcsin(np.clip(2 * (w * y - x * z), -1, 1)),
+        np.arctan2(x * y + w * z, 0.5 - y * y - z * z)], axis=1))
+
+
+def wrap(deg):
+    return (deg + 180) % 360 - 180
+
+
+def run(rate_hz, beta, log=None):
+    samples, truth = load_log(log) if log else record(rate_hz)
+    est, us = firmware(samples, beta)
+    period_us = 1e6 / rate_hz if not log else 1e6 * sum(s[0] for s in samples) / max(1, len(samples) - 1)
+
+    imu = array('f', samples[len(samples) // 2][1:])
+    # On a fresh filter the update counters stay below 256, small ints CPython
+    # does not allocate (MicroPython does not below 2**30)
+    att = Attitude(beta)
+    for _ in range(10):
+        att.update(imu, 0.01)
+    alloc = peak_alloc(lambda: att.update(imu, 0.01), 200)
+
+    result = {"source": log or "simulated flight", "samples": len(samples), "period_us": period_us,
+              "us_per_update": us, "budget": us / period_us, "alloc_bytes": alloc}
+    if truth:
+        errors = [e[0] - r for e, r in zip(est, truth) if r]
+        result["swing_roll_rms_deg"] = math.sqrt(sum(e * e for e in errors) / max(1, len(errors)))
+    if np is not None:
+        ref = reference(samples, beta)
+        diff = np.abs(wrap(np.array(est) - ref))
+        result["reference_max_diff_deg"] = dict(zip(("roll", "pitch", "yaw"), diff.max(axis=0).tolist()))
+    return result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=int, default=100, help="IMU sample rate of the simulated flight (Hz)")
+    parser.add_argument("--beta", type=float, default=0.1, help="filter gain, ATT_BETA in main.py")
+    parser.add_argument("--log", help="take the IMU samples from a binary flight log instead")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    r = run(args.rate, args.beta, args.log)
+    if args.json:
+        emit_json(r)
+        return
+    rows = [("samples", r["samples"]), ("IMU period", "%.0f us" % r["period_us"]),
+            ("update", "%.2f us" % r["us_per_update"]),
+            ("share of period", "%.2f%%" % (r["budget"] * 100)),
+            ("alloc per update", "%.0f B" % r["alloc_bytes"])]
+    if "swing_roll_rms_deg" in r:
+        rows.append(("roll error under canopy", "%.2f deg rms" % r["swing_roll_rms_deg"]))
+    table(rows, (r["source"], ""))
+    ref = r.get("reference_max_diff_deg")
+    if ref is None:
+        print("\nnumpy not installed: skipped the reference comparison")
+    else:
+        print("\nlargest difference from the NumPy reference: roll %.4f, pitch %.4f, yaw %.4f deg" % (
+            ref["roll"], ref["pitch"], ref["yaw"]))
+
+
+if __name__ == "__main__":
+    main_cli()
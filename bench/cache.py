@@ -0,0 +1,121 @@
+"""
+Flight archive benchmark: re-parsing every CSV log versus the columnar cache.
+
+Writes ``--flights`` synthetic balloon logs of ``--rows`` lines each
+(``bench.analysis``), bursting at altitudes from a few hundred metres to
+30 km, ingests them into an ``analysis.cache`` and runs the same query
+both ways: every sample above ``--above`` metres, with its time and
+position, across all flights.  Reports the ingest rate and its peak
+memory against the size of a log, how many chunks the query had to read,
+and how long opening a whole flight from the cache takes:
+
+    python -m bench.cache
+    python -m bench.cache --flights 24 --rows 100000 --above 1000 --json
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from bench.analysis import balloon, write
+from bench.harness import emit_json, quiet, table
+from sim import board
+
+BURSTS_M = (300.0, 1500.0, 5000.0, 12000.0, 30000.0)
+COLUMNS = ("time", "altitude_agl", "gps_lat", "gps_lon")
+
+
+def run(flights, rows, above):
+    from analysis import csvlog
+    from analysis.cache import Cache
+
+    board.reset()
+    with quiet():
+        import main
+    root = tempfile.mkdtemp(prefix="cansat_cache_")
+    try:
+        logs = []
+        for i in range(flights):
+            path = os.path.join(root, "flight%02d" % i, "cansat_log.csv")
+            os.makedirs(os.path.dirname(path))
+            f, _ = balloon(rows, seed=i, burst_m=BURSTS_M[i % len(BURSTS_M)])
+            write(path, f, False, main.CSV_LINE)
+            logs.append(path)
+        size = sum(os.path.getsize(p) for p in logs)
+
+        cache = Cache(os.path.join(root, "cache"))
+        t0 = time.perf_counter()
+        for path in logs:
+            cache.ingest(path)
+        ingest_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for path in logs:
+            cache.ingest(path)
+        unchanged_s = time.perf_counter() - t0
+        tracemalloc.start()
+        cache.ingest(logs[0], force=True)
+        ingest_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        t0 = time.perf_counter()
+        parsed = {}
+        for path in logs:
+            channels, _ = csvlog.read(path)
+            name = os.path.basename(os.path.dirname(path))
+            parsed[name] = int(np.count_nonzero(channels["altitude_agl"] >= above))
+        parse_s = time.perf_counter() - t0
+
+        cache = Cache(cache.root)  # as a later session would: index only
+        t0 = time.perf_counter()
+        found = {name: len(r["time"]) for name, r in cache.where("altitude_agl", low=above, columns=COLUMNS)}
+        query_s = time.perf_counter() - t0
+        total = sum(len(cache.index[n]["chunks"]) for n in cache.flights)
+        read = sum(1 for _ in cache.chunks("altitude_agl", low=above))
+
+        t0 = time.perf_counter()
+        for name in cache.flights:
+            cache.open(name)
+        open_s = (time.perf_counter() - t0) / flights
+        cache_bytes = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(cache.root) for f in fs)
+        matches = all(found.get(name, 0) == n for name, n in parsed.items())
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {"flights": flights, "rows": rows, "above_m": above, "csv_bytes": size, "cache_bytes": cache_bytes,
+            "ingest_s": ingest_s, "ingest_mb_per_s": size / 1e6 / ingest_s, "unchanged_s": unchanged_s,
+            "ingest_peak_bytes": ingest_peak, "log_bytes": size // flights,
+            "parse_query_s": parse_s, "cache_query_s": query_s, "chunks_read": read, "chunks": total,
+            "rows_found": int(sum(found.values())), "flights_found": len(found), "results_match": matches,
+            "open_s": open_s}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--flights", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=150000, help="log lines per flight")
+    parser.add_argument("--above", type=float, default=500.0, help="query: samples above this altitude")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    r = run(args.flights, args.rows, args.above)
+    if args.json:
+        emit_json(r)
+        return
+    table([("logs", "%d x %d rows, %.0f MB of CSV, %.0f MB cached" % (
+               r["flights"], r["rows"], r["csv_bytes"] / 1e6, r["cache_bytes"] / 1e6)),
+           ("ingest", "%.1f s, %.0f MB/s; peak %.0f MB for a %.0f MB log; %.3f s when unchanged" % (
+               r["ingest_s"], r["ingest_mb_per_s"], r["ingest_peak_bytes"] / 1e6, r["log_bytes"] / 1e6,
+               r["unchanged_s"])),
+           ("query by parsing", "%.2f s" % r["parse_query_s"]),
+           ("query from cache", "%.3f s, %d of %d chunks read" % (r["cache_query_s"], r["chunks_read"], r["chunks"])),
+           ("result", "%d samples above %g m in %d flights%s" % (
+               r["rows_found"], r["above_m"], r["flights_found"], "" if r["results_match"] else " (MISMATCH)")),
+           ("open a flight", "%.1f us" % (r["open_s"] * 1e6))],
+          ("flight archive", ""))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,163 @@
+"""
+Burst capture benchmark.
+
+Flies the simulated launch through the flight software with binary logging
+and burst capture on, asks for one burst over HTTP while the can is on the
+pad, and lets the acceleration trigger catch the launch.  For every burst
+file reports why it was taken, how much of the window came from before and
+after the trigger, the sample spacing and how late the trigger was against
+the scripted launch; for the flight log, the record rate on the pad and in
+flight.  Then times one sensor record with and without the capture ring:
+
+    python -m bench.capture
+    python -m bench.capture --mode timer --json
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from hal import asyncio
+from sim import board, socket
+from sim.profile import FlightProfile
+
+from bench.harness import emit_json, measure, peak_alloc, quiet, table
+import binlog
+from capture import Capture, REASONS
+
+CAPTURE_REQUEST = b"POST /api/capture HTTP/1.1\r\nHost: 192.168.4.1\r\nContent-Length: 0\r\n\r\n"
+PREFETCH_REQUEST = b"GET /api/capture HTTP/1.1\r\nHost: 192.168.4.1\r\n\r\n"  # must not trigger
+
+
+def read_log(path, clock):
+    """Simulated time of every sensor record, and (time, kind, value) of every event."""
+    with open(path, "rb") as f:
+        data = f.read()
+    hdr = binlog.read_header(data)
+    sensor, events = [], []
+    for rec in binlog.iter_records(data, hdr):
+        if rec[0] == binlog.REC_SENSOR:
+            sensor.append(clock(rec[3]))
+        elif rec[0] == binlog.REC_EVENT:
+            events.append((clock(rec[3]), rec[1], rec[4]))
+    return sensor, events
+
+
+def fly(mode, pad_s, manual_s, seconds):
+    b = board.reset(profile=FlightProfile(pad_s=pad_s))
+    import main
+    main.LOG_FORMAT = "binary"
+    main.ACQ_MODE = mode
+    main.SCHED_REPORT_S = 0
+
+    async def ask(request):
+        c = socket.connect(main.HTTP_PORT, request)
+        reply = b""
+        for _ in range(100):
+            await asyncio.sleep_ms(10)
+            try:
+                more = c.recv(1024)
+            except OSError:
+                continue
+            if not more:
+                break
+            reply += more
+        c.close()
+        return reply
+
+    async def go():
+        tasks = await main.start()
+        ticks, now = time.ticks_us(), b.now()
+        await asyncio.sleep(manual_s - 0.5 - b.now())
+        prefetch = await ask(PREFETCH_REQUEST)
+        await asyncio.sleep(manual_s - b.now())
+        reply = await ask(CAPTURE_REQUEST)
+        await asyncio.sleep(seconds - b.now())
+        for t in tasks:
+            t.cancel()
+        main.server.close()
+        return prefetch, reply, lambda t: now + time.ticks_diff(t, ticks) / 1e6
+
+    with quiet():
+        main.setup()
+        prefetch, reply, clock = asyncio.run(go())
+    return main, b.profile, prefetch, reply, clock
+
+
+def run(mode, pad_s, manual_s, seconds, iterations):
+    main, profile, prefetch, reply, clock = fly(mode, pad_s, manual_s, seconds)
+    log_times, _ = read_log(main.log_filename, clock)
+    bursts = []
+    for name in sorted(os.listdir(main.sd_root)):
+        if not name.startswith("burst_"):
+            continue
+        times, events = read_log(os.path.join(main.sd_root, name), clock)
+        trigger = next((t for t, kind, value in events if kind == binlog.EVENT_TRIGGER), None)
+        reason = next((REASONS[value] for t, kind, value in events if kind == binlog.EVENT_TRIGGER), "")
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        burst = {"file": name, "reason": reason, "records": len(times),
+                 "before_s": trigger - times[0] if trigger is not None else None,
+                 "after_s": times[-1] - trigger if trigger is not None else None,
+                 "interval_ms": statistics.median(gaps) * 1000 if gaps else None,
+                 "worst_gap_ms": max(gaps) * 1000 if gaps else None}
+        if reason == "accel":
+            burst["trigger_delay_ms"] = (trigger - profile.pad_s) * 1000
+        bursts.append(burst)
+
+    pad = [t for t in log_times if t < profile.pad_s - 0.5]
+    flight = [t for t in log_times if t > profile.pad_s + 0.5]
+    result = {"mode": mode, "http_reply": reply.split(b"\r\n\r\n", 1)[-1].decode(),
+              "http_get_status": prefetch.split(b"\r\n", 1)[0].decode(), "bursts": bursts,
+              "log_hz_pad": (len(pad) - 1) / (pad[-1] - pad[0]) if len(pad) > 1 else 0,
+              "log_hz_flight": (len(flight) - 1) / (flight[-1] - flight[0]) if len(flight) > 1 else 0,
+              "capture_bytes": len(main.capture.buf), "dropped_while_writing": main.capture.dropped}
+
+    # One IMU sample into the capture ring (and the log when it is due)
+    raw = main.mpu.buf
+    record = lambda: main.log_sensor_record(123456, binlog.FLAG_IMU, raw)
+    cap = main.capture
+    main.sd_log.poll()
+    with quiet():
+        main.log_every = 1 << 30
+        result["record_us"], _ = measure(record, iterations)
+        main.capture = None
+        result["record_us_no_capture"], _ = measure(record, iterations)
+        # Counters stay low on a small fresh ring; what is left is CPython
+        # boxing ring offsets above 256, small ints to MicroPython
+        main.capture = Capture(64, 32)
+        main.capture_seq = main.log_skip = 0
+        result["record_alloc_bytes"] = peak_alloc(record, 200)
+        main.capture = cap
+    return result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", default="tasks", choices=("tasks", "core1", "timer", "drdy"),
+                        help="ACQ_MODE of the flight software")
+    parser.add_argument("--pad-s", type=float, default=6.0, help="time on the pad before launch")
+    parser.add_argument("--manual-s", type=float, default=2.0, help="when to ask for a burst over HTTP")
+    parser.add_argument("--seconds", type=float, default=10.0, help="how long to fly")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    r = run(args.mode, args.pad_s, args.manual_s, args.seconds, args.iterations)
+    if args.json:
+        emit_json(r)
+        return
+    print("HTTP POST /api/capture: %s; GET: %s\n" % (r["http_reply"], r["http_get_status"]))
+    fmt = lambda v, f: "-" if v is None else f % v
+    table([(b["file"], b["reason"], b["records"], fmt(b["before_s"], "%.2f"), fmt(b["after_s"], "%.2f"),
+            fmt(b["interval_ms"], "%.1f"), fmt(b["worst_gap_ms"], "%.1f"), fmt(b.get("trigger_delay_ms"), "%+.0f"))
+           for b in r["bursts"]],
+          ("burst", "trigger", "records", "before s", "after s", "interval ms", "worst gap ms", "vs launch ms"))
+    print("\nflight log: %.0f records/s on the pad, %.0f in flight; capture ring %d bytes, "
+          "%d samples dropped while bursts were written" % (
+              r["log_hz_pad"], r["log_hz_flight"], r["capture_bytes"], r["dropped_while_writing"]))
+    print("sensor record: %.2f us with the capture ring (%.0f B allocated), %.2f us without" % (
+        r["record_us"], r["record_alloc_bytes"], r["record_us_no_capture"]))
+
+
+if __name__ == "__main__":
+    main_cli()
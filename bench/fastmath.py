@@ -0,0 +1,214 @@
+"""
+Fast barometer maths benchmark.
+
+Sweeps the BMP280's whole range (300 to 1100 hPa, -40 to 85 °C) and
+compares fastmath.py with the code it replaces:
+
+  * ``HeightTable`` against the barometric formula, in double precision
+    and, when NumPy is installed, in the single precision the Pico uses,
+  * ``Compensator`` against the driver's integer compensation, on ADC
+    values from the simulated sensor,
+
+then times every kernel, counts the integer intermediates each
+compensation makes beyond MicroPython's small-int range (each one a heap
+allocated long int on the Pico), and times one whole barometer reading
+into the altitude filter as main.py runs it, with and without FAST_MATH:
+
+    python -m bench.fastmath
+    python -m bench.fastmath --shift 7 --json
+"""
+
+import argparse
+
+from sim import board
+
+from bench.harness import emit_json, measure, quiet, table
+import hal
+from altitude import standard_height
+from bmp280 import BMP280
+from fastmath import HeightTable, Compensator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SMALL_INT = 1 << 30  # MicroPython small ints are 31-bit signed
+
+
+class Tracked(int):
+    """An int that counts the results of its arithmetic too big for a small int."""
+    big = 0
+
+    def _wrap(self, value):
+        if isinstance(value, int):
+            if not -SMALL_INT <= value < SMALL_INT:
+                Tracked.big += 1
+            return Tracked(value)
+        return value
+
+    def __add__(self, o): return self._wrap(int(self) + o)
+    def __radd__(self, o): return self._wrap(o + int(self))
+    def __sub__(self, o): return self._wrap(int(self) - o)
+    def __rsub__(self, o): return self._wrap(o - int(self))
+    def __mul__(self, o): return self._wrap(int(self) * o)
+    def __rmul__(self, o): return self._wrap(o * int(self))
+    def __floordiv__(self, o): return self._wrap(int(self) // o)
+    def __rfloordiv__(self, o): return self._wrap(o // int(self))
+    def __lshift__(self, o): return self._wrap(int(self) << o)
+    def __rlshift__(self, o): return self._wrap(o << int(self))
+    def __rshift__(self, o): return self._wrap(int(self) >> o)
+    def __rrshift__(self, o): return self._wrap(o >> int(self))
+
+
+def big_ints(func, obj, names, adc_T, adc_P):
+    """Long ints one call of ``func(adc_T, adc_P)`` makes, with obj's ``names`` tracked."""
+    saved = {name: getattr(obj, name) for name in names}
+    for name, value in saved.items():
+        setattr(obj, name, Tracked(value))
+    Tracked.big = 0
+    try:
+        func(Tracked(adc_T), Tracked(adc_P))
+    finally:
+        for name, value in saved.items():
+            setattr(obj, name, value)
+    return Tracked.big
+
+
+def sensor():
+    b = board.reset()
+    bmp = BMP280(hal.I2C(0, sda=hal.Pin(0), scl=hal.Pin(1), freq=400000))
+    return bmp, b.i2c[0].devices[0x76]
+
+
+def height_errors(shift, step_pa):
+    """Worst table error (m) and where, in double and in float32 arithmetic."""
+    table_ = HeightTable(shift=shift)
+    worst = {"double": (0.0, 0), "float32": None}
+    pressures = range(30000, 110001, step_pa)
+    for p in pressures:
+        e = abs(table_(p) - standard_height(p))
+        if e > worst["double"][0]:
+            worst["double"] = (e, p)
+    if np is not None:
+        f32 = np.float32
+        table_.low, table_.scale = f32(table_.low), f32(table_.scale)
+        exact = lambda p: f32(44330) * (f32(1) - (p / f32(101325)) ** f32(0.1903))
+        worst["float32"] = (0.0, 0)
+        worst["formula_float32"] = (0.0, 0)
+        for p in pressures:
+            ref = standard_height(p)
+            e = abs(float(table_(f32(p))) - ref)
+            if e > worst["float32"][0]:
+                worst["float32"] = (e, p)
+            e = abs(float(exact(f32(p))) - ref)
+            if e > worst["formula_float32"][0]:
+                worst["formula_float32"] = (e, p)
+    return {k: None if v is None else {"max_m": v[0], "at_pa": v[1]} for k, v in worst.items()}, len(table_.table)
+
+
+def compensation_errors(bmp, model, step_pa):
+    """Worst |float - integer| compensation difference over the range, in double and float32."""
+    fast = Compensator(bmp.calibration)
+    f32 = None
+    if np is not None:
+        f32 = Compensator(bmp.calibration)
+        for name, value in vars(f32).items():
+            if isinstance(value, float):
+                setattr(f32, name, np.float32(value))
+    worst = {"double_pa": 0.0, "double_c": 0.0, "float32_pa": None, "float32_c": None}
+    if f32 is not None:
+        worst["float32_pa"] = worst["float32_c"] = 0.0
+    for temperature in (-40, -10, 0, 25, 60, 85):
+        for pressure in range(30000, 110001, step_pa):
+            adc_T, adc_P = model.raw_for(temperature, pressure)
+            t_ref, p_ref = bmp.compensate(adc_T, adc_P)
+            t, p = fast.compensate(adc_T, adc_P)
+            worst["double_pa"] = max(worst["double_pa"], abs(p - p_ref))
+            worst["double_c"] = max(worst["double_c"], abs(t - t_ref))
+            if f32 is not None:
+                t, p = f32.compensate(adc_T, adc_P)
+                worst["float32_pa"] = max(worst["float32_pa"], abs(float(p) - p_ref))
+                worst["float32_c"] = max(worst["float32_c"], abs(float(t) - t_ref))
+    return worst
+
+
+def reading_cost(fast, iterations):
+    """One barometer reading as main.py's update_baro takes it: convert, filter, telemetry."""
+    board.reset()
+    import main
+    main.FAST_MATH = fast
+    main.baro_height = HeightTable() if fast else standard_height
+    main.alt.height = main.baro_height
+    main.alt.ground = 101000.0
+    with quiet():
+        main.init_i2c()
+        main.init_bmp280()
+    raw = bytearray(main.bmp.read_raw())
+
+    def reading():
+        main.convert_baro(raw)
+        main.alt.baro(main.baro[1])
+        main.store_baro()
+    return measure(reading, iterations)
+
+
+def run(shift, iterations):
+    bmp, model = sensor()
+    heights, entries = height_errors(shift, 7)
+    result = {"shift": shift, "table_entries": entries, "table_bytes": entries * 4,
+              "height": heights, "compensation": compensation_errors(bmp, model, 250)}
+
+    adc_T, adc_P = model.raw_for(25, 95000)
+    fast = Compensator(bmp.calibration)
+    table_ = HeightTable(shift=shift)
+    kernels = {"height_formula": lambda: standard_height(95000.0),
+               "height_table": lambda: table_(95000.0),
+               "compensate_integer": lambda: bmp.compensate(adc_T, adc_P),
+               "compensate_float": lambda: fast.compensate(adc_T, adc_P)}
+    result["us"], result["alloc_bytes"] = {}, {}
+    for name, func in kernels.items():
+        result["us"][name], result["alloc_bytes"][name] = measure(func, iterations)
+    result["long_ints"] = {
+        "compensate_integer": big_ints(bmp.compensate, bmp, [n for n in vars(bmp) if n.startswith("dig_")],
+                                       adc_T, adc_P),
+        "compensate_float": big_ints(fast.compensate, fast, ("t1", "p4"), adc_T, adc_P)}
+    result["reading_us"] = {"exact": reading_cost(False, iterations)[0], "fast": reading_cost(True, iterations)[0]}
+    return result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--shift", type=int, default=8, help="table spacing is 2**shift Pa")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    r = run(args.shift, args.iterations)
+    if args.json:
+        emit_json(r)
+        return
+    h, c = r["height"], r["compensation"]
+    fmt = lambda e: "-" if e is None else "%.4f m at %.0f hPa" % (e["max_m"], e["at_pa"] / 100)
+    print("height table: %d entries, %d bytes, one every %d Pa" % (
+        r["table_entries"], r["table_bytes"], 1 << r["shift"]))
+    table([("table, double", fmt(h["double"])), ("table, float32", fmt(h["float32"])),
+           ("formula, float32", fmt(h.get("formula_float32")))],
+          ("height vs formula in double", "worst error"))
+    print()
+    f32 = lambda v, f: "-" if v is None else f % v
+    table([("double", "%.3f" % c["double_pa"], "%.4f" % c["double_c"]),
+           ("float32", f32(c["float32_pa"], "%.3f"), f32(c["float32_c"], "%.4f"))],
+          ("float vs integer compensation", "worst Pa", "worst °C"))
+    if np is None:
+        print("(numpy not installed: skipped the float32 emulation)")
+    print()
+    table([(name, "%.3f" % r["us"][name], "%.0f" % r["alloc_bytes"][name], r["long_ints"].get(name, "-"))
+           for name in r["us"]],
+          ("kernel", "us", "alloc B", "long ints"))
+    print("\none barometer reading into the filter and telemetry: %.2f us exact, %.2f us with FAST_MATH" % (
+        r["reading_us"]["exact"], r["reading_us"]["fast"]))
+    print("(timed on this machine under CPython; on the Pico ** is a software powf and every long int a heap block)")
+
+
+if __name__ == "__main__":
+    main_cli()
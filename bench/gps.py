@@ -0,0 +1,127 @@
+"""
+GPS configuration and parsing benchmark.
+
+Runs the boot-time UBX handshake (``ublox.configure``) against simulated
+receivers: a u-blox M8 from power-up and after a Pico reset (already at the
+fast baud rate), a NEO-6M (5 Hz, no NAV-PVT) and an NMEA-only clone that
+must fall back to 9600 baud.  For each it reports the boot time and what was
+negotiated, then streams a few seconds and checks fixes actually arrive.
+Finally the parser is timed on a recorded NMEA and NAV-PVT stream:
+
+    python -m bench.gps
+    python -m bench.gps --seconds 2 --json
+"""
+
+import argparse
+import time
+
+from sim import board
+
+from bench.harness import emit_json, measure, quiet, table
+import hal
+import ublox
+from micropython_tinygpsplus import TinyGPSPlus
+
+RECEIVERS = (
+    ("u-blox M8", {}, True),
+    ("u-blox M8 warm", {"baudrate": 115200}, True),
+    ("NEO-6M", {"max_rate_hz": 5, "nav_pvt": False}, True),
+    ("NMEA clone", {"ubx": False}, False),
+)
+
+
+def handshake(name, receiver, nav_pvt, baudrate, rate_hz, seconds):
+    b = board.reset()
+    gps = b.uart[1]
+    gps.fix_after = 0
+    for key, value in receiver.items():
+        setattr(gps, "has_nav_pvt" if key == "nav_pvt" else key, value)
+    uart = hal.UART(1, baudrate=ublox.DEFAULT_BAUD, rxbuf=2048)
+    t0 = time.monotonic()
+    baud, rate, pvt = ublox.configure(uart, baudrate, rate_hz, nav_pvt)
+    boot_s = time.monotonic() - t0
+
+    parser = TinyGPSPlus()
+    buf = bytearray(128)
+    fixes = 0
+    epoch = None
+    first = None
+    t_end = time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        time.sleep(0.05)
+        while uart.any():
+            parser.feed(buf, uart.readinto(buf))
+            # GGA and RMC both carry the position: count navigation epochs
+            if parser.location.updated and (parser.time.second, parser.time.centisecond) != epoch:
+                epoch = (parser.time.second, parser.time.centisecond)
+                fixes += 1
+                if first is None:
+                    first = time.monotonic()
+            parser.location.updated = False
+    return {"receiver": name, "boot_s": boot_s, "baud": baud or ublox.DEFAULT_BAUD, "rate_hz": rate,
+            "nav_pvt": pvt, "fixes_per_s": (fixes - 1) / (t_end - first) if fixes > 1 else 0.0, "line_bytes_per_s": gps.bytes_sent / b.now(),
+            "acks": gps.acks, "naks": gps.naks, "overruns": uart.overruns,
+            "failed_checksum": parser.failed_checksum}
+
+
+def recorded(nav_pvt, epochs):
+    b = board.reset()
+    gps = b.uart[1]
+    gps.sentences = [] if nav_pvt else ["GGA", "RMC"]
+    gps.nav_pvt = nav_pvt
+    return b"".join(gps.epoch_sentences(12.0 + i * 0.1) for i in range(epochs))
+
+
+def throughput(iterations):
+    rows = []
+    for label, nav_pvt in (("NMEA GGA+RMC", False), ("UBX NAV-PVT", True)):
+        data = recorded(nav_pvt, 10)
+        parser = TinyGPSPlus()
+        us, alloc = measure(lambda: parser.feed(data), iterations)
+        epoch = len(data) / 10
+        rows.append({"stream": label, "bytes_per_epoch": epoch, "us_per_epoch": us / 10,
+                     "alloc_bytes_per_epoch": alloc / 10, "mb_per_s": len(data) / us,
+                     "cpu_at_10hz": us / 10 * 10 / 1e6})
+    return rows
+
+
+def run(seconds, baudrate, rate_hz, iterations):
+    result = {"handshake": [], "parse": throughput(iterations)}
+    with quiet():
+        for name, receiver, nav_pvt in RECEIVERS:
+            result["handshake"].append(handshake(name, receiver, nav_pvt, baudrate, rate_hz, seconds))
+            if nav_pvt:
+                result["handshake"].append(handshake(name + " nmea", receiver, False, baudrate, rate_hz, seconds))
+    return result
+
+
+def report(result):
+    table([(h["receiver"], "%.2f" % h["boot_s"], h["baud"], h["rate_hz"], "yes" if h["nav_pvt"] else "no",
+            "%.1f" % h["fixes_per_s"], "%.0f" % h["line_bytes_per_s"], "%d/%d" % (h["acks"], h["naks"]),
+            h["overruns"], h["failed_checksum"])
+           for h in result["handshake"]],
+          ("receiver", "boot s", "baud", "Hz", "NAV-PVT", "fixes/s", "line B/s", "ack/nak", "overruns", "bad"))
+    print()
+    table([(p["stream"], "%.0f" % p["bytes_per_epoch"], "%.1f" % p["us_per_epoch"],
+            "%.0f" % p["alloc_bytes_per_epoch"], "%.2f" % p["mb_per_s"], "%.2f%%" % (p["cpu_at_10hz"] * 100))
+           for p in result["parse"]],
+          ("stream", "B/epoch", "us/epoch", "alloc B/epoch", "MB/s", "CPU at 10 Hz"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="how long to stream after each handshake")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--rate", type=int, default=10, help="navigation rate to ask for (Hz)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+    result = run(args.seconds, args.baud, args.rate, args.iterations)
+    if args.json:
+        emit_json(result)
+    else:
+        report(result)
+
+
+if __name__ == "__main__":
+    main()
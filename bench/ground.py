@@ -0,0 +1,125 @@
+"""
+Ground station ingest benchmark.
+
+Starts ``ground.emulator`` in a process of its own with dozens of cans
+streaming over localhost TCP, points ``ground.station`` at all of them with
+a fresh SQLite database, and reports the ingest rate against the offered
+rate, how long rows wait from arrival to commit (average, 99th
+percentile, worst), the transactions it took, the can-to-station latency
+estimate, dropped frames and reconnects.  ``--disconnect-s`` makes the
+emulated cans drop their streams at random to exercise the backoff:
+
+    python -m bench.ground
+    python -m bench.ground --cans 100 --hz 50 --seconds 10
+    python -m bench.ground --cans 24 --disconnect-s 2 --json
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+
+from bench.harness import emit_json, table
+
+
+def emulate(cans, hz, base_port, disconnect_s, ready):
+    from ground import emulator
+    try:
+        asyncio.run(emulator.run(cans, hz, base_port, disconnect_s=disconnect_s, ready=ready))
+    except KeyboardInterrupt:
+        pass
+
+
+def run(cans, hz, seconds, base_port, disconnect_s, batch, flush_ms):
+    from ground.station import Link, Station
+    from ground.store import Store
+
+    ready = multiprocessing.Event()
+    proc = multiprocessing.Process(target=emulate, args=(cans, hz, base_port, disconnect_s, ready), daemon=True)
+    proc.start()
+    if not ready.wait(30):
+        proc.terminate()
+        raise RuntimeError("emulator did not start")
+    db = os.path.join(tempfile.mkdtemp(prefix="cansat_ground_"), "ground.sqlite")
+    store = Store(db, batch, flush_ms)
+    links = [Link("can%d" % i, "127.0.0.1", base_port + i, backoff_s=0.1, backoff_max_s=2.0)
+             for i in range(cans)]
+    station = Station(store, links)
+
+    async def go():
+        tasks = await station.start(port=0)
+        await asyncio.sleep(1.0)  # connect and warm up
+        await store.flush()
+        rows0, commits0 = store.rows, store.commits
+        store.commit_latency.mark()
+        for link in links:
+            link.tracker.window()
+        start = asyncio.get_running_loop().time()
+        await asyncio.sleep(seconds)
+        await store.flush()
+        elapsed = asyncio.get_running_loop().time() - start
+        runs, avg, p99, worst = store.commit_latency.window()
+        connected = sum(1 for link in links if link.connected)
+        windows = [link.tracker.window() for link in links]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return {"rows": store.rows - rows0, "commits": store.commits - commits0, "elapsed": elapsed,
+                "commit_latency_us": {"avg": avg, "p99": p99, "max": worst}, "windows": windows,
+                "connected": connected}
+
+    try:
+        result = asyncio.run(go())
+    finally:
+        proc.terminate()
+        proc.join()
+        store.close()
+    stored = sqlite3.connect(db).execute("SELECT count(*), count(DISTINCT can) FROM samples").fetchone()
+    windows = [w for w in result.pop("windows") if w]
+    result.update(
+        cans=cans, hz=hz, seconds=seconds, offered_rows_per_s=cans * hz,
+        rows_per_s=result["rows"] / result["elapsed"],
+        rows_per_commit=result["rows"] / max(1, result["commits"]),
+        stored_rows=stored[0], stored_cans=stored[1],
+        latency_p50_ms=max((w["p50"] for w in windows), default=0),
+        latency_p99_ms=max((w["p99"] for w in windows), default=0),
+        latency_max_ms=max((w["max"] for w in windows), default=0),
+        frames=sum(l.frames for l in links), dropped=sum(l.dropped for l in links),
+        connects=sum(l.connects for l in links), failures=sum(l.failures for l in links))
+    return result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cans", type=int, default=48)
+    parser.add_argument("--hz", type=float, default=10.0, help="frames per second of each can")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--base-port", type=int, default=19000)
+    parser.add_argument("--disconnect-s", type=float, default=0, help="mean stream lifetime (0 = forever)")
+    parser.add_argument("--batch", type=int, default=1000, help="rows per transaction at most")
+    parser.add_argument("--flush-ms", type=int, default=250, help="commit queued rows at least this often")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    r = run(args.cans, args.hz, args.seconds, args.base_port, args.disconnect_s, args.batch, args.flush_ms)
+    if args.json:
+        emit_json(r)
+        return
+    c = r["commit_latency_us"]
+    table([("offered", "%.0f rows/s" % r["offered_rows_per_s"]),
+           ("ingested", "%.0f rows/s" % r["rows_per_s"]),
+           ("transactions", "%d (%.0f rows each)" % (r["commits"], r["rows_per_commit"])),
+           ("arrival to commit", "avg %.1f ms, p99 %s, max %.1f ms" % (
+               c["avg"] / 1000, "%.1f ms" % (c["p99"] / 1000) if c["p99"] >= 0 else "long", c["max"] / 1000)),
+           ("can to station", "worst can: p50 %.1f ms, p99 %.1f ms, max %.1f ms" % (
+               r["latency_p50_ms"], r["latency_p99_ms"], r["latency_max_ms"])),
+           ("frames", "%d received, %d dropped" % (r["frames"], r["dropped"])),
+           ("links", "%d of %d up; %d connects, %d failures" % (
+               r["connected"], r["cans"], r["connects"], r["failures"])),
+           ("database", "%d rows from %d cans" % (r["stored_rows"], r["stored_cans"]))],
+          ("%d cans at %g Hz, %g s" % (r["cans"], r["hz"], r["seconds"]), ""))
+
+
+if __name__ == "__main__":
+    main_cli()
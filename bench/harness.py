@@ -0,0 +1,59 @@
+"""Timing and allocation helpers shared by the benchmarks."""
+
+import contextlib
+import io
+import json
+import sys
+import time
+import tracemalloc
+
+
+def measure(func, iterations, warmup=10):
+    """Return (microseconds per call, peak transient bytes per call).
+
+    The allocation figure is the tracemalloc peak above the starting point
+    for a single call, averaged over a short second pass so the timing pass
+    runs without tracing overhead.
+    """
+    for _ in range(warmup):
+        func()
+    t0 = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    us = (time.perf_counter_ns() - t0) / 1000 / iterations
+    return us, peak_alloc(func, min(iterations, 200))
+
+
+def peak_alloc(func, iterations):
+    tracemalloc.start()
+    total = 0
+    try:
+        for _ in range(iterations):
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func()
+            total += tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return total / iterations
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the firmware's console prints while benchmarking."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def table(rows, headers):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    line = "  ".join(str(h).ljust(w) for h, w in zip(headers, widths))
+    print(line)
+    print("-" * len(line))
+    for r in rows:
+        print("  ".join(str(c).rjust(w) if i else str(c).ljust(w) for i, (c, w) in enumerate(zip(r, widths))))
+
+
+def emit_json(result):
+    json.dump(result, sys.stdout, indent=2)
+    print()
@@ -0,0 +1,116 @@
+"""
+MPU6050 acquisition benchmark.
+
+Compares the original two-transaction read (0x3B and 0x43 as separate
+6-byte reads), the single 14-byte burst read, and FIFO batch draining at
+1 kHz.  Per IMU sample it reports CPU time, I2C transactions, estimated
+400 kHz bus time and allocations:
+
+    python -m bench.imu
+"""
+
+import argparse
+import time
+
+import hal
+from sim import board
+
+from bench.harness import emit_json, measure, table
+from mpu6050 import MPU6050, values
+
+MPU_ADDR = 0x68
+
+
+def legacy_read(i2c):
+    # read_mpu6050() as it was before the driver existed
+    accel_data = i2c.readfrom_mem(MPU_ADDR, 0x3B, 6)
+    gyro_data = i2c.readfrom_mem(MPU_ADDR, 0x43, 6)
+
+    def convert(high, low):
+        value = (high << 8) | low
+        return value - 65536 if value > 32767 else value
+
+    ax = convert(accel_data[0], accel_data[1]) / 16384.0
+    ay = convert(accel_data[2], accel_data[3]) / 16384.0
+    az = convert(accel_data[4], accel_data[5]) / 16384.0
+    gx = convert(gyro_data[0], gyro_data[1]) / 131.0
+    gy = convert(gyro_data[2], gyro_data[3]) / 131.0
+    gz = convert(gyro_data[4], gyro_data[5]) / 131.0
+    return ax, ay, az, gx, gy, gz
+
+
+def polled(name, i2c, func, iterations):
+    bus = i2c.bus
+    tx0, bits0 = bus.transactions, bus.bits
+    us, alloc = measure(func, iterations)
+    calls = iterations + 10 + min(iterations, 200)
+    bus_us = (bus.bits - bits0) * 1e6 / i2c.freq / calls
+    return {"mode": name, "samples": calls, "us": us, "alloc_bytes": alloc,
+            "i2c_transactions": (bus.transactions - tx0) / calls,
+            "i2c_bus_us": bus_us, "max_rate_hz": 1e6 / bus_us}
+
+
+def fifo(i2c, mpu, rate_hz, seconds, drain_ms):
+    bus = i2c.bus
+    out = values()
+    mpu.start_fifo(rate_hz)
+    label = "fifo %d Hz" % mpu.fifo_rate
+    tx0, bits0 = bus.transactions, bus.bits
+    samples = 0
+    cpu = 0
+    t_end = time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        time.sleep(drain_ms / 1000)
+        t0 = time.perf_counter_ns()
+        while True:
+            n = mpu.drain()
+            for i in range(n):
+                mpu.fifo_sample(i, out)
+            samples += n
+            if n < mpu.batch:
+                break
+        cpu += time.perf_counter_ns() - t0
+    mpu.stop_fifo()
+    bus_us = (bus.bits - bits0) * 1e6 / i2c.freq / max(1, samples)
+    return {"mode": label, "samples": samples,
+            "us": cpu / 1000 / max(1, samples), "alloc_bytes": None,
+            "i2c_transactions": (bus.transactions - tx0) / max(1, samples),
+            "i2c_bus_us": bus_us, "max_rate_hz": 1e6 / bus_us,
+            "delivered_hz": samples / seconds, "overflows": mpu.fifo_overflows}
+
+
+def run(iterations, rate_hz, seconds, drain_ms):
+    board.reset()
+    i2c = hal.I2C(0, sda=hal.Pin(0), scl=hal.Pin(1), freq=400000)
+    mpu = MPU6050(i2c)
+    out = values()
+    return [
+        polled("legacy 2x6 bytes", i2c, lambda: legacy_read(i2c), iterations),
+        polled("burst 14 bytes", i2c, lambda: mpu.read(out), iterations),
+        fifo(i2c, mpu, rate_hz, seconds, drain_ms),
+    ]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rate", type=int, default=1000, help="FIFO sample rate in Hz")
+    parser.add_argument("--seconds", type=float, default=2.0, help="length of the FIFO run")
+    parser.add_argument("--drain-ms", type=float, default=40.0, help="main-loop period while in FIFO mode")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    results = run(args.iterations, args.rate, args.seconds, args.drain_ms)
+    if args.json:
+        emit_json(results)
+        return
+    rows = [(r["mode"], "%.2f" % r["us"],
+             "-" if r["alloc_bytes"] is None else "%.0f" % r["alloc_bytes"], "%.3f" % r["i2c_transactions"],
+             "%.0f" % r["i2c_bus_us"], "%.0f" % r["max_rate_hz"]) for r in results]
+    table(rows, ("mode", "us/sample", "alloc B", "i2c txn", "bus us", "bus-limited Hz"))
+    f = results[-1]
+    print("\nFIFO: %d samples in %.1f s (%.0f Hz delivered), %d overflows" % (
+        f["samples"], args.seconds, f["delivered_hz"], f["overflows"]))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,187 @@
+"""
+End-to-end telemetry latency benchmark.
+
+Runs the flight tasks against the simulated board with live-stream
+subscribers (some reading slowly) and measures, for every frame a
+subscriber receives, how old its newest reading is.  The simulated can and
+the subscribers share one clock, so the true age is known; it is set
+against the estimate ``tools.latency`` and the dashboard make without a
+shared clock, from round trips to /api/latency (``--sync-s`` apart, 0 for
+none: the fallback that is low by the fastest delivery seen).  Also reports the age at rendering the server measured
+(/metrics ``cansat_telemetry_age_seconds``) and checks a dashboard's
+/api/latency report reaches the console report.  Fails if a frame whose
+latency is smaller than the clock offset's error is estimated as a wrapped
+tick period instead of about nothing:
+
+    python -m bench.latency
+    python -m bench.latency --streams 6 --slow-streams 2 --stream-hz 20 --json
+    python -m bench.latency --sync-s 0
+"""
+
+import argparse
+import json
+import time
+
+from hal import asyncio
+from sim import board, socket
+
+from bench.harness import emit_json, quiet, table
+from bench.loop import STREAM_REQUEST
+from tools.latency import TICKS_PERIOD, Tracker
+
+LATENCY_REQUEST = b"GET /api/latency?frames=10&dropped=1&p50=12.5&p95=20&p99=30&max=31.5 HTTP/1.1\r\n\r\n"
+CLOCK_REQUEST = b"GET /api/latency HTTP/1.1\r\n\r\n"
+
+
+class Subscriber:
+    """One /api/stream client: the estimated latency in ``tracker``, the true one in ``true_us``."""
+
+    def __init__(self, slow):
+        self.slow = slow
+        self.tracker = Tracker()
+        self.true_us = []
+        self.dropped = 0
+
+    async def run(self, port):
+        c = socket.connect(port, STREAM_REQUEST, rcvbuf=512 if self.slow else None)
+        pending = b""
+        try:
+            while True:
+                try:
+                    data = c.recv(512 if self.slow else 65536)
+                except OSError:
+                    data = b""
+                arrival = time.monotonic_ns() // 1000
+                now = time.ticks_us()
+                pending += data
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    if line.startswith(b"data: "):
+                        frame = json.loads(line[6:])
+                        self.tracker.add(frame, arrival)
+                        self.true_us.append(time.ticks_diff(now, frame["ticks"]))
+                await asyncio.sleep_ms(1000 if self.slow else 2)
+        finally:
+            c.close()
+
+    async def sync(self, port, every_s):
+        """Round trips to /api/latency, as tools.latency makes them."""
+        while True:
+            c = socket.connect(port, None)
+            sent = time.monotonic_ns() // 1000
+            c.send(CLOCK_REQUEST)
+            data = b""
+            answered = None
+            try:
+                while True:
+                    try:
+                        more = c.recv(512)
+                    except OSError:
+                        await asyncio.sleep_ms(1)
+                        continue
+                    if not more:
+                        break
+                    if answered is None:
+                        answered = time.monotonic_ns() // 1000
+                    data += more
+            finally:
+                c.close()
+            self.tracker.sync(sent, json.loads(data.partition(b"\r\n\r\n")[2])["ticks"], answered)
+            await asyncio.sleep(every_s)
+
+
+def offset_error_ms():
+    """Estimate for a frame 0.2 ms old when the clock offset is 0.5 ms too large, near a ticks wrap."""
+    tracker = Tracker()
+    can = 987654321  # local us - the can's ticks_us
+    tracker.sync(5000000, (5000500 - can - 500) % TICKS_PERIOD, 5001000)
+    ticks = (6000000 - 200 - can) % TICKS_PERIOD
+    tracker.add({"frame": 1, "ticks": ticks, "sent": (ticks + 100) % TICKS_PERIOD}, 6000000)
+    return tracker.window()["max"]
+
+
+def percentiles(us):
+    s = sorted(us) or [0]
+    return {p: s[min(len(s) - 1, len(s) * p // 100)] / 1000 for p in (50, 95, 99, 100)}
+
+
+def run(seconds, streams, slow_streams, stream_hz, sync_s):
+    board.reset()
+    import main
+    main.PHASE_RATES = False  # flight rates, not the pad's
+    main.SCHED_REPORT_S = 0
+    main.STREAM_HZ = stream_hz
+    with quiet():
+        main.setup()
+
+    subscribers = [Subscriber(i < slow_streams) for i in range(streams)]
+
+    async def go():
+        tasks = await main.start()
+        for s in subscribers:
+            tasks.append(asyncio.create_task(s.run(main.HTTP_PORT)))
+            if sync_s:
+                tasks.append(asyncio.create_task(s.sync(main.HTTP_PORT, sync_s)))
+            await asyncio.sleep_ms(20)
+        await asyncio.sleep(seconds)
+        socket.connect(main.HTTP_PORT, LATENCY_REQUEST)
+        await asyncio.sleep(0.2)
+        main.server.close()
+        for t in tasks:
+            t.cancel()
+
+    with quiet():
+        asyncio.run(go())
+    age = main.telemetry_age
+    runs, avg, p99, worst = age.window()
+    result = {"seconds": seconds, "stream_hz": stream_hz, "sync_s": sync_s, "frames_published": main.stream_frames,
+              "render_age_us": {"runs": runs, "avg": avg, "p99": p99, "max": worst},
+              "latency_report": main.latency_report(), "offset_error_ms": offset_error_ms(), "subscribers": []}
+    for s in subscribers:
+        w = s.tracker.window() or {"frames": 0, "dropped": 0, "p50": 0, "p95": 0, "p99": 0, "max": 0, "rtt": None}
+        true = percentiles(s.true_us)
+        result["subscribers"].append({"slow": s.slow, "estimated": w,
+                                      "true": {"p50": true[50], "p95": true[95], "p99": true[99],
+                                               "max": true[100]}})
+    return result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--streams", type=int, default=4, help="open /api/stream subscribers")
+    parser.add_argument("--slow-streams", type=int, default=1,
+                        help="how many of the subscribers read only 512 bytes a second")
+    parser.add_argument("--stream-hz", type=int, default=10, help="STREAM_HZ of the flight software")
+    parser.add_argument("--sync-s", type=float, default=1.0,
+                        help="seconds between a subscriber's clock round trips (0 = none)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    r = run(args.seconds, args.streams, args.slow_streams, args.stream_hz, args.sync_s)
+    if args.json:
+        emit_json(r)
+    else:
+        report(r)
+    if not 0 <= r["offset_error_ms"] < 1:
+        raise SystemExit("a frame newer than the clock offset's error was estimated at %.1f ms" % r["offset_error_ms"])
+
+
+def report(r):
+    rows = []
+    for i, s in enumerate(r["subscribers"]):
+        e, t = s["estimated"], s["true"]
+        rows.append(("%d%s" % (i, " (slow)" if s["slow"] else ""), e["frames"], e["dropped"],
+                     "%.1f / %.1f" % (e["p50"], t["p50"]), "%.1f / %.1f" % (e["p99"], t["p99"]),
+                     "%.1f / %.1f" % (e["max"], t["max"]), "-" if e["rtt"] is None else "%.1f" % e["rtt"]))
+    table(rows, ("subscriber", "frames", "dropped", "p50 ms est/true", "p99 ms est/true", "max ms est/true",
+                 "sync rtt ms"))
+    a = r["render_age_us"]
+    print("\n%d frames published at %d Hz; reading to render: avg %.1f ms, p99 %s, max %.1f ms" % (
+        r["frames_published"], r["stream_hz"], a["avg"] / 1000,
+        "%.1f ms" % (a["p99"] / 1000) if a["p99"] >= 0 else "long", a["max"] / 1000))
+    print(r["latency_report"])
+    print("frame 0.2 ms old, clock offset 0.5 ms off: estimated %.1f ms" % r["offset_error_ms"])
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,58 @@
+"""
+Log record cost: the 14-field CSV f-string versus a packed binary record.
+
+Reports CPU time to build one record, allocations, and bytes per sample
+that have to go to the SD card:
+
+    python -m bench.logformat
+"""
+
+import argparse
+
+import binlog
+from bench.harness import emit_json, measure, quiet, table
+from sim import board
+
+
+def run(iterations):
+    board.reset()
+    import main
+    with quiet():
+        main.setup()
+        main.step()
+
+    buf = bytearray(binlog.RECORD_SIZE)
+    raw = main.mpu.buf
+    baro = main.bmp.buf
+
+    def csv():
+        main.format_log_line().encode()
+
+    def binary():
+        binlog.pack_sensor(buf, 0, 1, 123456, binlog.FLAG_BARO | binlog.FLAG_IMU, baro, raw)
+
+    results = {}
+    for name, func, size in (("csv", csv, len(main.format_log_line())),
+                             ("binary", binary, binlog.RECORD_SIZE)):
+        us, alloc = measure(func, iterations)
+        results[name] = {"us": us, "alloc_bytes": alloc, "bytes": size}
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    results = run(args.iterations)
+    if args.json:
+        emit_json(results)
+        return
+    table([(k, "%.2f" % v["us"], "%.0f" % v["alloc_bytes"], v["bytes"]) for k, v in results.items()],
+          ("format", "us/record", "alloc B", "bytes/sample"))
+    c, b = results["csv"], results["binary"]
+    print("\nbinary is %.1fx cheaper to build and %.1fx smaller" % (c["us"] / b["us"], c["bytes"] / b["bytes"]))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,257 @@
+"""
+Main-loop benchmark.
+
+Runs one pass of every sensor and logging stage (``main.step()``) back to
+back against the simulated board and reports passes per second, then runs
+the asyncio runtime (``main.start()``) twice, without and with dashboard
+clients, and reports each scheduled task's achieved rate, release lateness
+(average, 99th percentile, worst) and skipped periods.  Sensor cadence
+should not change with the number of people watching.  Finally every stage
+is timed on its own with its I2C traffic and allocations:
+
+    python -m bench.loop
+    python -m bench.loop --seconds 5 --clients-per-s 3 --slow-clients 2 --json
+    python -m bench.loop --streams 6 --slow-streams 2
+"""
+
+import argparse
+import time
+
+from hal import asyncio
+from sim import board, socket
+
+from bench.harness import emit_json, measure, quiet, table
+
+TASKS = ("gps", "baro", "imu", "log", "stream")
+
+
+TELEMETRY_REQUEST = b"GET /api/telemetry HTTP/1.1\r\nHost: 192.168.4.1\r\n\r\n"
+STREAM_REQUEST = b"GET /api/stream HTTP/1.1\r\nHost: 192.168.4.1\r\nAccept: text/event-stream\r\n\r\n"
+
+
+class Clients:
+    """Dashboard browsers: some poll telemetry at a fixed rate, some load the page
+    very slowly, some hold a live stream open (a few of those reading slowly)."""
+
+    def __init__(self, port, per_s, slow, streams=0, slow_streams=0, slow_rcvbuf=512, slow_read_ms=200):
+        self.port = port
+        self.period = 1.0 / per_s if per_s else None
+        self.slow = slow
+        self.streams = streams
+        self.slow_streams = slow_streams
+        self.slow_rcvbuf = slow_rcvbuf
+        self.slow_read_ms = slow_read_ms
+        self.served = 0
+        self.refused = 0
+        self.bytes = 0
+        self.frames = 0
+        self.slow_frames = 0
+
+    async def run(self):
+        tasks = [asyncio.create_task(self.slow_client()) for _ in range(self.slow)]
+        for i in range(self.streams):
+            # Stagger the connections so they fit in the listen backlog
+            tasks.append(asyncio.create_task(self.stream(i < self.slow_streams)))
+            await asyncio.sleep_ms(20)
+        try:
+            while self.period is not None:
+                self.connect_fast()
+                await asyncio.sleep(self.period)
+            await asyncio.sleep(3600)
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    def connect_fast(self):
+        try:
+            c = socket.connect(self.port, TELEMETRY_REQUEST)
+        except OSError:
+            self.refused += 1
+            return
+        asyncio.create_task(self.read(c, 65536, 1))
+
+    async def slow_client(self):
+        # Keeps coming back, never reading more than rcvbuf per interval
+        while True:
+            try:
+                c = socket.connect(self.port, rcvbuf=self.slow_rcvbuf)
+            except OSError:
+                self.refused += 1
+                await asyncio.sleep_ms(self.slow_read_ms)
+                continue
+            await self.read(c, self.slow_rcvbuf, self.slow_read_ms)
+
+    async def stream(self, slow):
+        try:
+            c = socket.connect(self.port, STREAM_REQUEST, rcvbuf=self.slow_rcvbuf if slow else None)
+        except OSError:
+            self.refused += 1
+            return
+        try:
+            while True:
+                try:
+                    data = c.recv(self.slow_rcvbuf if slow else 65536)
+                except OSError:
+                    data = b""
+                if data:
+                    n = data.count(b"data: ")
+                    if slow:
+                        self.slow_frames += n
+                    else:
+                        self.frames += n
+                await asyncio.sleep_ms(1000 if slow else 5)
+        finally:
+            c.close()
+
+    async def read(self, c, size, interval_ms):
+        while True:
+            try:
+                data = c.recv(size)
+            except OSError:
+                await asyncio.sleep_ms(interval_ms)
+                continue
+            if not data:
+                break
+            self.bytes += len(data)
+        c.close()
+        self.served += 1
+
+
+def runtime(main, seconds, clients):
+    """Run the flight tasks for ``seconds``; return scheduler stats and HTTP counts."""
+
+    async def go():
+        samples = main.imu_samples
+        tasks = await main.start()
+        load = asyncio.create_task(clients.run()) if clients else None
+        await asyncio.sleep(seconds)
+        stats = main.sched.stats()
+        stats["all"] = {"load": main.sched.load()}
+        if load:
+            load.cancel()
+        main.server.close()
+        for t in tasks:
+            t.cancel()
+        return stats, main.imu_samples - samples
+
+    with quiet():
+        stats, imu_samples = asyncio.run(go())
+    result = {"tasks": stats, "imu_samples_hz": imu_samples / seconds,
+              "http_served": main.http_served, "http_rejected": main.http_rejected,
+              "http_errors": main.http_errors, "stream_frames": main.stream_frames,
+              "stream_skipped": main.stream_skipped, "stream_dropped": main.stream_dropped}
+    if clients:
+        result.update(clients_served=clients.served, clients_refused=clients.refused, http_bytes=clients.bytes,
+                      frames_per_stream=clients.frames / max(1, clients.streams - clients.slow_streams),
+                      frames_per_slow_stream=clients.slow_frames / max(1, clients.slow_streams))
+    return result
+
+
+def stages(main):
+    return [
+        ("gps", main.read_gps),
+        ("bmp280", main.read_bmp280),
+        ("mpu6050", main.update_mpu6050),
+        ("log", lambda: main.log_to_sd(main.format_log_line())),
+        ("web", lambda: main.render_telemetry().encode()),
+    ]
+
+
+def run(seconds, clients_per_s, slow_clients, streams, slow_streams, stage_iterations):
+    board.reset()
+    import main
+    main.PHASE_RATES = False  # measure at the flight rates, not the pad's
+    with quiet():
+        main.setup()
+
+    bus = main.i2c.bus
+    iterations = 0
+    t_end = time.monotonic() + seconds
+    t0 = time.perf_counter()
+    with quiet():
+        while time.monotonic() < t_end:
+            main.step()
+            iterations += 1
+    elapsed = time.perf_counter() - t0
+
+    result = {
+        "iterations": iterations,
+        "loop_hz": iterations / elapsed,
+        "loop_us": elapsed * 1e6 / iterations,
+        "idle": runtime(main, seconds, None),
+        "loaded": runtime(main, seconds, Clients(main.HTTP_PORT, clients_per_s, slow_clients,
+                                                 streams, slow_streams)),
+        "stages": {},
+    }
+    with quiet():
+        for name, func in stages(main):
+            tx0, bits0 = bus.transactions, bus.bits
+            us, alloc = measure(func, stage_iterations)
+            calls = stage_iterations + 10 + min(stage_iterations, 200)
+            result["stages"][name] = {
+                "us": us,
+                "alloc_bytes": alloc,
+                "i2c_transactions": (bus.transactions - tx0) / calls,
+                "i2c_bus_us": (bus.bits - bits0) * 1e6 / main.i2c.freq / calls,
+            }
+    return result
+
+
+def late(p99_us):
+    return "%.1f" % (p99_us / 1000) if p99_us >= 0 else "long"
+
+
+def report(result):
+    print("sensor/log pass: %d iterations, %.0f it/s (%.1f us/it)" % (
+        result["iterations"], result["loop_hz"], result["loop_us"]))
+    loaded = result["loaded"]
+    print("dashboard under load: %d served, %d refused, %d bytes (server: %d rejected, %d errors)" % (
+        loaded["clients_served"], loaded["clients_refused"], loaded["http_bytes"],
+        loaded["http_rejected"], loaded["http_errors"]))
+    print("live stream: %d frames published, %.0f received per stream, %.0f per slow stream, "
+          "%d skipped, %d subscribers dropped" % (
+              loaded["stream_frames"], loaded["frames_per_stream"], loaded["frames_per_slow_stream"],
+              loaded["stream_skipped"], loaded["stream_dropped"]))
+    print()
+    rows = []
+    for name in TASKS:
+        idle, busy = result["idle"]["tasks"][name], loaded["tasks"][name]
+        rows.append((name, "%.0f" % (1000 / idle["period_ms"]), "%.1f" % idle["hz"], "%.1f" % busy["hz"],
+                     "%.2f" % (idle["late_avg_us"] / 1000), "%.2f" % (busy["late_avg_us"] / 1000),
+                     late(busy["late_p99_us"]), "%.1f" % (busy["late_max_us"] / 1000), busy["overruns"]))
+    table(rows, ("task", "Hz target", "Hz idle", "Hz clients", "late ms idle", "late ms clients",
+                 "p99 ms", "max ms", "overruns"))
+    print("IMU samples: %.1f/s idle, %.1f/s with clients; task load %.1f%% idle, %.1f%% with clients" % (
+        result["idle"]["imu_samples_hz"], loaded["imu_samples_hz"],
+        result["idle"]["tasks"]["all"]["load"] * 100, loaded["tasks"]["all"]["load"] * 100))
+    print()
+    rows = []
+    for name, s in result["stages"].items():
+        rows.append((name, "%.1f" % s["us"], "%.0f" % s["alloc_bytes"],
+                     "%.1f" % s["i2c_transactions"], "%.0f" % s["i2c_bus_us"]))
+    table(rows, ("stage", "us/call", "alloc B/call", "i2c txn", "i2c bus us"))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="length of each run")
+    parser.add_argument("--clients-per-s", type=float, default=1.0,
+                        help="telemetry requests per second (each open dashboard polls every 1 s)")
+    parser.add_argument("--slow-clients", type=int, default=2,
+                        help="clients that read 512 bytes every 200 ms, over and over")
+    parser.add_argument("--streams", type=int, default=4, help="open /api/stream subscribers")
+    parser.add_argument("--slow-streams", type=int, default=1,
+                        help="how many of the subscribers read only 512 bytes a second")
+    parser.add_argument("--stage-iterations", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+    result = run(args.seconds, args.clients_per_s, args.slow_clients, args.streams, args.slow_streams,
+                 args.stage_iterations)
+    if args.json:
+        emit_json(result)
+    else:
+        report(result)
+
+
+if __name__ == "__main__":
+    main_cli()
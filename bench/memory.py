@@ -0,0 +1,101 @@
+"""
+Heap allocation and garbage collection benchmark.
+
+Runs the flight tasks against the simulated board with the scheduler
+charging every run the heap it allocated (SCHED_ALLOC_STATS) and garbage
+collected by its own task (GC_PERIOD_MS), optionally with live-stream
+subscribers, and reports per task the bytes allocated per run, plus the
+collection pauses and how fast the heap grows between collections per IMU
+sample.  This is the same accounting the console report shows on the Pico.
+
+Under CPython the figures come from tracemalloc (sim.heap) and include
+CPython's own int objects and the simulated devices, which MicroPython
+does not allocate; an empty task run the same way gives that floor, and
+the "above floor" column is what is left:
+
+    python -m bench.memory
+    python -m bench.memory --mode timer --streams 2 --json
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from hal import asyncio
+from sim import board
+
+from bench.harness import emit_json, quiet, table
+from bench.loop import Clients
+
+
+def run(mode, seconds, streams):
+    board.reset()
+    import main
+    main.ACQ_MODE = mode
+    main.PHASE_RATES = False  # flight rates, not the pad's
+    main.SCHED_ALLOC_STATS = True
+    main.SCHED_REPORT_S = 0
+
+    async def go():
+        tasks = await main.start()
+        floor = main.sched.add("floor", 10, lambda: None)
+        tasks.append(asyncio.create_task(floor.run()))
+        load = None
+        if streams:
+            load = asyncio.create_task(Clients(main.HTTP_PORT, 0, 0, streams).run())
+        await asyncio.sleep(0.5)
+        main.sched.reset()
+        main.memory_reset()
+        await asyncio.sleep(seconds)
+        result = {"tasks": main.sched.stats(), "gc": {
+            "collections": main.gc_runs, "pause_avg_us": main.gc_pause_total / max(1, main.gc_runs),
+            "pause_max_us": main.gc_pause_max, "grown_bytes": main.gc_grown,
+            "imu_samples": main.imu_samples - main.gc_samples, "free_bytes": main.gc_free}}
+        if load:
+            load.cancel()
+        main.server.close()
+        for t in tasks:
+            t.cancel()
+        return result
+
+    with quiet():
+        main.setup()
+        tracemalloc.start()
+        try:
+            result = asyncio.run(go())
+        finally:
+            tracemalloc.stop()
+            gc.collect()
+    floor = result["tasks"].pop("floor")["alloc_avg"]
+    result.update(mode=mode, seconds=seconds, streams=streams, floor_bytes=floor,
+                  heap_bytes_per_s=result["gc"]["grown_bytes"] / seconds,
+                  heap_bytes_per_sample=result["gc"]["grown_bytes"] / max(1, result["gc"]["imu_samples"]))
+    return result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", default="tasks", choices=("tasks", "core1", "timer", "drdy"),
+                        help="ACQ_MODE of the flight software")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--streams", type=int, default=0, help="open /api/stream subscribers")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    r = run(args.mode, args.seconds, args.streams)
+    if args.json:
+        emit_json(r)
+        return
+    floor = r["floor_bytes"]
+    table([(name, "%.1f" % s["hz"], "%.0f" % s["alloc_avg"], "%.0f" % max(0.0, s["alloc_avg"] - floor),
+            s["alloc_max"], s["collections"])
+           for name, s in r["tasks"].items()],
+          ("task", "Hz", "B/run", "above floor", "worst B", "gc in run"))
+    g = r["gc"]
+    print("\nempty task floor: %.0f B/run (CPython ints and the simulated clock)" % floor)
+    print("gc task: %d collections, pause avg %.2f ms, max %.2f ms; heap grew %.0f B/s, %.1f B per IMU sample" % (
+        g["collections"], g["pause_avg_us"] / 1000, g["pause_max_us"] / 1000,
+        r["heap_bytes_per_s"], r["heap_bytes_per_sample"]))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,123 @@
+"""
+Profiler overhead benchmark.
+
+Runs the flight tasks against the simulated board with METRICS off and on,
+at the flight rates, and compares each task's average run time and the
+total load: the difference is what timing every run costs.  Then times one
+``Histogram.observe`` and one rendering of /metrics, fetches /metrics over
+the loopback socket and shows the "# stats" summary lines the run left in
+the CSV log:
+
+    python -m bench.metrics
+    python -m bench.metrics --seconds 5 --json
+"""
+
+import argparse
+
+from hal import asyncio
+from sim import board, socket
+
+from bench.harness import emit_json, measure, quiet, table
+from metrics import Histogram
+
+METRICS_REQUEST = b"GET /metrics HTTP/1.1\r\nHost: 192.168.4.1\r\n\r\n"
+
+
+async def fetch(port, request):
+    c = socket.connect(port, request)
+    data = b""
+    while True:
+        try:
+            chunk = c.recv(65536)
+        except OSError:
+            await asyncio.sleep_ms(5)
+            continue
+        if not chunk:
+            break
+        data += chunk
+    c.close()
+    return data
+
+
+def runtime(main, seconds, on, log_s):
+    main.METRICS = on
+    main.METRICS_LOG_S = log_s
+
+    async def go():
+        tasks = await main.start()
+        await asyncio.sleep(0.5)
+        main.sched.reset()
+        await asyncio.sleep(seconds)
+        stats = main.sched.stats()
+        load = main.sched.load()
+        page = await fetch(main.HTTP_PORT, METRICS_REQUEST) if on else b""
+        main.server.close()
+        for t in tasks:
+            t.cancel()
+        return stats, load, page
+
+    with quiet():
+        return asyncio.run(go())
+
+
+def run(seconds, log_s):
+    board.reset()
+    import main
+    main.PHASE_RATES = False  # flight rates, not the pad's
+    main.SCHED_REPORT_S = 0
+    with quiet():
+        main.setup()
+
+    off, load_off, _ = runtime(main, seconds, False, 0)
+    on, load_on, page = runtime(main, seconds, True, log_s)
+    main.sd_log.flush(partial=True)
+    main.sd_log.sync()
+    with open(main.log_filename) as f:
+        summary = [line.rstrip() for line in f if line.startswith("# stats")]
+
+    h = Histogram()
+    observe_us, observe_alloc = measure(lambda: h.observe(1234), 20000)
+    render_us, _ = measure(main.render_metrics, 200)
+    body = page.partition(b"\r\n\r\n")[2]
+    return {
+        "seconds": seconds,
+        "tasks": {name: {"hz": on[name]["hz"], "busy_avg_us_off": off[name]["busy_avg_us"],
+                         "busy_avg_us_on": on[name]["busy_avg_us"]}
+                  for name in on if name in off},
+        "load_off": load_off,
+        "load_on": load_on,
+        "observe_us": observe_us,
+        "observe_alloc_bytes": observe_alloc,
+        "render_us": render_us,
+        "metrics_status": page.split(b"\r\n", 1)[0].decode(),
+        "metrics_bytes": len(body),
+        "metrics_lines": body.count(b"\n"),
+        "summary": summary,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="length of each run")
+    parser.add_argument("--log-s", type=float, default=1.0, help="METRICS_LOG_S for the run with metrics on")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    r = run(args.seconds, args.log_s)
+    if args.json:
+        emit_json(r)
+        return
+    table([(name, "%.1f" % s["hz"], "%.1f" % s["busy_avg_us_off"], "%.1f" % s["busy_avg_us_on"],
+            "%+.1f" % (s["busy_avg_us_on"] - s["busy_avg_us_off"]))
+           for name, s in r["tasks"].items()],
+          ("task", "Hz", "us/run off", "us/run on", "difference"))
+    print("\ntask load: %.2f%% without metrics, %.2f%% with" % (r["load_off"] * 100, r["load_on"] * 100))
+    print("Histogram.observe: %.2f us, %.0f B allocated; /metrics render: %.0f us" % (
+        r["observe_us"], r["observe_alloc_bytes"], r["render_us"]))
+    print("/metrics: %s, %d bytes, %d lines" % (r["metrics_status"], r["metrics_bytes"], r["metrics_lines"]))
+    print("\nsummary lines in the CSV log (%d):" % len(r["summary"]))
+    for line in r["summary"][-12:]:
+        print(line)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,192 @@
+"""
+Flight phase benchmark.
+
+Replays the simulated flight through the drivers and the flight software's
+attitude, altitude and phase filters, sampling at the rates main.py sets for
+each phase as it detects them (PHASE_SLOWDOWN, with burst capture keeping
+the sensors at full rate until landing), and reports when every
+transition was detected against the scripted flight.  Then times each
+scheduled task on the simulated board and works out, phase by phase, the
+CPU load and the bytes per second bound for the SD card with the phase
+rates and with the flight rates throughout.  The simulated touchdown stops
+the can dead with nothing on the accelerometer, so the altitude filter
+rings for a few seconds and landing shows up later than the 5 s hold alone:
+
+    python -m bench.phase
+    python -m bench.phase --pad-s 1800 --landed-s 600 --json
+"""
+
+import argparse
+
+from sim import board
+from sim.profile import FlightProfile
+
+from bench.harness import emit_json, measure, quiet, table
+import binlog
+import hal
+from altitude import AltitudeFilter
+from attitude import Attitude
+from bmp280 import BMP280
+from flightphase import FlightPhase, NAMES, PAD, LANDED
+from mpu6050 import MPU6050, values
+
+
+def sampling(main, slowdown, p):
+    """PHASE_SLOWDOWN row as main.enter_phase applies it to the sensors: burst capture
+    keeps them at full rate until landing."""
+    gps_k, baro_k, imu_k, csv_k, stream_k = slowdown[p]
+    if main.CAPTURE_PRE_S and p != LANDED:
+        baro_k = imu_k = 1
+    return gps_k, baro_k, imu_k, csv_k, stream_k
+
+
+def detect(main, pad_s, landed_s, adaptive):
+    """Sample the flight phase by phase; return (detections, seconds spent in each phase)."""
+    profile = FlightProfile(pad_s=pad_s)
+    b = board.reset(profile=profile)
+    i2c = hal.I2C(0, sda=hal.Pin(0), scl=hal.Pin(1), freq=400000)
+    mpu = MPU6050(i2c)
+    bmp = BMP280(i2c)
+    mpu_model = b.i2c[0].devices[0x68]
+    bmp_model = b.i2c[0].devices[0x76]
+    clip = 32000 * mpu.accel_scale
+
+    slowdown = main.PHASE_SLOWDOWN if adaptive else [(1, 1, 1, 1, 1)] * len(NAMES)
+    att = Attitude(main.ATT_BETA)
+    alt = AltitudeFilter(0, 1000 // (main.BMP_PERIOD_MS * sampling(main, slowdown, PAD)[1]), main.ALT_ACCEL_NOISE,
+                         baro_noise=main.ALT_BARO_NOISE, clip_noise=main.ALT_CLIP_NOISE)
+    phase = FlightPhase()
+    phase.changed_ms = 0
+    imu = values()
+    raw = bytearray(6)
+    end = profile.landing_t + landed_s
+    next_imu = next_baro = next_phase = 0.0
+    last_imu = None
+    entered = [0.0] + [None] * (len(NAMES) - 1)
+    while True:
+        t = min(next_imu, next_baro, next_phase)
+        if t >= end:
+            break
+        _, baro_k, imu_k, _, _ = sampling(main, slowdown, phase.phase)
+        if t == next_imu:
+            mpu.convert(mpu_model.sample(t), imu)
+            if last_imu is None:
+                att.align(imu)
+            else:
+                att.update(imu, t - last_imu)
+                alt.predict(att.vertical(imu), t - last_imu,
+                            abs(imu[0]) > clip or abs(imu[1]) > clip or abs(imu[2]) > clip)
+            last_imu = t
+            next_imu += main.IMU_PERIOD_MS * imu_k / 1000
+        elif t == next_baro:
+            adc_t, adc_p = bmp_model.raw_for(profile.temperature(t), profile.pressure(t))
+            raw[0:3] = bytes((adc_p >> 12, (adc_p >> 4) & 0xFF, (adc_p & 0x0F) << 4))
+            raw[3:6] = bytes((adc_t >> 12, (adc_t >> 4) & 0xFF, (adc_t & 0x0F) << 4))
+            alt.baro(bmp.convert(raw)[1])
+            next_baro += main.BMP_PERIOD_MS * baro_k / 1000
+        else:
+            accel = (imu[0] * imu[0] + imu[1] * imu[1] + imu[2] * imu[2]) ** 0.5
+            height = speed = 0.0
+            if alt.ground:
+                height, speed = alt.x[0], alt.x[1]
+            if phase.update(int(t * 1000), height, speed, accel):
+                entered[phase.phase] = t
+            next_phase += main.PHASE_PERIOD_MS / 1000
+
+    # What each transition should have followed: launch, the top, the fixed
+    # wait after it, touchdown
+    truth = (0.0, profile.pad_s, profile.apogee_t, profile.apogee_t + phase.apogee_ms / 1000,
+             profile.landing_t)
+    detections = {NAMES[p]: {"true_s": truth[p], "detected_s": entered[p]} for p in range(1, len(NAMES))}
+    bounds = entered + [end]
+    durations = {}
+    for p, name in enumerate(NAMES):
+        start = bounds[p] if bounds[p] is not None else end
+        stop = next((s for s in bounds[p + 1:] if s is not None), end)
+        durations[name] = max(0.0, stop - start)
+    return detections, durations
+
+
+def task_costs(iterations):
+    """Microseconds per release of every rate-controlled task, on the simulated board."""
+    board.reset()
+    import main
+    with quiet():
+        main.setup()
+        main.step()
+    stream = lambda: main.render_telemetry().encode()
+    costs = {}
+    with quiet():
+        for name, func in (("gps", main.read_gps), ("baro", main.update_baro), ("imu", main.update_mpu6050),
+                           ("csv", lambda: main.log_to_sd(main.format_log_line())), ("stream", stream),
+                           ("log", main.update_log), ("phase", main.update_phase)):
+            costs[name] = measure(func, iterations)[0]
+    return main, costs, len(main.format_log_line())
+
+
+def budget(main, costs, csv_line, slowdown, p):
+    """CPU share and SD bytes per second in phase ``p`` with these PHASE_SLOWDOWN rows."""
+    gps_k, baro_k, imu_k, csv_k, stream_k = sampling(main, slowdown, p)
+    log_k = slowdown[p][2]
+    hz = {"gps": 1000 / (main.GPS_PERIOD_MS * gps_k), "baro": 1000 / (main.BMP_PERIOD_MS * baro_k),
+          "imu": 1000 / (main.IMU_PERIOD_MS * imu_k), "csv": 1 / (main.LOG_INTERVAL * csv_k),
+          "stream": main.STREAM_HZ / stream_k, "log": 1000 / main.LOG_PERIOD_MS,
+          "phase": 1000 / main.PHASE_PERIOD_MS}
+    gps_fix_hz = max(1, main.GPS_RATE_HZ // gps_k)
+    return {"cpu": sum(hz[name] * costs[name] for name in hz) / 1e6,
+            "csv_bytes_per_s": hz["csv"] * csv_line,
+            "binary_bytes_per_s": (hz["imu"] / log_k + gps_fix_hz) * binlog.RECORD_SIZE}
+
+
+def run(pad_s, landed_s, iterations):
+    main, costs, csv_line = task_costs(iterations)
+    detections, durations = detect(main, pad_s, landed_s, True)
+    flat = [(1, 1, 1, 1, 1)] * len(NAMES)
+    phases = {}
+    totals = {"adaptive": {"cpu_s": 0.0, "csv_bytes": 0.0, "binary_bytes": 0.0},
+              "flight_rates": {"cpu_s": 0.0, "csv_bytes": 0.0, "binary_bytes": 0.0}}
+    for p, name in enumerate(NAMES):
+        row = {"seconds": durations[name], "adaptive": budget(main, costs, csv_line, main.PHASE_SLOWDOWN, p),
+               "flight_rates": budget(main, costs, csv_line, flat, p)}
+        for key in totals:
+            totals[key]["cpu_s"] += row[key]["cpu"] * row["seconds"]
+            totals[key]["csv_bytes"] += row[key]["csv_bytes_per_s"] * row["seconds"]
+            totals[key]["binary_bytes"] += row[key]["binary_bytes_per_s"] * row["seconds"]
+        phases[name] = row
+    return {"pad_s": pad_s, "landed_s": landed_s, "task_us": costs, "detections": detections,
+            "phases": phases, "totals": totals}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pad-s", type=float, default=600, help="time on the pad before launch")
+    parser.add_argument("--landed-s", type=float, default=600, help="time on the ground before recovery")
+    parser.add_argument("--iterations", type=int, default=500, help="calls per task timing")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    r = run(args.pad_s, args.landed_s, args.iterations)
+    if args.json:
+        emit_json(r)
+        return
+    table([(name, "%.2f" % d["true_s"], "-" if d["detected_s"] is None else "%.2f" % d["detected_s"],
+            "-" if d["detected_s"] is None else "%+.2f" % (d["detected_s"] - d["true_s"]))
+           for name, d in r["detections"].items()],
+          ("entered", "event s", "detected s", "delay s"))
+    print()
+    rows = []
+    for name, row in r["phases"].items():
+        a, f = row["adaptive"], row["flight_rates"]
+        rows.append((name, "%.0f" % row["seconds"], "%.2f%%" % (a["cpu"] * 100), "%.2f%%" % (f["cpu"] * 100),
+                     "%.0f" % a["binary_bytes_per_s"], "%.0f" % f["binary_bytes_per_s"],
+                     "%.0f" % a["csv_bytes_per_s"], "%.0f" % f["csv_bytes_per_s"]))
+    table(rows, ("phase", "s", "cpu", "cpu flat", "bin B/s", "bin flat", "csv B/s", "csv flat"))
+    a, f = r["totals"]["adaptive"], r["totals"]["flight_rates"]
+    print("\nwhole flight: %.0f s CPU, %.1f MB binary / %.1f MB CSV with the phase rates; "
+          "%.0f s, %.1f MB / %.1f MB at flight rates throughout" % (
+              a["cpu_s"], a["binary_bytes"] / 1e6, a["csv_bytes"] / 1e6,
+              f["cpu_s"], f["binary_bytes"] / 1e6, f["csv_bytes"] / 1e6))
+    print("(task costs measured on this machine under CPython; the ratios carry over to the Pico)")
+
+
+if __name__ == "__main__":
+    main_cli()
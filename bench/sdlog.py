@@ -0,0 +1,169 @@
+"""
+SD logging cost: open/append/close per record versus the buffered SDLogger
+and the raw block log.
+
+The host has no FatFs, so every file operation is replayed through a small
+model of what FatFs does with the card: a write that starts or ends inside a
+sector reads that sector back first (read-modify-write), and a close or
+flush rewrites the directory entry and the FAT sector.  The raw block log
+goes straight to the simulated card, whose own command counters are used.
+
+    python -m bench.sdlog
+    python -m bench.sdlog --record 32 --records 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import sim  # noqa: F401  (installs time.ticks_ms & co.)
+from bench.harness import emit_json, table
+from rawlog import RawLog, find_file
+from sdlogger import SDLogger
+from sim import board
+from sim.sdcard import SDCard
+
+SECTOR = 512
+
+
+class CardModel:
+    """Counts the sector traffic FatFs would generate for a file."""
+
+    def __init__(self):
+        self.sector_reads = 0
+        self.sector_writes = 0
+        self.rmw = 0
+        self.commits = 0
+        self.calls = 0
+
+    def write(self, pos, n):
+        self.calls += 1
+        end = pos + n
+        first, last = pos // SECTOR, (end - 1) // SECTOR
+        if pos % SECTOR:
+            self.rmw += 1
+            self.sector_reads += 1
+        if end % SECTOR and (last != first or not pos % SECTOR):
+            self.rmw += 1
+            self.sector_reads += 1
+        self.sector_writes += last - first + 1
+
+    def commit(self):
+        # directory entry + FAT sector
+        self.commits += 1
+        self.sector_writes += 2
+
+
+class ModelFile:
+    """File wrapper that replays writes/closes into a CardModel."""
+
+    def __init__(self, f, card):
+        self.f = f
+        self.card = card
+
+    def write(self, data):
+        self.card.write(self.f.tell(), len(data))
+        return self.f.write(data)
+
+    def flush(self):
+        self.card.commit()
+        self.f.flush()
+
+    def close(self):
+        self.card.commit()
+        self.f.close()
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run(record_size, records, ring, flush_bytes):
+    record = bytes(record_size)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Legacy: open, append, close for every record
+        card = CardModel()
+        path = os.path.join(tmp, "legacy.bin")
+        open(path, "wb").close()
+        worst = 0
+        t0 = time.perf_counter_ns()
+        for _ in range(records):
+            t = time.perf_counter_ns()
+            with ModelFile(open(path, "ab"), card) as f:
+                f.write(record)
+            worst = max(worst, time.perf_counter_ns() - t)
+        us = (time.perf_counter_ns() - t0) / 1000 / records
+        results["open/append/close"] = dict(us=us, worst_us=worst / 1000, dropped=0, **vars(card))
+
+        # Buffered: persistent handle, sector-aligned flushes
+        card = CardModel()
+        path = os.path.join(tmp, "buffered.bin")
+        log = SDLogger(path, ring, flush_bytes, max_age_ms=1000, sync_ms=5000)
+        log.f = ModelFile(log.f, card)
+        worst = 0
+        t0 = time.perf_counter_ns()
+        for _ in range(records):
+            t = time.perf_counter_ns()
+            log.write(record)
+            log.poll()
+            worst = max(worst, time.perf_counter_ns() - t)
+        us = (time.perf_counter_ns() - t0) / 1000 / records
+        log.close()
+        results["SDLogger"] = dict(us=us, worst_us=worst / 1000, dropped=log.dropped,
+                                   write_us_avg=log.write_us_avg(), write_us_max=log.write_us_max,
+                                   bytes_written=log.bytes_written, **vars(card))
+
+    # Raw: sector range of CANSAT.RAW, multi-block writes, no FAT
+    board.reset()
+    sd = SDCard()
+    start, sectors = find_file(sd)
+    log = RawLog(sd, start, sectors, ring // SECTOR, flush_bytes // SECTOR, max_age_ms=1000)
+    sd.writes = sd.multi_writes = sd.blocks_written = 0
+    worst = 0
+    t0 = time.perf_counter_ns()
+    for _ in range(records):
+        t = time.perf_counter_ns()
+        log.write(record)
+        log.poll()
+        worst = max(worst, time.perf_counter_ns() - t)
+    us = (time.perf_counter_ns() - t0) / 1000 / records
+    log.close()
+    results["RawLog"] = dict(us=us, worst_us=worst / 1000, dropped=log.dropped,
+                             write_us_avg=log.write_us_avg(), write_us_max=log.write_us_max,
+                             bytes_written=log.bytes_written, calls=sd.writes, multi_writes=sd.multi_writes,
+                             rmw=0, commits=0, sector_reads=0, sector_writes=sd.blocks_written)
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--record", type=int, default=73, help="bytes per record (73 = CSV line, 32 = binary)")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--ring", type=int, default=8192)
+    parser.add_argument("--flush-bytes", type=int, default=2048)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    results = run(args.record, args.records, args.ring, args.flush_bytes)
+    if args.json:
+        emit_json(results)
+        return
+    table([(k, "%.2f" % v["us"], "%.0f" % v["worst_us"], v["calls"], v["rmw"], v["commits"],
+            v["sector_writes"], v["dropped"]) for k, v in results.items()],
+          ("logger", "us/record", "worst us", "writes", "RMW", "FAT commits", "sectors written", "dropped"))
+    a = results["open/append/close"]
+    print()
+    for name in ("SDLogger", "RawLog"):
+        b = results[name]
+        print("%s, %d-byte records: %.1fx fewer sector writes, %.1fx less host time per record"
+              % (name, args.record, a["sector_writes"] / b["sector_writes"], a["us"] / b["us"]))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,130 @@
+"""
+Compact binary log format.
+
+A log file is one 512-byte header followed by fixed-size 32-byte records.
+Records hold raw sensor counts exactly as they came off the bus plus a
+``ticks_us`` timestamp; scaling and BMP280 compensation happen on the ground
+(``python -m tools.decode_log``) using the constants stored in the header.
+
+Header (little-endian):
+    0   8s   magic b"CANSATLG"
+    8   H    format version
+    10  H    header size (512)
+    12  H    record size (32)
+    14  H    ticks period in bits (30: ticks_us wraps at 2**30)
+    16  24s  BMP280 calibration registers 0x88-0x9F
+    40  f    MPU6050 accel LSB per g
+    44  f    MPU6050 gyro LSB per deg/s
+    48  ...  schema text, one line per record type, NUL padded
+
+Every record starts with ``type, flags/extra, seq, ticks_us``; seq counts
+records mod 2**16 so dropped records are visible.
+"""
+
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
+
+import struct
+
+MAGIC = b"CANSATLG"
+VERSION = const(1)
+HEADER_SIZE = const(512)
+RECORD_SIZE = const(32)
+
+REC_SENSOR = const(1)
+REC_GPS = const(2)
+REC_EVENT = const(3)
+REC_STATS = const(4)
+
+# SENSOR flags
+FLAG_BARO = const(0x01)  # baro_raw holds a BMP280 reading taken since the previous record
+FLAG_IMU = const(0x02)  # imu_raw holds a valid MPU6050 sample
+FLAG_IMU_FIFO = const(0x04)  # sample came from the FIFO (temperature is not fresh)
+
+# EVENT kinds
+EVENT_PHASE = const(1)  # value is the flight phase entered (flightphase.PAD..LANDED)
+EVENT_TRIGGER = const(2)  # value is what triggered a burst capture (capture.TRIGGER_ACCEL..MANUAL)
+
+_HEADER_FORMAT = "<8sHHHH24sff"
+# type, flags, seq, ticks_us, BMP280 0xF7-0xFC, MPU6050 0x3B-0x48 (big-endian), reserved
+SENSOR_FORMAT = "<BBHI6s14sI"
+# type, sats, seq, ticks_us, lat/lon (1e-7 deg), alt MSL (cm), speed (cm/s),
+# course (0.01 deg), fix quality, HDOP (0.1), reserved
+GPS_FORMAT = "<BBHIiiiHHBBHI"
+# type, kind, seq, ticks_us, value, altitude AGL (cm), vertical speed (cm/s),
+# apogee AGL (cm), acceleration magnitude (mg), reserved
+EVENT_FORMAT = "<BBHIiiiiiI"
+# type, reserved, seq, ticks_us, stage name (NUL padded), errors so far, runs, average,
+# 99th percentile (-1: beyond the last bucket) and worst run time (us) since the previous summary
+STATS_FORMAT = "<BBHI6sHIIiI"
+
+SCHEMA = (
+    "1 SENSOR " + SENSOR_FORMAT + " type,flags,seq,ticks_us,baro_raw,imu_raw,reserved\n"
+    "2 GPS " + GPS_FORMAT + " type,sats,seq,ticks_us,lat_e7,lon_e7,alt_cm,speed_cms,"
+    "course_cdeg,fix,hdop_d,reserved,reserved\n"
+    "3 EVENT " + EVENT_FORMAT + " type,kind,seq,ticks_us,value,alt_cm,vspeed_cms,apogee_cm,accel_mg,reserved\n"
+    "4 STATS " + STATS_FORMAT + " type,reserved,seq,ticks_us,stage,errors,runs,avg_us,p99_us,max_us\n"
+)
+
+
+def header(bmp_calibration, accel_lsb, gyro_lsb):
+    buf = bytearray(HEADER_SIZE)
+    struct.pack_into(_HEADER_FORMAT, buf, 0, MAGIC, VERSION, HEADER_SIZE, RECORD_SIZE, 30,
+                     bytes(bmp_calibration or bytes(24)), accel_lsb, gyro_lsb)
+    schema = SCHEMA.encode()
+    buf[48:48 + len(schema)] = schema
+    return buf
+
+
+def pack_sensor(buf, offset, seq, ticks_us, flags, baro_raw, imu_raw, reserved=0):
+    struct.pack_into(SENSOR_FORMAT, buf, offset, REC_SENSOR, flags, seq & 0xFFFF,
+                     ticks_us, baro_raw, imu_raw, reserved)
+
+
+def pack_gps(buf, offset, seq, ticks_us, fix, sats, lat_e7, lon_e7, alt_cm,
+             speed_cms=0, course_cdeg=0, hdop_d=0):
+    struct.pack_into(GPS_FORMAT, buf, offset, REC_GPS, sats, seq & 0xFFFF, ticks_us,
+                     lat_e7, lon_e7, alt_cm, speed_cms, course_cdeg, fix, hdop_d, 0, 0)
+
+
+def pack_event(buf, offset, seq, ticks_us, kind, value, alt_cm=0, vspeed_cms=0, apogee_cm=0, accel_mg=0):
+    struct.pack_into(EVENT_FORMAT, buf, offset, REC_EVENT, kind, seq & 0xFFFF, ticks_us,
+                     value, alt_cm, vspeed_cms, apogee_cm, accel_mg, 0)
+
+
+def pack_stats(buf, offset, seq, ticks_us, stage, runs, avg_us, p99_us, max_us, errors=0):
+    struct.pack_into(STATS_FORMAT, buf, offset, REC_STATS, 0, seq & 0xFFFF, ticks_us,
+                     stage, min(errors, 0xFFFF), runs, avg_us, p99_us, max_us)
+
+
+# ============= GROUND SIDE =============
+def read_header(data):
+    """Parse a header; raises ValueError if ``data`` is not a CanSat binary log."""
+    if len(data) < HEADER_SIZE or data[:8] != MAGIC:
+        raise ValueError("not a CanSat binary log")
+    magic, version, header_size, record_size, ticks_bits, calib, accel_lsb, gyro_lsb = \
+        struct.unpack_from(_HEADER_FORMAT, data, 0)
+    schema = bytes(data[48:header_size]).rstrip(b"\0").decode()
+    return {
+        "version": version,
+        "header_size": header_size,
+        "record_size": record_size,
+        "ticks_period": 1 << ticks_bits,
+        "bmp280_calibration": bytes(calib),
+        "accel_lsb": accel_lsb,
+        "gyro_lsb": gyro_lsb,
+        "schema": schema,
+    }
+
+
+def iter_records(data, hdr):
+    """Yield unpacked record tuples from the bytes following the header."""
+    size = hdr["record_size"]
+    formats = {REC_SENSOR: SENSOR_FORMAT, REC_GPS: GPS_FORMAT, REC_EVENT: EVENT_FORMAT, REC_STATS: STATS_FORMAT}
+    for offset in range(hdr["header_size"], len(data) - size + 1, size):
+        fmt = formats.get(data[offset])
+        if fmt is not None:
+            yield struct.unpack_from(fmt, data, offset)
@@ -0,0 +1,90 @@
+"""
+Burst capture around flight events.
+
+Keeps the newest records in a preallocated ring of fixed-size slots, so the
+second before an event is still in RAM when the event is noticed.  A
+trigger lets ``post`` more records in and then freezes the ring: the window
+stays put until it has been written out and ``rearm()`` is called.  While
+frozen, ``reserve`` returns -1 and the record is dropped (counted in
+``dropped``); triggers that arrive while a window is being collected or
+written are counted in ``missed``.
+
+    cap = Capture(slots=600, post=400, slot_size=32)
+    off = cap.reserve()        # -1 while frozen
+    pack_into(..., cap.buf, off, ...)
+    cap.trigger(TRIGGER_ACCEL)
+    if cap.frozen:
+        f.write(cap.span(0, 64))   # oldest records first, up to the wrap
+        cap.rearm()
+"""
+
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
+
+TRIGGER_ACCEL = const(1)  # acceleration magnitude above a threshold
+TRIGGER_PRESSURE = const(2)  # pressure changing faster than a threshold
+TRIGGER_MANUAL = const(3)  # asked for over HTTP
+
+REASONS = ("", "accel", "pressure", "manual")
+
+
+class Capture:
+    def __init__(self, slots, post, slot_size=32):
+        self.slots = slots
+        self.post = min(post, slots)
+        self.slot_size = slot_size
+        self.buf = bytearray(slots * slot_size)
+        self.mv = memoryview(self.buf)
+        self.triggers = 0
+        self.missed = 0
+        self.dropped = 0
+        self.reason = 0
+        self.rearm()
+
+    def rearm(self):
+        self.head = 0  # next slot to fill
+        self.count = 0  # records held, up to slots
+        self.remaining = -1  # records still to take after the trigger; -1 armed, 0 frozen
+
+    @property
+    def frozen(self):
+        return self.remaining == 0
+
+    @property
+    def triggered(self):
+        return self.remaining >= 0
+
+    def reserve(self):
+        """Offset of the slot for the next record, or -1 while frozen."""
+        remaining = self.remaining
+        if remaining == 0:
+            self.dropped += 1
+            return -1
+        head = self.head
+        self.head = head + 1 if head + 1 < self.slots else 0
+        if self.count < self.slots:
+            self.count += 1
+        if remaining > 0:
+            self.remaining = remaining - 1
+        return head * self.slot_size
+
+    def trigger(self, reason):
+        """Start the post-trigger window; False if one is already under way."""
+        if self.remaining >= 0:
+            self.missed += 1
+            return False
+        self.remaining = self.post
+        self.reason = reason
+        self.triggers += 1
+        return True
+
+    def span(self, i, n):
+        """Up to ``n`` frozen records from the i-th oldest, stopping at the end of the buffer."""
+        first = self.head - self.count + i
+        if first < 0:
+            first += self.slots
+        n = min(n, self.count - i, self.slots - first)
+        return self.mv[first * self.slot_size:(first + n) * self.slot_size]
@@ -0,0 +1,111 @@
+"""
+Fast barometer maths for the flight loop.
+
+``HeightTable`` replaces the barometric formula's ``** 0.1903`` (a software
+``powf`` on the RP2040) with linear interpolation in a table of
+standard-atmosphere heights, one every ``1 << shift`` Pa.  The error of
+linear interpolation grows with the curvature, so it is largest at the low
+end of the range: with the default 256 Pa spacing it stays under 5 cm down
+to 300 hPa and under 1 cm above 700 hPa, far inside the BMP280's own noise.
+Pressures outside the table extrapolate from its end segments.
+
+``Compensator`` is the datasheet's floating-point BMP280 compensation
+(section 8.1) with the calibration constants folded into a few float
+coefficients once.  The driver's integer version goes through 64-bit
+intermediates (``1 << 47``, ``P4 << 35``), which MicroPython holds as
+heap-allocated long ints; here every integer stays a small int and the
+rest is single-precision floats, within a fraction of a pascal of the
+integer result.  ``convert`` writes into a caller's array, like
+``MPU6050.convert``, so a reading does not even allocate a tuple.
+
+    height = HeightTable()
+    height(95000.0)                 # metres in the standard atmosphere
+    comp = Compensator(bmp.calibration)
+    comp.convert(bmp.read_raw(), out)   # out[0] = °C, out[1] = Pa
+"""
+
+from array import array
+import struct
+
+from altitude import standard_height
+
+try:
+    import micropython
+except ImportError:
+    # Ground tools under plain CPython: the decorator is a no-op
+    class micropython:
+        @staticmethod
+        def native(func):
+            return func
+
+
+class HeightTable:
+    def __init__(self, low=30000, high=110000, shift=8):
+        step = 1 << shift
+        n = (high - low + step - 1) // step + 1
+        self.low = low
+        self.high = low + (n - 1) * step
+        self.step = step
+        self.scale = 1 / step
+        self.last = n - 2  # first entry of the last segment
+        self.table = array('f', (standard_height(low + i * step) for i in range(n)))
+
+    @micropython.native
+    def __call__(self, pressure):
+        """Height in metres of ``pressure`` (Pa) in the standard atmosphere."""
+        x = (pressure - self.low) * self.scale
+        i = int(x)
+        if i < 0:
+            i = 0
+        elif i > self.last:
+            i = self.last
+        t = self.table
+        h = t[i]
+        return h + (t[i + 1] - h) * (x - i)
+
+
+class Compensator:
+    def __init__(self, calibration):
+        T1, T2, T3, P1, P2, P3, P4, P5, P6, P7, P8, P9 = struct.unpack("<HhhHhhhhhhhh", calibration)
+        # t_fine = d * (T2 / 2**14 + d * T3 / 2**34) with d = adc_T - 16 * T1
+        self.t1 = T1 << 4
+        self.t2 = T2 / 16384
+        self.t3 = T3 / 17179869184
+        # With v = t_fine / 2 - 64000 the datasheet's var1 and var2 become
+        # polynomials in v, and p = (1048576 - adc_P - var2 / 4096) * 6250 / var1
+        self.p1 = P1 / 6250
+        self.p2 = P2 * P1 / 17179869184 / 6250
+        self.p3 = P3 * P1 / 9007199254740992 / 6250
+        self.p4 = 1048576 - (P4 << 4)
+        self.p5 = P5 / 8192
+        self.p6 = P6 / 536870912
+        self.p7 = P7 / 16
+        self.p8 = 1 + P8 / 524288
+        self.p9 = P9 / 34359738368
+        self.temperature = 0.0  # °C, last conversion
+        self.pressure = 0.0  # Pa
+
+    def compensate(self, adc_T, adc_P):
+        """(temperature in °C, pressure in Pa) from the 20-bit ADC values."""
+        self._adc(adc_T, adc_P)
+        return self.temperature, self.pressure
+
+    def convert(self, b, out, o=0):
+        """Temperature and pressure of a BMP280.read_raw() block at ``b[o:o + 6]`` into out[0:2]."""
+        self._adc((b[o + 3] << 12) | (b[o + 4] << 4) | (b[o + 5] >> 4),
+                  (b[o] << 12) | (b[o + 1] << 4) | (b[o + 2] >> 4))
+        out[0] = self.temperature
+        out[1] = self.pressure
+
+    @micropython.native
+    def _adc(self, adc_T, adc_P):
+        d = adc_T - self.t1
+        t_fine = d * (self.t2 + d * self.t3)
+        self.temperature = t_fine / 5120
+        v = t_fine * 0.5 - 64000.0
+        q = self.p1 + v * (self.p2 + v * self.p3)
+        if q == 0.0:
+            self.pressure = 0.0
+            return
+        p = (self.p4 - adc_P - v * (self.p5 + v * self.p6)) / q
+        self.pressure = p * (self.p8 + p * self.p9) + self.p7
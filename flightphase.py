@@ -0,0 +1,86 @@
+"""
+Flight phase detection.
+
+Decides from the altitude filter's height and vertical speed and the
+accelerometer's magnitude which part of the flight the can is in:
+
+    PAD -> ASCENT -> APOGEE -> DESCENT -> LANDED
+
+Every transition needs its condition to hold for a while (``hold_ms``,
+``landed_ms``), so a knock on the pad or one noisy reading does not change
+the phase.  Launch is seen either as thrust (a rocket) or as the can having
+climbed ``launch_alt`` metres (a balloon, or a boost the accelerometer's
+range clips).  Apogee is the vertical speed turning negative; the can is
+in DESCENT ``apogee_ms`` later, and LANDED once it has been still for
+``landed_ms``.  Phases only move forward.
+
+    phase = FlightPhase()
+    if phase.update(time.ticks_ms(), altitude, vspeed, accel_g):
+        print(NAMES[phase.phase])
+"""
+
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
+
+import time
+
+PAD = const(0)
+ASCENT = const(1)
+APOGEE = const(2)
+DESCENT = const(3)
+LANDED = const(4)
+
+NAMES = ("pad", "ascent", "apogee", "descent", "landed")
+
+
+class FlightPhase:
+    def __init__(self, launch_g=1.8, launch_alt=10.0, hold_ms=150, apogee_ms=1000,
+                 landed_speed=1.0, landed_g=0.1, landed_ms=5000):
+        self.launch_g = launch_g
+        self.launch_alt = launch_alt
+        self.hold_ms = hold_ms
+        self.apogee_ms = apogee_ms
+        self.landed_speed = landed_speed
+        self.landed_g = landed_g
+        self.landed_ms = landed_ms
+        self.reset()
+
+    def reset(self):
+        self.phase = PAD
+        self.changed_ms = time.ticks_ms()
+        self._since = None  # when the pending transition's condition started to hold
+
+    @property
+    def name(self):
+        return NAMES[self.phase]
+
+    def _held(self, cond, now, ms):
+        if not cond:
+            self._since = None
+            return False
+        if self._since is None:
+            self._since = now
+        return time.ticks_diff(now, self._since) >= ms
+
+    def update(self, now, altitude, vspeed, accel_g):
+        """Feed the latest estimates at ticks_ms ``now``; True if the phase changed."""
+        phase = self.phase
+        if phase == PAD:
+            moved = self._held(accel_g > self.launch_g or altitude > self.launch_alt, now, self.hold_ms)
+        elif phase == ASCENT:
+            moved = self._held(vspeed < 0, now, self.hold_ms)
+        elif phase == APOGEE:
+            moved = time.ticks_diff(now, self.changed_ms) >= self.apogee_ms
+        elif phase == DESCENT:
+            moved = self._held(abs(vspeed) < self.landed_speed and abs(accel_g - 1) < self.landed_g,
+                               now, self.landed_ms)
+        else:
+            return False
+        if moved:
+            self.phase = phase + 1
+            self.changed_ms = now
+            self._since = None
+        return moved
@@ -0,0 +1,5 @@
+"""
+Ground station that runs under normal Python.
+
+Run from the repository root, e.g. ``python -m ground.station 192.168.4.1``.
+"""
@@ -0,0 +1,143 @@
+"""
+Load generator: dozens of emulated cans speaking the flight software's protocol.
+
+    python -m ground.emulator --cans 24 --base-port 9000
+    python -m ground.emulator --cans 48 --hz 20 --disconnect-s 30
+
+Every can listens on its own port (``--base-port`` upwards) and serves
+``/api/stream`` and ``/api/telemetry`` with the headers and telemetry JSON
+of ``main.py`` (the format strings are imported from it), flying the
+simulator's scripted launch with a staggered start.  Like the can, each one
+publishes a numbered frame ``--hz`` times a second and hands every
+subscriber the newest frame when it is ready for one, so a slow subscriber
+sees frame numbers go missing.  ``--disconnect-s`` closes each stream after
+a random time with that mean, to exercise reconnects.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import main as flight
+from sim.profile import FlightProfile
+
+TICKS_MASK = (1 << 30) - 1
+PHASES = {"pad": "pad", "boost": "ascent", "coast": "ascent", "descent": "descent", "landed": "landed"}
+
+
+def ticks_us():
+    return (time.monotonic_ns() // 1000) & TICKS_MASK
+
+
+class EmulatedCan:
+    def __init__(self, index, hz, pad_s, disconnect_s=0):
+        self.index = index
+        self.period = 1 / hz
+        self.profile = FlightProfile(pad_s=pad_s)
+        self.disconnect_s = disconnect_s
+        self.start = time.monotonic()
+        self.frame = None
+        self.frames = 0
+        self.seq = 0
+        self.apogee = 0.0
+        self.event = asyncio.Event()
+        self.subscribers = 0
+        self.disconnects = 0
+
+    def render(self):
+        # One telemetry snapshot, exactly as main.render_telemetry lays it out
+        t = time.monotonic() - self.start
+        p = self.profile
+        h, v, _ = p.kinematics(t)
+        self.apogee = max(self.apogee, h)
+        ax, ay, az = p.accel(t)
+        gx, gy, gz = p.gyro(t)
+        lat, lon, alt = p.position(t)
+        pressure = p.pressure(t) / 100
+        self.seq += 10  # the can updates its readings faster than it streams them
+        ticks = ticks_us()
+        return (t, p.temperature(t), pressure, 44330 * (1 - (pressure / 1013.25) ** 0.1903), h, v, self.apogee,
+                PHASES[p.phase(t)], ax, ay, az, gx, gy, gz, p.swing(t)[0], 0.0, 0.0,
+                "%.6f" % lat, "%.6f" % lon, "%.1f" % alt, 9, 100, 1, self.frames, self.seq, ticks, ticks)
+
+    async def publish(self):
+        deadline = time.monotonic()
+        while True:
+            self.frames += 1
+            self.frame = (flight.STREAM_FRAME % self.render()).encode()
+            event, self.event = self.event, asyncio.Event()
+            event.set()
+            deadline += self.period
+            await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+
+    async def handle(self, reader, writer):
+        try:
+            parts = (await asyncio.wait_for(reader.readline(), 5)).split()
+            while (await asyncio.wait_for(reader.readline(), 5)).strip():
+                pass
+            path = parts[1].decode() if len(parts) > 1 else ""
+            if path == "/api/stream":
+                await self.stream(writer)
+            elif path == "/api/telemetry":
+                body = (flight.TELEMETRY_JSON % self.render()).encode()
+                writer.write((flight.JSON_HEADERS % len(body)).encode() + body)
+                await writer.drain()
+            else:
+                writer.write(flight.NOT_FOUND)
+                await writer.drain()
+        except (OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def stream(self, writer):
+        # Newest frame whenever the subscriber is ready, as main.stream_telemetry
+        self.subscribers += 1
+        until = time.monotonic() + random.expovariate(1 / self.disconnect_s) if self.disconnect_s else None
+        try:
+            writer.write(flight.SSE_HEADERS)
+            while until is None or time.monotonic() < until:
+                await self.event.wait()
+                writer.write(self.frame)
+                await asyncio.wait_for(writer.drain(), flight.STREAM_STALL_S)
+            self.disconnects += 1
+        finally:
+            self.subscribers -= 1
+
+
+async def run(cans, hz, base_port, host="127.0.0.1", disconnect_s=0, seconds=0, ready=None):
+    """Serve ``cans`` emulated cans on consecutive ports; forever, or for ``seconds``."""
+    fleet = [EmulatedCan(i, hz, 5 + 3 * i, disconnect_s) for i in range(cans)]
+    servers = [await asyncio.start_server(c.handle, host, base_port + i) for i, c in enumerate(fleet)]
+    tasks = [asyncio.create_task(c.publish()) for c in fleet]
+    if ready is not None:
+        ready.set()
+    try:
+        await asyncio.sleep(seconds if seconds else 1e9)
+    finally:
+        for t in tasks:
+            t.cancel()
+        for s in servers:
+            s.close()
+    return {"frames": sum(c.frames for c in fleet), "disconnects": sum(c.disconnects for c in fleet)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cans", type=int, default=24)
+    parser.add_argument("--hz", type=float, default=flight.STREAM_HZ, help="frames per second of each can")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=9000, help="port of the first can, the rest follow")
+    parser.add_argument("--disconnect-s", type=float, default=0, help="mean stream lifetime (0 = forever)")
+    args = parser.parse_args()
+    print("%d cans on %s:%d-%d at %g Hz" % (args.cans, args.host, args.base_port,
+                                            args.base_port + args.cans - 1, args.hz), flush=True)
+    try:
+        asyncio.run(run(args.cans, args.hz, args.base_port, args.host, args.disconnect_s))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Ground station: follows the live telemetry of many cans at once.
+
+    python -m ground.station 192.168.4.1
+    python -m ground.station can1=192.168.4.1 can2=192.168.5.1 --db launch.sqlite --port 8080
+    python -m ground.station 127.0.0.1:9000-9023     # the cans of ground.emulator
+
+Every can gets an asyncio task that holds its ``/api/stream`` open and
+reconnects with exponential backoff (and jitter, so a field of cans that
+dropped together does not reconnect in lockstep) when it goes away or
+stalls.  Frames are written to SQLite in batches (``ground.store``) and
+fanned out to the station's own web server, which shows every can on one
+page:
+
+    /             live table of all cans
+    /api/cans     status and newest frame of each can (JSON)
+    /api/stream   every frame of every can as Server-Sent Events, with a "can" field
+    /metrics      ingest counters, commit latency and per-can link state (Prometheus text)
+
+Per can, the latency from a reading on the can to its arrival here is
+estimated as ``tools.latency`` does, and missing frame numbers are counted
+as dropped frames.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import metrics
+from ground.store import Store
+from tools.latency import Tracker
+
+STREAM_REQUEST = "GET /api/stream HTTP/1.1\r\nHost: %s\r\nAccept: text/event-stream\r\n\r\n"
+STAMPS = ("frame", "ticks", "sent")  # numbers every frame must carry to be tracked
+REPORT_S = 10
+
+PAGE = b"""<!DOCTYPE html>
+<html>
+<head>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>CanSat Ground Station</title>
+<style>
+body { font-family: sans-serif; margin: 20px; }
+table { border-collapse: collapse; width: 100%; }
+th, td { padding: 6px 10px; border-bottom: 1px solid #ddd; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+.down { color: #b91c1c; }
+</style>
+</head>
+<body>
+<h1>CanSat Ground Station</h1>
+<table>
+<thead><tr><th>Can</th><th>Phase</th><th>Time (s)</th><th>Altitude (m)</th><th>Vertical speed (m/s)</th>
+<th>Apogee (m)</th><th>Latitude</th><th>Longitude</th><th>Sats</th><th>Frames</th></tr></thead>
+<tbody id="cans"></tbody>
+</table>
+<script>
+var rows = {};
+function cell(tr, text) { var td = document.createElement("td"); td.textContent = text; tr.appendChild(td); }
+function show(d) {
+    var tr = rows[d.can];
+    if (!tr) {
+        tr = rows[d.can] = document.createElement("tr");
+        document.getElementById("cans").appendChild(tr);
+    }
+    tr.textContent = "";
+    tr.className = "";
+    tr.seen = Date.now();
+    cell(tr, d.can); cell(tr, d.phase); cell(tr, d.time.toFixed(1)); cell(tr, d.altitude.toFixed(1));
+    cell(tr, d.vspeed.toFixed(1)); cell(tr, d.apogee.toFixed(1)); cell(tr, d.lat); cell(tr, d.lon);
+    cell(tr, d.sats); cell(tr, d.frame);
+}
+setInterval(function () {
+    for (var k in rows) { rows[k].className = Date.now() - rows[k].seen > 3000 ? "down" : ""; }
+}, 1000);
+new EventSource("/api/stream").onmessage = function (e) { show(JSON.parse(e.data)); };
+</script>
+</body>
+</html>
+"""
+
+
+def well_formed(frame):
+    """True for a telemetry frame (a JSON object) with the stream stamps the station tracks."""
+    return isinstance(frame, dict) and all(isinstance(frame.get(k), int) for k in STAMPS)
+
+
+class Link:
+    """The station's connection to one can."""
+
+    def __init__(self, name, host, port, backoff_s=0.5, backoff_max_s=10.0, timeout_s=5.0):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.backoff_s = backoff_s
+        self.backoff_max_s = backoff_max_s
+        self.timeout_s = timeout_s  # connecting, and the longest gap between frames
+        self.id = None  # row id in the store
+        self.connected = False
+        self.connects = 0
+        self.failures = 0
+        self.last_error = None
+        self.frames = 0
+        self.dropped = 0
+        self.malformed = 0  # events skipped: not a frame the station can track
+        self.last_frame = 0
+        self.latest = None
+        self.tracker = Tracker()
+
+    async def run(self, station):
+        delay = self.backoff_s
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout_s)
+                writer.write((STREAM_REQUEST % self.host).encode())
+                await writer.drain()
+                status = await asyncio.wait_for(reader.readline(), self.timeout_s)
+                if status.split()[1:2] != [b"200"]:
+                    raise ConnectionError("refused: %s" % status.decode(errors="replace").strip())
+                while (await asyncio.wait_for(reader.readline(), self.timeout_s)).strip():
+                    pass
+                self.connected = True
+                self.connects += 1
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), self.timeout_s)
+                    if not line:
+                        raise ConnectionError("closed by the can")
+                    if line.startswith(b"data: "):
+                        frame = json.loads(line[6:])
+                        if not well_formed(frame):
+                            self.malformed += 1
+                            continue
+                        station.ingest(self, frame)
+                        delay = self.backoff_s
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError) as e:
+                self.failures += 1
+                self.last_error = str(e) or type(e).__name__
+            finally:
+                self.connected = False
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, self.backoff_max_s)
+
+    def receive(self, frame, arrival_us):
+        self.tracker.add(frame, arrival_us)
+        n = frame["frame"]
+        if self.last_frame and n > self.last_frame + 1:
+            self.dropped += n - self.last_frame - 1
+        self.last_frame = n
+        self.frames += 1
+        self.latest = frame
+
+    def status(self):
+        return {"name": self.name, "host": self.host, "port": self.port, "connected": self.connected,
+                "connects": self.connects, "failures": self.failures, "last_error": self.last_error,
+                "frames": self.frames, "dropped": self.dropped, "malformed": self.malformed, "latest": self.latest}
+
+
+class Station:
+    def __init__(self, store, links):
+        self.store = store
+        self.links = links
+        for link in links:
+            link.id = store.can_id(link.name, link.host, link.port)
+        self.viewers = []  # one queue per /api/stream subscriber
+        self.viewer_queue = 256  # frames queued for a slow viewer at most, newer ones are skipped
+        self.viewer_stall_s = 5  # a viewer that cannot take a frame in this long is dropped
+        self.viewer_skipped = 0
+        self.server = None
+
+    def ingest(self, link, frame):
+        arrival = time.monotonic_ns() // 1000
+        link.receive(frame, arrival)
+        self.store.add(link.id, frame, arrival)
+        if self.viewers:
+            frame["can"] = link.name
+            event = b"data: " + json.dumps(frame).encode() + b"\n\n"
+            for q in self.viewers:
+                if q.qsize() < self.viewer_queue:
+                    q.put_nowait(event)
+                else:
+                    self.viewer_skipped += 1
+
+    async def start(self, host="0.0.0.0", port=8080):
+        tasks = [asyncio.create_task(self.store.run())]
+        tasks += [asyncio.create_task(link.run(self)) for link in self.links]
+        if port:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return tasks
+
+    # ============= WEB SERVER =============
+    async def handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)).strip():
+                pass
+            parts = request.split()
+            path = parts[1].decode() if len(parts) > 1 else ""
+            if path == "/api/stream":
+                await self.stream(writer)
+            elif path == "/api/cans":
+                self.reply(writer, "application/json", json.dumps([l.status() for l in self.links]).encode())
+            elif path == "/metrics":
+                self.reply(writer, "text/plain; version=0.0.4", self.render_metrics().encode())
+            elif path in ("/", "/index.html"):
+                self.reply(writer, "text/html; charset=utf-8", PAGE)
+            else:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+        except (OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    def reply(self, writer, kind, body):
+        writer.write(("HTTP/1.1 200 OK\r\nContent-Type: %s\r\nContent-Length: %d\r\n"
+                      "Cache-Control: no-store\r\nConnection: close\r\n\r\n" % (kind, len(body))).encode())
+        writer.write(body)
+
+    async def stream(self, writer):
+        q = asyncio.Queue()
+        self.viewers.append(q)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                         b"Cache-Control: no-store\r\nConnection: keep-alive\r\n\r\nretry: 1000\n\n")
+            while True:
+                writer.write(await q.get())
+                await asyncio.wait_for(writer.drain(), self.viewer_stall_s)
+        finally:
+            self.viewers.remove(q)
+
+    def render_metrics(self):
+        out = []
+        s = self.store
+        metrics.family(out, "ground_rows_total", "counter", "Samples committed to the database")
+        metrics.sample(out, "ground_rows_total", "", s.rows)
+        metrics.family(out, "ground_commits_total", "counter", "Database transactions")
+        metrics.sample(out, "ground_commits_total", "", s.commits)
+        metrics.family(out, "ground_commit_errors_total", "counter", "Failed database transactions")
+        metrics.sample(out, "ground_commit_errors_total", "", s.errors)
+        metrics.family(out, "ground_rows_lost_total", "counter", "Samples given up after failed commits")
+        metrics.sample(out, "ground_rows_lost_total", "", s.lost)
+        metrics.family(out, "ground_rows_rejected_total", "counter", "Samples the database refused")
+        metrics.sample(out, "ground_rows_rejected_total", "", s.rejected)
+        metrics.family(out, "ground_commit_latency_seconds", "histogram", "Time from a frame's arrival to its commit")
+        metrics.histogram(out, "ground_commit_latency_seconds", "", s.commit_latency)
+        metrics.family(out, "ground_viewers", "gauge", "Open /api/stream subscribers")
+        metrics.sample(out, "ground_viewers", "", len(self.viewers))
+        metrics.family(out, "ground_viewer_skipped_total", "counter", "Frames not sent to a viewer that fell behind")
+        metrics.sample(out, "ground_viewer_skipped_total", "", self.viewer_skipped)
+        for name, kind, help, key in (
+                ("ground_can_connected", "gauge", "Stream to the can is open", "connected"),
+                ("ground_can_connects_total", "counter", "Streams opened", "connects"),
+                ("ground_can_failures_total", "counter", "Failed or lost connections", "failures"),
+                ("ground_can_frames_total", "counter", "Frames received", "frames"),
+                ("ground_can_dropped_total", "counter", "Frames missing from the stream", "dropped"),
+                ("ground_can_malformed_total", "counter", "Events skipped as malformed", "malformed")):
+            metrics.family(out, name, kind, help)
+            for link in self.links:
+                metrics.sample(out, name, 'can="%s"' % link.name, int(getattr(link, key)))
+        return "\n".join(out) + "\n"
+
+    def report(self):
+        """One line per can with its latency since the last report, then the ingest totals."""
+        lines = []
+        for link in self.links:
+            w = link.tracker.window()
+            line = "%-10s %-4s %7d frames %5d dropped %4d connects" % (
+                link.name, "up" if link.connected else "down", link.frames, link.dropped, link.connects)
+            if w:
+                line += "  latency p50 %.1f ms p99 %.1f ms" % (w["p50"], w["p99"])
+            lines.append(line)
+        runs, avg, p99, worst = self.store.commit_latency.window()
+        self.store.commit_latency.mark()
+        lines.append("store: %d rows in %d commits; arrival to commit avg %.1f ms, p99 %s, max %.1f ms" % (
+            self.store.rows, self.store.commits, avg / 1000,
+            "%.1f ms" % (p99 / 1000) if p99 >= 0 else "long", worst / 1000))
+        return "\n".join(lines)
+
+
+def parse_cans(specs):
+    """[name=]host[:port[-last_port]] into Links; a port range gives one can per port."""
+    links = []
+    for spec in specs:
+        name, _, address = spec.rpartition("=")
+        host, _, ports = address.partition(":")
+        first, _, last = (ports or "80").partition("-")
+        first = int(first)
+        last = int(last) if last else first
+        for port in range(first, last + 1):
+            if last > first:
+                label = "%s%d" % (name, port - first) if name else "%s:%d" % (host, port)
+            else:
+                label = name or address
+            links.append((label, host, port))
+    return links
+
+
+async def serve(args):
+    store = Store(args.db, args.batch, args.flush_ms)
+    links = [Link(name, host, port, args.backoff_s, args.backoff_max_s, args.timeout_s)
+             for name, host, port in parse_cans(args.cans)]
+    station = Station(store, links)
+    tasks = await station.start(args.host, args.port)
+    print("ground station: %d cans into %s, live view on http://%s:%d/" % (
+        len(links), args.db, args.host, args.port), flush=True)
+    try:
+        while True:
+            await asyncio.sleep(REPORT_S)
+            print(station.report(), flush=True)
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("cans", nargs="+", help="[name=]host[:port[-last_port]] of each flight computer")
+    parser.add_argument("--db", default="ground.sqlite", help="SQLite database (created if missing)")
+    parser.add_argument("--host", default="0.0.0.0", help="address of the live view")
+    parser.add_argument("--port", type=int, default=8080, help="port of the live view (0 = none)")
+    parser.add_argument("--batch", type=int, default=1000, help="rows per transaction at most")
+    parser.add_argument("--flush-ms", type=int, default=250, help="commit queued rows at least this often")
+    parser.add_argument("--backoff-s", type=float, default=0.5, help="first reconnect delay")
+    parser.add_argument("--backoff-max-s", type=float, default=10.0, help="reconnect delay ceiling")
+    parser.add_argument("--timeout-s", type=float, default=5.0, help="connect timeout and longest gap between frames")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("stopped", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
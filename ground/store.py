@@ -0,0 +1,196 @@
+"""
+SQLite store for the telemetry of many cans.
+
+Frames are queued in memory as they arrive and written by one background
+task in batches, each batch a single transaction (``executemany``) on a
+worker thread, so the event loop never waits on the disk and a busy
+station commits a few times a second instead of once per frame.  The
+database runs in WAL mode, so readers do not block the writer.  A batch
+that fails to commit for the moment (``sqlite3.OperationalError``, say
+"database is locked") goes back to the front of the queue and is retried a
+flush interval later; only beyond ``max_pending`` queued rows are the
+oldest given up, counted in ``lost``.  Fields that are not a number or a
+string are stored as NULL; should a batch still hold a row SQLite refuses,
+the others are written one by one and that row is counted in ``rejected``.
+
+Samples are indexed by (can, received) and by received, the station's wall
+clock time at arrival, for time-range queries per can and across cans:
+
+    store = Store("ground.sqlite")
+    can = store.can_id("can1", "192.168.4.1", 80)
+    store.add(can, frame, arrival_us)
+    task = asyncio.create_task(store.run())
+
+``commit_latency`` holds how long rows waited from arrival to commit.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+
+from metrics import Histogram
+
+# Telemetry JSON fields as main.py renders them, in table order
+FIELDS = ("time", "temperature", "pressure", "altitude_bmp", "altitude", "vspeed", "apogee", "phase",
+          "ax", "ay", "az", "gx", "gy", "gz", "roll", "pitch", "yaw",
+          "lat", "lon", "gps_alt", "sats", "frame", "seq", "ticks")
+# GPS fields arrive as text, "N/A" without a fix
+NUMERIC_TEXT = ("lat", "lon", "gps_alt", "sats")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cans (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    host TEXT,
+    port INTEGER
+);
+CREATE TABLE IF NOT EXISTS samples (
+    can INTEGER NOT NULL REFERENCES cans(id),
+    received REAL NOT NULL,
+    time REAL, temperature REAL, pressure REAL, altitude_bmp REAL, altitude REAL,
+    vspeed REAL, apogee REAL, phase TEXT,
+    ax REAL, ay REAL, az REAL, gx REAL, gy REAL, gz REAL,
+    roll REAL, pitch REAL, yaw REAL,
+    lat REAL, lon REAL, gps_alt REAL, sats INTEGER,
+    frame INTEGER, seq INTEGER, ticks INTEGER
+);
+CREATE INDEX IF NOT EXISTS samples_can_received ON samples (can, received);
+CREATE INDEX IF NOT EXISTS samples_received ON samples (received);
+"""
+
+INSERT = "INSERT INTO samples (can, received, %s) VALUES (?, ?, %s)" % (
+    ", ".join(FIELDS), ", ".join("?" * len(FIELDS)))
+
+
+def number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def scalar(value):
+    """``value`` if SQLite can store it as it is, else None."""
+    if value is None or isinstance(value, float):
+        return value
+    if isinstance(value, int):
+        return value if -(1 << 63) <= value < 1 << 63 else None
+    if isinstance(value, str):
+        try:
+            value.encode()
+        except UnicodeEncodeError:  # a lone surrogate from a JSON escape
+            return None
+        return value
+    return None
+
+
+class Store:
+    def __init__(self, path, batch=1000, flush_ms=250, max_pending=50000):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.batch = batch
+        self.flush_ms = flush_ms
+        self.max_pending = max_pending
+        self.pending = []
+        self.arrivals = []  # monotonic us of every pending row
+        self.full = asyncio.Event()
+        # One transaction at a time on the connection, also across a flush cancelled
+        # while its worker thread is still writing
+        self.writing = threading.Lock()
+        self.rows = 0
+        self.commits = 0
+        self.errors = 0
+        self.lost = 0  # rows given up after failed commits
+        self.rejected = 0  # rows SQLite would not take
+        self.commit_latency = Histogram(buckets=20)  # up to 32 << 18 us, about 8 s
+
+    def can_id(self, name, host=None, port=None):
+        with self.db:
+            self.db.execute("INSERT OR IGNORE INTO cans (name, host, port) VALUES (?, ?, ?)", (name, host, port))
+        return self.db.execute("SELECT id FROM cans WHERE name = ?", (name,)).fetchone()[0]
+
+    def add(self, can, frame, arrival_us, received=None):
+        """Queue one decoded telemetry frame; ``received`` defaults to the wall clock now."""
+        row = [can, received if received is not None else time.time()]
+        for key in FIELDS:
+            value = frame.get(key)
+            row.append(number(value) if key in NUMERIC_TEXT else scalar(value))
+        self.pending.append(row)
+        self.arrivals.append(arrival_us)
+        if len(self.pending) >= self.batch:
+            self.full.set()
+
+    async def run(self):
+        """Write queued rows until cancelled; a last flush happens on the way out."""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self.full.wait(), self.flush_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+                await self.flush()
+        finally:
+            if self.pending:
+                try:
+                    self._write(self.pending)  # after any write still running on its thread
+                except sqlite3.OperationalError:
+                    raise
+                except (sqlite3.Error, ValueError, OverflowError):
+                    self.rejected += self._write_each(self.pending)
+
+    async def flush(self):
+        self.full.clear()
+        if not self.pending:
+            return
+        rows, arrivals = self.pending, self.arrivals
+        self.pending, self.arrivals = [], []
+        try:
+            try:
+                await asyncio.to_thread(self._write, rows)
+            except sqlite3.OperationalError:
+                raise
+            except (sqlite3.Error, ValueError, OverflowError):
+                # Not worth a retry: it would fail the same way
+                self.errors += 1
+                self.rejected += await asyncio.to_thread(self._write_each, rows)
+        except sqlite3.OperationalError:
+            self.errors += 1
+            self.pending[:0] = rows
+            self.arrivals[:0] = arrivals
+            excess = len(self.pending) - self.max_pending
+            if excess > 0:
+                del self.pending[:excess], self.arrivals[:excess]
+                self.lost += excess
+            await asyncio.sleep(self.flush_ms / 1000)
+            return
+        now = time.monotonic_ns() // 1000
+        for t in arrivals:
+            self.commit_latency.observe(now - t)
+
+    def _write(self, rows):
+        with self.writing, self.db:
+            self.db.executemany(INSERT, rows)
+        self.rows += len(rows)
+        self.commits += 1
+
+    def _write_each(self, rows):
+        """Write the rows SQLite takes, one statement each, in one transaction; how many it refused."""
+        written = 0
+        with self.writing, self.db:
+            for row in rows:
+                try:
+                    self.db.execute(INSERT, row)
+                except sqlite3.OperationalError:
+                    raise
+                except (sqlite3.Error, ValueError, OverflowError):
+                    continue
+                written += 1
+        self.rows += written
+        self.commits += 1
+        return len(rows) - written
+
+    def close(self):
+        self.db.close()
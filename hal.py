@@ -0,0 +1,58 @@
+"""
+Hardware abstraction layer for the CanSat flight software.
+
+Everything that touches the Pico's hardware is imported from here instead of
+from ``machine``/``network``/``socket``/``asyncio``/``_thread`` directly.  On
+the Pico these are the real MicroPython modules; under CPython the simulator
+in ``sim/`` is loaded instead (``_thread`` is CPython's own), so the same
+flight code can be profiled and regression-tested on a Linux box:
+
+    python main.py                 # flight loop against the simulated board
+    python -m bench.loop           # loop-rate benchmark
+"""
+
+try:
+    import machine
+    import network
+    import socket
+    import os
+
+    try:
+        import _thread
+    except ImportError:
+        _thread = None
+
+    try:
+        import asyncio
+    except ImportError:
+        import uasyncio as asyncio
+
+    SIMULATED = False
+
+    try:
+        from sdcard import SDCard
+    except ImportError:
+        SDCard = None
+
+    def mount(dev, point):
+        """Mount a block device and return the path to prefix file names with."""
+        os.mount(dev, point)
+        return point
+
+except ImportError:
+    import sim  # noqa: F401  (installs the micropython/time shims)
+    import _thread
+    from sim import machine
+    from sim import network
+    from sim import socket
+    from sim import aio as asyncio
+    from sim.sdcard import SDCard
+    from sim.vfs import mount
+
+    SIMULATED = True
+
+Pin = machine.Pin
+I2C = machine.I2C
+UART = machine.UART
+SPI = machine.SPI
+Timer = machine.Timer
@@ -1,14 +1,108 @@
-import time
-import socket
-import network
 import os
-from machine import Pin, I2C, UART, SPI
-from bmp280 import BMP280
+import time
+from hal import Pin, I2C, UART, SPI, Timer, SDCard, mount, network, asyncio, _thread
+import micropython
+import gc
+from array import array
+from micropython import const
+from bmp280 import BMP280, MODE_NORMAL, OSAMPLE_1, OSAMPLE_4, IIR_4, STANDBY_0_5
+from mpu6050 import MPU6050, values as mpu_values
+from attitude import Attitude, angles as attitude_angles
+from altitude import AltitudeFilter, SEA_LEVEL_PA, standard_height
+from fastmath import HeightTable, Compensator
+from flightphase import FlightPhase, NAMES as PHASE_NAMES, LANDED
+from capture import Capture, REASONS as CAPTURE_REASONS, TRIGGER_ACCEL, TRIGGER_PRESSURE, TRIGGER_MANUAL
+from micropython_tinygpsplus import TinyGPSPlus
+import ublox
+import binlog
+from sdlogger import SDLogger
+from rawlog import RawLog, find_file
+from scheduler import Scheduler
+from metrics import Histogram
+import metrics
+from spsc import Ring
 
 # ============= CONFIGURATION =============
 WIFI_SSID = "CANSAT_LIVE"
 WIFI_PASSWORD = "12345678"
-LOG_INTERVAL = 1  # seconds between logs
+LOG_INTERVAL = 0.1  # seconds between CSV logs in flight (see PHASE_SLOWDOWN)
+LOG_FORMAT = "csv"  # "csv", "binary" (32-byte record per IMU sample, decode with tools/decode_log.py)
+                    # or "raw" (binary records streamed into the sectors of RAW_LOG_FILE, bypassing FAT)
+RAW_LOG_FILE = "CANSAT.RAW"  # preallocated with tools/prep_card.py, extract with tools/extract_raw.py
+LOG_RING_BYTES = 8192  # RAM buffer between the loop and the SD card
+LOG_FLUSH_BYTES = 2048  # write once this much is buffered (whole 512-byte sectors only)
+LOG_MAX_AGE_MS = 1000  # ...or once the oldest buffered byte is this old
+LOG_SYNC_MS = 5000  # commit file size/FAT this often
+# Each sensor and the logger run as their own task at these periods
+GPS_PERIOD_MS = 50
+GPS_MAX_BYTES = 1024  # most UART bytes parsed per GPS tick, bounds its run time
+GPS_BAUD = 115200  # negotiated at boot from the receiver's 9600 default
+GPS_RATE_HZ = 10  # navigation rate; lowered if the receiver or baud rate cannot keep up
+GPS_NAV_PVT = False  # True: binary UBX NAV-PVT instead of NMEA GGA + RMC (u-blox M8 and later)
+GPS_RXBUF = 2048  # UART receive buffer, ~180 ms of a saturated 115200 baud line
+BMP_PERIOD_MS = 20
+IMU_PERIOD_MS = 10  # polled mode; the FIFO is drained at half its fill time instead
+LOG_PERIOD_MS = 20
+SCHED_REPORT_S = 10  # print task rates, lateness and load this often (0 = never)
+SCHED_ALLOC_STATS = False  # also each task's heap allocation per run (gc.mem_alloc walks the heap, twice a run)
+GC_PERIOD_MS = 1000  # collect garbage in a task of its own this often (0 = whenever MicroPython decides)
+METRICS = True  # time every task run and HTTP request into histograms, served with error counters on /metrics
+METRICS_LOG_S = 30  # summarise run times and errors into the SD log this often (0 = never)
+HTTP_PORT = 80
+HTTP_BACKLOG = 4  # connections waiting to be accepted
+HTTP_MAX_CLIENTS = 4  # connections served at the same time, more are closed at once
+HTTP_TIMEOUT_S = 5  # give up on a client that stalls this long
+HTTP_CHUNK = 1024  # response bytes handed to the socket per drain
+STREAM_HZ = 10  # telemetry frames per second pushed on /api/stream
+STREAM_MAX_CLIENTS = 8  # open streams, on top of HTTP_MAX_CLIENTS
+STREAM_STALL_S = 2  # a subscriber that cannot take one frame in this long is dropped
+WEB_ROOT = "www"  # dashboard page on flash (upload www/index.html.gz)
+DASHBOARD_MAX_AGE_S = 3600  # browsers reuse the cached page this long, then revalidate by ETag
+IMU_FIFO_HZ = 0  # 0 = poll the MPU6050 each loop; 4..1000 = sample into its FIFO at this rate
+ATT_BETA = 0.1  # attitude filter gain (rad/s): higher trusts the accelerometer sooner
+GROUND_PRESSURE_HPA = 0  # launch site pressure for altitude above ground; 0 = average the first second at boot
+SEA_LEVEL_HPA = 1013.25  # reference for Altitude_BMP; the local QNH makes it height above sea level
+FAST_MATH = True  # table lookup for pressure altitude and float BMP280 compensation (fastmath.py)
+ALT_ACCEL_NOISE = 0.5  # altitude filter: vertical acceleration noise (m/s²)
+ALT_BARO_NOISE = 0.1  # altitude filter: barometric altitude noise (m), about the BMP280's at x4 oversampling and IIR x4
+ALT_CLIP_NOISE = 100.0  # altitude filter: acceleration noise while the accelerometer clips (m/s²)
+# Each flight phase (flightphase.py) runs the tasks this many times slower than the periods
+# above (the IMU and baro sampler too, outside "tasks" mode; the GPS navigation rate follows).
+# Columns: gps, baro, imu, csv, stream
+PHASE_SLOWDOWN = (
+    (5, 5, 5, 10, 5),  # pad: just fast enough to see the launch
+    (1, 1, 1, 1, 1),  # ascent
+    (1, 1, 1, 1, 1),  # apogee
+    (1, 1, 1, 1, 1),  # descent
+    (20, 50, 100, 10, 10),  # landed: a 1 Hz GPS beacon for recovery
+)
+PHASE_WIFI_POWERSAVE = (True, False, False, False, True)
+PHASE_RATES = True  # False: flight rates in every phase
+PHASE_PERIOD_MS = 50  # flight phase detection
+# Burst capture: every sample goes into a RAM ring; a trigger freezes the samples around it
+# and writes them to burst_NNN.bin on the SD card in the background (decode with tools/decode_log.py).
+# Until landing the IMU and baro then keep their full rate and the IMU column of
+# PHASE_SLOWDOWN thins out the binary log instead
+CAPTURE_PRE_S = 1.0  # seconds kept from before the trigger (0 = no burst capture)
+CAPTURE_POST_S = 2.0  # seconds taken after it
+CAPTURE_ACCEL_G = 1.8  # trigger: acceleration magnitude above this (0 = off)
+CAPTURE_DPDT_PA_S = 300  # trigger: pressure changing faster than this, about 25 m/s (0 = off)
+CAPTURE_MAX_FILES = 16  # stop capturing after this many bursts
+CAPTURE_CHUNK = 2048  # burst bytes written to the card per capture task run
+CAPTURE_PERIOD_MS = 20
+# Who samples the IMU and baro: "tasks" (scheduler tasks on core 0), "core1" (a _thread on
+# the second core), "timer" (machine.Timer IRQ) or "drdy" (MPU6050 INT pin IRQ). All but
+# "tasks" capture raw samples into a ring that a core 0 task drains into the log.
+ACQ_MODE = "tasks"
+ACQ_HZ = 200  # IMU sample rate outside "tasks" mode (the baro is read every BMP_PERIOD_MS)
+ACQ_RING_SLOTS = 64  # 32-byte samples buffered for core 0 (power of two)
+IMU_INT_PIN = 2  # GP2 <- MPU6050 INT, for ACQ_MODE = "drdy"
+# BMP280: x1 temperature / x4 pressure oversampling, IIR x4, 0.5 ms standby -> new sample every ~14 ms
+BMP_MODE = MODE_NORMAL  # MODE_FORCED converts only when read
+BMP_OSRS_T = OSAMPLE_1
+BMP_OSRS_P = OSAMPLE_4
+BMP_IIR = IIR_4
+BMP_STANDBY = STANDBY_0_5
 
 # ============= TIMER =============
 start_time = time.ticks_ms()
@@ -16,436 +110,1284 @@ start_time = time.ticks_ms()
 def mission_time():
     return time.ticks_diff(time.ticks_ms(), start_time) / 1000
 
+# ============= DATA STORAGE =============
+# The newest value of every field in one preallocated record: the sensor tasks
+# overwrite it in place, the log line and the telemetry are rendered from it
+F_TIME = const(0)  # mission time (s)
+F_TEMPERATURE = const(1)  # °C
+F_PRESSURE = const(2)  # hPa
+F_ALT_BMP = const(3)  # m, against SEA_LEVEL_HPA
+F_ALTITUDE = const(4)  # m above the launch site
+F_VSPEED = const(5)  # m/s
+F_APOGEE = const(6)  # m above the launch site
+F_AX = const(7)  # ax, ay, az (g), gx, gy, gz (°/s)
+F_ROLL = const(13)  # roll, pitch, yaw (°)
+F_COUNT = const(16)
+sensor_data = array('f', bytes(4 * F_COUNT))
+# Every update of sensor_data is numbered and stamped with the ticks_us its reading
+# was taken at; log lines and telemetry carry both, so the age of what is shown can be told
+data_seq = 0
+data_ticks = 0
+
 # ============= I2C SETUP =============
-i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=400000)
+i2c = None
+
+def init_i2c():
+    global i2c
+    i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=400000)
 
 # ============= BMP280 SENSOR =============
-try:
-    bmp = BMP280(i2c, addr=0x76)
-    bmp_available = True
-    print("✓ BMP280 initialized")
-except Exception as e:
-    bmp_available = False
-    print("✗ BMP280 not found:", e)
+bmp = None
+bmp_available = False
+baro_fresh = False  # a reading was taken since the last binary log record
+capture_baro = False  # ...since the last capture record
+baro_ticks = 0
+baro = array('f', (0.0, 0.0))  # temperature (°C), pressure (Pa) of the newest reading
+baro_comp = None
+bmp_errors = 0  # failed I2C reads
+baro_height = HeightTable() if FAST_MATH else standard_height
+# Altitude_BMP = 44330 * (1 - (p / SEA_LEVEL_HPA) ** 0.1903), from the standard-atmosphere height
+qnh_scale = (SEA_LEVEL_PA / (SEA_LEVEL_HPA * 100)) ** 0.1903
+# The ground is averaged over the first second; enter_phase sets the sample count for the
+# baro rate the pad actually runs at
+alt = AltitudeFilter(GROUND_PRESSURE_HPA * 100, 1000 // BMP_PERIOD_MS,
+                     ALT_ACCEL_NOISE, baro_noise=ALT_BARO_NOISE, clip_noise=ALT_CLIP_NOISE, height=baro_height)
+
+def init_bmp280():
+    global bmp, bmp_available, baro_comp
+    try:
+        bmp = BMP280(i2c, addr=0x76, osrs_t=BMP_OSRS_T, osrs_p=BMP_OSRS_P,
+                     mode=BMP_MODE, iir=BMP_IIR, standby=BMP_STANDBY)
+        # Float compensation instead of the driver's long-int arithmetic
+        baro_comp = Compensator(bmp.calibration) if FAST_MATH else None
+        bmp_available = True
+        print("✓ BMP280 initialized")
+        print(f"✓ BMP280 sample period: {bmp.sample_period_us() / 1000:.1f} ms")
+    except Exception as e:
+        bmp_available = False
+        print("✗ BMP280 not found:", e)
+
+def read_bmp280():
+    global baro_fresh, capture_baro, bmp_errors
+    if not bmp_available:
+        return
+    try:
+        # Temperature and pressure from one burst read
+        if bmp.mode != MODE_NORMAL:
+            time.sleep_us(bmp.force())
+            while bmp.measuring():
+                pass
+        convert_baro(bmp.read_raw())
+        update_altitude(baro[1], time.ticks_us())
+        store_baro()
+        baro_fresh = capture_baro = True
+    except Exception as e:
+        bmp_errors += 1
+        print("BMP280 error:", e)
+
+def convert_baro(b, o=0):
+    # Raw block at b[o:o + 6] into `baro`
+    if baro_comp:
+        baro_comp.convert(b, baro, o)
+    else:
+        baro[0], baro[1] = bmp.convert(b, o)
+
+def update_altitude(pressure, ticks):
+    # One reading into the altitude filter; the IMU predicts between readings,
+    # without it the filter coasts at constant speed
+    global baro_ticks
+    dt = time.ticks_diff(ticks, baro_ticks) * 1e-6
+    if not mpu_available:
+        alt.predict(0.0, dt)
+    if capture_armed:
+        check_pressure_rate(pressure, dt)
+    baro_ticks = ticks
+    alt.baro(pressure)
+
+def store_baro():
+    global data_seq, data_ticks
+    data_seq += 1
+    data_ticks = baro_ticks
+    pressure = baro[1]
+    sensor_data[F_TEMPERATURE] = baro[0]
+    sensor_data[F_PRESSURE] = pressure / 100  # Convert to hPa
+    sensor_data[F_ALT_BMP] = 44330 - (44330 - baro_height(pressure)) * qnh_scale
+    sensor_data[F_ALTITUDE] = alt.x[0]
+    sensor_data[F_VSPEED] = alt.x[1]
+    sensor_data[F_APOGEE] = alt.apogee
 
 # ============= MPU6050 SENSOR =============
 MPU_ADDR = 0x68
+mpu = None
 mpu_available = False
+mpu_errors = 0  # failed I2C reads
+imu = mpu_values()  # ax, ay, az (g), gx, gy, gz (°/s)
+imu_samples = 0
+imu_ticks = 0  # ticks_us of the newest sample
+imu_clip = 2.0  # g; beyond this the accelerometer is at the end of its range
+att = Attitude(ATT_BETA)
+att_aligned = False
+att_angles = attitude_angles()  # roll, pitch, yaw (°)
 
-try:
-    i2c.writeto_mem(MPU_ADDR, 0x6B, b'\x00')  # Wake up MPU6050
-    time.sleep_ms(100)
-    mpu_available = True
-    print("✓ MPU6050 initialized")
-except Exception as e:
-    print("✗ MPU6050 not found:", e)
+def init_mpu6050():
+    global mpu, mpu_available, imu_clip
+    try:
+        # ±2g range (16384 LSB/g), ±250°/s range (131 LSB/°/s)
+        mpu = MPU6050(i2c, addr=MPU_ADDR)
+        imu_clip = 32000 * mpu.accel_scale
+        if IMU_FIFO_HZ:
+            mpu.start_fifo(IMU_FIFO_HZ)
+        mpu_available = True
+        print("✓ MPU6050 initialized")
+        if IMU_FIFO_HZ:
+            print(f"✓ MPU6050 FIFO at {mpu.fifo_rate} Hz")
+    except Exception as e:
+        print("✗ MPU6050 not found:", e)
 
 def read_mpu6050():
+    # Every sample goes through the attitude filter, the latest ends up in `imu`;
+    # returns how many samples were read
+    global imu_samples, imu_ticks, mpu_errors
     if not mpu_available:
-        return None, None, None, None, None, None
-    
+        return 0
+
     try:
-        # Read accelerometer (registers 0x3B to 0x40)
-        accel_data = i2c.readfrom_mem(MPU_ADDR, 0x3B, 6)
-        # Read gyroscope (registers 0x43 to 0x48)
-        gyro_data = i2c.readfrom_mem(MPU_ADDR, 0x43, 6)
-        
-        def convert(high, low):
-            value = (high << 8) | low
-            return value - 65536 if value > 32767 else value
-        
-        # Accelerometer (±2g range, sensitivity 16384 LSB/g)
-        ax = convert(accel_data[0], accel_data[1]) / 16384.0
-        ay = convert(accel_data[2], accel_data[3]) / 16384.0
-        az = convert(accel_data[4], accel_data[5]) / 16384.0
-        
-        # Gyroscope (±250°/s range, sensitivity 131 LSB/°/s)
-        gx = convert(gyro_data[0], gyro_data[1]) / 131.0
-        gy = convert(gyro_data[2], gyro_data[3]) / 131.0
-        gz = convert(gyro_data[4], gyro_data[5]) / 131.0
-        
-        return ax, ay, az, gx, gy, gz
+        if not IMU_FIFO_HZ:
+            mpu.read(imu)
+            now = time.ticks_us()
+            fuse_imu(time.ticks_diff(now, imu_ticks))
+            imu_ticks = now
+            imu_samples += 1
+            if bin_logging or capture:
+                log_sensor_record(now, binlog.FLAG_IMU, mpu.buf)
+            return 1
+
+        # Drain whole batches until the FIFO is (nearly) empty
+        total = 0
+        period = mpu.sample_period_us
+        while True:
+            n = mpu.drain()
+            if n:
+                # Samples are evenly spaced; the newest one is "now"
+                now = time.ticks_us()
+                for i in range(n):
+                    mpu.fifo_sample(i, imu)
+                    fuse_imu(period)
+                    if bin_logging or capture:
+                        mpu.fifo_raw(i, imu_raw)
+                        t = time.ticks_add(now, -(n - 1 - i) * period)
+                        log_sensor_record(t, binlog.FLAG_IMU | binlog.FLAG_IMU_FIFO, imu_raw)
+                imu_ticks = now
+                total += n
+            if n < mpu.batch:
+                break
+        imu_samples += total
+        return total
     except Exception as e:
+        mpu_errors += 1
         print("MPU6050 read error:", e)
-        return None, None, None, None, None, None
+        return 0
+
+def update_mpu6050():
+    if read_mpu6050():
+        store_imu(imu_ticks)
+
+def fuse_imu(dt_us):
+    # The sample in `imu` was taken dt_us after the previous one: attitude first,
+    # then the altitude filter predicts with the vertical acceleration.  The first
+    # sample only levels the attitude
+    global att_aligned
+    if att_aligned:
+        dt = dt_us * 1e-6
+        att.update(imu, dt)
+        a = imu_clip
+        alt.predict(att.vertical(imu), dt, abs(imu[0]) > a or abs(imu[1]) > a or abs(imu[2]) > a)
+        if capture_armed:
+            check_accel()
+    else:
+        att.align(imu)
+        att_aligned = True
+
+def store_imu(ticks):
+    global data_seq, data_ticks
+    data_seq += 1
+    data_ticks = ticks
+    # Array to array slices copy without boxing a float
+    sensor_data[F_AX:F_AX + 6] = imu
+    att.euler(att_angles)
+    sensor_data[F_ROLL:F_ROLL + 3] = att_angles
 
 # ============= GPS SETUP =============
-gps_uart = UART(1, baudrate=9600, tx=Pin(4), rx=Pin(5))
-gps_data = {
-    'latitude': 'N/A',
-    'longitude': 'N/A',
-    'altitude': 'N/A',
-    'satellites': '0'
-}
+gps_uart = None
+gps = TinyGPSPlus()
+gps_rx = bytearray(128)
+gps_rate = 0  # navigation rate set at boot, 0 if the receiver does not answer UBX
+gps_fix = array('i', (0, 0, 0, 0))  # newest fix: latitude, longitude (degrees * 1e7), altitude (cm), satellites
+gps_valid = False  # there has been a fix
+G_LAT = const(0)
+G_LON = const(1)
+G_ALT = const(2)
+G_SATS = const(3)
+
+def init_gps():
+    global gps_uart, gps_rate
+    gps_uart = UART(1, baudrate=ublox.DEFAULT_BAUD, tx=Pin(4), rx=Pin(5), rxbuf=GPS_RXBUF)
+    baud, rate, nav_pvt = ublox.configure(gps_uart, GPS_BAUD, GPS_RATE_HZ, GPS_NAV_PVT)
+    gps_rate = rate if baud else 0
+    if baud:
+        print("✓ GPS: %d baud, %d Hz, %s" % (baud, rate, "UBX NAV-PVT" if nav_pvt else "NMEA"))
+    else:
+        print("✗ GPS not answering UBX, staying at 9600 baud NMEA")
+
+def gps_coord(e7):
+    # Degrees * 1e7 as "%.6f" prints them, without the float (single precision on the Pico)
+    if not gps_valid:
+        return "N/A"
+    a = (abs(e7) + 5) // 10
+    return "%s%d.%06d" % ("-" if e7 < 0 and a else "", a // 1000000, a % 1000000)
+
+def gps_altitude():
+    return "%.1f" % (gps_fix[G_ALT] / 100) if gps_valid else "N/A"
+
+def set_gps_rate(slowdown):
+    # Fire and forget: never above the rate the receiver accepted at boot
+    if gps_rate:
+        gps_uart.write(ublox.cfg_rate(max(1, gps_rate // slowdown)))
 
 def read_gps():
-    if gps_uart.any():
-        try:
-            line = gps_uart.readline()
-            sentence = line.decode("ascii", errors="ignore").strip()
-            
-            if sentence.startswith("$GPGGA") or sentence.startswith("$GNGGA"):
-                parts = sentence.split(",")
-                if len(parts) > 9 and parts[6] != "0":
-                    gps_data['latitude'] = parts[2] + parts[3]
-                    gps_data['longitude'] = parts[4] + parts[5]
-                    gps_data['altitude'] = parts[9]
-                    gps_data['satellites'] = parts[7]
-        except:
-            pass
+    # Drain everything the UART has into the parser, up to GPS_MAX_BYTES per tick
+    global gps_valid
+    budget = GPS_MAX_BYTES
+    while budget > 0 and gps_uart.any():
+        n = gps_uart.readinto(gps_rx)
+        if not n:
+            break
+        gps.feed(gps_rx, n)
+        budget -= n
+
+    location = gps.location
+    if location.updated:
+        location.updated = False
+        # Kept as integers, turned into text only when a line or frame is rendered
+        gps_fix[G_LAT] = location.lat_e7()
+        gps_fix[G_LON] = location.lng_e7()
+        gps_fix[G_ALT] = gps.altitude.value
+        gps_fix[G_SATS] = gps.satellites.value
+        gps_valid = True
+        if bin_logging:
+            log_gps_record()
 
 # ============= SD CARD SETUP =============
 sd_available = False
-log_file = None
-
-try:
-    from sdcard import SDCard
-    
-    # SPI setup for SD card (adjust pins as needed)
-    spi = SPI(0, baudrate=1000000, polarity=0, phase=0, 
-              sck=Pin(18), mosi=Pin(19), miso=Pin(16))
-    cs = Pin(17, Pin.OUT)
-    
-    sd = SDCard(spi, cs)
-    os.mount(sd, '/sd')
-    
-    # Create log file with timestamp
-    log_filename = '/sd/cansat_log.csv'
-    
-    # Check if file exists, if not create with headers
+sd_root = None
+log_filename = None
+sd_log = None
+
+def init_sd():
+    global sd_available, sd_root, log_filename, sd_log
     try:
-        with open(log_filename, 'r') as f:
-            pass
-    except:
-        with open(log_filename, 'w') as f:
-            f.write("Time(s),Temp(C),Pressure(hPa),Altitude_BMP(m),Accel_X(g),Accel_Y(g),Accel_Z(g),Gyro_X(deg/s),Gyro_Y(deg/s),Gyro_Z(deg/s),GPS_Lat,GPS_Lon,GPS_Alt(m),Satellites\n")
-    
-    sd_available = True
-    print("✓ SD card initialized")
-    print(f"✓ Logging to: {log_filename}")
-    
-except Exception as e:
-    print("✗ SD card not available:", e)
-    print("  Continuing without SD logging...")
+        if SDCard is None:
+            raise ImportError("sdcard driver missing")
+        
+        # SPI setup for SD card (adjust pins as needed)
+        spi = SPI(0, baudrate=1000000, polarity=0, phase=0, 
+                  sck=Pin(18), mosi=Pin(19), miso=Pin(16))
+        cs = Pin(17, Pin.OUT)
+        
+        sd = SDCard(spi, cs)
+        sd_root = mount(sd, '/sd')
+        
+        if LOG_FORMAT == "raw":
+            init_raw_log(sd)
+        else:
+            if LOG_FORMAT == "binary":
+                init_binary_log(sd_root)
+            else:
+                # Create log file with timestamp
+                log_filename = sd_root + '/cansat_log.csv'
+                
+                # Append to the log of earlier boots if it has the same columns;
+                # one written by another version moves aside to cansat_log_old_NNN.csv
+                try:
+                    with open(log_filename, 'r') as f:
+                        header = f.readline().rstrip()
+                except OSError:
+                    header = None
+                if header and header != CSV_HEADER:
+                    old = free_filename(sd_root + '/cansat_log_old_%03d.csv')
+                    os.rename(log_filename, old)
+                    print(f"✓ Old log with other columns moved to {old}")
+                if header != CSV_HEADER:
+                    with open(log_filename, 'w') as f:
+                        f.write(CSV_HEADER + "\n")
+            
+            # Keep the file open and write whole sectors from a RAM ring
+            sd_log = SDLogger(log_filename, LOG_RING_BYTES, LOG_FLUSH_BYTES, LOG_MAX_AGE_MS, LOG_SYNC_MS)
+        sd_available = True
+        print("✓ SD card initialized")
+        print(f"✓ Logging to: {log_filename}")
+        
+    except Exception as e:
+        print("✗ SD card not available:", e)
+        print("  Continuing without SD logging...")
 
 def log_to_sd(data):
+    # A line that finds the buffer full is counted in sd_log.dropped (sd_report)
     if not sd_available:
         return
-    
-    try:
-        with open('/sd/cansat_log.csv', 'a') as f:
-            f.write(data + '\n')
-    except Exception as e:
-        print("SD write error:", e)
+    sd_log.write(data.encode())
+
+sd_reported = 0  # sd_log.dropped at the last status report
+
+def sd_report():
+    # Lines and records dropped with the log buffer full since the last report, or None
+    global sd_reported
+    if not sd_available or sd_log.dropped == sd_reported:
+        return None
+    n = sd_log.dropped - sd_reported
+    sd_reported = sd_log.dropped
+    return "SD log buffer full: %d dropped since the last report, %d in all" % (n, sd_reported)
+
+# ============= BINARY LOG =============
+bin_logging = False
+bin_seq = 0
+log_every = 1  # log one sensor record in this many
+log_skip = 0
+imu_raw = bytearray(14)
+NO_SAMPLE = bytes(14)
+NO_BARO = bytes(6)
+
+def init_binary_log(sd_root):
+    # ticks_us restarts at boot, so every boot gets its own numbered file
+    global log_filename, bin_logging
+    log_filename = free_filename(sd_root + '/cansat_log_%03d.bin')
+    with open(log_filename, 'wb') as f:
+        f.write(binary_log_header())
+    bin_logging = True
+
+def free_filename(pattern):
+    n = 0
+    while True:
+        name = pattern % n
+        try:
+            with open(name, 'r') as f:
+                pass
+            n += 1
+        except OSError:
+            return name
+
+def init_raw_log(sd):
+    # Same records as the binary log, written straight into the file's sectors
+    global log_filename, bin_logging, sd_log
+    start, sectors = find_file(sd, RAW_LOG_FILE)
+    sd_log = RawLog(sd, start, sectors, LOG_RING_BYTES // 512, LOG_FLUSH_BYTES // 512, LOG_MAX_AGE_MS)
+    sd_log.write_header(binary_log_header())
+    log_filename = "%s session %d (sector %d)" % (RAW_LOG_FILE, sd_log.session, start + sd_log.block)
+    bin_logging = True
+
+def binary_log_header():
+    calibration = bmp.calibration if bmp_available else None
+    accel_lsb = 1 / mpu.accel_scale if mpu_available else 16384.0
+    gyro_lsb = 1 / mpu.gyro_scale if mpu_available else 131.0
+    return binlog.header(calibration, accel_lsb, gyro_lsb)
+
+def log_sensor_record(ticks_us, flags, raw):
+    # Records are packed straight into the capture ring and, every log_every-th
+    # sample, into the logger's ring buffer
+    global bin_seq, baro_fresh, capture_baro, capture_seq, log_skip
+    baro = bmp.buf if bmp_available else NO_BARO
+    if capture:
+        offset = capture.reserve()
+        if offset >= 0:
+            binlog.pack_sensor(capture.buf, offset, capture_seq, ticks_us,
+                               flags | binlog.FLAG_BARO if capture_baro else flags, baro, raw)
+            capture_seq += 1
+        capture_baro = False
+    if not bin_logging:
+        return
+    log_skip += 1
+    if log_skip < log_every:
+        return
+    log_skip = 0
+    if baro_fresh:
+        flags |= binlog.FLAG_BARO
+        baro_fresh = False
+    offset = sd_log.reserve(binlog.RECORD_SIZE)
+    if offset >= 0:
+        binlog.pack_sensor(sd_log.ring, offset, bin_seq, ticks_us, flags, baro, raw)
+    bin_seq += 1
+
+def log_gps_record():
+    global bin_seq
+    offset = sd_log.reserve(binlog.RECORD_SIZE)
+    if offset >= 0:
+        binlog.pack_gps(sd_log.ring, offset, bin_seq, time.ticks_us(),
+                        gps.fix_quality, gps.satellites.value,
+                        gps.location.lat_e7(), gps.location.lng_e7(), gps.altitude.value,
+                        gps.speed.cms(), gps.course.value, min(255, gps.hdop.value // 10))
+    bin_seq += 1
+
+def log_event(kind, value, accel):
+    global bin_seq
+    offset = sd_log.reserve(binlog.RECORD_SIZE)
+    if offset >= 0:
+        pack_event(sd_log.ring, offset, bin_seq, kind, value, accel)
+    bin_seq += 1
+
+def pack_event(buf, offset, seq, kind, value, accel):
+    # An event with the altitude filter's state and the acceleration (g) at that moment
+    binlog.pack_event(buf, offset, seq, time.ticks_us(), kind, value,
+                      int(alt.x[0] * 100), int(alt.x[1] * 100), int(alt.apogee * 100), int(accel * 1000))
+
+# ============= BURST CAPTURE =============
+capture = None
+capture_armed = False  # the triggers are watched (until landing)
+capture_seq = 0
+capture_accel_high = False
+capture_pressure = 0.0
+capture_dpdt = 0.0  # low-passed pressure rate (Pa/s)
+capture_dpdt_high = False
+capture_file = None
+capture_pos = 0  # records of the frozen window written so far
+capture_files = 0
+
+def init_capture():
+    global capture
+    if not CAPTURE_PRE_S or not sd_available:
+        return
+    # One record per IMU sample, or per baro reading without the IMU
+    if ACQ_MODE != "tasks":
+        rate = ACQ_HZ
+    elif mpu_available:
+        rate = mpu.fifo_rate if IMU_FIFO_HZ else 1000 // IMU_PERIOD_MS
+    else:
+        rate = 1000 // BMP_PERIOD_MS
+    post = int(CAPTURE_POST_S * rate)
+    capture = Capture(int(CAPTURE_PRE_S * rate) + post, post, binlog.RECORD_SIZE)
+    print(f"✓ Burst capture: {CAPTURE_PRE_S:g} s + {CAPTURE_POST_S:g} s at {rate} Hz ({len(capture.buf)} bytes)")
+
+# Both triggers fire when their threshold is crossed and wait until the value
+# is back half way to normal before they can fire again
+
+def check_accel():
+    global capture_accel_high
+    if not CAPTURE_ACCEL_G:
+        return
+    g2 = imu[0] * imu[0] + imu[1] * imu[1] + imu[2] * imu[2]
+    if capture_accel_high:
+        low = 0.5 + 0.5 * CAPTURE_ACCEL_G
+        capture_accel_high = g2 > low * low
+    elif g2 > CAPTURE_ACCEL_G * CAPTURE_ACCEL_G:
+        capture_accel_high = True
+        trigger_capture(TRIGGER_ACCEL)
+
+def check_pressure_rate(pressure, dt):
+    # Low-passed, so the noise of single readings does not count
+    global capture_pressure, capture_dpdt, capture_dpdt_high
+    if CAPTURE_DPDT_PA_S and capture_pressure and dt > 0:
+        capture_dpdt += ((pressure - capture_pressure) / dt - capture_dpdt) * 0.2
+        rate = abs(capture_dpdt)
+        if capture_dpdt_high:
+            capture_dpdt_high = rate > 0.5 * CAPTURE_DPDT_PA_S
+        elif rate > CAPTURE_DPDT_PA_S:
+            capture_dpdt_high = True
+            trigger_capture(TRIGGER_PRESSURE)
+    capture_pressure = pressure
+
+def trigger_capture(reason):
+    # The trigger goes into the window, and the flight log, as an event record
+    global capture_seq
+    if capture_files >= CAPTURE_MAX_FILES or not capture.trigger(reason):
+        return False
+    accel = accel_g()
+    offset = capture.reserve()
+    if offset >= 0:
+        pack_event(capture.buf, offset, capture_seq, binlog.EVENT_TRIGGER, reason, accel)
+        capture_seq += 1
+    if bin_logging:
+        log_event(binlog.EVENT_TRIGGER, reason, accel)
+    print(f"✓ Capture triggered ({CAPTURE_REASONS[reason]}) at {mission_time():.1f}s")
+    return True
+
+def write_capture():
+    # In the background: a frozen window goes to its own file a chunk per run,
+    # then the ring starts over
+    global capture_file, capture_pos, capture_files
+    if not capture.frozen:
+        return
+    if capture_file is None:
+        name = free_filename(sd_root + '/burst_%03d.bin')
+        capture_file = open(name, 'wb')
+        capture_file.write(binary_log_header())
+        capture_pos = 0
+        print(f"✓ Writing burst to {name}")
+        return
+    chunk = capture.span(capture_pos, CAPTURE_CHUNK // binlog.RECORD_SIZE)
+    capture_file.write(chunk)
+    capture_pos += len(chunk) // binlog.RECORD_SIZE
+    if capture_pos < capture.count:
+        return
+    capture_file.close()
+    capture_file = None
+    capture_files += 1
+    print(f"✓ Burst {capture_files} written: {capture.count} records ({CAPTURE_REASONS[capture.reason]})")
+    capture.rearm()
+
+# ============= ACQUISITION =============
+# With ACQ_MODE other than "tasks" the sampler owns the I2C bus: core 1 or an
+# IRQ writes raw samples into acq_ring, a core 0 task drains it
+acq_ring = None
+acq_running = False
+acq_stop = False
+acq_timer = None
+acq_pin = None
+acq_seq = 0  # producer: samples taken (including ones the full ring dropped)
+acq_baro_every = 1  # producer: read the baro on every n-th sample
+acq_period_us = 5000  # core 1: sample period
+acq_overruns = 0  # producer: sample periods missed entirely
+acq_busy_max_us = 0  # producer: longest time from the sample instant to the packed record
+acq_stamp = 0  # ticks_us of the pending IRQ
+acq_pending = False  # an IRQ's bus read is scheduled but has not run yet
+acq_next_seq = 0  # core 0: sequence number expected next
+acq_gaps = 0  # core 0: samples missing from the sequence
+acq_torn = 0  # core 0: slots whose two copies of seq disagree
+acq_last_stamp = 0  # core 0: ticks_us of the last sample drained
+acq_baro = bytearray(6)  # core 0: baro reading of a record left out of the log
+acq_baro_pending = False
+
+def start_acquisition():
+    global acq_ring, acq_stop, acq_seq, acq_baro_every, acq_overruns, acq_busy_max_us
+    global acq_pending, acq_next_seq, acq_gaps, acq_torn, acq_timer, acq_pin, acq_running
+    acq_ring = Ring(ACQ_RING_SLOTS, binlog.RECORD_SIZE)
+    acq_stop = acq_pending = False
+    acq_seq = acq_overruns = acq_busy_max_us = 0
+    acq_next_seq = acq_gaps = acq_torn = 0
+    micropython.alloc_emergency_exception_buf(100)
+    if ACQ_MODE == "core1":
+        rate = set_acq_rate(ACQ_HZ, BMP_PERIOD_MS)
+        _thread.start_new_thread(acquire, ())
+        print(f"✓ Sampling on core 1 at {rate} Hz")
+        return
+    if ACQ_MODE == "timer":
+        acq_timer = Timer()
+    else:
+        acq_pin = Pin(IMU_INT_PIN, Pin.IN)
+        acq_pin.irq(acq_irq, Pin.IRQ_RISING, hard=True)
+    rate = set_acq_rate(ACQ_HZ, BMP_PERIOD_MS)
+    acq_running = True
+    if ACQ_MODE == "timer":
+        print(f"✓ Sampling from a timer IRQ at {rate} Hz")
+    else:
+        print(f"✓ Sampling on MPU6050 data-ready (GP{IMU_INT_PIN}) at {rate} Hz")
+
+def set_acq_rate(hz, baro_period_ms):
+    # Also while sampling; returns the rate actually set
+    global acq_baro_every, acq_period_us
+    hz = max(1, hz)
+    if ACQ_MODE == "drdy":
+        hz = mpu.enable_data_ready(hz)
+    elif ACQ_MODE == "timer":
+        acq_timer.init(mode=Timer.PERIODIC, freq=hz, callback=acq_irq, hard=True)
+    acq_period_us = 1000000 // hz
+    acq_baro_every = max(1, baro_period_ms * hz // 1000)
+    return hz
+
+def stop_acquisition():
+    global acq_stop, acq_running
+    if ACQ_MODE == "core1":
+        acq_stop = True
+        while acq_running:
+            time.sleep_ms(1)
+        return
+    if acq_timer:
+        acq_timer.deinit()
+    if acq_pin:
+        acq_pin.irq(None)
+        mpu.disable_data_ready()
+    acq_running = False
+
+def acq_sample(stamp):
+    # One sample into the next free ring slot; allocates nothing
+    global acq_seq, acq_busy_max_us
+    seq = acq_seq
+    if mpu_available:
+        mpu.read_raw()
+    flags = binlog.FLAG_IMU if mpu_available else 0
+    if bmp_available and seq % acq_baro_every == 0:
+        bmp.read_raw()
+        if bmp.mode != MODE_NORMAL:
+            bmp.force()
+        flags |= binlog.FLAG_BARO
+    offset = acq_ring.reserve()
+    if offset >= 0:
+        # seq again in the reserved word: core 0 checks both copies match
+        binlog.pack_sensor(acq_ring.buf, offset, seq, stamp, flags,
+                           bmp.buf if bmp_available else NO_BARO,
+                           mpu.buf if mpu_available else NO_SAMPLE, seq & 0xFFFF)
+        acq_ring.commit()
+    acq_seq = seq + 1
+    busy = time.ticks_diff(time.ticks_us(), stamp)
+    if busy > acq_busy_max_us:
+        acq_busy_max_us = busy
+
+def acq_irq(_):
+    # Hard IRQ (timer or data-ready pin): stamp the instant, leave the bus reads
+    # to the scheduler; must not allocate
+    global acq_stamp, acq_pending, acq_overruns
+    if acq_pending:
+        acq_overruns += 1
+        return
+    acq_stamp = time.ticks_us()
+    acq_pending = True
+    micropython.schedule(acq_scheduled, 0)
+
+def acq_scheduled(_):
+    global acq_pending
+    acq_sample(acq_stamp)
+    acq_pending = False
+
+def acquire():
+    # Runs on core 1 at fixed ticks_us deadlines
+    global acq_running, acq_overruns
+    acq_running = True
+    deadline = time.ticks_us()
+    while not acq_stop:
+        acq_sample(time.ticks_us())
+        period = acq_period_us
+        deadline = time.ticks_add(deadline, period)
+        delay = time.ticks_diff(deadline, time.ticks_us())
+        if delay > 0:
+            time.sleep_us(delay)
+        elif delay <= -period:
+            missed = -delay // period
+            acq_overruns += missed
+            deadline = time.ticks_add(deadline, missed * period)
+    acq_running = False
+
+def drain_samples():
+    # Core 0: move the sampler's records into the capture ring and the log, and
+    # keep the newest for telemetry
+    global acq_next_seq, acq_gaps, acq_torn, acq_last_stamp, imu_samples, bin_seq
+    global capture_seq, log_skip, acq_baro_pending
+    ring = acq_ring
+    n = ring.available()
+    if not n:
+        return
+    buf = ring.buf
+    fresh_baro = False
+    for i in range(n):
+        offset = ring.slot(i)
+        seq = buf[offset + 2] | buf[offset + 3] << 8
+        if seq != buf[offset + 28] | buf[offset + 29] << 8:
+            acq_torn += 1
+        if seq != acq_next_seq:
+            acq_gaps += (seq - acq_next_seq) & 0xFFFF
+        acq_next_seq = (seq + 1) & 0xFFFF
+        stamp = buf[offset + 4] | buf[offset + 5] << 8 | buf[offset + 6] << 16 | buf[offset + 7] << 24
+        if mpu_available:
+            mpu.convert(buf, imu, offset + 14)
+            fuse_imu(time.ticks_diff(stamp, acq_last_stamp))
+            acq_last_stamp = stamp
+        if buf[offset + 1] & binlog.FLAG_BARO:
+            convert_baro(buf, offset + 8)
+            update_altitude(baro[1], stamp)
+            fresh_baro = True
+        if capture:
+            dest = capture.reserve()
+            if dest >= 0:
+                copy_record(capture.buf, dest, ring.view(i), capture_seq)
+                capture_seq += 1
+        if not bin_logging:
+            continue
+        log_skip += 1
+        if log_skip < log_every:
+            # A skipped baro reading rides on the next record that is logged
+            if buf[offset + 1] & binlog.FLAG_BARO:
+                for k in range(6):
+                    acq_baro[k] = buf[offset + 8 + k]
+                acq_baro_pending = True
+            continue
+        log_skip = 0
+        dest = sd_log.reserve(binlog.RECORD_SIZE)
+        if dest >= 0:
+            log = sd_log.ring
+            copy_record(log, dest, ring.view(i), bin_seq)
+            if acq_baro_pending and not buf[offset + 1] & binlog.FLAG_BARO:
+                log[dest + 1] |= binlog.FLAG_BARO
+                log[dest + 8:dest + 14] = acq_baro
+        acq_baro_pending = False
+        bin_seq += 1
+    if mpu_available:
+        store_imu(acq_last_stamp)
+    if fresh_baro:
+        # `baro` holds the newest reading of the batch; an IMU-only batch leaves it be
+        store_baro()
+    ring.release(n)
+    imu_samples += n
+
+def copy_record(dest_buf, dest, record, seq):
+    # One sampler record renumbered into another ring, the consumer's check word cleared
+    dest_buf[dest:dest + binlog.RECORD_SIZE] = record
+    dest_buf[dest + 2] = seq & 0xFF
+    dest_buf[dest + 3] = seq >> 8 & 0xFF
+    dest_buf[dest + 28] = dest_buf[dest + 29] = 0
+
+def acquisition_report():
+    return "%s: %d samples, %d dropped (ring full), %d periods missed, worst %d us; core 0: %d gaps, %d torn" % (
+        ACQ_MODE, acq_seq, acq_ring.overflows, acq_overruns, acq_busy_max_us, acq_gaps, acq_torn)
+
+CSV_HEADER = "Time(s),Temp(C),Pressure(hPa),Altitude_BMP(m),Altitude_AGL(m),Vertical_Speed(m/s),Apogee_AGL(m),Accel_X(g),Accel_Y(g),Accel_Z(g),Gyro_X(deg/s),Gyro_Y(deg/s),Gyro_Z(deg/s),Roll(deg),Pitch(deg),Yaw(deg),GPS_Lat,GPS_Lon,GPS_Alt(m),Satellites,Phase,Seq,Sample_Ticks(us)"
+CSV_LINE = "%.1f,%.2f,%.2f,%.2f,%.2f,%.2f,%.1f,%.3f,%.3f,%.3f,%.2f,%.2f,%.2f,%.1f,%.1f,%.1f,%s,%s,%s,%d,%s,%d,%d\n"
+
+def format_log_line():
+    d = sensor_data
+    return CSV_LINE % (
+        d[F_TIME], d[F_TEMPERATURE], d[F_PRESSURE], d[F_ALT_BMP], d[F_ALTITUDE], d[F_VSPEED], d[F_APOGEE],
+        d[F_AX], d[F_AX + 1], d[F_AX + 2], d[F_AX + 3], d[F_AX + 4], d[F_AX + 5],
+        d[F_ROLL], d[F_ROLL + 1], d[F_ROLL + 2],
+        gps_coord(gps_fix[G_LAT]), gps_coord(gps_fix[G_LON]), gps_altitude(), gps_fix[G_SATS], phase.name,
+        data_seq, data_ticks)
 
 # ============= WIFI ACCESS POINT =============
-ap = network.WLAN(network.AP_IF)
-ap.active(True)
-ap.config(essid=WIFI_SSID, password=WIFI_PASSWORD)
-
-print("\n" + "="*40)
-print("Waiting for WiFi AP to start...")
-while not ap.active():
-    time.sleep(0.5)
-
-ip_address = ap.ifconfig()[0]
-print("="*40)
-print(f"✓ WiFi AP Active: {WIFI_SSID}")
-print(f"✓ Password: {WIFI_PASSWORD}")
-print(f"✓ IP Address: http://{ip_address}")
-print("="*40 + "\n")
+ap = None
+ip_address = None
+
+def init_wifi():
+    global ap, ip_address
+    ap = network.WLAN(network.AP_IF)
+    ap.active(True)
+    ap.config(essid=WIFI_SSID, password=WIFI_PASSWORD)
+
+    print("\n" + "="*40)
+    print("Waiting for WiFi AP to start...")
+    while not ap.active():
+        time.sleep(0.5)
+
+    ip_address = ap.ifconfig()[0]
+    print("="*40)
+    print(f"✓ WiFi AP Active: {WIFI_SSID}")
+    print(f"✓ Password: {WIFI_PASSWORD}")
+    print(f"✓ IP Address: http://{ip_address}")
+    print("="*40 + "\n")
 
 # ============= WEB SERVER =============
-addr = socket.getaddrinfo("0.0.0.0", 80)[0][-1]
-server = socket.socket()
-server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-server.bind(addr)
-server.listen(1)
-server.setblocking(False)
+TELEMETRY_JSON = ('{"time":%.1f,"temperature":%.2f,"pressure":%.2f,"altitude_bmp":%.2f,'
+                  '"altitude":%.2f,"vspeed":%.2f,"apogee":%.1f,"phase":"%s",'
+                  '"ax":%.3f,"ay":%.3f,"az":%.3f,"gx":%.2f,"gy":%.2f,"gz":%.2f,'
+                  '"roll":%.1f,"pitch":%.1f,"yaw":%.1f,'
+                  '"lat":"%s","lon":"%s","gps_alt":"%s","sats":"%d","gps_age":%d,"sd":%d,'
+                  '"frame":%d,"seq":%d,"ticks":%d,"sent":%d}')
+STREAM_FRAME = "data: " + TELEMETRY_JSON + "\n\n"
+CAPTURE_JSON = '{"triggered":%s,"armed":%s,"triggers":%d,"missed":%d,"bursts":%d}'
+CLOCK_JSON = '{"ticks":%d}'
+JSON_HEADERS = ("HTTP/1.1 200 OK\r\n"
+                "Content-Type: application/json\r\n"
+                "Content-Length: %d\r\n"
+                "Cache-Control: no-store\r\n"
+                "Connection: close\r\n\r\n")
+METRICS_HEADERS = ("HTTP/1.1 200 OK\r\n"
+                   "Content-Type: text/plain; version=0.0.4\r\n"
+                   "Content-Length: %d\r\n"
+                   "Cache-Control: no-store\r\n"
+                   "Connection: close\r\n\r\n")
+NOT_MODIFIED = "HTTP/1.1 304 Not Modified\r\nETag: %s\r\nConnection: close\r\n\r\n"
+POST_ONLY = b"HTTP/1.1 405 Method Not Allowed\r\nAllow: POST\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+NOT_FOUND = b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+BUSY = b"HTTP/1.1 503 Service Unavailable\r\nRetry-After: 5\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+SSE_HEADERS = (b"HTTP/1.1 200 OK\r\n"
+               b"Content-Type: text/event-stream\r\n"
+               b"Cache-Control: no-store\r\n"
+               b"Connection: keep-alive\r\n\r\n"
+               b"retry: 1000\n\n")
 
-print("✓ Web server started")
-print("Ready to collect data!\n")
+server = None
+dashboard = None
+dashboard_headers = None
+dashboard_etag = None
 
-# ============= DATA STORAGE =============
-sensor_data = {
-    'time': 0,
-    'temperature': 0,
-    'pressure': 0,
-    'altitude_bmp': 0,
-    'ax': 0, 'ay': 0, 'az': 0,
-    'gx': 0, 'gy': 0, 'gz': 0
-}
+# Live stream: the newest frame, its number and an event fired when it changes
+stream_frame = None
+stream_seq = 0
+stream_event = None
+stream_clients = 0
+stream_frames = 0
+stream_skipped = 0
+stream_dropped = 0
+http_clients = 0
+http_served = 0
+http_rejected = 0
+http_errors = 0
+http_timing = None  # run time of every request but streams, with METRICS
+telemetry_age = None  # ticks_us from a reading to the telemetry rendered from it, with METRICS
 
-last_log_time = 0
+# Sample-to-display latency as the newest dashboard report has it (/api/latency):
+# frames shown and frames missed in its window, then percentiles and worst in us
+LATENCY_KEYS = ("frames", "dropped", "p50", "p95", "p99", "max")
+display_latency = array('i', bytes(4 * len(LATENCY_KEYS)))
+display_reports = 0
 
-# ============= MAIN LOOP =============
-while True:
-    current_time = mission_time()
-    
-    # Read GPS
-    read_gps()
-    
-    # Read BMP280
-    if bmp_available:
+async def init_server():
+    global server
+    try:
+        load_dashboard()
+    except OSError as e:
+        print("✗ Dashboard page missing:", e)
+    server = await asyncio.start_server(handle_client, "0.0.0.0", HTTP_PORT, HTTP_BACKLOG)
+
+    print("✓ Web server started")
+    print("Ready to collect data!\n")
+
+def load_dashboard():
+    # The page is static and precompressed (tools/build_web.py); keep it in RAM
+    global dashboard, dashboard_headers, dashboard_etag
+    try:
+        with open(WEB_ROOT + '/index.html.gz', 'rb') as f:
+            dashboard = f.read()
+        encoding = "Content-Encoding: gzip\r\n"
+        # The gzip trailer holds the CRC-32 of the page, a free ETag
+        dashboard_etag = '"%02x%02x%02x%02x"' % (dashboard[-5], dashboard[-6], dashboard[-7], dashboard[-8])
+    except OSError:
+        with open(WEB_ROOT + '/index.html', 'rb') as f:
+            dashboard = f.read()
+        encoding = ""
+        dashboard_etag = '"%x"' % len(dashboard)
+    dashboard_headers = ("HTTP/1.1 200 OK\r\n"
+                         "Content-Type: text/html; charset=utf-8\r\n"
+                         + encoding +
+                         "Content-Length: %d\r\n"
+                         "Cache-Control: public, max-age=%d\r\n"
+                         "ETag: %s\r\n"
+                         "Connection: close\r\n\r\n") % (len(dashboard), DASHBOARD_MAX_AGE_S, dashboard_etag)
+    dashboard_headers = dashboard_headers.encode()
+    print(f"✓ Dashboard: {len(dashboard)} bytes{' (gzip)' if encoding else ''}")
+
+def render_telemetry(template=TELEMETRY_JSON):
+    # "frame" is the newest stream frame's number, "seq" and "ticks" the newest
+    # reading's, "sent" the ticks_us now; their differences are the age of the data
+    d = sensor_data
+    sent = time.ticks_us()
+    if telemetry_age:
+        telemetry_age.observe(time.ticks_diff(sent, data_ticks))
+    return template % (
+        d[F_TIME], d[F_TEMPERATURE], d[F_PRESSURE], d[F_ALT_BMP], d[F_ALTITUDE], d[F_VSPEED], d[F_APOGEE],
+        phase.name,
+        d[F_AX], d[F_AX + 1], d[F_AX + 2], d[F_AX + 3], d[F_AX + 4], d[F_AX + 5],
+        d[F_ROLL], d[F_ROLL + 1], d[F_ROLL + 2],
+        gps_coord(gps_fix[G_LAT]), gps_coord(gps_fix[G_LON]), gps_altitude(), gps_fix[G_SATS],
+        gps.location.age(),
+        1 if sd_available else 0,
+        stream_seq, data_seq, data_ticks, sent)
+
+def record_latency(query):
+    # "frames=..&dropped=..&p50=..&p95=..&p99=..&max=.." from a dashboard, latencies in ms
+    global display_reports
+    for pair in query.split("&"):
+        key, _, value = pair.partition("=")
+        if key not in LATENCY_KEYS:
+            continue
         try:
-            sensor_data['temperature'] = bmp.temperature
-            sensor_data['pressure'] = bmp.pressure / 100  # Convert to hPa
-            # Calculate altitude from pressure (simplified formula)
-            sensor_data['altitude_bmp'] = 44330 * (1 - (sensor_data['pressure'] / 1013.25) ** 0.1903)
-        except Exception as e:
-            print("BMP280 error:", e)
-    
-    # Read MPU6050
-    ax, ay, az, gx, gy, gz = read_mpu6050()
-    if ax is not None:
-        sensor_data['ax'] = ax
-        sensor_data['ay'] = ay
-        sensor_data['az'] = az
-        sensor_data['gx'] = gx
-        sensor_data['gy'] = gy
-        sensor_data['gz'] = gz
-    
-    sensor_data['time'] = current_time
-    
-    # Log to SD card at intervals
-    if current_time - last_log_time >= LOG_INTERVAL:
-        log_data = f"{sensor_data['time']:.1f},{sensor_data['temperature']:.2f},{sensor_data['pressure']:.2f},{sensor_data['altitude_bmp']:.2f},{sensor_data['ax']:.3f},{sensor_data['ay']:.3f},{sensor_data['az']:.3f},{sensor_data['gx']:.2f},{sensor_data['gy']:.2f},{sensor_data['gz']:.2f},{gps_data['latitude']},{gps_data['longitude']},{gps_data['altitude']},{gps_data['satellites']}"
-        log_to_sd(log_data)
-        last_log_time = current_time
-        print(f"[{current_time:.1f}s] Logged data")
-    
-    # Handle web requests
+            v = float(value)
+        except ValueError:
+            continue
+        i = LATENCY_KEYS.index(key)
+        display_latency[i] = int(v * 1000) if i >= 2 else int(v)
+    display_reports += 1
+
+def latency_report():
+    l = display_latency
+    return "display: %d reports; last: %d frames, %d dropped, latency p50 %.1f ms, p95 %.1f ms, p99 %.1f ms, max %.1f ms" % (
+        display_reports, l[0], l[1], l[2] / 1000, l[3] / 1000, l[4] / 1000, l[5] / 1000)
+
+async def handle_client(reader, writer):
+    # One task per connection; a slow client only ever waits on its own socket
+    global http_clients, http_served, http_rejected, http_errors
+    if http_clients >= HTTP_MAX_CLIENTS:
+        http_rejected += 1
+        writer.close()
+        await writer.wait_closed()
+        return
+    http_clients += 1
+    slot = True
     try:
-        client, addr = server.accept()
-        
-        html = f"""HTTP/1.1 200 OK
-Content-Type: text/html
-
-<!DOCTYPE html>
-<html>
-<head>
-<meta http-equiv="refresh" content="1">
-<meta name="viewport" content="width=device-width, initial-scale=1">
-<title>CanSat Telemetry</title>
-<style>
-* {{
-    margin: 0;
-    padding: 0;
-    box-sizing: border-box;
-}}
-
-body {{
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-    color: #ffffff;
-    padding: 20px;
-    min-height: 100vh;
-}}
-
-.container {{
-    max-width: 1200px;
-    margin: 0 auto;
-}}
-
-h1 {{
-    text-align: center;
-    font-size: 2em;
-    margin-bottom: 10px;
-    text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-}}
-
-.mission-time {{
-    text-align: center;
-    font-size: 1.5em;
-    margin-bottom: 30px;
-    background: rgba(255,255,255,0.2);
-    padding: 15px;
-    border-radius: 15px;
-    backdrop-filter: blur(10px);
-}}
-
-.grid {{
-    display: grid;
-    grid-template-columns: 1fr;
-    gap: 20px;
-    margin-bottom: 20px;
-}}
-
-.card {{
-    background: rgba(255,255,255,0.15);
-    backdrop-filter: blur(10px);
-    border-radius: 20px;
-    padding: 25px;
-    box-shadow: 0 8px 32px rgba(0,0,0,0.1);
-    border: 1px solid rgba(255,255,255,0.2);
-    transition: transform 0.3s ease;
-}}
-
-.card:hover {{
-    transform: translateY(-5px);
-}}
-
-.card-title {{
-    font-size: 1.3em;
-    margin-bottom: 15px;
-    border-bottom: 2px solid rgba(255,255,255,0.3);
-    padding-bottom: 10px;
-}}
-
-.data-row {{
-    display: flex;
-    justify-content: space-between;
-    padding: 10px 0;
-    border-bottom: 1px solid rgba(255,255,255,0.1);
-}}
-
-.data-label {{
-    color: rgba(255,255,255,0.8);
-    font-weight: 500;
-}}
-
-.data-value {{
-    font-weight: bold;
-    font-size: 1.1em;
-}}
-
-.status {{
-    text-align: center;
-    padding: 15px;
-    background: rgba(255,255,255,0.1);
-    border-radius: 15px;
-    margin-top: 20px;
-}}
-
-.status-indicator {{
-    display: inline-block;
-    width: 12px;
-    height: 12px;
-    border-radius: 50%;
-    background: #4ade80;
-    margin-right: 8px;
-    animation: pulse 2s infinite;
-}}
-
-@keyframes pulse {{
-    0%, 100% {{ opacity: 1; }}
-    50% {{ opacity: 0.5; }}
-}}
-
-.sd-status {{
-    background: {'rgba(74, 222, 128, 0.2)' if sd_available else 'rgba(248, 113, 113, 0.2)'};
-    padding: 10px;
-    border-radius: 10px;
-    margin-top: 10px;
-}}
-</style>
-</head>
-<body>
-<div class="container">
-    <h1>CanSat Live Telemetry</h1>
-    
-    <div class="mission-time">
-        Mission Time: <strong>{sensor_data['time']:.1f}</strong> seconds
-    </div>
-    
-    <div class="grid">
-        <!-- BMP280 Card -->
-        <div class="card">
-            <div class="card-title">
-                BMP280 Sensor
-            </div>
-            <div class="data-row">
-                <span class="data-label">Temperature:</span>
-                <span class="data-value">{sensor_data['temperature']:.2f} °C</span>
-            </div>
-            <div class="data-row">
-                <span class="data-label">Pressure:</span>
-                <span class="data-value">{sensor_data['pressure']:.2f} hPa</span>
-            </div>
-            <div class="data-row">
-                <span class="data-label">Altitude:</span>
-                <span class="data-value">{sensor_data['altitude_bmp']:.2f} m</span>
-            </div>
-        </div>
-        
-        <!-- Accelerometer Card -->
-        <div class="card">
-            <div class="card-title">
-                Accelerometer
-            </div>
-            <div class="data-row">
-                <span class="data-label">X-axis:</span>
-                <span class="data-value">{sensor_data['ax']:.3f} g</span>
-            </div>
-            <div class="data-row">
-                <span class="data-label">Y-axis:</span>
-                <span class="data-value">{sensor_data['ay']:.3f} g</span>
-            </div>
-            <div class="data-row">
-                <span class="data-label">Z-axis:</span>
-                <span class="data-value">{sensor_data['az']:.3f} g</span>
-            </div>
-        </div>
-        
-        <!-- Gyroscope Card -->
-        <div class="card">
-            <div class="card-title">
-                Gyroscope
-            </div>
-            <div class="data-row">
-                <span class="data-label">X-axis:</span>
-                <span class="data-value">{sensor_data['gx']:.2f} °/s</span>
-            </div>
-            <div class="data-row">
-                <span class="data-label">Y-axis:</span>
-                <span class="data-value">{sensor_data['gy']:.2f} °/s</span>
-            </div>
-            <div class="data-row">
-                <span class="data-label">Z-axis:</span>
-                <span class="data-value">{sensor_data['gz']:.2f} °/s</span>
-            </div>
-        </div>
-        
-        <!-- GPS Card -->
-        <div class="card">
-            <div class="card-title">
-                GPS Location
-            </div>
-            <div class="data-row">
-                <span class="data-label">Latitude:</span>
-                <span class="data-value">{gps_data['latitude']}</span>
-            </div>
-            <div class="data-row">
-                <span class="data-label">Longitude:</span>
-                <span class="data-value">{gps_data['longitude']}</span>
-            </div>
-            <div class="data-row">
-                <span class="data-label">GPS Altitude:</span>
-                <span class="data-value">{gps_data['altitude']} m</span>
-            </div>
-            <div class="data-row">
-                <span class="data-label">Satellites:</span>
-                <span class="data-value">{gps_data['satellites']}</span>
-            </div>
-        </div>
-    </div>
-    
-    <div class="status">
-        <span class="status-indicator"></span>
-        <strong>Live Data Stream Active</strong>
-        <div class="sd-status">
-            SD Card: {'Logging Active' if sd_available else 'Not Available'}
-        </div>
-    </div>
-</div>
-</body>
-</html>
-"""
-        
-        client.send(html.encode())
-        client.close()
-        
+        method, path, etag = await asyncio.wait_for(read_request(reader), HTTP_TIMEOUT_S)
+        start = time.ticks_us()
+        if path == "/api/stream":
+            # Long-lived: give the request slot back, streams have their own limit
+            http_clients -= 1
+            slot = False
+            await stream_telemetry(writer)
+        elif path == "/api/telemetry":
+            body = render_telemetry().encode()
+            await send(writer, (JSON_HEADERS % len(body)).encode())
+            await send(writer, body)
+        elif path == "/api/capture" and capture and method != "POST":
+            # A trigger changes state: not for a prefetch or a link preview
+            await send(writer, POST_ONLY)
+        elif path == "/api/capture" and capture:
+            triggered = trigger_capture(TRIGGER_MANUAL)
+            body = (CAPTURE_JSON % ("true" if triggered else "false", "true" if capture_armed else "false",
+                                    capture.triggers, capture.missed, capture_files)).encode()
+            await send(writer, (JSON_HEADERS % len(body)).encode())
+            await send(writer, body)
+        elif path == "/api/latency" or path.startswith("/api/latency?"):
+            # Answered with the ticks_us now: timing the round trip sets a client's clock against ours
+            if path[13:]:
+                record_latency(path[13:])
+            body = (CLOCK_JSON % time.ticks_us()).encode()
+            await send(writer, (JSON_HEADERS % len(body)).encode())
+            await send(writer, body)
+        elif path == "/metrics" and METRICS:
+            body = render_metrics().encode()
+            await send(writer, (METRICS_HEADERS % len(body)).encode())
+            await send(writer, body)
+        elif path in ("/", "/index.html") and dashboard is not None:
+            if etag == dashboard_etag:
+                await send(writer, (NOT_MODIFIED % dashboard_etag).encode())
+            else:
+                await send(writer, dashboard_headers)
+                await send(writer, dashboard)
+        else:
+            await send(writer, NOT_FOUND)
+        if http_timing and slot:
+            http_timing.observe(time.ticks_diff(time.ticks_us(), start))
+        http_served += 1
+    except Exception:
+        http_errors += 1  # timed out or the client went away
+    finally:
+        if slot:
+            http_clients -= 1
+        writer.close()
+        await writer.wait_closed()
+
+async def stream_telemetry(writer):
+    # Server-Sent Events. A subscriber is sent the newest frame whenever it is ready
+    # for one, so a slow client skips frames instead of holding anything up
+    global stream_clients, stream_skipped, stream_dropped
+    if stream_clients >= STREAM_MAX_CLIENTS:
+        await send(writer, BUSY)
+        return
+    stream_clients += 1
+    try:
+        await send(writer, SSE_HEADERS)
+        seq = stream_seq - 1 if stream_frame else stream_seq
+        while True:
+            if seq == stream_seq:
+                await stream_event.wait()
+            stream_skipped += stream_seq - seq - 1
+            seq = stream_seq
+            writer.write(stream_frame)
+            try:
+                await asyncio.wait_for(writer.drain(), STREAM_STALL_S)
+            except asyncio.TimeoutError:
+                stream_dropped += 1
+                return
     except OSError:
-        pass  # No client connected
-    
-    time.sleep(0.1)  # Small delay to prevent CPU overload
+        pass  # subscriber went away
+    finally:
+        stream_clients -= 1
+
+def publish_telemetry():
+    # Serialised once per tick; every subscriber is handed the same bytes
+    global stream_frame, stream_seq, stream_frames
+    if not stream_clients:
+        return
+    sensor_data[F_TIME] = mission_time()
+    stream_seq += 1
+    stream_frame = render_telemetry(STREAM_FRAME).encode()
+    stream_frames += 1
+    stream_event.set()
+    stream_event.clear()
+
+async def send(writer, data):
+    # Hand the socket one chunk at a time so a slow client never buffers a whole reply
+    data = memoryview(data)
+    for i in range(0, len(data), HTTP_CHUNK):
+        writer.write(data[i:i + HTTP_CHUNK])
+        await asyncio.wait_for(writer.drain(), HTTP_TIMEOUT_S)
+
+async def read_request(reader):
+    # Returns the method and path of the request line and the If-None-Match header, if any
+    parts = (await reader.readline()).split()
+    method = parts[0].decode() if parts else ""
+    path = parts[1].decode() if len(parts) > 1 else ""
+    etag = None
+    line = await reader.readline()
+    while line and line != b"\r\n":
+        if line[:14].lower() == b"if-none-match:":
+            etag = line[14:].strip().decode()
+        line = await reader.readline()
+    return method, path, etag
+
+# ============= FLIGHT PHASE =============
+phase = FlightPhase()
+
+def accel_g():
+    return (imu[0] * imu[0] + imu[1] * imu[1] + imu[2] * imu[2]) ** 0.5 if mpu_available else 1.0
+
+def update_phase():
+    # Height and speed only count once the launch site is calibrated; until
+    # then the altitude filter has nothing but the accelerometer to go on
+    accel = accel_g()
+    height = speed = 0.0
+    if alt.ground:
+        height, speed = alt.x[0], alt.x[1]
+    if phase.update(time.ticks_ms(), height, speed, accel):
+        enter_phase(phase.phase, accel)
+
+def enter_phase(p, accel=1.0):
+    # Retune every rate for the phase, then record the transition
+    global capture_armed, log_every
+    gps_k, baro_k, imu_k, csv_k, stream_k = PHASE_SLOWDOWN[p] if PHASE_RATES else (1, 1, 1, 1, 1)
+    capture_armed = capture is not None and p != LANDED
+    log_every = 1
+    if capture_armed:
+        # The capture ring wants every sample: thin out the log instead
+        log_every = imu_k if mpu_available else baro_k
+        baro_k = imu_k = 1
+    alt.ground_samples = max(1, 1000 // (BMP_PERIOD_MS * baro_k))  # until the ground is calibrated
+    sched.set_period("gps", GPS_PERIOD_MS * gps_k)
+    set_gps_rate(gps_k)
+    sched.set_period("baro", BMP_PERIOD_MS * baro_k)
+    if not IMU_FIFO_HZ:
+        sched.set_period("imu", IMU_PERIOD_MS * imu_k)
+    if sched.task("drain"):
+        set_acq_rate(ACQ_HZ // imu_k, BMP_PERIOD_MS * baro_k)
+    sched.set_period("csv", LOG_INTERVAL * 1000 * csv_k)
+    sched.set_period("stream", 1000 // STREAM_HZ * stream_k)
+    if ap and hasattr(network.WLAN, "PM_POWERSAVE"):
+        powersave = PHASE_RATES and PHASE_WIFI_POWERSAVE[p]
+        ap.config(pm=network.WLAN.PM_POWERSAVE if powersave else network.WLAN.PM_PERFORMANCE)
+
+    print(f"✓ Flight phase: {PHASE_NAMES[p]} at {mission_time():.1f}s, {alt.x[0]:.1f} m, {alt.x[1]:.1f} m/s")
+    if bin_logging:
+        log_event(binlog.EVENT_PHASE, p, accel)
+    elif sd_available:
+        log_csv()
+
+# ============= MEMORY =============
+# The sensor tasks allocate nothing per sample; the little garbage there is (log
+# lines, telemetry frames, HTTP) is collected at a fixed period by its own task, so
+# the pause lands where the scheduler puts it instead of inside a sensor read
+gc_runs = 0
+gc_pause_total = 0
+gc_pause_max = 0
+gc_heap = -1  # gc.mem_alloc() after the last collection, -1 before the first
+gc_grown = 0  # bytes allocated between collections since the last report
+gc_free = 0
+gc_since = 0  # ticks_ms of the last report
+gc_samples = 0  # imu_samples at the last report
+
+def collect_garbage():
+    global gc_runs, gc_pause_total, gc_pause_max, gc_heap, gc_grown, gc_free
+    before = gc.mem_alloc()
+    start = time.ticks_us()
+    gc.collect()
+    pause = time.ticks_diff(time.ticks_us(), start)
+    if gc_heap >= 0:
+        gc_grown += max(0, before - gc_heap)
+    gc_heap = gc.mem_alloc()
+    gc_free = gc.mem_free()
+    gc_runs += 1
+    gc_pause_total += pause
+    if pause > gc_pause_max:
+        gc_pause_max = pause
+
+def memory_report():
+    seconds = max(1, time.ticks_diff(time.ticks_ms(), gc_since)) / 1000
+    return "gc: %d collections, pause avg %.2f ms, max %.2f ms; heap +%d B/s, %.1f B per IMU sample; %d B free" % (
+        gc_runs, gc_pause_total / max(1, gc_runs) / 1000, gc_pause_max / 1000, gc_grown / seconds,
+        gc_grown / max(1, imu_samples - gc_samples), gc_free)
+
+def memory_reset():
+    global gc_runs, gc_pause_total, gc_pause_max, gc_grown, gc_since, gc_samples
+    gc_runs = gc_pause_total = gc_pause_max = gc_grown = 0
+    gc_since = time.ticks_ms()
+    gc_samples = imu_samples
+
+# ============= METRICS =============
+# Every scheduled task's run time (Task.timing) and every HTTP request's go into
+# fixed-bucket histograms; /metrics serves them in the Prometheus text format
+# with the error counters, and a summary goes into the log every METRICS_LOG_S
+STATS_LINE = "# stats %.1f %s runs=%d avg_us=%d p99_us=%d max_us=%d errors=%d\n"
+
+def stages():
+    timed = [(t.name, t.timing) for t in sched.tasks if t.timing]
+    if http_timing:
+        timed.append(("http", http_timing))
+    return timed
+
+def stage_errors(name):
+    # The error counter that goes with a stage in the log summary
+    if name == "gps":
+        return gps.failed_checksum
+    if name == "baro":
+        return bmp_errors
+    if name == "imu":
+        return mpu_errors
+    if name == "log":
+        return sd_log.errors if sd_available else 0
+    if name == "http":
+        return http_errors
+    return 0
+
+def log_metrics():
+    # Runs and run times of every stage since the previous summary: a STATS
+    # record each in binary logs, a "# stats" comment line each in the CSV
+    global bin_seq
+    now = time.ticks_us()
+    t = mission_time()
+    for name, h in stages():
+        runs, avg, p99, worst = h.window()
+        h.mark()
+        if not runs:
+            continue
+        errors = stage_errors(name)
+        if bin_logging:
+            offset = sd_log.reserve(binlog.RECORD_SIZE)
+            if offset >= 0:
+                binlog.pack_stats(sd_log.ring, offset, bin_seq, now, name.encode(), runs, int(avg), p99, worst, errors)
+            bin_seq += 1
+        else:
+            log_to_sd(STATS_LINE % (t, name, runs, avg, p99, worst, errors))
+
+def render_metrics():
+    out = []
+    metrics.family(out, "cansat_stage_seconds", "histogram", "Run time of each flight task and HTTP request")
+    for name, h in stages():
+        metrics.histogram(out, "cansat_stage_seconds", 'stage="%s"' % name, h)
+    metrics.family(out, "cansat_telemetry_age_seconds", "histogram",
+                   "Time from a reading to the telemetry rendered from it")
+    if telemetry_age:
+        metrics.histogram(out, "cansat_telemetry_age_seconds", "", telemetry_age)
+    metrics.family(out, "cansat_display_latency_seconds", "summary",
+                   "Sample-to-display latency in the newest dashboard report")
+    for i, q in ((2, "0.5"), (3, "0.95"), (4, "0.99"), (5, "1")):
+        metrics.sample(out, "cansat_display_latency_seconds", 'quantile="%s"' % q, "%.6f" % (display_latency[i] / 1000000))
+    metrics.family(out, "cansat_display_frames", "gauge", "Stream frames shown and missed in the newest dashboard report")
+    metrics.sample(out, "cansat_display_frames", 'result="shown"', display_latency[0])
+    metrics.sample(out, "cansat_display_frames", 'result="dropped"', display_latency[1])
+    metrics.family(out, "cansat_display_reports_total", "counter", "Latency reports received from dashboards")
+    metrics.sample(out, "cansat_display_reports_total", "", display_reports)
+    metrics.family(out, "cansat_i2c_errors_total", "counter", "Failed sensor reads")
+    metrics.sample(out, "cansat_i2c_errors_total", 'device="bmp280"', bmp_errors)
+    metrics.sample(out, "cansat_i2c_errors_total", 'device="mpu6050"', mpu_errors)
+    metrics.family(out, "cansat_sd_write_errors_total", "counter", "Failed SD card writes and syncs")
+    metrics.sample(out, "cansat_sd_write_errors_total", "", sd_log.errors if sd_available else 0)
+    metrics.family(out, "cansat_sd_dropped_total", "counter", "Log lines and records dropped with the log buffer full")
+    metrics.sample(out, "cansat_sd_dropped_total", "", sd_log.dropped if sd_available else 0)
+    metrics.family(out, "cansat_gps_checksum_failures_total", "counter", "GPS sentences with a bad checksum")
+    metrics.sample(out, "cansat_gps_checksum_failures_total", "", gps.failed_checksum)
+    metrics.family(out, "cansat_gps_sentences_total", "counter", "GPS sentences parsed")
+    metrics.sample(out, "cansat_gps_sentences_total", "", gps.sentences_passed)
+    metrics.family(out, "cansat_http_requests_total", "counter", "HTTP requests by outcome")
+    metrics.sample(out, "cansat_http_requests_total", 'result="served"', http_served)
+    metrics.sample(out, "cansat_http_requests_total", 'result="rejected"', http_rejected)
+    metrics.sample(out, "cansat_http_requests_total", 'result="failed"', http_errors)
+    metrics.family(out, "cansat_stream_frames_total", "counter", "Telemetry frames published on /api/stream")
+    metrics.sample(out, "cansat_stream_frames_total", "", stream_frames)
+    metrics.family(out, "cansat_heap_free_bytes", "gauge", "Free heap")
+    metrics.sample(out, "cansat_heap_free_bytes", "", gc.mem_free())
+    metrics.family(out, "cansat_uptime_seconds", "gauge", "Mission time")
+    metrics.sample(out, "cansat_uptime_seconds", "", "%.1f" % mission_time())
+    return "\n".join(out) + "\n"
+
+# ============= TASKS =============
+sched = None
+def update_baro():
+    read_bmp280()
+    if (bin_logging or capture) and not mpu_available:
+        # Without the IMU there is no per-sample record, log each baro reading
+        log_sensor_record(time.ticks_us(), 0, NO_SAMPLE)
+
+def update_log():
+    sensor_data[F_TIME] = mission_time()
+    # Write buffered log data that is due
+    if sd_available:
+        sd_log.poll()
+
+def log_csv():
+    # How many lines went out shows as the csv task's runs in the scheduler report
+    sensor_data[F_TIME] = mission_time()
+    log_to_sd(format_log_line())
+
+def imu_period_ms():
+    if mpu_available and IMU_FIFO_HZ:
+        # Come back before the 1024-byte MPU6050 FIFO can overflow
+        return mpu.fifo_span_ms() // 2
+    return IMU_PERIOD_MS
+
+# ============= MAIN LOOP =============
+def setup():
+    global start_time
+    start_time = time.ticks_ms()
+    init_i2c()
+    init_bmp280()
+    init_mpu6050()
+    init_gps()
+    init_sd()
+    init_capture()
+    init_wifi()
+
+def step():
+    # One pass over every sensor and the logger, in loop order (used by the benchmarks)
+    read_gps()
+    update_baro()
+    update_mpu6050()
+    update_log()
+
+async def start():
+    # Sensors, logger and web server run side by side from here on
+    global stream_event, sched, http_timing, telemetry_age
+    stream_event = asyncio.Event()
+    sched = Scheduler(gc.mem_alloc if SCHED_ALLOC_STATS else None, METRICS)
+    http_timing = Histogram() if METRICS else None
+    telemetry_age = Histogram() if METRICS else None
+    sched.add("gps", GPS_PERIOD_MS, read_gps)
+    if ACQ_MODE != "tasks" and (ACQ_MODE != "core1" or _thread):
+        if not acq_running:
+            start_acquisition()
+        sched.add("drain", LOG_PERIOD_MS, drain_samples)
+    else:
+        sched.add("baro", BMP_PERIOD_MS, update_baro)
+        sched.add("imu", imu_period_ms(), update_mpu6050)
+    sched.add("log", LOG_PERIOD_MS, update_log)
+    if not bin_logging:
+        sched.add("csv", LOG_INTERVAL * 1000, log_csv)
+    sched.add("stream", 1000 // STREAM_HZ, publish_telemetry)
+    sched.add("phase", PHASE_PERIOD_MS, update_phase)
+    if capture:
+        sched.add("burst", CAPTURE_PERIOD_MS, write_capture)
+    if GC_PERIOD_MS:
+        sched.add("gc", GC_PERIOD_MS, collect_garbage)
+    if METRICS and METRICS_LOG_S and sd_available:
+        sched.add("stats", METRICS_LOG_S * 1000, log_metrics)
+    enter_phase(phase.phase)
+    memory_reset()
+    tasks = sched.start()
+    await init_server()
+    return tasks
+
+async def runtime():
+    await start()
+    while True:
+        await asyncio.sleep_ms(SCHED_REPORT_S * 1000 if SCHED_REPORT_S else 60000)
+        if SCHED_REPORT_S:
+            print(sched.report())
+            if acq_running:
+                print(acquisition_report())
+            if GC_PERIOD_MS:
+                print(memory_report())
+            if display_reports:
+                print(latency_report())
+            dropped = sd_report()
+            if dropped:
+                print(dropped)
+            sched.reset()
+            memory_reset()
+
+def run():
+    setup()
+    asyncio.run(runtime())
+
+if __name__ == "__main__":
+    run()
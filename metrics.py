@@ -0,0 +1,106 @@
+"""
+Run-time histograms and Prometheus text exposition.
+
+A ``Histogram`` counts microsecond durations into fixed power-of-two
+buckets held in a preallocated array, so ``observe`` costs a short shift
+loop and allocates nothing: cheap enough to time every run of every task in
+flight.  Its counts only ever grow, as Prometheus expects of a histogram;
+``mark()`` starts a new window for the on-board summaries, which read the
+runs, average, 99th percentile and worst case since the last mark.
+
+The exposition helpers append lines of the Prometheus text format
+(version 0.0.4) to a list, for a /metrics route to join and send:
+
+    h = Histogram()
+    t = time.ticks_us(); work(); h.observe(time.ticks_diff(time.ticks_us(), t))
+    out = []
+    family(out, "cansat_stage_seconds", "histogram", "Run time of each stage")
+    histogram(out, "cansat_stage_seconds", 'stage="imu"', h)
+    family(out, "cansat_i2c_errors_total", "counter", "Failed sensor reads")
+    sample(out, "cansat_i2c_errors_total", 'device="bmp280"', 3)
+    body = "\\n".join(out) + "\\n"
+"""
+
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
+
+from array import array
+
+STAGE_BUCKETS = const(13)
+STAGE_BASE_US = const(32)  # bucket k holds durations up to 32 << k us; the last one is open
+
+
+class Histogram:
+    def __init__(self, buckets=STAGE_BUCKETS, base_us=STAGE_BASE_US):
+        self.base_us = base_us
+        self.buckets = buckets
+        self.counts = array('I', bytes(4 * buckets))
+        self.count = 0
+        self.total = 0  # us
+        # The same at the last mark(), and the worst case since
+        self.marked = array('I', bytes(4 * buckets))
+        self.marked_count = 0
+        self.marked_total = 0
+        self.window_max = 0
+        # Bucket bounds in seconds, as the exposition prints them
+        self.le = ["%g" % ((base_us << k) / 1000000) for k in range(buckets - 1)] + ["+Inf"]
+
+    def observe(self, us):
+        k = 0
+        limit = self.base_us
+        last = self.buckets - 1
+        while us > limit and k < last:
+            limit <<= 1
+            k += 1
+        self.counts[k] += 1
+        self.count += 1
+        self.total += us
+        if us > self.window_max:
+            self.window_max = us
+
+    def mark(self):
+        self.marked[:] = self.counts
+        self.marked_count = self.count
+        self.marked_total = self.total
+        self.window_max = 0
+
+    def window(self):
+        """(runs, average us, 99th percentile us or -1 if in the open bucket, worst us) since mark()."""
+        runs = self.count - self.marked_count
+        if not runs:
+            return 0, 0, 0, 0
+        target = runs * 99 / 100
+        seen = 0
+        p99 = -1
+        for k in range(self.buckets - 1):
+            seen += self.counts[k] - self.marked[k]
+            if seen >= target:
+                p99 = min(self.base_us << k, self.window_max)
+                break
+        return runs, (self.total - self.marked_total) / runs, p99, self.window_max
+
+
+def family(out, name, kind, help):
+    out.append("# HELP %s %s" % (name, help))
+    out.append("# TYPE %s %s" % (name, kind))
+
+
+def sample(out, name, labels, value):
+    if labels:
+        out.append("%s{%s} %s" % (name, labels, value))
+    else:
+        out.append("%s %s" % (name, value))
+
+
+def histogram(out, name, labels, h):
+    """Cumulative buckets, sum (seconds) and count of ``h``."""
+    sep = "," if labels else ""
+    seen = 0
+    for k in range(h.buckets):
+        seen += h.counts[k]
+        out.append('%s_bucket{%s%sle="%s"} %d' % (name, labels, sep, h.le[k], seen))
+    sample(out, name + "_sum", labels, "%.6f" % (h.total / 1000000))
+    sample(out, name + "_count", labels, h.count)
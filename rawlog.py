@@ -0,0 +1,345 @@
+"""
+Raw block log: streams log data straight to a contiguous range of SD card
+sectors with multi-block (CMD25) writes, bypassing the FAT filesystem.
+
+The range is a preallocated file (``CANSAT.RAW``, created on a freshly
+formatted card with ``python -m tools.prep_card``).  At boot ``find_file``
+walks the FAT once to resolve the file to its first sector and checks that
+its clusters are contiguous; after that nothing but data blocks is written.
+
+Region layout, one 512-byte sector per block:
+    block 0     superblock: magic, version, sectors, last session, its start
+    block 1...  log blocks, appended session after session
+
+Log block (little-endian):
+    0   4s  magic b"CSLB"
+    4   I   CRC-32 of bytes 8-511
+    8   I   seq, block number within the session
+    12  H   session (boot number)
+    14  H   payload bytes used
+    16  I   ticks_ms when the block was sealed
+    20  B   kind: 0 data, 1 log header (``binlog.header`` without padding)
+    32  ... payload, 480 bytes = 15 binary log records
+
+A boot finds the end of the previous session with a binary search on
+(valid CRC, same session) and starts the next session there, so a reboot
+in flight never overwrites data.  ``python -m tools.extract_raw`` turns the
+region back into one binary log per session.
+"""
+
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
+
+import struct
+import time
+
+try:
+    from binascii import crc32
+except ImportError:
+    crc32 = None
+
+BLOCK = const(512)
+HEADER = const(32)
+PAYLOAD = const(480)
+
+MAGIC = b"CSLB"
+SUPER_MAGIC = b"CANSATRW"
+VERSION = const(1)
+KIND_DATA = const(0)
+KIND_HEADER = const(1)
+
+BLOCK_FORMAT = "<4sIIHHIB"
+SUPER_FORMAT = "<8sHHIHI"
+_ZEROS = bytes(PAYLOAD)
+
+if crc32 is None:
+    _CRC_TABLE = []
+    for _i in range(256):
+        _c = _i
+        for _ in range(8):
+            _c = (_c >> 1) ^ 0xEDB88320 if _c & 1 else _c >> 1
+        _CRC_TABLE.append(_c)
+
+    def crc32(data, crc=0):
+        crc ^= 0xFFFFFFFF
+        table = _CRC_TABLE
+        for b in data:
+            crc = table[(crc ^ b) & 0xFF] ^ (crc >> 8)
+        return crc ^ 0xFFFFFFFF
+
+
+# ============= FAT LOOKUP =============
+def find_file(sd, name="CANSAT.RAW"):
+    """Return (first_sector, sectors) of a contiguous file in the root directory.
+
+    Understands FAT16 and FAT32, with or without an MBR.  Raises OSError if
+    the file is missing or fragmented.
+    """
+    buf = bytearray(BLOCK)
+    base, stem = name.upper().split(".")
+    want = (base + " " * 8)[:8].encode() + (stem + "   ")[:3].encode()
+
+    sd.readblocks(0, buf)
+    part = 0
+    if buf[0] not in (0xEB, 0xE9) or buf[11:13] != b"\x00\x02":
+        # MBR: boot sector of the first partition
+        part = struct.unpack_from("<I", buf, 0x1C6)[0]
+        sd.readblocks(part, buf)
+    spc = buf[13]
+    reserved, nfats, root_entries, _, _, fat16_size = struct.unpack_from("<HBHHBH", buf, 14)
+    fat_size, root_cluster = struct.unpack_from("<I4xI", buf, 36)
+    fat32 = fat16_size == 0
+    if not fat32:
+        fat_size = fat16_size
+    fat_start = part + reserved
+    root_start = fat_start + nfats * fat_size
+    data_start = root_start + (root_entries * 32 + BLOCK - 1) // BLOCK
+    eoc = 0x0FFFFFF8 if fat32 else 0xFFF8
+    cached = [-1]
+
+    def next_cluster(c):
+        offset = c * (4 if fat32 else 2)
+        sector = fat_start + offset // BLOCK
+        if cached[0] != sector:
+            sd.readblocks(sector, buf)
+            cached[0] = sector
+        if fat32:
+            return struct.unpack_from("<I", buf, offset % BLOCK)[0] & 0x0FFFFFFF
+        return struct.unpack_from("<H", buf, offset % BLOCK)[0]
+
+    # Root directory sectors: a cluster chain on FAT32, a fixed area on FAT16
+    if fat32:
+        sectors = []
+        c = root_cluster
+        while c < eoc:
+            first = data_start + (c - 2) * spc
+            sectors.extend(range(first, first + spc))
+            c = next_cluster(c)
+    else:
+        sectors = range(root_start, data_start)
+
+    entry = None
+    for sector in sectors:
+        sd.readblocks(sector, buf)
+        cached[0] = -1
+        for offset in range(0, BLOCK, 32):
+            if buf[offset] == 0:
+                break
+            if buf[offset:offset + 11] == want and not buf[offset + 11] & 0x18:
+                hi, lo, size = struct.unpack_from("<H4xHI", buf, offset + 20)
+                entry = ((hi << 16) | lo if fat32 else lo), size
+                break
+        else:
+            continue
+        break
+    if entry is None:
+        raise OSError("%s not found" % name)
+
+    first, size = entry
+    clusters = (size + spc * BLOCK - 1) // (spc * BLOCK)
+    c = first
+    for i in range(clusters - 1):
+        n = next_cluster(c)
+        if n != c + 1:
+            raise OSError("%s is fragmented at cluster %d" % (name, i))
+        c = n
+    return data_start + (first - 2) * spc, size // BLOCK
+
+
+# ============= WRITER =============
+class RawLog:
+    """Ring of sector-sized blocks flushed with multi-block writes.
+
+    ``reserve``/``write``/``poll``/``close`` and the counters match
+    ``sdlogger.SDLogger`` so main.py can use either.
+    """
+
+    def __init__(self, sd, start, sectors, ring_blocks=16, batch=8, max_age_ms=1000):
+        self.sd = sd
+        self.start = start
+        self.sectors = sectors
+        self.ring = bytearray(ring_blocks * BLOCK)
+        self._mv = memoryview(self.ring)
+        self.size = ring_blocks
+        self.batch = min(batch, ring_blocks)
+        self.max_age_ms = max_age_ms
+
+        self.tail = 0  # oldest sealed, unwritten ring block
+        self.sealed = 0
+        self.used = 0  # payload bytes in the open block (ring block tail + sealed)
+        self.kind = KIND_DATA
+        self.seq = 0
+        self.full = False
+        self._oldest = time.ticks_ms()
+
+        self.bytes_written = 0
+        self.blocks_written = 0
+        self.partial_blocks = 0
+        self.writes = 0
+        self.dropped = 0
+        self.errors = 0
+        self.write_us_last = 0
+        self.write_us_max = 0
+        self.write_us_total = 0
+
+        self.session, self.block = self._recover()
+
+    def _valid(self, mv, session=None):
+        if bytes(mv[:4]) != MAGIC or struct.unpack_from("<I", mv, 4)[0] != crc32(mv[8:BLOCK]):
+            return False
+        return session is None or struct.unpack_from("<H", mv, 12)[0] == session
+
+    def _recover(self):
+        # Find where the previous session ended and claim the space after it
+        mv = self._mv[:BLOCK]
+        self.sd.readblocks(self.start, mv)
+        magic, version, _, sectors, session, first = struct.unpack_from(SUPER_FORMAT, mv, 0)
+        if magic != SUPER_MAGIC or sectors != self.sectors or not 1 <= first <= sectors:
+            session, first = 0, 1
+        lo, hi = first, self.sectors
+        while lo < hi:
+            mid = (lo + hi) // 2
+            self.sd.readblocks(self.start + mid, mv)
+            if self._valid(mv, session):
+                lo = mid + 1
+            else:
+                hi = mid
+        session = (session + 1) & 0xFFFF
+        self.ring[:BLOCK] = bytes(BLOCK)
+        struct.pack_into(SUPER_FORMAT, mv, 0, SUPER_MAGIC, VERSION, BLOCK, self.sectors, session, lo)
+        self.sd.writeblocks(self.start, mv)
+        if lo >= self.sectors:
+            self.full = True
+        return session, lo
+
+    # ============= PRODUCER SIDE =============
+    def reserve(self, n):
+        """Claim ``n`` (<= 480) bytes in ``ring`` and return their offset, or -1."""
+        if self.used + n > PAYLOAD:
+            self._seal()
+        if self.full or self.sealed == self.size:
+            self.dropped += 1
+            return -1
+        if not self.used and not self.sealed:
+            self._oldest = time.ticks_ms()
+        offset = ((self.tail + self.sealed) % self.size) * BLOCK + HEADER + self.used
+        self.used += n
+        return offset
+
+    def write(self, data):
+        """Copy ``data`` into the open block; returns False if it was dropped."""
+        offset = self.reserve(len(data))
+        if offset < 0:
+            return False
+        self._mv[offset:offset + len(data)] = data
+        return True
+
+    def write_header(self, data):
+        """Put ``data`` in a block of its own (kind 1) at the start of the session."""
+        data = bytes(data).rstrip(b"\0")
+        if len(data) > PAYLOAD:
+            raise ValueError("header too large")
+        self._seal()
+        self.kind = KIND_HEADER
+        self.write(data)
+        self._seal()
+
+    def _seal(self):
+        if not self.used or self.full:
+            return
+        i = (self.tail + self.sealed) % self.size
+        offset = i * BLOCK
+        mv = self._mv[offset:offset + BLOCK]
+        zeros = memoryview(_ZEROS)
+        if self.used < PAYLOAD:
+            mv[HEADER + self.used:] = zeros[:PAYLOAD - self.used]
+            self.partial_blocks += 1
+        struct.pack_into(BLOCK_FORMAT, mv, 0, MAGIC, 0, self.seq, self.session,
+                         self.used, time.ticks_ms(), self.kind)
+        mv[21:HEADER] = zeros[:HEADER - 21]
+        struct.pack_into("<I", mv, 4, crc32(mv[8:BLOCK]))
+        self.seq += 1
+        self.sealed += 1
+        self.used = 0
+        self.kind = KIND_DATA
+        if self.block + self.sealed >= self.sectors:
+            self.full = True
+
+    # ============= CONSUMER SIDE =============
+    def poll(self):
+        """Write a batch once it is ready, or whatever there is once it gets old."""
+        aged = (self.used or self.sealed) and \
+            time.ticks_diff(time.ticks_ms(), self._oldest) >= self.max_age_ms
+        if aged:
+            self._seal()
+        if self.sealed >= self.batch or (aged and self.sealed):
+            self.flush()
+
+    def flush(self):
+        """Write every sealed block; returns the number of blocks written."""
+        total = 0
+        while self.sealed:
+            n = min(self.sealed, self.size - self.tail)
+            self._write(self._mv[self.tail * BLOCK:(self.tail + n) * BLOCK], n)
+            self.tail = (self.tail + n) % self.size
+            total += n
+        if self.used:
+            self._oldest = time.ticks_ms()
+        return total
+
+    def _write(self, mv, n):
+        t0 = time.ticks_us()
+        try:
+            # More than one block goes out as a single CMD25 transfer
+            self.sd.writeblocks(self.start + self.block, mv)
+        except OSError:
+            self.errors += 1
+        dt = time.ticks_diff(time.ticks_us(), t0)
+        self.block += n
+        self.sealed -= n
+        self.blocks_written += n
+        self.bytes_written += n * BLOCK
+        self.writes += 1
+        self.write_us_last = dt
+        self.write_us_total += dt
+        if dt > self.write_us_max:
+            self.write_us_max = dt
+
+    def sync(self):
+        # Nothing to commit: the region has no filesystem metadata
+        pass
+
+    def close(self):
+        self._seal()
+        self.flush()
+
+    def write_us_avg(self):
+        return self.write_us_total // self.writes if self.writes else 0
+
+
+# ============= GROUND SIDE =============
+def read_super(data):
+    magic, version, block, sectors, session, first = struct.unpack_from(SUPER_FORMAT, data, 0)
+    if magic != SUPER_MAGIC:
+        return None
+    return {"version": version, "sectors": sectors, "session": session, "first": first}
+
+
+def iter_blocks(data):
+    """Yield (index, seq, session, kind, ticks_ms, payload) for every valid block.
+
+    Blocks with a bad magic or CRC are skipped; the caller spots them as
+    gaps in ``seq``.
+    """
+    mv = memoryview(data)
+    for index in range(1, len(data) // BLOCK):
+        block = mv[index * BLOCK:(index + 1) * BLOCK]
+        if block[:4] != MAGIC:
+            continue
+        magic, crc, seq, session, used, ticks, kind = struct.unpack_from(BLOCK_FORMAT, block, 0)
+        if crc != crc32(block[8:]) or used > PAYLOAD:
+            continue
+        yield index, seq, session, kind, ticks, bytes(block[HEADER:HEADER + used])
@@ -0,0 +1,215 @@
+"""
+Deadline scheduler for the flight tasks.
+
+Every task is released at absolute deadlines one period apart on the
+``time.ticks_us()`` clock, so its rate does not drift with how long it runs
+or how late the event loop woke it.  A task that falls a whole period behind
+skips the releases it missed instead of bursting to catch up, and counts them
+as overruns.  How late each release started is kept in a power-of-two
+histogram, together with the time spent running, so a saturated loop shows
+up as rising lateness before any task actually misses a period.
+
+Given ``mem_alloc`` (``gc.mem_alloc``), every run is also charged the heap
+it allocated; a run the count went down in had a garbage collection land
+inside it, and is counted in ``collections`` instead.
+
+With ``profile``, every run's duration also goes into a ``metrics.Histogram``
+(``Task.timing``) that is never reset, for the /metrics route and the
+periodic summary in the log.
+
+    sched = Scheduler()
+    sched.add("imu", 10, update_mpu6050)
+    tasks = sched.start()      # one asyncio task each
+    sched.set_period("imu", 50)
+    print(sched.report())
+
+A new period takes effect from the task's next release.
+"""
+
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
+
+from array import array
+import time
+
+from hal import asyncio
+from metrics import Histogram
+
+JITTER_BUCKETS = const(10)
+JITTER_BASE_US = const(128)  # bucket k holds lateness below 128 << k us; the last one is open
+
+
+def bucket_limits():
+    """Upper bound in microseconds of every histogram bucket but the last."""
+    return [JITTER_BASE_US << k for k in range(JITTER_BUCKETS - 1)]
+
+
+class Task:
+    def __init__(self, name, period_ms, func, mem_alloc=None, profile=False):
+        self.name = name
+        self.func = func
+        self.mem_alloc = mem_alloc
+        self.timing = Histogram() if profile else None
+        self.set_period(period_ms)
+        self.hist = array('I', [0] * JITTER_BUCKETS)
+        self.reset()
+
+    def reset(self):
+        self.runs = 0
+        self.overruns = 0  # releases skipped because the task was a whole period late
+        self.late_max = 0
+        self.late_total = 0
+        self.busy_max = 0
+        self.busy_total = 0
+        self.alloc_max = 0
+        self.alloc_total = 0
+        self.collections = 0  # runs a garbage collection happened in
+        for k in range(JITTER_BUCKETS):
+            self.hist[k] = 0
+        self.since = time.ticks_us()
+
+    def set_period(self, period_ms):
+        self.period_us = int(period_ms * 1000)
+
+    async def run(self):
+        deadline = time.ticks_us()
+        while True:
+            start = time.ticks_us()
+            late = max(0, time.ticks_diff(start, deadline))
+            mem_alloc = self.mem_alloc
+            if mem_alloc:
+                heap = mem_alloc()
+            self.func()
+            busy = time.ticks_diff(time.ticks_us(), start)
+            if mem_alloc:
+                heap = mem_alloc() - heap
+                if heap < 0:
+                    self.collections += 1
+                else:
+                    self.alloc_total += heap
+                    if heap > self.alloc_max:
+                        self.alloc_max = heap
+            if self.timing:
+                self.timing.observe(busy)
+
+            self.runs += 1
+            self.late_total += late
+            self.busy_total += busy
+            if late > self.late_max:
+                self.late_max = late
+            if busy > self.busy_max:
+                self.busy_max = busy
+            k = 0
+            late //= JITTER_BASE_US
+            while late and k < JITTER_BUCKETS - 1:
+                late >>= 1
+                k += 1
+            self.hist[k] += 1
+
+            period = self.period_us
+            deadline = time.ticks_add(deadline, period)
+            delay = time.ticks_diff(deadline, time.ticks_us())
+            if delay <= -period:
+                missed = -delay // period
+                self.overruns += missed
+                deadline = time.ticks_add(deadline, missed * period)
+                delay += missed * period
+            # The event loop counts in milliseconds: round up, never release early
+            await asyncio.sleep_ms((delay + 999) // 1000 if delay > 0 else 0)
+
+    def elapsed_us(self):
+        return max(1, time.ticks_diff(time.ticks_us(), self.since))
+
+    def rate(self):
+        """Achieved releases per second since the last reset."""
+        return self.runs * 1000000 / self.elapsed_us()
+
+    def late_pct(self, pct):
+        """Upper bound in microseconds on the pct-th percentile of lateness (from the
+        histogram, capped at the worst case), or -1 if it is in the open last bucket."""
+        target = self.runs * pct / 100
+        seen = 0
+        for k in range(JITTER_BUCKETS - 1):
+            seen += self.hist[k]
+            if seen >= target:
+                return min(JITTER_BASE_US << k, self.late_max)
+        return -1
+
+    def stats(self):
+        runs = max(1, self.runs)
+        return {
+            "period_ms": self.period_us / 1000,
+            "hz": self.rate(),
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "late_avg_us": self.late_total / runs,
+            "late_max_us": self.late_max,
+            "late_p99_us": self.late_pct(99),
+            "busy_avg_us": self.busy_total / runs,
+            "busy_max_us": self.busy_max,
+            "load": self.busy_total / self.elapsed_us(),
+            "alloc_avg": self.alloc_total / max(1, runs - self.collections),
+            "alloc_max": self.alloc_max,
+            "collections": self.collections,
+            "hist": list(self.hist),
+        }
+
+
+class Scheduler:
+    def __init__(self, mem_alloc=None, profile=False):
+        self.tasks = []
+        self.mem_alloc = mem_alloc
+        self.profile = profile
+
+    def add(self, name, period_ms, func):
+        task = Task(name, period_ms, func, self.mem_alloc, self.profile)
+        self.tasks.append(task)
+        return task
+
+    def task(self, name):
+        for task in self.tasks:
+            if task.name == name:
+                return task
+        return None
+
+    def set_period(self, name, period_ms):
+        """Change the period of the task called ``name``, if there is one."""
+        task = self.task(name)
+        if task is not None:
+            task.set_period(period_ms)
+
+    def start(self):
+        for task in self.tasks:
+            task.reset()
+        return [asyncio.create_task(task.run()) for task in self.tasks]
+
+    def reset(self):
+        for task in self.tasks:
+            task.reset()
+
+    def load(self):
+        """Fraction of the time spent inside scheduled tasks."""
+        return sum(t.busy_total / t.elapsed_us() for t in self.tasks)
+
+    def stats(self):
+        return {t.name: t.stats() for t in self.tasks}
+
+    def report(self):
+        alloc = self.mem_alloc is not None
+        lines = ["%-6s %6s %6s %8s %8s %9s %8s" % (
+            "task", "Hz", "late", "p99", "max", "busy", "overrun") + ("  alloc/run  gc" if alloc else "")]
+        for t in self.tasks:
+            s = t.stats()
+            p99 = s["late_p99_us"]
+            line = "%-6s %6.1f %4.1fms %8s %6.1fms %7.2fms %8d" % (
+                t.name, s["hz"], s["late_avg_us"] / 1000,
+                "%.1fms" % (p99 / 1000) if p99 >= 0 else "long",
+                s["late_max_us"] / 1000, s["busy_avg_us"] / 1000, s["overruns"])
+            if alloc:
+                line += " %9.0fB %3d" % (s["alloc_avg"], s["collections"])
+            lines.append(line)
+        lines.append("load %.1f%%" % (self.load() * 100))
+        return "\n".join(lines)
@@ -0,0 +1,171 @@
+"""
+Buffered SD card logger.
+
+Keeps the log file open and collects data in a preallocated ring buffer.
+Writes go to the card only in whole 512-byte sectors, aligned to the file
+position, so FatFs can hand them straight to ``SDCard.writeblocks`` without
+a read-modify-write of a partial sector.  The file is flushed (directory
+entry and FAT updated) on a separate, slower budget.
+
+    log = SDLogger('/sd/cansat_log.csv')
+    log.write(b"...")          # or: off = log.reserve(32); pack_into(log.ring, off, ...)
+    log.poll()                 # once per main-loop iteration
+"""
+
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
+
+import time
+
+SECTOR = const(512)
+
+
+class SDLogger:
+    def __init__(self, path, ring_size=8192, flush_bytes=2048, max_age_ms=1000, sync_ms=5000):
+        # ring_size must be a multiple of 512 so ring offsets track file sectors
+        ring_size = max(SECTOR, ring_size - ring_size % SECTOR)
+        self.f = open(path, 'ab')
+        self.f.seek(0, 2)
+        self.pos = self.f.tell()  # file position of the oldest unwritten byte
+        self.ring = bytearray(ring_size)
+        self._mv = memoryview(self.ring)
+        self.size = ring_size
+        # Ring offset == file position mod 512, so a sector in the file is a
+        # sector-aligned slice of the ring
+        self.head = self.pos % SECTOR
+        self.tail = self.head
+        self.pending = 0
+        self.flush_bytes = max(SECTOR, flush_bytes - flush_bytes % SECTOR)
+        self.max_age_ms = max_age_ms
+        self.sync_ms = sync_ms
+        now = time.ticks_ms()
+        self._oldest = now
+        self._last_sync = now
+        self._dirty = False
+
+        self.bytes_written = 0
+        self.writes = 0
+        self.partial_writes = 0
+        self.syncs = 0
+        self.dropped = 0
+        self.errors = 0
+        self.write_us_last = 0
+        self.write_us_max = 0
+        self.write_us_total = 0
+
+    # ============= PRODUCER SIDE =============
+    def free(self):
+        return self.size - self.pending
+
+    def reserve(self, n):
+        """Claim ``n`` contiguous bytes in ``ring`` and return their offset.
+
+        Returns -1 (and counts a dropped record) if the ring is full or the
+        space would wrap; fixed-size records that divide 512 never wrap.
+        """
+        head = self.head
+        if n > self.size - self.pending or head + n > self.size:
+            self.dropped += 1
+            return -1
+        if not self.pending:
+            self._oldest = time.ticks_ms()
+        self.head = (head + n) % self.size
+        self.pending += n
+        return head
+
+    def write(self, data):
+        """Copy ``data`` into the ring; returns False if it was dropped."""
+        n = len(data)
+        if n > self.size - self.pending:
+            self.dropped += 1
+            return False
+        if not self.pending:
+            self._oldest = time.ticks_ms()
+        head = self.head
+        first = self.size - head
+        if n <= first:
+            self._mv[head:head + n] = data
+        else:
+            mv = memoryview(data)
+            self._mv[head:] = mv[:first]
+            self._mv[:n - first] = mv[first:]
+        self.head = (head + n) % self.size
+        self.pending += n
+        return True
+
+    # ============= CONSUMER SIDE =============
+    def poll(self):
+        """Write whatever the byte/time budgets say is due."""
+        if self.pending >= self.flush_bytes:
+            self.flush()
+        elif self.pending and time.ticks_diff(time.ticks_ms(), self._oldest) >= self.max_age_ms:
+            # Data is getting old: write the whole sectors, and the partial
+            # tail too if there is no whole sector to write
+            if not self.flush():
+                self.flush(partial=True)
+        if self._dirty and time.ticks_diff(time.ticks_ms(), self._last_sync) >= self.sync_ms:
+            self.sync()
+
+    def flush(self, partial=False):
+        """Write all complete sectors (everything if ``partial``); returns bytes written."""
+        n = self.pending
+        if not partial:
+            # End the write on a sector boundary of the file
+            n -= (self.pos + n) % SECTOR
+        if n <= 0:
+            return 0
+        total = 0
+        while n > 0:
+            chunk = min(n, self.size - self.tail)
+            total += self._write(self._mv[self.tail:self.tail + chunk])
+            self.tail = (self.tail + chunk) % self.size
+            n -= chunk
+        if partial and total % SECTOR:
+            self.partial_writes += 1
+        if self.pending:
+            self._oldest = time.ticks_ms()
+        return total
+
+    def _write(self, mv):
+        t0 = time.ticks_us()
+        try:
+            self.f.write(mv)
+        except OSError:
+            self.errors += 1
+        dt = time.ticks_diff(time.ticks_us(), t0)
+        n = len(mv)
+        self.pos += n
+        self.pending -= n
+        self.bytes_written += n
+        self.writes += 1
+        self.write_us_last = dt
+        self.write_us_total += dt
+        if dt > self.write_us_max:
+            self.write_us_max = dt
+        self._dirty = True
+        return n
+
+    def sync(self):
+        """Commit file size and FAT so everything written survives a power cut."""
+        t0 = time.ticks_us()
+        try:
+            self.f.flush()
+        except OSError:
+            self.errors += 1
+        dt = time.ticks_diff(time.ticks_us(), t0)
+        if dt > self.write_us_max:
+            self.write_us_max = dt
+        self.syncs += 1
+        self._dirty = False
+        self._last_sync = time.ticks_ms()
+
+    def close(self):
+        self.flush(partial=True)
+        self.sync()
+        self.f.close()
+
+    def write_us_avg(self):
+        return self.write_us_total // self.writes if self.writes else 0
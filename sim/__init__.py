@@ -0,0 +1,33 @@
+"""
+Host-side simulator for the CanSat flight computer.
+
+Importing this package makes the flight software importable under CPython:
+
+  * a ``micropython`` module (const, schedule, ...) is installed,
+  * the MicroPython extensions of ``time`` (ticks_ms, ticks_us, ticks_diff,
+    ticks_add, sleep_ms, sleep_us) are added to the stdlib ``time`` module,
+  * ``gc.mem_alloc`` and ``gc.mem_free`` are added to ``gc`` (see sim.heap),
+  * ``Imported libraries/`` is put on ``sys.path`` so the drivers resolve
+    exactly as they do from the Pico's flash root.
+
+``hal.py`` falls back to this package when ``machine`` is not available, so
+``python main.py`` runs the real flight loop against the simulated board in
+``sim.board``.
+"""
+
+import os
+import sys
+
+from sim import clock
+from sim import heap
+from sim import micropython as _micropython
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIB_DIR = os.path.join(_ROOT, "Imported libraries")
+
+sys.modules.setdefault("micropython", _micropython)
+clock.install()
+heap.install()
+
+if LIB_DIR not in sys.path:
+    sys.path.append(LIB_DIR)
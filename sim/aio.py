@@ -0,0 +1,128 @@
+"""
+MicroPython ``asyncio`` on top of CPython's.
+
+Re-exports the stdlib event loop (run, create_task, gather, sleep, Event,
+wait_for, ...) and adds what MicroPython has on top: ``sleep_ms``,
+``wait_for_ms`` and a ``start_server`` that serves the in-process loopback
+sockets of ``sim.socket`` with MicroPython's single ``Stream`` object per
+connection.  Socket readiness is polled every ``POLL_S`` seconds, standing in
+for the poller MicroPython's scheduler blocks on.
+"""
+
+from asyncio import *  # noqa: F401,F403
+import asyncio as _asyncio
+
+from sim import socket as _socket
+
+POLL_S = 0.001
+_EAGAIN = 11
+
+
+async def sleep_ms(ms):
+    await _asyncio.sleep(ms / 1000)
+
+
+async def wait_for_ms(aw, timeout):
+    return await _asyncio.wait_for(aw, timeout / 1000)
+
+
+class Stream:
+    """Reader and writer of one connection, as in MicroPython."""
+
+    def __init__(self, sock, peer=None):
+        self.s = sock
+        self.peer = peer
+        self._in = bytearray()
+        self.out_buf = bytearray()
+
+    def get_extra_info(self, name):
+        return self.peer if name == "peername" else None
+
+    async def _recv(self, n):
+        while True:
+            try:
+                return self.s.recv(n)
+            except OSError as e:
+                if e.args[0] != _EAGAIN:
+                    raise
+            await _asyncio.sleep(POLL_S)
+
+    async def read(self, n=-1):
+        if self._in:
+            n = len(self._in) if n < 0 else min(n, len(self._in))
+            out = bytes(self._in[:n])
+            del self._in[:n]
+            return out
+        return await self._recv(4096 if n < 0 else n)
+
+    async def readline(self):
+        while True:
+            end = self._in.find(b"\n")
+            if end >= 0:
+                out = bytes(self._in[:end + 1])
+                del self._in[:end + 1]
+                return out
+            data = await self._recv(256)
+            if not data:
+                out = bytes(self._in)
+                self._in = bytearray()
+                return out
+            self._in += data
+
+    def write(self, buf):
+        self.out_buf += buf
+
+    async def drain(self):
+        # The socket may take only part of the buffer (or none of it)
+        while self.out_buf:
+            try:
+                n = self.s.send(self.out_buf)
+            except OSError as e:
+                if e.args[0] != _EAGAIN:
+                    raise
+                n = 0
+            del self.out_buf[:n]
+            if self.out_buf:
+                await _asyncio.sleep(POLL_S)
+
+    def close(self):
+        self.s.close()
+
+    async def wait_closed(self):
+        pass
+
+
+class Server:
+    def __init__(self, sock, cb):
+        self.s = sock
+        self.cb = cb
+        self.task = _asyncio.get_event_loop().create_task(self._accept())
+
+    async def _accept(self):
+        while True:
+            try:
+                conn, addr = self.s.accept()
+            except OSError:
+                await _asyncio.sleep(POLL_S)
+                continue
+            stream = Stream(conn, addr)
+            _asyncio.get_event_loop().create_task(self.cb(stream, stream))
+
+    def close(self):
+        self.task.cancel()
+        self.s.close()
+
+    async def wait_closed(self):
+        try:
+            await self.task
+        except _asyncio.CancelledError:
+            pass
+
+
+async def start_server(cb, host, port, backlog=5):
+    sock = _socket.socket()
+    sock.setsockopt(_socket.SOL_SOCKET, _socket.SO_REUSEADDR, 1)
+    sock.bind(_socket.getaddrinfo(host, port)[0][-1])
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return Server(sock, cb)
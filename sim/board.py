@@ -0,0 +1,102 @@
+"""
+The simulated CanSat board: which devices sit on which bus.
+
+``sim.machine`` and friends look devices up here when a peripheral is
+constructed, so benchmarks call ``reset()`` to get a fresh board (and a fresh
+flight) before importing or re-initialising the flight software.
+"""
+
+import tempfile
+
+from sim import clock, fat
+from sim.devices import BMP280Model, MPU6050Model
+from sim.gps import GPSReceiver
+from sim.profile import FlightProfile
+
+
+class I2CBus:
+    """Devices on one I2C controller plus traffic counters."""
+
+    def __init__(self, devices):
+        self.devices = devices
+        self.transactions = 0
+        self.bytes = 0
+        self.bits = 0
+
+    def account(self, nbytes):
+        # START + address + register (+ repeated START + address) + data, 9 bits per byte.
+        self.transactions += 1
+        self.bytes += nbytes
+        self.bits += (nbytes + 3) * 9 + 2
+
+    def bus_time_us(self, freq):
+        return self.bits * 1e6 / freq
+
+
+class Board:
+    def __init__(self, profile=None, time_scale=1.0, bmp280=True, mpu6050=True,
+                 gps=True, sd_card=True, sd_sectors=1 << 21, sd_raw_bytes=64 << 20,
+                 imu_int_pin=2):
+        self.profile = profile if profile is not None else FlightProfile()
+        self.time_scale = time_scale
+        self.t0 = clock.now_s()
+        self.pins = {}  # GPIO number -> Pin with an IRQ handler
+        self.tickers = []
+        devices = {}
+        if bmp280:
+            devices[0x76] = BMP280Model(self)
+        if mpu6050:
+            devices[0x68] = MPU6050Model(self, imu_int_pin)
+        self.i2c = {0: I2CBus(devices), 1: I2CBus({})}
+        self.uart = {1: GPSReceiver(self)} if gps else {}
+        self.sd_card = sd_card
+        self.sd_sectors = sd_sectors
+        self.sd_blocks = {}
+        if sd_card and sd_raw_bytes:
+            # FAT32 card holding the preallocated raw log file
+            fat.format(self.sd_blocks, sd_sectors, size=sd_raw_bytes)
+        self._sd_dir = None
+
+    def now(self):
+        """Flight time in seconds since the board was reset."""
+        return (clock.now_s() - self.t0) * self.time_scale
+
+    def ticker(self, period_s, func, once=False):
+        """Start a periodic interrupt source; stopped when the board is reset."""
+        t = clock.Ticker(period_s, func, once)
+        self.tickers.append(t)
+        return t
+
+    def pulse(self, pin_id):
+        """Raise a GPIO line for an instant, running its IRQ handler if one is set."""
+        pin = self.pins.get(pin_id)
+        if pin is not None and pin._handler is not None:
+            pin._value = 1
+            pin._handler(pin)
+            pin._value = 0
+
+    def stop(self):
+        for t in self.tickers:
+            t.stop()
+        self.tickers.clear()
+
+    @property
+    def sd_dir(self):
+        """Host directory standing in for the FAT filesystem on the card."""
+        if self._sd_dir is None:
+            self._sd_dir = tempfile.mkdtemp(prefix="cansat_sd_")
+        return self._sd_dir
+
+
+_board = Board()
+
+
+def current():
+    return _board
+
+
+def reset(**kwargs):
+    global _board
+    _board.stop()
+    _board = Board(**kwargs)
+    return _board
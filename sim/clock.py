@@ -0,0 +1,89 @@
+"""
+MicroPython ``time`` extensions for CPython.
+
+Ticks wrap at 2**30 like on the RP2040 port, so code that forgets to use
+ticks_diff() breaks in the simulator the same way it would in flight.
+"""
+
+import threading
+import time
+
+TICKS_PERIOD = 1 << 30
+_TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALF = TICKS_PERIOD // 2
+
+_monotonic_ns = time.monotonic_ns
+
+
+def ticks_ms():
+    return (_monotonic_ns() // 1000000) & _TICKS_MAX
+
+
+def ticks_us():
+    return (_monotonic_ns() // 1000) & _TICKS_MAX
+
+
+def ticks_cpu():
+    return _monotonic_ns() & _TICKS_MAX
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+
+def sleep_ms(ms):
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    if us > 0:
+        time.sleep(us / 1000000)
+
+
+def now_s():
+    """Monotonic host time in seconds, used by the device models."""
+    return _monotonic_ns() / 1e9
+
+
+class Ticker:
+    """Call ``func()`` every ``period_s`` from a background thread, like an IRQ.
+
+    Deadlines are absolute so the rate does not drift, and the callback cuts
+    into whatever the main thread is doing, as a hardware interrupt would.
+    """
+
+    def __init__(self, period_s, func, once=False):
+        self.period_s = period_s
+        self.func = func
+        self.once = once
+        self.fired = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        deadline = time.perf_counter()
+        while True:
+            deadline += self.period_s
+            delay = deadline - time.perf_counter()
+            if self._stop.wait(max(0.0, delay)):
+                return
+            self.fired += 1
+            self.func()
+            if self.once:
+                return
+
+    def stop(self):
+        self._stop.set()
+
+
+def install():
+    for name in ("ticks_ms", "ticks_us", "ticks_cpu", "ticks_add", "ticks_diff",
+                 "sleep_ms", "sleep_us"):
+        if not hasattr(time, name):
+            setattr(time, name, globals()[name])
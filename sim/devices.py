@@ -0,0 +1,270 @@
+"""
+Register-map models of the I2C sensors on the CanSat bus.
+
+Each model exposes ``read(reg, n)`` and ``write(reg, data)`` the way the chip
+answers a register-addressed I2C transaction.  Data registers are refreshed
+from the board's flight profile whenever they are read.
+"""
+
+import struct
+
+
+class RegisterDevice:
+    def __init__(self, board):
+        self.board = board
+        self.regs = bytearray(256)
+
+    def read(self, reg, n):
+        self.refresh(reg, n)
+        return bytes(self.regs[reg:reg + n])
+
+    def write(self, reg, data):
+        for i, value in enumerate(data):
+            self.write_reg(reg + i, value)
+
+    def write_reg(self, reg, value):
+        self.regs[reg] = value
+
+    def refresh(self, reg, n):
+        pass
+
+
+# ============= BMP280 =============
+
+# Calibration set from the BMP280 datasheet (section 3.12 worked example).
+BMP280_CALIBRATION = (27504, 26435, -1000,
+                      36477, -10685, 3024, 2855, 140, -7, 15500, -14600, 6000)
+
+_BMP_STANDBY_MS = (0.5, 62.5, 125.0, 250.0, 500.0, 1000.0, 2000.0, 4000.0)
+
+
+class BMP280Model(RegisterDevice):
+    CHIP_ID = 0x58
+
+    def __init__(self, board, calibration=BMP280_CALIBRATION):
+        super().__init__(board)
+        self.cal = calibration
+        self.regs[0x88:0xA0] = struct.pack("<HhhHhhhhhhhh", *calibration)
+        self.regs[0xD0] = self.CHIP_ID
+        self.regs[0xF7:0xFD] = b"\x80\x00\x00\x80\x00\x00"
+        self.conversions = 0
+        self._sample_index = -1
+        self._forced_done = 0.0
+        # Secant slopes used to invert the compensation formulas.
+        self._adc_t0 = 519888
+        self._t_slope = (self._comp_t(self._adc_t0 + 1000)[0] - self._comp_t(self._adc_t0)[0]) / 1000
+        self._adc_p0 = 415148
+        t_fine = self._comp_t(self._adc_t0)[1]
+        self._p_slope = (self._comp_p(self._adc_p0 + 1000, t_fine) - self._comp_p(self._adc_p0, t_fine)) / 1000
+
+    # Floating-point compensation from the datasheet (section 8.1).
+    def _comp_t(self, adc_t):
+        t1, t2, t3 = self.cal[0:3]
+        var1 = (adc_t / 16384.0 - t1 / 1024.0) * t2
+        var2 = (adc_t / 131072.0 - t1 / 8192.0) ** 2 * t3
+        t_fine = var1 + var2
+        return t_fine / 5120.0, t_fine
+
+    def _comp_p(self, adc_p, t_fine):
+        p1, p2, p3, p4, p5, p6, p7, p8, p9 = self.cal[3:12]
+        var1 = t_fine / 2.0 - 64000.0
+        var2 = var1 * var1 * p6 / 32768.0
+        var2 = var2 + var1 * p5 * 2.0
+        var2 = var2 / 4.0 + p4 * 65536.0
+        var1 = (p3 * var1 * var1 / 524288.0 + p2 * var1) / 524288.0
+        var1 = (1.0 + var1 / 32768.0) * p1
+        p = 1048576.0 - adc_p
+        p = (p - var2 / 4096.0) * 6250.0 / var1
+        var1 = p9 * p * p / 2147483648.0
+        var2 = p * p8 / 32768.0
+        return p + (var1 + var2 + p7) / 16.0
+
+    def raw_for(self, temperature, pressure):
+        """Invert the compensation: physical values -> (adc_T, adc_P)."""
+        adc_t = self._adc_t0
+        for _ in range(2):
+            adc_t += (temperature - self._comp_t(adc_t)[0]) / self._t_slope
+        t_fine = self._comp_t(adc_t)[1]
+        adc_p = self._adc_p0
+        for _ in range(2):
+            adc_p += (pressure - self._comp_p(adc_p, t_fine)) / self._p_slope
+        return int(adc_t) & 0xFFFFF, int(adc_p) & 0xFFFFF
+
+    @property
+    def mode(self):
+        return self.regs[0xF4] & 0x03
+
+    def measurement_ms(self):
+        osrs_t = (self.regs[0xF4] >> 5) & 0x07
+        osrs_p = (self.regs[0xF4] >> 2) & 0x07
+        t_os = (1 << (min(osrs_t, 5) - 1)) if osrs_t else 0
+        p_os = (1 << (min(osrs_p, 5) - 1)) if osrs_p else 0
+        return 1.25 + 2.3 * t_os + (2.3 * p_os + 0.575 if p_os else 0)
+
+    def sample_period_ms(self):
+        return self.measurement_ms() + _BMP_STANDBY_MS[self.regs[0xF5] >> 5]
+
+    def write_reg(self, reg, value):
+        if reg == 0xE0:
+            if value == 0xB6:
+                self.regs[0xF4] = 0
+                self.regs[0xF5] = 0
+            return
+        self.regs[reg] = value
+        if reg == 0xF4 and value & 0x03 in (0x01, 0x02):
+            # Forced mode: one conversion, then back to sleep.
+            now = self.board.now()
+            self._convert(now)
+            self._forced_done = now + self.measurement_ms() / 1000
+            self.regs[0xF4] = value & 0xFC
+
+    def refresh(self, reg, n):
+        now = self.board.now()
+        if reg <= 0xF3 < reg + n:
+            self.regs[0xF3] = 0x08 if now < self._forced_done else 0x00
+        if reg + n <= 0xF7 or reg > 0xFC or self.mode != 0x03:
+            return
+        index = int(now * 1000 / self.sample_period_ms())
+        if index != self._sample_index:
+            self._sample_index = index
+            self._convert(now)
+
+    def _convert(self, now):
+        profile = self.board.profile
+        adc_t, adc_p = self.raw_for(profile.temperature(now), profile.pressure(now))
+        if not (self.regs[0xF4] >> 5) & 0x07:
+            adc_t = 0x80000
+        if not (self.regs[0xF4] >> 2) & 0x07:
+            adc_p = 0x80000
+        self.regs[0xF7] = adc_p >> 12
+        self.regs[0xF8] = (adc_p >> 4) & 0xFF
+        self.regs[0xF9] = (adc_p & 0x0F) << 4
+        self.regs[0xFA] = adc_t >> 12
+        self.regs[0xFB] = (adc_t >> 4) & 0xFF
+        self.regs[0xFC] = (adc_t & 0x0F) << 4
+        self.conversions += 1
+
+
+# ============= MPU6050 =============
+
+class MPU6050Model(RegisterDevice):
+    WHO_AM_I = 0x68
+    FIFO_SIZE = 1024
+
+    def __init__(self, board, int_pin=None):
+        super().__init__(board)
+        self.regs[0x6B] = 0x40  # powers up asleep
+        self.regs[0x75] = self.WHO_AM_I
+        self.fifo = bytearray()
+        self.fifo_overflows = 0
+        self._fifo_t = None
+        self.int_pin = int_pin  # GPIO the INT line is wired to
+        self._drdy = None
+
+    @property
+    def asleep(self):
+        return bool(self.regs[0x6B] & 0x40)
+
+    @property
+    def fifo_enabled(self):
+        return bool(self.regs[0x6A] & 0x40) and not self.asleep
+
+    def sample_rate(self):
+        dlpf = self.regs[0x1A] & 0x07
+        base = 8000 if dlpf in (0, 7) else 1000
+        return base / (1 + self.regs[0x19])
+
+    def write_reg(self, reg, value):
+        if reg == 0x6B and value & 0x80:
+            self.regs[0x00:0x75] = bytes(0x75)
+            self.regs[0x6B] = 0x40
+            self.fifo.clear()
+            self._data_ready(False)
+            return
+        if reg == 0x38:
+            self.regs[reg] = value
+            self._data_ready(bool(value & 0x01))
+            return
+        if reg == 0x6A:
+            if value & 0x04:
+                self.fifo.clear()
+                self.regs[0x3A] &= ~0x10
+            if value & 0x40 and not self.regs[0x6A] & 0x40:
+                self._fifo_t = self.board.now()
+            value &= ~0x05  # reset bits self-clear
+        self.regs[reg] = value
+
+    def read(self, reg, n):
+        if reg == 0x74:
+            self._fill_fifo()
+            out = bytes(self.fifo[:n])
+            del self.fifo[:n]
+            return out + bytes(n - len(out))
+        out = super().read(reg, n)
+        if reg <= 0x3A < reg + n:
+            self.regs[0x3A] = 0  # INT_STATUS clears on read
+        return out
+
+    def _data_ready(self, on):
+        # INT pulses once per sample while DATA_RDY_EN is set
+        if self._drdy is not None:
+            self._drdy.stop()
+            self._drdy = None
+        if on and self.int_pin is not None:
+            self._drdy = self.board.ticker(1.0 / self.sample_rate(), self._pulse)
+
+    def _pulse(self):
+        if not self.asleep:
+            self.regs[0x3A] |= 0x01
+            self.board.pulse(self.int_pin)
+
+    def sample(self, t):
+        """Return the 14 data bytes (accel, temp, gyro) the chip would hold at t."""
+        profile = self.board.profile
+        accel_lsb = 16384 >> ((self.regs[0x1C] >> 3) & 0x03)
+        gyro_lsb = 131.0 / (1 << ((self.regs[0x1B] >> 3) & 0x03))
+        ax, ay, az = profile.accel(t)
+        gx, gy, gz = profile.gyro(t)
+        temp = (profile.temperature(t) - 36.53) * 340
+        values = [ax * accel_lsb, ay * accel_lsb, az * accel_lsb, temp,
+                  gx * gyro_lsb, gy * gyro_lsb, gz * gyro_lsb]
+        for i in range(7):
+            values[i] = max(-32768, min(32767, int(values[i])))
+        return struct.pack(">7h", *values)
+
+    def _fill_fifo(self):
+        if not self.fifo_enabled or self._fifo_t is None:
+            return
+        now = self.board.now()
+        period = 1.0 / self.sample_rate()
+        en = self.regs[0x23]
+        while self._fifo_t + period <= now:
+            self._fifo_t += period
+            data = self.sample(self._fifo_t)
+            if en & 0x08:
+                self.fifo += data[0:6]
+            if en & 0x80:
+                self.fifo += data[6:8]
+            if en & 0x40:
+                self.fifo += data[8:10]
+            if en & 0x20:
+                self.fifo += data[10:12]
+            if en & 0x10:
+                self.fifo += data[12:14]
+            if len(self.fifo) > self.FIFO_SIZE:
+                # Oldest bytes are overwritten, not whole samples.
+                del self.fifo[:len(self.fifo) - self.FIFO_SIZE]
+                self.regs[0x3A] |= 0x10
+                self.fifo_overflows += 1
+        self.regs[0x3A] |= 0x01
+
+    def refresh(self, reg, n):
+        if self.asleep:
+            return
+        if reg <= 0x3A < reg + n or reg <= 0x73 and 0x72 < reg + n:
+            self._fill_fifo()
+            self.regs[0x72] = len(self.fifo) >> 8
+            self.regs[0x73] = len(self.fifo) & 0xFF
+        if reg + n <= 0x3B or reg > 0x48:
+            return
+        self.regs[0x3B:0x49] = self.sample(self.board.now())
@@ -0,0 +1,60 @@
+"""
+Minimal FAT32 card image for the simulator.
+
+Lays out an MBR, one FAT32 partition and a single contiguous file in the
+root directory, the way a freshly formatted card looks after
+``python -m tools.prep_card`` has created the raw log file.  Only non-zero
+sectors are stored in the board's sparse sector map.
+"""
+
+import struct
+
+BLOCK = 512
+PART_START = 2048
+RESERVED = 32
+FATS = 2
+EOC = 0x0FFFFFFF
+
+
+def format(blocks, sectors, name="CANSAT.RAW", size=64 << 20, spc=8):
+    """Write the image into ``blocks``; returns the file's first sector."""
+    blocks.clear()
+    part_sectors = sectors - PART_START
+    clusters = (part_sectors - RESERVED) * BLOCK // (spc * BLOCK + FATS * 4)
+    fat_size = ((clusters + 2) * 4 + BLOCK - 1) // BLOCK
+    fat_start = PART_START + RESERVED
+    data_start = fat_start + FATS * fat_size
+    file_clusters = (size + spc * BLOCK - 1) // (spc * BLOCK)
+    if file_clusters + 1 > clusters:
+        raise ValueError("file does not fit on the card")
+
+    mbr = bytearray(BLOCK)
+    struct.pack_into("<B3xB3xII", mbr, 0x1BE, 0x00, 0x0C, PART_START, part_sectors)
+    mbr[510:512] = b"\x55\xaa"
+    blocks[0] = bytes(mbr)
+
+    vbr = bytearray(BLOCK)
+    vbr[0:3] = b"\xeb\x58\x90"
+    vbr[3:11] = b"MSDOS5.0"
+    struct.pack_into("<HBHBHHBHHHII", vbr, 11, BLOCK, spc, RESERVED, FATS, 0, 0, 0xF8, 0,
+                     63, 255, PART_START, part_sectors)
+    struct.pack_into("<IHHIHH", vbr, 36, fat_size, 0, 0, 2, 1, 6)
+    vbr[82:90] = b"FAT32   "
+    vbr[510:512] = b"\x55\xaa"
+    blocks[PART_START] = bytes(vbr)
+
+    # Cluster 2 is the root directory, the file follows from cluster 3
+    fat = [0x0FFFFFF8, EOC, EOC] + list(range(4, 3 + file_clusters)) + [EOC]
+    raw = struct.pack("<%dI" % len(fat), *fat)
+    for i in range(0, len(raw), BLOCK):
+        sector = raw[i:i + BLOCK].ljust(BLOCK, b"\0")
+        for copy in range(FATS):
+            blocks[fat_start + copy * fat_size + i // BLOCK] = sector
+
+    base, ext = name.upper().split(".")
+    root = bytearray(BLOCK)
+    root[0:11] = (base.ljust(8) + ext.ljust(3)).encode()
+    root[11] = 0x20  # archive
+    struct.pack_into("<H4xHI", root, 20, 0, 3, size)
+    blocks[data_start] = bytes(root)
+    return data_start + spc
@@ -0,0 +1,213 @@
+"""
+Model of a u-blox style UART GPS receiver (NEO-6M/M8N defaults).
+
+At every navigation epoch the receiver queues its NMEA sentences (and UBX
+NAV-PVT once enabled) and clocks them out at the configured baud rate, so a
+reader that does not keep up sees the UART receive buffer overflow exactly as
+on the Pico.  UBX CFG-PRT, CFG-RATE and CFG-MSG written to it are applied and
+answered with ACK/NAK like a real u-blox; ``ubx=False`` models an NMEA-only
+clone that ignores them, ``max_rate_hz=5`` and ``nav_pvt=False`` a NEO-6M.
+"""
+
+import struct
+
+
+def nmea_checksum(body):
+    cs = 0
+    for ch in body.encode():
+        cs ^= ch
+    return cs
+
+
+def nmea(body):
+    return "$%s*%02X\r\n" % (body, nmea_checksum(body))
+
+
+def _lat(value):
+    hemi = "N" if value >= 0 else "S"
+    value = abs(value)
+    deg = int(value)
+    return "%02d%08.5f" % (deg, (value - deg) * 60), hemi
+
+
+def _lon(value):
+    hemi = "E" if value >= 0 else "W"
+    value = abs(value)
+    deg = int(value)
+    return "%03d%08.5f" % (deg, (value - deg) * 60), hemi
+
+
+DEFAULT_SENTENCES = ("GGA", "GLL", "GSA", "GSV", "RMC", "VTG")
+NMEA_IDS = dict(enumerate(DEFAULT_SENTENCES))  # UBX class 0xF0 message ids
+
+NAV_PVT_FORMAT = "<IHBBBBBBIiBBBBiiiiIIiiiiiIIH6xihH"
+
+
+def ubx(cls, msg_id, payload=b""):
+    body = struct.pack("<BBH", cls, msg_id, len(payload)) + payload
+    a = b = 0
+    for c in body:
+        a = (a + c) & 0xFF
+        b = (b + a) & 0xFF
+    return b"\xb5\x62" + body + bytes((a, b))
+
+
+class GPSReceiver:
+    def __init__(self, board, baudrate=9600, rate_hz=1.0, fix_after=2.0,
+                 sentences=DEFAULT_SENTENCES, satellites=8, ubx=True, max_rate_hz=10,
+                 nav_pvt=True):
+        self.board = board
+        self.baudrate = baudrate
+        self.rate_hz = rate_hz
+        self.fix_after = fix_after
+        self.sentences = list(sentences)
+        self.satellites = satellites
+        self.ubx = ubx
+        self.max_rate_hz = max_rate_hz
+        self.has_nav_pvt = nav_pvt
+        self.nav_pvt = False
+        self.pending = bytearray()
+        self.received = bytearray()
+        self.acks = 0
+        self.naks = 0
+        self._rx = bytearray()
+        self.bytes_sent = 0
+        self.epochs = 0
+        self._next_epoch = 0.0
+        self._tx_clock = 0.0
+
+    @property
+    def bytes_per_s(self):
+        return self.baudrate / 10
+
+    def epoch_sentences(self, t):
+        profile = self.board.profile
+        lat, lon, alt = profile.position(t)
+        fix = t >= self.fix_after
+        tod = 36000.0 + t
+        hh = int(tod // 3600) % 24
+        mm = int(tod // 60) % 60
+        utc = "%02d%02d%05.2f" % (hh, mm, tod % 60)
+        la, ns = _lat(lat)
+        lo, ew = _lon(lon)
+        if not fix:
+            la = ns = lo = ew = ""
+        sats = self.satellites if fix else 0
+        out = []
+        for kind in self.sentences:
+            if kind == "GGA":
+                out.append(nmea("GPGGA,%s,%s,%s,%s,%s,%d,%02d,0.9,%s,M,-86.0,M,," % (
+                    utc, la, ns, lo, ew, 1 if fix else 0, sats, ("%.1f" % alt) if fix else "")))
+            elif kind == "GLL":
+                out.append(nmea("GPGLL,%s,%s,%s,%s,%s,%s,%s" % (
+                    la, ns, lo, ew, utc, "A" if fix else "V", "A" if fix else "N")))
+            elif kind == "GSA":
+                prns = ",".join("%02d" % (i + 1) for i in range(sats))
+                prns += "," * (12 - sats)
+                out.append(nmea("GPGSA,A,%d,%s,1.6,0.9,1.3" % (3 if fix else 1, prns)))
+            elif kind == "GSV":
+                count = max(1, (sats + 3) // 4)
+                for msg in range(count):
+                    sv = ""
+                    for i in range(msg * 4, min(sats, msg * 4 + 4)):
+                        sv += ",%02d,%02d,%03d,%02d" % (i + 1, 30 + 5 * i, (40 * i) % 360, 30 + i)
+                    out.append(nmea("GPGSV,%d,%d,%02d%s" % (count, msg + 1, sats, sv)))
+            elif kind == "RMC":
+                out.append(nmea("GPRMC,%s,%s,%s,%s,%s,%s,0.8,45.0,181026,,,%s" % (
+                    utc, "A" if fix else "V", la, ns, lo, ew, "A" if fix else "N")))
+            elif kind == "VTG":
+                out.append(nmea("GPVTG,45.0,T,,M,0.8,N,1.5,K,%s" % ("A" if fix else "N")))
+        data = "".join(out).encode()
+        if self.nav_pvt:
+            data += self.nav_pvt_message(t, tod, fix, sats, lat, lon, alt)
+        return data
+
+    def nav_pvt_message(self, t, tod, fix, sats, lat, lon, alt):
+        climb = self.board.profile.kinematics(t)[1]
+        drift = 222 if t > self.board.profile.pad_s else 0  # mm/s north and east
+        sec = tod % 60
+        payload = struct.pack(
+            NAV_PVT_FORMAT, int(tod * 1000) % 604800000, 2026, 10, 18,
+            int(tod // 3600) % 24, int(tod // 60) % 60, int(sec), 0x07 if fix else 0, 50,
+            int((sec - int(sec)) * 1e9), 3 if fix else 0, 0x01 if fix else 0, 0, sats,
+            int(round(lon * 1e7)) if fix else 0, int(round(lat * 1e7)) if fix else 0,
+            int((alt - 86.0) * 1000) if fix else 0, int(alt * 1000) if fix else 0,
+            2500, 4000, drift, drift, int(-climb * 1000), int(drift * 1.414), 4500000,
+            300, 100000, 160, 0, 0, 0)
+        return ubx(0x01, 0x07, payload)
+
+    def pump(self, now):
+        """Advance the transmitter to ``now`` and return the bytes put on the wire."""
+        out = bytearray()
+        bps = self.bytes_per_s
+        while True:
+            t_end = min(now, self._next_epoch)
+            if t_end > self._tx_clock:
+                n = int((t_end - self._tx_clock) * bps)
+                take = min(n, len(self.pending))
+                if take:
+                    out += self.pending[:take]
+                    del self.pending[:take]
+                if self.pending:
+                    self._tx_clock += take / bps
+                else:
+                    self._tx_clock = t_end
+            if now < self._next_epoch:
+                break
+            self.pending += self.epoch_sentences(self._next_epoch)
+            self.epochs += 1
+            self._next_epoch += 1.0 / self.rate_hz
+        self.bytes_sent += len(out)
+        return out
+
+    def receive(self, data):
+        """Bytes written by the Pico to the receiver's RX line."""
+        self.received += data
+        if not self.ubx:
+            return
+        rx = self._rx
+        rx += data
+        while True:
+            start = rx.find(b"\xb5\x62")
+            if start < 0:
+                del rx[:-1]
+                return
+            del rx[:start]
+            if len(rx) < 6:
+                return
+            length = rx[4] | rx[5] << 8
+            if len(rx) < length + 8:
+                return
+            msg = bytes(rx[:length + 8])
+            del rx[:length + 8]
+            if ubx(msg[2], msg[3], msg[6:-2]) == msg:
+                self._command(msg[2], msg[3], msg[6:-2])
+
+    def _command(self, cls, msg_id, payload):
+        ok = False
+        if cls == 0x06 and msg_id == 0x00 and len(payload) == 20:  # CFG-PRT
+            # Switches right away: the ACK already goes out at the new rate
+            self.baudrate = struct.unpack_from("<I", payload, 8)[0]
+            ok = True
+        elif cls == 0x06 and msg_id == 0x08 and len(payload) == 6:  # CFG-RATE
+            rate = 1000 / struct.unpack_from("<H", payload)[0]
+            ok = rate <= self.max_rate_hz
+            if ok:
+                self.rate_hz = rate
+        elif cls == 0x06 and msg_id == 0x01 and len(payload) == 3:  # CFG-MSG
+            msg_cls, msg, rate = payload
+            if msg_cls == 0xF0 and msg in NMEA_IDS:
+                name = NMEA_IDS[msg]
+                if rate and name not in self.sentences:
+                    self.sentences.append(name)
+                elif not rate and name in self.sentences:
+                    self.sentences.remove(name)
+                ok = True
+            elif msg_cls == 0x01 and msg == 0x07 and self.has_nav_pvt:
+                self.nav_pvt = bool(rate)
+                ok = True
+        if ok:
+            self.acks += 1
+        else:
+            self.naks += 1
+        self.pending += ubx(0x05, 0x01 if ok else 0x00, bytes((cls, msg_id)))
@@ -0,0 +1,51 @@
+"""
+MicroPython ``gc`` extensions for CPython.
+
+``gc.mem_alloc()`` on the Pico keeps growing with every allocation until
+the next collection, because MicroPython only frees memory when it
+collects.  CPython frees objects as soon as they are dropped, so here,
+while ``tracemalloc`` is tracing, each call adds the high-water mark of the
+traced memory since the previous call: a lower bound on what was allocated
+in between (CPython's own int objects included, which MicroPython keeps as
+small ints).  ``gc.collect()`` brings the count back to the live bytes.
+Without tracing it stays at zero.
+"""
+
+import gc
+import tracemalloc
+
+HEAP_BYTES = 192 * 1024  # about what a Pico W has free after the firmware has loaded
+
+_collect = gc.collect
+_heap = 0
+_base = 0
+
+
+def mem_alloc():
+    global _heap, _base
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        _heap += max(0, peak - _base)
+        tracemalloc.reset_peak()
+        _base = current
+    return _heap
+
+
+def mem_free():
+    return max(0, HEAP_BYTES - mem_alloc())
+
+
+def collect(*args):
+    global _heap, _base
+    n = _collect(*args)
+    _base = _heap = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    return n
+
+
+def install():
+    if not hasattr(gc, "mem_alloc"):
+        gc.mem_alloc = mem_alloc
+        gc.mem_free = mem_free
+        gc.collect = collect
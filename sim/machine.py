@@ -0,0 +1,234 @@
+"""
+CPython implementation of the parts of ``machine`` the flight software uses.
+
+Peripherals are wired to the models on ``sim.board.current()`` at
+construction time.  Errors are raised the way the rp2 port raises them
+(``OSError(5)`` for a NAK on the I2C bus).
+"""
+
+from sim import board as _board
+
+_EIO = 5
+
+
+def freq(hz=None):
+    return 125000000
+
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._value = 0
+        self._handler = None
+        self.init(mode, pull, value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+        if value is not None:
+            self._value = 1 if value else 0
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = 1 if v else 0
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def toggle(self):
+        self._value ^= 1
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        # Handlers run on the board's interrupt threads when a device pulses the line
+        self._handler = handler
+        pins = _board.current().pins
+        if handler is None:
+            pins.pop(self.id, None)
+        else:
+            pins[self.id] = self
+
+
+class Timer:
+    """Virtual timer; the callback runs on a background thread at absolute deadlines."""
+
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, mode=PERIODIC, freq=-1, period=-1, callback=None, hard=True):
+        self._ticker = None
+        if callback is not None:
+            self.init(mode=mode, freq=freq, period=period, callback=callback, hard=hard)
+
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None, hard=True):
+        self.deinit()
+        period_s = 1.0 / freq if freq > 0 else period / 1000
+        self._ticker = _board.current().ticker(period_s, lambda: callback(self), mode == Timer.ONE_SHOT)
+
+    def deinit(self):
+        if self._ticker is not None:
+            self._ticker.stop()
+            self._ticker = None
+
+
+class I2C:
+    def __init__(self, id, scl=None, sda=None, freq=400000, timeout=50000):
+        self.id = id
+        self.freq = freq
+        self.bus = _board.current().i2c[id]
+
+    def _device(self, addr):
+        dev = self.bus.devices.get(addr)
+        if dev is None:
+            self.bus.account(0)
+            raise OSError(_EIO)
+        return dev
+
+    def scan(self):
+        return sorted(self.bus.devices)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        dev = self._device(addr)
+        self.bus.account(nbytes)
+        return dev.read(memaddr, nbytes)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        dev = self._device(addr)
+        self.bus.account(len(buf))
+        buf[:] = dev.read(memaddr, len(buf))
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        dev = self._device(addr)
+        self.bus.account(len(buf))
+        dev.write(memaddr, bytes(buf))
+
+    def readfrom(self, addr, nbytes, stop=True):
+        return self.readfrom_mem(addr, 0, nbytes)
+
+    def writeto(self, addr, buf, stop=True):
+        if len(buf):
+            self.writeto_mem(addr, buf[0], buf[1:])
+        return 1
+
+
+class UART:
+    def __init__(self, id, baudrate=9600, bits=8, parity=None, stop=1, tx=None, rx=None,
+                 txbuf=256, rxbuf=256, timeout=0, timeout_char=0, **kwargs):
+        self.id = id
+        self.device = _board.current().uart.get(id)
+        self._rx = bytearray()
+        self.overruns = 0
+        self.init(baudrate, rxbuf=rxbuf, timeout=timeout)
+
+    def init(self, baudrate=9600, bits=8, parity=None, stop=1, rxbuf=None, timeout=0, **kwargs):
+        self.baudrate = baudrate
+        if rxbuf is not None:
+            self.rxbuf = rxbuf
+        self.timeout = timeout
+
+    def deinit(self):
+        self.device = None
+
+    def _pump(self):
+        if self.device is None:
+            return
+        data = self.device.pump(self.device.board.now())
+        if not data:
+            return
+        if self.baudrate != self.device.baudrate:
+            # A receiver clocked at another rate produces framing garbage.
+            data = b"\xff" * len(data)
+        room = self.rxbuf - len(self._rx)
+        if len(data) > room:
+            self.overruns += len(data) - room
+            data = data[:room]
+        self._rx += data
+
+    def any(self):
+        self._pump()
+        return len(self._rx)
+
+    def read(self, nbytes=None):
+        self._pump()
+        if not self._rx:
+            return None
+        if nbytes is None or nbytes >= len(self._rx):
+            out = bytes(self._rx)
+            self._rx.clear()
+        else:
+            out = bytes(self._rx[:nbytes])
+            del self._rx[:nbytes]
+        return out
+
+    def readinto(self, buf, nbytes=None):
+        self._pump()
+        if not self._rx:
+            return None
+        n = min(len(buf) if nbytes is None else nbytes, len(self._rx))
+        buf[:n] = self._rx[:n]
+        del self._rx[:n]
+        return n
+
+    def readline(self):
+        self._pump()
+        if not self._rx:
+            return None
+        end = self._rx.find(b"\n")
+        n = len(self._rx) if end < 0 else end + 1
+        out = bytes(self._rx[:n])
+        del self._rx[:n]
+        return out
+
+    def write(self, buf):
+        if self.device is not None and self.baudrate == self.device.baudrate:
+            self.device.receive(bytes(buf))
+        return len(buf)
+
+    def flush(self):
+        pass
+
+    def txdone(self):
+        return True
+
+
+class SPI:
+    """Unconnected SPI controller; the SD card is modelled at block level."""
+
+    def __init__(self, id, baudrate=1000000, polarity=0, phase=0, bits=8,
+                 firstbit=0, sck=None, mosi=None, miso=None):
+        self.id = id
+        self.init(baudrate=baudrate, polarity=polarity, phase=phase)
+
+    def init(self, baudrate=1000000, polarity=0, phase=0, **kwargs):
+        self.baudrate = baudrate
+
+    def write(self, buf):
+        pass
+
+    def read(self, nbytes, write=0x00):
+        return bytes([0xFF]) * nbytes
+
+    def readinto(self, buf, write=0x00):
+        for i in range(len(buf)):
+            buf[i] = 0xFF
+
+    def write_readinto(self, write_buf, read_buf):
+        self.readinto(read_buf)
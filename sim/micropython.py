@@ -0,0 +1,30 @@
+"""CPython stand-in for the ``micropython`` builtin module."""
+
+
+def const(value):
+    return value
+
+
+def schedule(func, arg):
+    # There is no IRQ context on the host; run the callback straight away.
+    func(arg)
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def mem_info(verbose=False):
+    pass
+
+
+def opt_level(level=None):
+    return 0
+
+
+def native(func):
+    return func
+
+
+def viper(func):
+    return func
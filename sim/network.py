@@ -0,0 +1,36 @@
+"""CPython stand-in for the ``network`` module (CYW43 access point)."""
+
+STA_IF = 0
+AP_IF = 1
+
+AP_ADDRESS = ("192.168.4.1", "255.255.255.0", "192.168.4.1", "0.0.0.0")
+
+
+class WLAN:
+    PM_NONE = 0x10
+    PM_PERFORMANCE = 0xA11142
+    PM_POWERSAVE = 0x111022
+
+    def __init__(self, interface_id=STA_IF):
+        self.interface_id = interface_id
+        self._active = False
+        self._config = {"essid": "", "password": "", "channel": 1, "pm": self.PM_PERFORMANCE}
+
+    def active(self, state=None):
+        if state is None:
+            return self._active
+        self._active = bool(state)
+
+    def config(self, *args, **kwargs):
+        if args:
+            return self._config[args[0]]
+        self._config.update(kwargs)
+
+    def ifconfig(self, config=None):
+        return AP_ADDRESS
+
+    def isconnected(self):
+        return self._active
+
+    def status(self, param=None):
+        return [] if param == "stations" else 3
@@ -0,0 +1,118 @@
+"""
+Scripted flight used to drive the simulated sensors.
+
+The default flight is a small rocket launch: the can sits on the pad, is
+boosted, coasts to apogee, descends under parachute (spinning slowly and
+swinging like a pendulum) and lands.  All values are
+analytic so the models stay cheap enough not to distort benchmarks.
+"""
+
+import math
+
+G = 9.80665
+
+SEA_LEVEL_PA = 101325.0
+SITE_LAT = 12.9716
+SITE_LON = 77.5946
+
+
+def pressure_at(alt_msl):
+    return SEA_LEVEL_PA * (1 - 2.25577e-5 * alt_msl) ** 5.25588
+
+
+class FlightProfile:
+    def __init__(self, pad_s=10.0, burn_s=1.5, boost_accel=80.0, descent_rate=8.0,
+                 site_alt=920.0, ground_temp=28.4, spin_dps=30.0, swing_deg=10.0,
+                 swing_period_s=2.0, noise=True):
+        self.pad_s = pad_s
+        self.burn_s = burn_s
+        self.boost_accel = boost_accel
+        self.descent_rate = descent_rate
+        self.site_alt = site_alt
+        self.ground_temp = ground_temp
+        self.spin_dps = spin_dps
+        self.swing_deg = swing_deg
+        self.swing_period_s = swing_period_s
+        self.noise = noise
+
+        self.burnout_v = boost_accel * burn_s
+        self.burnout_h = 0.5 * boost_accel * burn_s * burn_s
+        self.coast_s = self.burnout_v / G
+        self.apogee_t = pad_s + burn_s + self.coast_s
+        self.apogee_h = self.burnout_h + self.burnout_v * self.coast_s - 0.5 * G * self.coast_s ** 2
+        # Free fall after apogee until the parachute holds the descent rate
+        self.fall_s = descent_rate / G
+        self.deploy_h = self.apogee_h - 0.5 * G * self.fall_s ** 2
+        self.landing_t = self.apogee_t + self.fall_s + self.deploy_h / descent_rate
+
+    def phase(self, t):
+        if t < self.pad_s:
+            return "pad"
+        if t < self.pad_s + self.burn_s:
+            return "boost"
+        if t < self.apogee_t:
+            return "coast"
+        if t < self.landing_t:
+            return "descent"
+        return "landed"
+
+    def kinematics(self, t):
+        """Return (altitude AGL in m, vertical speed in m/s, specific force along z in g)."""
+        if t < self.pad_s:
+            return 0.0, 0.0, 1.0
+        tb = t - self.pad_s
+        if tb < self.burn_s:
+            a = self.boost_accel
+            return 0.5 * a * tb * tb, a * tb, (a + G) / G
+        tc = tb - self.burn_s
+        if t < self.apogee_t:
+            h = self.burnout_h + self.burnout_v * tc - 0.5 * G * tc * tc
+            return h, self.burnout_v - G * tc, 0.0
+        td = t - self.apogee_t
+        if td < self.fall_s:
+            return self.apogee_h - 0.5 * G * td * td, -G * td, 0.0
+        if t < self.landing_t:
+            return self.deploy_h - self.descent_rate * (td - self.fall_s), -self.descent_rate, 1.0
+        return 0.0, 0.0, 1.0
+
+    def _noise(self, t, k):
+        if not self.noise:
+            return 0.0
+        return math.sin(t * (37.0 + 11.0 * k) + k) * 0.5 + math.sin(t * (91.0 + 7.0 * k)) * 0.5
+
+    def altitude(self, t):
+        return self.kinematics(t)[0]
+
+    def pressure(self, t):
+        h = self.kinematics(t)[0]
+        return pressure_at(self.site_alt + h) + 1.5 * self._noise(t, 0)
+
+    def temperature(self, t):
+        return self.ground_temp - 0.0065 * self.kinematics(t)[0] + 0.05 * self._noise(t, 1)
+
+    def swing(self, t):
+        """Return (roll in deg, roll rate in deg/s) of the swing under the parachute."""
+        if self.phase(t) != "descent":
+            return 0.0, 0.0
+        w = 2 * math.pi / self.swing_period_s
+        x = w * (t - self.apogee_t)
+        return self.swing_deg * math.sin(x), self.swing_deg * w * math.cos(x)
+
+    def accel(self, t):
+        """Specific force in g along the body axes (z up the can)."""
+        fz = self.kinematics(t)[2]
+        roll = math.radians(self.swing(t)[0])
+        return (0.01 * self._noise(t, 2), fz * math.sin(roll) + 0.01 * self._noise(t, 3),
+                fz * math.cos(roll) + 0.01 * self._noise(t, 4))
+
+    def gyro(self, t):
+        """Body rates in deg/s; the can spins slowly under the parachute."""
+        spin = self.spin_dps if self.phase(t) == "descent" else 0.0
+        return (self.swing(t)[1] + 0.3 * self._noise(t, 5), 0.3 * self._noise(t, 6),
+                spin + 0.3 * self._noise(t, 7))
+
+    def position(self, t):
+        """Return (lat, lon, altitude MSL) drifting slowly north-east."""
+        h = self.kinematics(t)[0]
+        drift = max(0.0, t - self.pad_s) * 2.0e-6
+        return SITE_LAT + drift, SITE_LON + drift, self.site_alt + h
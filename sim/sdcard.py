@@ -0,0 +1,59 @@
+"""
+In-memory stand-in for ``sdcard.SDCard``.
+
+Implements the same block protocol as the SPI driver (readblocks,
+writeblocks, ioctl) on top of a sparse sector map held by the board, and
+counts the command traffic the real driver would generate: a single-block
+write is CMD24, a multi-block write is one CMD25 plus a stop token.
+"""
+
+from sim import board as _board
+
+BLOCK_SIZE = 512
+_EMPTY = bytes(BLOCK_SIZE)
+
+
+class SDCard:
+    def __init__(self, spi=None, cs=None, baudrate=1320000):
+        board = _board.current()
+        if not board.sd_card:
+            raise OSError("no SD card")
+        self.sectors = board.sd_sectors
+        self.blocks = board.sd_blocks
+        self.reads = 0
+        self.writes = 0
+        self.multi_writes = 0
+        self.blocks_read = 0
+        self.blocks_written = 0
+
+    def _check(self, block_num, buf):
+        nblocks, err = divmod(len(buf), BLOCK_SIZE)
+        assert nblocks and not err, "Buffer length is invalid"
+        if block_num < 0 or block_num + nblocks > self.sectors:
+            raise OSError(5)  # EIO
+        return nblocks
+
+    def readblocks(self, block_num, buf):
+        nblocks = self._check(block_num, buf)
+        mv = memoryview(buf)
+        for i in range(nblocks):
+            mv[i * BLOCK_SIZE:(i + 1) * BLOCK_SIZE] = self.blocks.get(block_num + i, _EMPTY)
+        self.reads += 1
+        self.blocks_read += nblocks
+
+    def writeblocks(self, block_num, buf):
+        nblocks = self._check(block_num, buf)
+        mv = memoryview(buf)
+        for i in range(nblocks):
+            self.blocks[block_num + i] = bytes(mv[i * BLOCK_SIZE:(i + 1) * BLOCK_SIZE])
+        self.writes += 1
+        if nblocks > 1:
+            self.multi_writes += 1
+        self.blocks_written += nblocks
+
+    def ioctl(self, op, arg):
+        if op == 4:  # get number of blocks
+            return self.sectors
+        if op == 5:  # get block size in bytes
+            return BLOCK_SIZE
+        return 0
@@ -0,0 +1,123 @@
+"""
+In-process loopback implementation of the MicroPython ``socket`` API.
+
+The flight software listens on port 80 as usual; benchmarks play the
+dashboard clients with ``connect()``, which hands a connected socket pair to
+the listener's accept queue.  Nothing touches the host network.
+
+A client created with ``rcvbuf`` only accepts that many unread bytes, so a
+phone that reads slowly makes the server's ``send`` return short counts or
+EAGAIN, the way lwIP does when the TCP window is full.
+"""
+
+AF_INET = 2
+SOCK_STREAM = 1
+SOL_SOCKET = 1
+SO_REUSEADDR = 4
+
+_EAGAIN = 11
+_ECONNREFUSED = 111
+_ENOTCONN = 107
+_ECONNRESET = 104
+
+_listeners = {}
+
+
+def getaddrinfo(host, port, af=0, type=0, proto=0, flags=0):
+    return [(AF_INET, SOCK_STREAM, 0, "", (host, port))]
+
+
+class socket:
+    def __init__(self, af=AF_INET, type=SOCK_STREAM, proto=0):
+        self._rx = bytearray()
+        self._peer = None
+        self._closed = False
+        self._blocking = True
+        self._backlog = None
+        self._port = None
+        self._rcvbuf = None
+        self.bytes_sent = 0
+
+    # ----- listener side -----
+    def setsockopt(self, level, optname, value):
+        pass
+
+    def bind(self, addr):
+        self._port = addr[1]
+
+    def listen(self, backlog=0):
+        self._backlog = []
+        self._backlog_size = max(1, backlog)
+        _listeners[self._port] = self
+
+    def setblocking(self, flag):
+        self._blocking = flag
+
+    def settimeout(self, value):
+        self._blocking = value is None
+
+    def accept(self):
+        if not self._backlog:
+            raise OSError(_EAGAIN)
+        conn = self._backlog.pop(0)
+        return conn, ("192.168.4.2", 50000 + len(self._backlog))
+
+    # ----- stream side -----
+    def send(self, data):
+        if self._peer is None or self._closed:
+            raise OSError(_ENOTCONN)
+        if self._peer._closed:
+            raise OSError(_ECONNRESET)
+        limit = self._peer._rcvbuf
+        if limit is not None:
+            space = limit - len(self._peer._rx)
+            if space <= 0:
+                raise OSError(_EAGAIN)
+            data = data[:space]
+        self._peer._rx += data
+        self.bytes_sent += len(data)
+        return len(data)
+
+    write = send
+
+    def sendall(self, data):
+        self.send(data)
+
+    def recv(self, bufsize):
+        if not self._rx:
+            if self._peer is None or self._peer._closed:
+                return b""
+            raise OSError(_EAGAIN)
+        out = bytes(self._rx[:bufsize])
+        del self._rx[:bufsize]
+        return out
+
+    read = recv
+
+    def readline(self):
+        end = self._rx.find(b"\n")
+        n = len(self._rx) if end < 0 else end + 1
+        out = bytes(self._rx[:n])
+        del self._rx[:n]
+        return out
+
+    def close(self):
+        self._closed = True
+        if self._backlog is not None and _listeners.get(self._port) is self:
+            del _listeners[self._port]
+
+
+def connect(port=80, request=b"GET / HTTP/1.1\r\nHost: 192.168.4.1\r\n\r\n", rcvbuf=None):
+    """Open a client connection to a listening flight-software socket."""
+    server = _listeners.get(port)
+    if server is None or len(server._backlog) >= server._backlog_size:
+        raise OSError(_ECONNREFUSED)
+    client = socket()
+    client._rcvbuf = rcvbuf
+    conn = socket()
+    client._peer = conn
+    conn._peer = client
+    if request:
+        client.send(request)
+    server._backlog.append(conn)
+    return client
@@ -0,0 +1,21 @@
+"""
+Mount points for the simulator.
+
+There is no FAT driver on the host, so mounting a card maps the mount point
+to a scratch directory owned by the board; file I/O then goes through the
+normal CPython ``open``.
+"""
+
+from sim import board as _board
+
+mounts = {}
+
+
+def mount(dev, point):
+    path = _board.current().sd_dir
+    mounts[point] = (dev, path)
+    return path
+
+
+def umount(point):
+    mounts.pop(point, None)
@@ -0,0 +1,64 @@
+"""
+Single-producer/single-consumer ring of fixed-size slots.
+
+Hands records from one core to the other without a lock: only the producer
+moves ``head`` and only the consumer moves ``tail``, each after the slot
+contents are complete, and each index is a single array word so a store is
+never seen half-done.  Indices run modulo twice the slot count, which tells
+a full ring from an empty one and keeps them small ints (no allocation on
+either side).  When the ring is full the producer drops the new record and
+counts it in ``overflows``.
+
+    ring = Ring(64, 32)
+    off = ring.reserve()       # producer: -1 if full
+    pack_into(..., ring.buf, off, ...)
+    ring.commit()
+    n = ring.available()       # consumer
+    off = ring.slot(0) ... ring.release(n)
+    dest[a:a + 32] = ring.view(0)   # the whole slot, without slicing a memoryview
+"""
+
+from array import array
+
+
+class Ring:
+    def __init__(self, slots, slot_size):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.slots = slots
+        self.slot_size = slot_size
+        self.buf = bytearray(slots * slot_size)
+        self.mv = memoryview(self.buf)
+        self.views = [self.mv[k * slot_size:(k + 1) * slot_size] for k in range(slots)]
+        self._wrap = 2 * slots - 1
+        self.idx = array('i', (0, 0))  # head (producer), tail (consumer)
+        self.overflows = 0  # written by the producer only
+
+    # ----- producer -----
+    def reserve(self):
+        """Offset of the next free slot, or -1 (and one more overflow) if full."""
+        idx = self.idx
+        head = idx[0]
+        if (head - idx[1]) & self._wrap == self.slots:
+            self.overflows += 1
+            return -1
+        return (head & (self.slots - 1)) * self.slot_size
+
+    def commit(self):
+        self.idx[0] = (self.idx[0] + 1) & self._wrap
+
+    # ----- consumer -----
+    def available(self):
+        idx = self.idx
+        return (idx[0] - idx[1]) & self._wrap
+
+    def slot(self, i):
+        """Offset of the i-th oldest unread slot."""
+        return ((self.idx[1] + i) & (self.slots - 1)) * self.slot_size
+
+    def view(self, i):
+        """Memoryview of the i-th oldest unread slot (made once, so this allocates nothing)."""
+        return self.views[(self.idx[1] + i) & (self.slots - 1)]
+
+    def release(self, n):
+        self.idx[1] = (self.idx[1] + n) & self._wrap
@@ -0,0 +1,5 @@
+"""
+Ground-side tools that run under normal Python.
+
+Run from the repository root, e.g. ``python -m tools.decode_log log.bin``.
+"""
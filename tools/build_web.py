@@ -0,0 +1,38 @@
+"""
+Precompress the dashboard for the flight software to serve from flash.
+
+    python -m tools.build_web
+
+Writes ``www/index.html.gz`` next to ``www/index.html``; upload the .gz to
+``/www/`` on the Pico.  The output is deterministic (no timestamp in the
+gzip header), so the ETag the Pico derives from the gzip CRC only changes
+when the page does.
+"""
+
+import argparse
+import gzip
+import os
+
+WWW = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "www")
+
+
+def build(src):
+    with open(src, "rb") as f:
+        page = f.read()
+    data = gzip.compress(page, compresslevel=9, mtime=0)
+    with open(src + ".gz", "wb") as f:
+        f.write(data)
+    return len(page), len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="*", default=[os.path.join(WWW, "index.html")])
+    args = parser.parse_args()
+    for src in args.pages:
+        size, packed = build(src)
+        print("%s.gz: %d -> %d bytes" % (src, size, packed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Decode a binary flight log into the same CSV layout ``main.py`` writes.
+
+    python -m tools.decode_log /path/to/cansat_log_000.bin > flight.csv
+
+Ticks are unwrapped into seconds since the first record, BMP280 counts are
+compensated with the calibration stored in the log header and GPS records
+are carried forward onto the sensor rows.  GPS coordinates are written in
+decimal degrees.  Roll, pitch and yaw come from running the flight
+software's attitude filter over every IMU sample at its logged time, and
+altitude above ground, vertical speed and apogee from its altitude filter.
+The flight phase is carried forward from the logged phase transitions.
+Seq and Sample_Ticks(us) are each row's record sequence number and raw stamp.
+Stage run-time summaries become ``# stats`` comment lines, as in the CSV log.
+"""
+
+import argparse
+import struct
+import sys
+
+from array import array
+
+import binlog
+from attitude import Attitude, angles
+from altitude import AltitudeFilter
+from flightphase import NAMES as PHASE_NAMES, PAD
+
+CSV_HEADER = ("Time(s),Temp(C),Pressure(hPa),Altitude_BMP(m),Altitude_AGL(m),Vertical_Speed(m/s),Apogee_AGL(m),Accel_X(g),Accel_Y(g),Accel_Z(g),"
+              "Gyro_X(deg/s),Gyro_Y(deg/s),Gyro_Z(deg/s),Roll(deg),Pitch(deg),Yaw(deg),GPS_Lat,GPS_Lon,GPS_Alt(m),Satellites,Phase,Seq,Sample_Ticks(us)")
+STATS_LINE = "# stats %.1f %s runs=%d avg_us=%d p99_us=%d max_us=%d errors=%d\n"
+
+
+class Compensator:
+    """BMP280 integer compensation (datasheet 8.2), identical to the driver."""
+
+    def __init__(self, calibration):
+        (self.T1, self.T2, self.T3, self.P1, self.P2, self.P3, self.P4, self.P5,
+         self.P6, self.P7, self.P8, self.P9) = struct.unpack("<HhhHhhhhhhhh", calibration)
+
+    def __call__(self, raw):
+        adc_P = (raw[0] << 12) | (raw[1] << 4) | (raw[2] >> 4)
+        adc_T = (raw[3] << 12) | (raw[4] << 4) | (raw[5] >> 4)
+        var1 = (((adc_T >> 3) - (self.T1 << 1)) * self.T2) >> 11
+        var2 = (((((adc_T >> 4) - self.T1) * ((adc_T >> 4) - self.T1)) >> 12) * self.T3) >> 14
+        t_fine = var1 + var2
+        temperature = ((t_fine * 5 + 128) >> 8) / 100
+        var1 = t_fine - 128000
+        var2 = var1 * var1 * self.P6
+        var2 = var2 + ((var1 * self.P5) << 17)
+        var2 = var2 + (self.P4 << 35)
+        var1 = ((var1 * var1 * self.P3) >> 8) + ((var1 * self.P2) << 12)
+        var1 = (((1 << 47) + var1) * self.P1) >> 33
+        if var1 == 0:
+            return temperature, 0.0
+        p = 1048576 - adc_P
+        p = (((p << 31) - var2) * 3125) // var1
+        var1 = (self.P9 * (p >> 13) * (p >> 13)) >> 25
+        var2 = (self.P8 * p) >> 19
+        p = ((p + var1 + var2) >> 8) + (self.P7 << 4)
+        return temperature, p / 256
+
+
+def decode(data, out, beta=0.1, ground_hpa=0, sea_level_hpa=1013.25):
+    hdr = binlog.read_header(data)
+    compensate = Compensator(hdr["bmp280_calibration"])
+    accel = 1 / hdr["accel_lsb"]
+    clip = 32000 * accel
+    gyro = 1 / hdr["gyro_lsb"]
+    period = hdr["ticks_period"]
+    half = period // 2
+
+    out.write(CSV_HEADER + "\n")
+    gps = ("N/A", "N/A", "N/A", "0")
+    baro = ("0.00", "0.00", "0.00")
+    phase = PHASE_NAMES[PAD]
+    att = Attitude(beta)
+    imu = array('f', bytes(24))
+    euler = angles()
+    imu_time = None
+    alt = AltitudeFilter(ground_hpa * 100)
+    baro_time = None
+    last = None
+    elapsed = 0
+    rows = 0
+    for rec in binlog.iter_records(data, hdr):
+        ticks = rec[3]
+        if last is None:
+            last = ticks
+        elapsed += ((ticks - last + half) % period) - half
+        last = ticks
+        if rec[0] == binlog.REC_GPS:
+            _, sats, _, _, lat, lon, alt_cm, _, _, fix, _, _, _ = rec
+            if fix:
+                gps = ("%.7f" % (lat / 1e7), "%.7f" % (lon / 1e7), "%.1f" % (alt_cm / 100), str(sats))
+            continue
+        if rec[0] == binlog.REC_EVENT:
+            if rec[1] == binlog.EVENT_PHASE and 0 <= rec[4] < len(PHASE_NAMES):
+                phase = PHASE_NAMES[rec[4]]
+            continue
+        if rec[0] == binlog.REC_STATS:
+            _, _, _, _, stage, errors, runs, avg_us, p99_us, max_us = rec
+            out.write(STATS_LINE % (elapsed / 1e6, stage.rstrip(b"\0").decode(), runs, avg_us, p99_us, max_us, errors))
+            continue
+        _, flags, seq, _, baro_raw, imu_raw, _ = rec
+        ax, ay, az, _, gx, gy, gz = struct.unpack(">7h", imu_raw)
+        if flags & binlog.FLAG_IMU:
+            imu[0], imu[1], imu[2] = ax * accel, ay * accel, az * accel
+            imu[3], imu[4], imu[5] = gx * gyro, gy * gyro, gz * gyro
+            if imu_time is None:
+                att.align(imu)
+            else:
+                dt = (elapsed - imu_time) / 1e6
+                att.update(imu, dt)
+                alt.predict(att.vertical(imu), dt, max(abs(ax), abs(ay), abs(az)) * accel > clip)
+            imu_time = elapsed
+            att.euler(euler)
+        if flags & binlog.FLAG_BARO:
+            temperature, pressure = compensate(baro_raw)
+            if imu_time is None and baro_time is not None:
+                alt.predict(0.0, (elapsed - baro_time) / 1e6)
+            baro_time = elapsed
+            alt.baro(pressure)
+            hpa = pressure / 100
+            altitude = 44330 * (1 - (hpa / sea_level_hpa) ** 0.1903)
+            baro = ("%.2f" % temperature, "%.2f" % hpa, "%.2f" % altitude)
+        out.write("%.6f,%s,%s,%s,%.2f,%.2f,%.1f,%.3f,%.3f,%.3f,%.2f,%.2f,%.2f,%.1f,%.1f,%.1f,%s,%s,%s,%s,%s,%d,%d\n" % (
+            elapsed / 1e6, baro[0], baro[1], baro[2], alt.x[0], alt.x[1], alt.apogee,
+            ax * accel, ay * accel, az * accel, gx * gyro, gy * gyro, gz * gyro,
+            euler[0], euler[1], euler[2], gps[0], gps[1], gps[2], gps[3], phase, seq, ticks))
+        rows += 1
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("log", help="binary log written with LOG_FORMAT = 'binary'")
+    parser.add_argument("-o", "--output", help="CSV file to write (default: stdout)")
+    parser.add_argument("--beta", type=float, default=0.1, help="attitude filter gain, ATT_BETA in main.py")
+    parser.add_argument("--ground-hpa", type=float, default=0,
+                        help="launch site pressure (default: average of the first second)")
+    parser.add_argument("--sea-level-hpa", type=float, default=1013.25,
+                        help="reference pressure for Altitude_BMP, SEA_LEVEL_HPA in main.py")
+    args = parser.parse_args()
+    with open(args.log, "rb") as f:
+        data = f.read()
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        rows = decode(data, out, args.beta, args.ground_hpa, args.sea_level_hpa)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print("%d sensor rows" % rows, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Extract flight logs from a raw log region (LOG_FORMAT = "raw").
+
+    python -m tools.extract_raw /media/$USER/SDCARD/CANSAT.RAW -o flights/
+    python -m tools.extract_raw card.img --offset 6172 -o flights/ --csv
+
+The input is either the CANSAT.RAW file copied off the card or a whole-card
+image with ``--offset`` giving the file's first sector (printed at boot).
+Every session (boot) becomes ``session_NNN.bin`` in the binary log format,
+which ``tools.decode_log`` turns into CSV; ``--csv`` does that directly.
+Blocks that fail their CRC are skipped and reported as gaps.
+"""
+
+import argparse
+import os
+import sys
+
+import binlog
+import rawlog
+from tools.decode_log import decode
+
+
+def extract(data):
+    """Return {session: (header bytes, record bytes, stats)} from a region image."""
+    sessions = {}
+    for index, seq, session, kind, ticks, payload in rawlog.iter_blocks(data):
+        sessions.setdefault(session, []).append((seq, index, kind, payload))
+
+    result = {}
+    for session, blocks in sessions.items():
+        blocks.sort()
+        header = None
+        records = bytearray()
+        gaps = 0
+        expected = 0
+        for seq, index, kind, payload in blocks:
+            if seq != expected:
+                gaps += seq - expected
+            expected = seq + 1
+            if kind == rawlog.KIND_HEADER:
+                header = payload.ljust(binlog.HEADER_SIZE, b"\0")
+            else:
+                records += payload
+        if header is None:
+            # Header block lost: fall back to default scales and no calibration
+            header = bytes(binlog.header(None, 16384.0, 131.0))
+        stats = {"blocks": len(blocks), "missing_blocks": gaps,
+                 "first_block": blocks[0][1], "records": len(records) // binlog.RECORD_SIZE}
+        result[session] = (header, bytes(records), stats)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("region", help="CANSAT.RAW copy or card image")
+    parser.add_argument("--offset", type=int, default=0, help="first sector of the region in an image")
+    parser.add_argument("-o", "--output", default=".", help="output directory")
+    parser.add_argument("--csv", action="store_true", help="also decode each session to CSV")
+    args = parser.parse_args()
+
+    with open(args.region, "rb") as f:
+        f.seek(args.offset * rawlog.BLOCK)
+        data = f.read()
+    sb = rawlog.read_super(data)
+    if sb is None:
+        print("warning: no superblock, scanning anyway", file=sys.stderr)
+    else:
+        print("region: %d sectors, last session %d" % (sb["sectors"], sb["session"]), file=sys.stderr)
+
+    os.makedirs(args.output, exist_ok=True)
+    for session, (header, records, stats) in sorted(extract(data).items()):
+        path = os.path.join(args.output, "session_%03d.bin" % session)
+        with open(path, "wb") as f:
+            f.write(header)
+            f.write(records)
+        print("%s: %d blocks from block %d, %d records, %d missing blocks" % (
+            path, stats["blocks"], stats["first_block"], stats["records"], stats["missing_blocks"]),
+            file=sys.stderr)
+        if args.csv:
+            with open(path[:-4] + ".csv", "w") as out:
+                decode(header + records, out)
+
+
+if __name__ == "__main__":
+    main()
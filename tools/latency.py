@@ -0,0 +1,166 @@
+"""
+Measure sample-to-display latency of the live telemetry stream.
+
+    python -m tools.latency
+    python -m tools.latency --host 192.168.4.1 --interval 5 --seconds 60
+
+Subscribes to ``/api/stream`` like a dashboard and, for every frame, works
+out how old its newest reading is on arrival.  Frames carry the ``ticks_us``
+of that reading (``ticks``).  The can's clock and this one are not
+synchronised, so every ``--sync`` seconds, as the dashboard does, a request
+to ``/api/latency`` fetches the can's ``ticks_us`` and its round trip sets
+the offset between the clocks, wrong by at most half the round trip.  Of the
+last ``SYNC_KEEP`` round trips the fastest counts, so a slow one does not
+spoil the offset and the clocks' drift apart over a long session is
+re-based away.  Until the first round trip (or against a can that does not
+answer one) the smallest gap seen between a frame's arrival and its
+rendering (``sent``) stands in for the offset: figures are then low by the
+fastest delivery seen, which for a subscriber that never keeps up is most
+of its latency.  Missing stream frame numbers are counted as dropped
+frames.  Every ``--interval`` seconds the percentiles of that window are
+printed.
+"""
+
+import argparse
+import json
+import socket
+import sys
+import time
+
+TICKS_PERIOD = 1 << 30  # ticks_us wraps here
+SYNC_KEEP = 6  # clock round trips the offset is taken from, the fastest of them
+HALF_PERIOD = TICKS_PERIOD // 2
+
+
+class Tracker:
+    """Latency and dropped frames of one subscriber, fed frame by frame."""
+
+    def __init__(self):
+        self.offset = None  # fallback: smallest arrival - sent seen
+        self.clock = None  # local us - the can's ticks_us, from the fastest recent round trip
+        self.rtt = None
+        self.syncs = []
+        self.base = 0
+        self.last_sent = None
+        self.frame = 0
+        self.frames = 0
+        self.dropped = 0
+        self.us = []
+
+    def add(self, frame, arrival_us):
+        """``frame`` is a decoded telemetry frame, ``arrival_us`` any monotonic clock in us."""
+        if self.last_sent is not None and frame["sent"] < self.last_sent:
+            self.base += TICKS_PERIOD
+        self.last_sent = frame["sent"]
+        sent = self.base + frame["sent"]
+        if self.offset is None or arrival_us - sent < self.offset:
+            self.offset = arrival_us - sent
+        if self.clock is not None:
+            # Signed like ticks_diff: an offset error beyond the latency comes out
+            # a little below zero, which counts as none rather than a whole period
+            us = (arrival_us - self.clock - frame["ticks"] + HALF_PERIOD) % TICKS_PERIOD - HALF_PERIOD
+            self.us.append(max(0, us))
+        else:
+            age = (frame["sent"] - frame["ticks"]) % TICKS_PERIOD
+            self.us.append(arrival_us - self.offset - sent + age)
+        if self.frame and frame["frame"] > self.frame + 1:
+            self.dropped += frame["frame"] - self.frame - 1
+        self.frame = frame["frame"]
+        self.frames += 1
+
+    def sync(self, request_us, ticks, response_us):
+        """A round trip to ``/api/latency``: local us when it was sent and answered, the can's ticks_us."""
+        self.syncs.append((response_us - request_us, (request_us + response_us) // 2 - ticks))
+        del self.syncs[:-SYNC_KEEP]
+        self.rtt, self.clock = min(self.syncs)
+
+    def window(self):
+        """Summary of the frames since the last call, latencies in ms; None if there were none."""
+        if not self.us:
+            return None
+        s = sorted(self.us)
+        pct = lambda p: s[min(len(s) - 1, len(s) * p // 100)] / 1000
+        result = {"frames": self.frames, "dropped": self.dropped,
+                  "p50": pct(50), "p95": pct(95), "p99": pct(99), "max": s[-1] / 1000,
+                  "rtt": None if self.rtt is None else self.rtt / 1000}
+        self.us = []
+        self.frames = self.dropped = 0
+        return result
+
+
+def frames(host, port, timeout):
+    """Yield (decoded frame, arrival in us) from the server's event stream."""
+    sock = socket.create_connection((host, port), timeout)
+    sock.sendall(b"GET /api/stream HTTP/1.1\r\nHost: %s\r\nAccept: text/event-stream\r\n\r\n" % host.encode())
+    f = sock.makefile("rb")
+    try:
+        for line in f:
+            if line.startswith(b"data: "):
+                yield json.loads(line[6:]), time.monotonic_ns() // 1000
+    finally:
+        f.close()
+        sock.close()
+
+
+def clock(host, port, timeout):
+    """One round trip to ``/api/latency``: (local us sent, the can's ticks_us, local us answered)."""
+    sock = socket.create_connection((host, port), timeout)
+    try:
+        sent = time.monotonic_ns() // 1000
+        sock.sendall(b"GET /api/latency HTTP/1.1\r\nHost: %s\r\n\r\n" % host.encode())
+        data = sock.recv(512)
+        answered = time.monotonic_ns() // 1000
+        while True:  # the rest, up to the server closing the connection
+            more = sock.recv(512)
+            if not more:
+                break
+            data += more
+    finally:
+        sock.close()
+    return sent, json.loads(data.partition(b"\r\n\r\n")[2])["ticks"], answered
+
+
+def format_window(w):
+    return "%d frames, %d dropped; latency p50 %.1f ms, p95 %.1f ms, p99 %.1f ms, max %.1f ms (%s)" % (
+        w["frames"], w["dropped"], w["p50"], w["p95"], w["p99"], w["max"],
+        "no clock sync: low by the fastest delivery" if w["rtt"] is None else "clock +-%.1f ms" % (w["rtt"] / 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="192.168.4.1")
+    parser.add_argument("--port", type=int, default=80)
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds per reported window")
+    parser.add_argument("--seconds", type=float, default=0, help="stop after this long (0 = never)")
+    parser.add_argument("--timeout", type=float, default=5.0, help="give up when the stream stalls this long")
+    parser.add_argument("--sync", type=float, default=10.0, help="seconds between clock round trips (0 = none)")
+    args = parser.parse_args()
+    tracker = Tracker()
+    start = due = time.monotonic()
+    synced = None
+    try:
+        for frame, arrival in frames(args.host, args.port, args.timeout):
+            now = time.monotonic()
+            if args.sync and (synced is None or now - synced >= args.sync):
+                synced = now
+                try:
+                    tracker.sync(*clock(args.host, args.port, args.timeout))
+                except (OSError, ValueError, KeyError) as e:
+                    print("clock sync failed: %s" % e, file=sys.stderr)
+            tracker.add(frame, arrival)
+            if now - due >= args.interval:
+                due = now
+                print(format_window(tracker.window()), flush=True)
+            if args.seconds and now - start >= args.seconds:
+                break
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print("stream ended: %s" % e, file=sys.stderr)
+    w = tracker.window()
+    if w:
+        print(format_window(w))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Create the preallocated raw log file on an SD card (LOG_FORMAT = "raw").
+
+    python -m tools.prep_card /media/$USER/SDCARD --size 256
+
+Format the card (FAT32) first: on an empty card the file's clusters are
+allocated back to back, which the flight software checks at boot.  The file
+is filled with zeros so no stale log blocks are found in it.
+"""
+
+import argparse
+import os
+
+CHUNK = 1 << 20
+
+
+def prep(root, name, size_mb):
+    path = os.path.join(root, name)
+    zeros = bytes(CHUNK)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(zeros)
+        f.flush()
+        os.fsync(f.fileno())
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root", help="mount point of the SD card")
+    parser.add_argument("--size", type=int, default=256, help="size in MiB (default 256)")
+    parser.add_argument("--name", default="CANSAT.RAW", help="must match RAW_LOG_FILE in main.py")
+    args = parser.parse_args()
+    entries = [e for e in os.listdir(args.root) if not e.startswith((".", "System Volume"))]
+    if entries:
+        print("warning: card is not empty (%s); the file may end up fragmented" % ", ".join(entries[:5]))
+    path = prep(args.root, args.name, args.size)
+    print("%s: %d MiB, %d log blocks" % (path, args.size, args.size * 2048 - 1))
+
+
+if __name__ == "__main__":
+    main()